@@ -0,0 +1,76 @@
+"""Compare submit and claim throughput of the SQLite and in-memory job stores.
+
+Usage:
+
+    uv run python benchmarks/store_throughput.py --jobs 2000 --threads 8
+
+Both stores run against files in a temporary directory so the numbers include
+real commits/fsyncs. Each phase is run once single-threaded and once from a pool
+of threads, since the journal's group commit only pays off with concurrency.
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from deborgen.coordinator.app import JobStore, SqliteJobStore
+from deborgen.coordinator.memory_store import MemoryJobStore
+from deborgen.coordinator.models import JobCreateRequest
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="deborgen store throughput benchmark")
+    parser.add_argument("--jobs", type=int, default=2000, help="Jobs to submit and claim per run")
+    parser.add_argument("--threads", type=int, default=8, help="Threads for the concurrent runs")
+    return parser.parse_args()
+
+
+def run_phase(operation: Callable[[int], object], count: int, threads: int) -> float:
+    started = time.perf_counter()
+    if threads == 1:
+        for index in range(count):
+            operation(index)
+    else:
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(operation, range(count)))
+    return count / (time.perf_counter() - started)
+
+
+def bench_store(make_store: Callable[[Path], JobStore], jobs: int, threads: int) -> tuple[float, float]:
+    with tempfile.TemporaryDirectory() as tmp:
+        store = make_store(Path(tmp))
+        submit_rate = run_phase(
+            lambda index: store.create_job(JobCreateRequest(command=f"echo {index}")),
+            jobs,
+            threads,
+        )
+        claim_rate = run_phase(
+            lambda index: store.claim_next_job(f"node-{index % 16}"),
+            jobs,
+            threads,
+        )
+        if isinstance(store, MemoryJobStore):
+            store.close()
+        return submit_rate, claim_rate
+
+
+def main() -> None:
+    args = parse_args()
+    stores: dict[str, Callable[[Path], JobStore]] = {
+        "sqlite": lambda tmp: SqliteJobStore(db_path=str(tmp / "bench.db")),
+        "memory": lambda tmp: MemoryJobStore(journal_dir=str(tmp / "journal")),
+    }
+    print(f"{'store':<8} {'threads':>7} {'submit/s':>10} {'claim/s':>10}")
+    for name, make_store in stores.items():
+        for threads in sorted({1, args.threads}):
+            submit_rate, claim_rate = bench_store(make_store, args.jobs, threads)
+            print(f"{name:<8} {threads:>7} {submit_rate:>10.0f} {claim_rate:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""Compare bytes on the wire and CPU per request for the worker's encodings.
+
+Usage:
+
+    uv run --extra wire python benchmarks/wire_protocol.py --jobs 200 --log-kb 64
+
+Each job runs through the worker's cycle: heartbeat, claim, and a completion that
+carries the job's log text. The coordinator runs in process, so CPU per request
+is client and coordinator together; the store's work is the same in every mode,
+so differences between rows come from encoding. Modes that need `msgpack` or
+`zstandard` are skipped when those packages are missing.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from collections import defaultdict
+from typing import Any
+
+import httpx
+from fastapi.testclient import TestClient
+
+from deborgen.coordinator.app import create_app
+from deborgen.core.wire import MSGPACK_TYPE, WireClient, content_encodings, has_msgpack
+
+
+class CountingTransport(httpx.BaseTransport):
+    """Records the encoded size of each request and response body."""
+
+    def __init__(self, inner: httpx.BaseTransport) -> None:
+        self.inner = inner
+        self.sent: dict[str, int] = defaultdict(int)
+        self.received: dict[str, int] = defaultdict(int)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        endpoint = request.url.path.rsplit("/", 1)[-1]
+        self.sent[endpoint] += len(request.read())
+        response = self.inner.handle_request(request)
+        raw = b"".join(response.stream)
+        self.received[endpoint] += len(raw)
+        return httpx.Response(response.status_code, headers=response.headers, content=raw)
+
+
+class PinnedClient(WireClient):
+    """A WireClient that uses a fixed set of request encodings instead of negotiating."""
+
+    def __init__(self, *args: Any, accepts: frozenset[str], **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.pinned = accepts
+
+    def send(self, request: httpx.Request, **kwargs: Any) -> httpx.Response:
+        self.peer_accepts = self.pinned
+        return super().send(request, **kwargs)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="deborgen wire protocol benchmark")
+    parser.add_argument("--jobs", type=int, default=200, help="Worker cycles per mode")
+    parser.add_argument("--log-kb", type=int, default=64, help="Log text per job, in KiB")
+    return parser.parse_args()
+
+
+def make_log(size: int, seed: int) -> str:
+    rng = random.Random(seed)
+    lines = []
+    total = 0
+    step = 0
+    while total < size:
+        line = (
+            f"step {step:>6} loss {rng.uniform(0.1, 3):.4f} lr 3.0e-04 "
+            f"grad_norm {rng.uniform(0, 2):.3f} tokens/s {rng.randint(9000, 12000)}\n"
+        )
+        lines.append(line)
+        total += len(line)
+        step += 1
+    return "".join(lines)
+
+
+def modes() -> dict[str, tuple[frozenset[str], str | None, bool]]:
+    """name -> (request encodings, response Accept-Encoding, MessagePack responses)."""
+    available: dict[str, tuple[frozenset[str], str | None, bool]] = {
+        "json": (frozenset(), None, False),
+        "json+gzip": (frozenset({"gzip"}), "gzip", False),
+    }
+    if "zstd" in content_encodings():
+        available["json+zstd"] = (frozenset({"zstd"}), "zstd", False)
+    if has_msgpack():
+        available["msgpack"] = (frozenset({MSGPACK_TYPE}), None, True)
+        available["msgpack+gzip"] = (frozenset({MSGPACK_TYPE, "gzip"}), "gzip", True)
+        if "zstd" in content_encodings():
+            available["msgpack+zstd"] = (frozenset({MSGPACK_TYPE, "zstd"}), "zstd", True)
+    return available
+
+
+def bench_mode(
+    accepts: frozenset[str], accept_encoding: str | None, packed: bool, jobs: int, log: str
+) -> tuple[CountingTransport, float, int]:
+    app = create_app(db_path=":memory:", store_kind="memory", journal_dir=":memory:")
+    with TestClient(app) as submitter:
+        transport = CountingTransport(submitter._transport)
+        worker = PinnedClient(
+            transport=transport,
+            base_url=str(submitter.base_url),
+            compact=bool(accepts) or packed,
+            accepts=accepts,
+        )
+        worker.headers["Accept-Encoding"] = accept_encoding or "identity"
+        worker.headers["Accept"] = f"{MSGPACK_TYPE}, application/json" if packed else "application/json"
+        requests = 0
+        cpu = 0.0
+        for index in range(jobs):
+            submitter.post("/jobs", json={"command": f"python train.py --seed {index}"})
+            started = time.process_time()
+            worker.post("/nodes/bench/heartbeat", json={"labels": {"os": "linux", "cpu_cores": 8}})
+            assignment = worker.get("/jobs/next", params={"node_id": "bench"}).json()
+            worker.post(
+                f"/jobs/{assignment['job']['id']}/complete",
+                json={
+                    "node_id": "bench",
+                    "lease_token": assignment["lease_token"],
+                    "exit_code": 0,
+                    "failure_reason": None,
+                    "logs": log,
+                    "artifact_urls": [],
+                },
+            ).raise_for_status()
+            cpu += time.process_time() - started
+            requests += 3
+        return transport, cpu, requests
+
+
+def main() -> None:
+    args = parse_args()
+    log = make_log(args.log_kb * 1024, seed=0)
+    print(f"{'mode':<14} {'endpoint':<10} {'sent B/op':>10} {'recv B/op':>10}")
+    cpu_rows = []
+    for name, (accepts, accept_encoding, packed) in modes().items():
+        transport, cpu, requests = bench_mode(accepts, accept_encoding, packed, args.jobs, log)
+        for endpoint in ("heartbeat", "next", "complete"):
+            print(
+                f"{name:<14} {endpoint:<10} {transport.sent[endpoint] / args.jobs:>10.0f} "
+                f"{transport.received[endpoint] / args.jobs:>10.0f}"
+            )
+        cpu_rows.append((name, cpu / requests * 1000))
+    print()
+    print(f"{'mode':<14} {'CPU ms/request':>15}")
+    for name, cpu_ms in cpu_rows:
+        print(f"{name:<14} {cpu_ms:>15.3f}")
+
+
+if __name__ == "__main__":
+    main()
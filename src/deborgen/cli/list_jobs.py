@@ -26,7 +26,7 @@ def parse_args() -> argparse.Namespace:
     )
     parser.add_argument(
         "--status",
-        choices=("queued", "running", "succeeded", "failed"),
+        choices=("blocked", "queued", "running", "succeeded", "failed"),
         default=None,
         help="Optional status filter",
     )
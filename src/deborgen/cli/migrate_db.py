@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import argparse
+import os
+import sqlite3
+
+from deborgen.coordinator.app import SqliteJobStore
+from deborgen.coordinator.schema import SCHEMA_VERSION
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Upgrade a coordinator's SQLite database to the current schema",
+    )
+    parser.add_argument(
+        "db_path",
+        nargs="?",
+        default=os.getenv("DEBORGEN_DB_PATH", "deborgen.db"),
+        help="Database file (defaults to DEBORGEN_DB_PATH, then deborgen.db)",
+    )
+    parser.add_argument(
+        "--backup",
+        default=None,
+        help="Copy the database here before migrating (default: <db_path>.bak)",
+    )
+    parser.add_argument("--no-backup", action="store_true", help="Migrate without a backup copy")
+    parser.add_argument(
+        "--vacuum",
+        action="store_true",
+        help="Rewrite the file afterwards to return the space the old tables used",
+    )
+    return parser.parse_args()
+
+
+def schema_version(db_path: str) -> int:
+    conn = sqlite3.connect(db_path)
+    try:
+        return int(conn.execute("PRAGMA user_version").fetchone()[0])
+    finally:
+        conn.close()
+
+
+def backup_database(db_path: str, backup_path: str) -> None:
+    """Consistent copy through SQLite's backup API, safe while coordinators are running."""
+    if os.path.exists(backup_path):
+        raise SystemExit(f"backup {backup_path} already exists; pass another --backup")
+    source = sqlite3.connect(db_path)
+    target = sqlite3.connect(backup_path)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+
+def checkpoint(db_path: str, vacuum: bool) -> None:
+    """Fold the WAL back into the main file, optionally rewriting it compactly first."""
+    conn = sqlite3.connect(db_path)
+    try:
+        if vacuum:
+            conn.execute("VACUUM")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    finally:
+        conn.close()
+
+
+def main() -> None:
+    args = parse_args()
+    if not os.path.exists(args.db_path):
+        raise SystemExit(f"no database at {args.db_path}")
+
+    version = schema_version(args.db_path)
+    size_before = os.path.getsize(args.db_path)
+    if version >= SCHEMA_VERSION:
+        print(f"{args.db_path} is already at schema version {version}")
+    else:
+        if not args.no_backup:
+            backup_path = args.backup or f"{args.db_path}.bak"
+            backup_database(args.db_path, backup_path)
+            print(f"backed up to {backup_path}")
+        # Opening the store runs the migration, in a single transaction.
+        SqliteJobStore(db_path=args.db_path)
+        print(f"migrated {args.db_path} from schema version {version} to {SCHEMA_VERSION}")
+    checkpoint(args.db_path, args.vacuum)
+    print(f"size: {size_before} -> {os.path.getsize(args.db_path)} bytes")
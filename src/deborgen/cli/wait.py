@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+from collections.abc import Callable, Mapping
+from pathlib import Path
+
+from deborgen.client import DeborgenClient
+from deborgen.coordinator.models import JobStatus, JobStatusEntry
+
+STATUS_ORDER: tuple[JobStatus, ...] = ("blocked", "queued", "running", "succeeded", "failed")
+ACTIVE_STATES: tuple[JobStatus, ...] = ("blocked", "queued", "running")
+MAX_FAILURES_SHOWN = 20
+
+# Counts of jobs per status (plus "missing") and the failed jobs seen so far.
+Progress = tuple[dict[str, int], list[JobStatusEntry]]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Wait for many deborgen jobs to reach a terminal state",
+    )
+    parser.add_argument("job_ids", nargs="*", help="Job ids, for example job_1 job_2")
+    parser.add_argument("--coordinator", required=True, help="Coordinator base URL")
+    parser.add_argument(
+        "--token",
+        default=os.getenv("DEBORGEN_TOKEN"),
+        help="Bearer token (defaults to DEBORGEN_TOKEN)",
+    )
+    parser.add_argument("--group", default=None, help="Wait for every job in this submission group")
+    parser.add_argument(
+        "--ids-file",
+        default=None,
+        help="Read job ids from this file, one per line ('-' for stdin)",
+    )
+    parser.add_argument(
+        "--min-poll-seconds",
+        type=float,
+        default=1.0,
+        help="Polling interval while jobs are changing state",
+    )
+    parser.add_argument(
+        "--max-poll-seconds",
+        type=float,
+        default=30.0,
+        help="Longest interval the poller backs off to while nothing changes",
+    )
+    parser.add_argument(
+        "--timeout-seconds",
+        type=float,
+        default=None,
+        help="How long to wait before giving up (default: wait indefinitely)",
+    )
+    return parser.parse_args()
+
+
+class PollInterval:
+    """Poll at `minimum` while statuses change; back off toward `maximum` while they don't."""
+
+    def __init__(self, minimum: float, maximum: float, factor: float = 1.5) -> None:
+        self.minimum = minimum
+        self.maximum = max(maximum, minimum)
+        self.factor = factor
+        self.current = minimum
+
+    def next(self, changed: bool) -> float:
+        if changed:
+            self.current = self.minimum
+        else:
+            self.current = min(self.current * self.factor, self.maximum)
+        return self.current
+
+
+def format_progress(counts: Mapping[str, int]) -> str:
+    total = sum(counts.values())
+    done = total - sum(counts.get(status, 0) for status in ACTIVE_STATES)
+    parts = [
+        f"{status}={counts[status]}" for status in (*STATUS_ORDER, "missing") if counts.get(status)
+    ]
+    return " ".join([f"{done}/{total} done", *parts])
+
+
+def read_job_ids(job_ids: list[str], ids_file: str | None) -> list[str]:
+    if ids_file is not None:
+        text = sys.stdin.read() if ids_file == "-" else Path(ids_file).read_text()
+        job_ids = job_ids + [line.strip() for line in text.splitlines() if line.strip()]
+    return list(dict.fromkeys(job_ids))
+
+
+def id_poller(client: DeborgenClient, job_ids: list[str]) -> Callable[[], Progress]:
+    """Each poll asks only about jobs not yet seen finishing, so requests shrink over time."""
+    pending = list(job_ids)
+    finished: Counter[str] = Counter()
+    failed: list[JobStatusEntry] = []
+
+    def poll() -> Progress:
+        nonlocal pending
+        response = client.statuses(pending)
+        active: Counter[str] = Counter()
+        still_pending: set[str] = set()
+        for entry in response.jobs:
+            if entry.status in ACTIVE_STATES:
+                active[entry.status] += 1
+                still_pending.add(entry.id)
+            else:
+                finished[entry.status] += 1
+                if entry.status == "failed":
+                    failed.append(entry)
+        finished["missing"] += len(response.missing)
+        pending = [job_id for job_id in pending if job_id in still_pending]
+        return dict(finished + active), failed
+
+    return poll
+
+
+def group_poller(client: DeborgenClient, group_id: str) -> Callable[[], Progress]:
+    """Each poll is one request: counts for the group plus entries for its failures."""
+
+    def poll() -> Progress:
+        response = client.group_statuses(group_id, statuses=["failed"])
+        return {status: count for status, count in response.counts.items()}, response.jobs
+
+    return poll
+
+
+def wait_for_jobs(
+    poll: Callable[[], Progress], interval: PollInterval, timeout_seconds: float | None
+) -> Progress:
+    deadline = None if timeout_seconds is None else time.monotonic() + timeout_seconds
+    last_counts: dict[str, int] | None = None
+    while True:
+        counts, failed = poll()
+        changed = counts != last_counts
+        if changed:
+            print(format_progress(counts), flush=True)
+            last_counts = counts
+        if not any(counts.get(status) for status in ACTIVE_STATES):
+            return counts, failed
+        if deadline is not None and time.monotonic() >= deadline:
+            raise SystemExit(f"timed out: {format_progress(counts)}")
+        time.sleep(interval.next(changed))
+
+
+def print_failures(failed: list[JobStatusEntry]) -> None:
+    for entry in failed[:MAX_FAILURES_SHOWN]:
+        reason = entry.failure_reason or f"exit code {entry.exit_code}"
+        print(f"failed {entry.id}: {reason}")
+    if len(failed) > MAX_FAILURES_SHOWN:
+        print(f"... and {len(failed) - MAX_FAILURES_SHOWN} more failures")
+
+
+def main() -> None:
+    args = parse_args()
+    job_ids = read_job_ids(args.job_ids, args.ids_file)
+    if (args.group is None) == (not job_ids):
+        raise SystemExit("give job ids (or --ids-file) or --group, but not both")
+
+    with DeborgenClient(args.coordinator, token=args.token) as client:
+        poll = group_poller(client, args.group) if args.group else id_poller(client, job_ids)
+        counts, failed = wait_for_jobs(
+            poll,
+            PollInterval(args.min_poll_seconds, args.max_poll_seconds),
+            args.timeout_seconds,
+        )
+
+    if not counts:
+        raise SystemExit(f"no jobs found in group {args.group}")
+    print_failures(failed)
+    if failed or counts.get("missing"):
+        raise SystemExit(1)
@@ -65,13 +65,21 @@ def watch_job(
 ) -> None:
     deadline = time.monotonic() + timeout_seconds
     headers = build_headers(token)
+    job: dict[str, object] = {}
+    etag: str | None = None
 
     with httpx.Client(headers=headers, timeout=30.0) as client:
         while True:
-            response = client.get(f"{coordinator}/jobs/{job_id}")
-            response.raise_for_status()
-            job: dict[str, object] = response.json()
-            print(format_summary(job))
+            # Conditional after the first poll: an unchanged job comes back as an empty 304.
+            response = client.get(
+                f"{coordinator}/jobs/{job_id}",
+                headers={"If-None-Match": etag} if etag is not None else None,
+            )
+            if response.status_code != 304:
+                response.raise_for_status()
+                job = response.json()
+                etag = response.headers.get("ETag")
+                print(format_summary(job))
 
             status = str(job["status"])
             if status in TERMINAL_STATES:
@@ -0,0 +1,6 @@
+"""Programmatic access to a deborgen coordinator."""
+
+from deborgen.client.executor import DeborgenExecutor, JobFailedError
+from deborgen.client.http import AsyncDeborgenClient, DeborgenClient
+
+__all__ = ["AsyncDeborgenClient", "DeborgenClient", "DeborgenExecutor", "JobFailedError"]
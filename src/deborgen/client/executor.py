@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import logging
+import secrets
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Executor, Future
+from typing import Any
+
+import httpx
+
+from deborgen.client.http import DeborgenClient
+from deborgen.coordinator.models import JobBatchItem, JobStatusEntry
+
+logger = logging.getLogger("deborgen.client")
+
+
+class JobFailedError(Exception):
+    """Raised by a future whose job finished as `failed`."""
+
+    def __init__(self, status: JobStatusEntry) -> None:
+        reason = status.failure_reason or f"exit code {status.exit_code}"
+        super().__init__(f"{status.id} failed: {reason}")
+        self.status = status
+
+
+def entrypoint_for(fn: Callable[..., Any] | str) -> str:
+    """The `module:function` a worker will import for `fn`."""
+    if isinstance(fn, str):
+        return fn
+    module = getattr(fn, "__module__", None)
+    qualname = getattr(fn, "__qualname__", None)
+    if not module or not qualname or module == "__main__" or "<" in qualname:
+        raise ValueError(f"{fn!r} is not importable by name on a worker")
+    return f"{module}:{qualname}"
+
+
+class DeborgenExecutor(Executor):
+    """Run Python callables on the cooperative as `python` jobs.
+
+    `submit(fn, *args)` queues a job for `fn`'s `module:function` (which must be
+    importable on the workers) or for an entrypoint string. Queued jobs go out
+    through `POST /jobs/batch`, `batch_size` at a time or after `linger_seconds`,
+    all in one submission group. A single background thread looks up every
+    outstanding job with one bulk status request per `poll_seconds`. A future
+    resolves to the job's `JobStatusEntry`, or raises `JobFailedError`.
+
+    Futures can be cancelled until their batch is sent. Shutting down does not
+    cancel jobs that are already on the coordinator.
+    """
+
+    def __init__(
+        self,
+        client: DeborgenClient,
+        group_id: str | None = None,
+        batch_size: int = 500,
+        linger_seconds: float = 0.05,
+        poll_seconds: float = 1.0,
+        job_defaults: dict[str, Any] | None = None,
+    ) -> None:
+        self.client = client
+        self.group_id = group_id or f"grp_{secrets.token_hex(6)}"
+        self._batch_size = batch_size
+        self._linger_seconds = linger_seconds
+        self._poll_seconds = poll_seconds
+        self._job_defaults = job_defaults or {}
+        self._condition = threading.Condition()
+        self._pending: list[tuple[JobBatchItem, Future[Any]]] = []
+        self._pending_since = 0.0
+        self._outstanding: dict[str, Future[Any]] = {}
+        self._shutdown = False
+        self._thread = threading.Thread(target=self._run, name="deborgen-executor", daemon=True)
+        self._thread.start()
+
+    def submit(self, fn: Callable[..., Any] | str, /, *args: Any, **kwargs: Any) -> Future[Any]:
+        if args and kwargs:
+            raise TypeError("python jobs take positional or keyword arguments, not both")
+        item = JobBatchItem.model_validate(
+            {
+                **self._job_defaults,
+                "command": entrypoint_for(fn),
+                "kind": "python",
+                "args": dict(kwargs) if kwargs else list(args),
+            }
+        )
+        future: Future[Any] = Future()
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError("cannot schedule new futures after shutdown")
+            if not self._pending:
+                self._pending_since = time.monotonic()
+            self._pending.append((item, future))
+            self._condition.notify()
+        return future
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        with self._condition:
+            self._shutdown = True
+            if cancel_futures:
+                for _, future in self._pending:
+                    future.cancel()
+                self._pending = []
+            self._condition.notify()
+        if wait:
+            self._thread.join()
+
+    def _run(self) -> None:
+        next_poll = time.monotonic() + self._poll_seconds
+        while True:
+            with self._condition:
+                while True:
+                    now = time.monotonic()
+                    if self._shutdown and not self._pending and not self._outstanding:
+                        return
+                    flush_due = bool(self._pending) and (
+                        self._shutdown
+                        or len(self._pending) >= self._batch_size
+                        or now >= self._pending_since + self._linger_seconds
+                    )
+                    poll_due = bool(self._outstanding) and now >= next_poll
+                    if flush_due or poll_due:
+                        break
+                    waits = [next_poll - now] if self._outstanding else []
+                    if self._pending:
+                        waits.append(self._pending_since + self._linger_seconds - now)
+                    self._condition.wait(min(waits) if waits else None)
+                batch: list[tuple[JobBatchItem, Future[Any]]] = []
+                if flush_due:
+                    batch = self._pending[: self._batch_size]
+                    self._pending = self._pending[self._batch_size :]
+                    self._pending_since = now
+                outstanding = dict(self._outstanding) if poll_due else {}
+            if batch:
+                self._send(batch)
+            if outstanding:
+                self._poll(outstanding)
+                next_poll = time.monotonic() + self._poll_seconds
+
+    def _send(self, batch: list[tuple[JobBatchItem, Future[Any]]]) -> None:
+        # Cancelled futures are dropped here; the rest can no longer be cancelled.
+        live = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+        if not live:
+            return
+        try:
+            jobs = self.client.submit_batch([item for item, _ in live], group_id=self.group_id)
+        except (httpx.HTTPError, ValueError) as exc:
+            for _, future in live:
+                future.set_exception(exc)
+            return
+        with self._condition:
+            for job, (_, future) in zip(jobs, live, strict=True):
+                self._outstanding[job.id] = future
+
+    def _poll(self, outstanding: dict[str, Future[Any]]) -> None:
+        try:
+            response = self.client.statuses(list(outstanding))
+        except (httpx.HTTPError, ValueError) as exc:
+            logger.warning("status poll failed, retrying: %s", exc)
+            return
+        done: list[str] = []
+        for status in response.jobs:
+            if status.status == "succeeded":
+                outstanding[status.id].set_result(status)
+            elif status.status == "failed":
+                outstanding[status.id].set_exception(JobFailedError(status))
+            else:
+                continue
+            done.append(status.id)
+        for job_id in response.missing:
+            outstanding[job_id].set_exception(LookupError(f"{job_id} not found"))
+            done.append(job_id)
+        with self._condition:
+            for job_id in done:
+                del self._outstanding[job_id]
@@ -0,0 +1,297 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from collections import Counter
+from collections.abc import Sequence
+from types import TracebackType
+from typing import Any, Self
+
+import httpx
+
+from deborgen.coordinator.models import (
+    STATUS_LOOKUP_MAX,
+    Job,
+    JobBatchItem,
+    JobCreateRequest,
+    JobListResponse,
+    JobLogsResponse,
+    JobStatus,
+    JobStatusResponse,
+)
+from deborgen.core.backoff import OVERLOADED_STATUSES, PollBackoff, retry_after
+from deborgen.core.wire import WireClient
+
+DEFAULT_TIMEOUT_SECONDS = 30.0
+DEFAULT_MAX_CONNECTIONS = 20
+# Jobs remembered with their ETags, so polling the same job sends conditional requests.
+JOB_CACHE_SIZE = 1024
+# Tries for a request an overloaded coordinator sheds with 429/503 before the error is
+# raised, and the first and longest wait between them absent a `Retry-After`.
+OVERLOAD_RETRIES = 5
+OVERLOAD_BACKOFF_SECONDS = 0.5
+OVERLOAD_BACKOFF_MAX_SECONDS = 30.0
+
+
+def build_headers(token: str | None) -> dict[str, str]:
+    token = token if token is not None else os.getenv("DEBORGEN_TOKEN")
+    return {"Authorization": f"Bearer {token}"} if token else {}
+
+
+def batch_body(jobs: Sequence[JobBatchItem], group_id: str | None) -> dict[str, Any]:
+    body: dict[str, Any] = {"jobs": [job.model_dump(mode="json", exclude_unset=True) for job in jobs]}
+    if group_id is not None:
+        body["group_id"] = group_id
+    return body
+
+
+def status_body(
+    job_ids: Sequence[str] = (),
+    group_id: str | None = None,
+    statuses: Sequence[JobStatus] | None = None,
+) -> dict[str, Any]:
+    body: dict[str, Any] = {"ids": list(job_ids)} if group_id is None else {"group_id": group_id}
+    if statuses is not None:
+        body["statuses"] = list(statuses)
+    return body
+
+
+class JobCache:
+    """Recently fetched jobs by id, with the ETag each was served under."""
+
+    def __init__(self, size: int = JOB_CACHE_SIZE) -> None:
+        self.size = size
+        self._entries: dict[str, tuple[str, Job]] = {}
+
+    def headers(self, job_id: str) -> dict[str, str]:
+        entry = self._entries.get(job_id)
+        return {"If-None-Match": entry[0]} if entry is not None else {}
+
+    def resolve(self, job_id: str, response: httpx.Response) -> Job:
+        """The job a GET answered with, reusing the cached copy on 304 Not Modified."""
+        entry = self._entries.get(job_id)
+        if response.status_code == 304 and entry is not None:
+            return entry[1].model_copy(deep=True)
+        response.raise_for_status()
+        job = Job.model_validate(response.json())
+        etag = response.headers.get("ETag")
+        if etag is not None:
+            self._entries.pop(job_id, None)
+            if len(self._entries) >= self.size:
+                del self._entries[next(iter(self._entries))]
+            self._entries[job_id] = (etag, job.model_copy(deep=True))
+        return job
+
+
+def overload_backoff() -> PollBackoff:
+    return PollBackoff(OVERLOAD_BACKOFF_SECONDS, OVERLOAD_BACKOFF_MAX_SECONDS)
+
+
+def merge_statuses(responses: list[JobStatusResponse]) -> JobStatusResponse:
+    counts: Counter[JobStatus] = Counter()
+    for response in responses:
+        counts.update(response.counts)
+    return JobStatusResponse(
+        jobs=[entry for response in responses for entry in response.jobs],
+        missing=[job_id for response in responses for job_id in response.missing],
+        counts=dict(counts),
+    )
+
+
+class DeborgenClient:
+    """Thread-safe coordinator client with a shared keep-alive connection pool.
+
+    The token defaults to `DEBORGEN_TOKEN`. Request bodies are negotiated down to
+    MessagePack and compressed the same way the worker's are. A request shed with
+    `429` or `503` is retried up to `overload_retries` times, waiting at least its
+    `Retry-After` plus jitter, like a worker's claims. HTTP errors raise
+    `httpx.HTTPStatusError`.
+    """
+
+    def __init__(
+        self,
+        coordinator: str,
+        token: str | None = None,
+        timeout: float = DEFAULT_TIMEOUT_SECONDS,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        transport: httpx.BaseTransport | None = None,
+        overload_retries: int = OVERLOAD_RETRIES,
+    ) -> None:
+        self.overload_retries = overload_retries
+        self._http = WireClient(
+            base_url=coordinator.rstrip("/"),
+            headers=build_headers(token),
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections, max_keepalive_connections=max_connections
+            ),
+            transport=transport,
+        )
+        self._jobs = JobCache()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._http.close()
+
+    def _request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        backoff = overload_backoff()
+        for _ in range(self.overload_retries):
+            response = self._http.request(method, url, **kwargs)
+            if response.status_code not in OVERLOADED_STATUSES:
+                return response
+            time.sleep(backoff.next(retry_after(response)))
+        return self._http.request(method, url, **kwargs)
+
+    def submit(self, job: JobCreateRequest) -> Job:
+        response = self._request(
+            "POST", "/jobs", json=job.model_dump(mode="json", exclude_unset=True)
+        )
+        response.raise_for_status()
+        return Job.model_validate(response.json())
+
+    def submit_batch(self, jobs: Sequence[JobBatchItem], group_id: str | None = None) -> list[Job]:
+        response = self._request("POST", "/jobs/batch", json=batch_body(jobs, group_id))
+        response.raise_for_status()
+        return JobListResponse.model_validate(response.json()).jobs
+
+    def get_job(self, job_id: str) -> Job:
+        response = self._request("GET", f"/jobs/{job_id}", headers=self._jobs.headers(job_id))
+        return self._jobs.resolve(job_id, response)
+
+    def statuses(
+        self, job_ids: Sequence[str], statuses: Sequence[JobStatus] | None = None
+    ) -> JobStatusResponse:
+        """Status of every job in `job_ids`, in as few requests as the server allows."""
+        responses = []
+        for start in range(0, len(job_ids), STATUS_LOOKUP_MAX):
+            chunk = job_ids[start : start + STATUS_LOOKUP_MAX]
+            response = self._request(
+                "POST", "/jobs/status", json=status_body(chunk, statuses=statuses)
+            )
+            response.raise_for_status()
+            responses.append(JobStatusResponse.model_validate(response.json()))
+        return merge_statuses(responses)
+
+    def group_statuses(
+        self, group_id: str, statuses: Sequence[JobStatus] | None = None
+    ) -> JobStatusResponse:
+        """Status counts for a submission group, with entries for jobs in `statuses`."""
+        response = self._request(
+            "POST", "/jobs/status", json=status_body(group_id=group_id, statuses=statuses)
+        )
+        response.raise_for_status()
+        return JobStatusResponse.model_validate(response.json())
+
+    def logs(self, job_id: str) -> str:
+        response = self._request("GET", f"/jobs/{job_id}/logs")
+        response.raise_for_status()
+        return JobLogsResponse.model_validate(response.json()).text
+
+
+class AsyncDeborgenClient:
+    """`DeborgenClient` for asyncio code, over a pooled `httpx.AsyncClient`.
+
+    Unlike `DeborgenClient` it sends plain, uncompressed JSON: MessagePack and
+    compression are negotiated by `WireClient`, which is synchronous. It retries
+    shed requests the same way.
+    """
+
+    def __init__(
+        self,
+        coordinator: str,
+        token: str | None = None,
+        timeout: float = DEFAULT_TIMEOUT_SECONDS,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        transport: httpx.AsyncBaseTransport | None = None,
+        overload_retries: int = OVERLOAD_RETRIES,
+    ) -> None:
+        self.overload_retries = overload_retries
+        self._http = httpx.AsyncClient(
+            base_url=coordinator.rstrip("/"),
+            headers=build_headers(token),
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections, max_keepalive_connections=max_connections
+            ),
+            transport=transport,
+        )
+        self._jobs = JobCache()
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        await self._http.aclose()
+
+    async def _request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        backoff = overload_backoff()
+        for _ in range(self.overload_retries):
+            response = await self._http.request(method, url, **kwargs)
+            if response.status_code not in OVERLOADED_STATUSES:
+                return response
+            await asyncio.sleep(backoff.next(retry_after(response)))
+        return await self._http.request(method, url, **kwargs)
+
+    async def submit(self, job: JobCreateRequest) -> Job:
+        response = await self._request(
+            "POST", "/jobs", json=job.model_dump(mode="json", exclude_unset=True)
+        )
+        response.raise_for_status()
+        return Job.model_validate(response.json())
+
+    async def submit_batch(
+        self, jobs: Sequence[JobBatchItem], group_id: str | None = None
+    ) -> list[Job]:
+        response = await self._request("POST", "/jobs/batch", json=batch_body(jobs, group_id))
+        response.raise_for_status()
+        return JobListResponse.model_validate(response.json()).jobs
+
+    async def get_job(self, job_id: str) -> Job:
+        response = await self._request("GET", f"/jobs/{job_id}", headers=self._jobs.headers(job_id))
+        return self._jobs.resolve(job_id, response)
+
+    async def statuses(
+        self, job_ids: Sequence[str], statuses: Sequence[JobStatus] | None = None
+    ) -> JobStatusResponse:
+        responses = []
+        for start in range(0, len(job_ids), STATUS_LOOKUP_MAX):
+            chunk = job_ids[start : start + STATUS_LOOKUP_MAX]
+            response = await self._request(
+                "POST", "/jobs/status", json=status_body(chunk, statuses=statuses)
+            )
+            response.raise_for_status()
+            responses.append(JobStatusResponse.model_validate(response.json()))
+        return merge_statuses(responses)
+
+    async def group_statuses(
+        self, group_id: str, statuses: Sequence[JobStatus] | None = None
+    ) -> JobStatusResponse:
+        response = await self._request(
+            "POST", "/jobs/status", json=status_body(group_id=group_id, statuses=statuses)
+        )
+        response.raise_for_status()
+        return JobStatusResponse.model_validate(response.json())
+
+    async def logs(self, job_id: str) -> str:
+        response = await self._request("GET", f"/jobs/{job_id}/logs")
+        response.raise_for_status()
+        return JobLogsResponse.model_validate(response.json()).text
@@ -0,0 +1,158 @@
+"""Load shedding in front of the store, so an overload fails fast instead of timing out.
+
+Every request that reaches the store contends for one lock (and, with several
+coordinator processes, one SQLite write lock). A burst of workers reconnecting or a
+large submit script can queue more requests behind it than finish before their
+clients time out. The middleware here rejects requests it cannot serve promptly with
+`429` or `503` and a `Retry-After`, which workers back off on.
+"""
+
+from __future__ import annotations
+
+import math
+import re
+import time
+from dataclasses import dataclass
+from typing import Literal
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+RouteClass = Literal["worker", "user"]
+
+# Reports of work already done: shedding one would waste a whole run, and there are
+# never more of them in flight than running jobs.
+EXEMPT_ROUTES = re.compile(
+    r"/health|/admin/.*|/jobs/[^/]+/(finish|complete|preempt|artifacts(/presign)?)"
+)
+WORKER_ROUTES = re.compile(r"/nodes/[^/]+/heartbeat|/jobs/[^/]+/logs")
+MAX_RETRY_AFTER_SECONDS = 30
+
+
+def route_class(method: str, path: str) -> RouteClass | None:
+    """Which budget a request draws on, or None for requests that are never shed."""
+    if EXEMPT_ROUTES.fullmatch(path):
+        return None
+    if path == "/jobs/next" or (method == "POST" and WORKER_ROUTES.fullmatch(path)):
+        return "worker"
+    return "user"
+
+
+@dataclass(frozen=True)
+class AdmissionPolicy:
+    """Limits on concurrent requests and on standing queueing delay, per route class.
+
+    Worker routes (heartbeats, claims, log uploads) and user routes (submitting,
+    listing, reading jobs) each have their own in-flight budget, so a submit script
+    cannot starve the fleet and a reconnecting fleet cannot lock users out. A request
+    over its class's budget gets `429`.
+
+    Queueing delay is the shortest latency of any request that finished during the
+    last `window_seconds`. A burst that drains quickly leaves some fast requests in
+    the window; only a standing queue makes every request slow. A window in which
+    fewer than `min_samples` requests finished counts as no delay, so one slow
+    request (a large batch, say) on a quiet coordinator does not look like a queue.
+    While that delay is over a class's target, its requests get `503`. User routes
+    are shed at a lower target than worker routes, so they give way first.
+    """
+
+    worker_in_flight: int = 64
+    user_in_flight: int = 16
+    worker_target_seconds: float = 2.0
+    user_target_seconds: float = 0.5
+    window_seconds: float = 1.0
+    min_samples: int = 5
+
+    def limits(self, route: RouteClass) -> tuple[int, float]:
+        if route == "worker":
+            return self.worker_in_flight, self.worker_target_seconds
+        return self.user_in_flight, self.user_target_seconds
+
+
+class AdmissionController:
+    """In-flight counts and the queueing-delay estimate for one coordinator process.
+
+    Only the event loop touches it, from the middleware, so it needs no lock.
+    """
+
+    def __init__(self, policy: AdmissionPolicy) -> None:
+        self.policy = policy
+        self.in_flight: dict[RouteClass, int] = {"worker": 0, "user": 0}
+        self.rejected: dict[RouteClass, int] = {"worker": 0, "user": 0}
+        self.delay_seconds = 0.0
+        self._window_started = time.monotonic()
+        self._window_min: float | None = None
+        self._window_count = 0
+
+    def admit(self, route: RouteClass, now: float) -> int | None:
+        """None to serve the request, or the status code to reject it with."""
+        self._roll_window(now)
+        max_in_flight, target_seconds = self.policy.limits(route)
+        code: int | None = None
+        if self.in_flight[route] >= max_in_flight:
+            code = 429
+        elif self.delay_seconds > target_seconds:
+            code = 503
+        if code is None:
+            self.in_flight[route] += 1
+        else:
+            self.rejected[route] += 1
+        return code
+
+    def release(self, route: RouteClass, latency_seconds: float) -> None:
+        self.in_flight[route] -= 1
+        self._window_count += 1
+        if self._window_min is None or latency_seconds < self._window_min:
+            self._window_min = latency_seconds
+
+    def _roll_window(self, now: float) -> None:
+        if now - self._window_started < self.policy.window_seconds:
+            return
+        # A window in which (almost) nothing finished says nothing about the queue;
+        # the in-flight budgets still bound it.
+        if self._window_count < self.policy.min_samples:
+            self.delay_seconds = 0.0
+        else:
+            self.delay_seconds = self._window_min or 0.0
+        self._window_min = None
+        self._window_count = 0
+        self._window_started = now
+
+    def retry_after(self) -> int:
+        """Whole seconds for `Retry-After`: about twice the time to drain the queue."""
+        return min(max(1, math.ceil(2 * self.delay_seconds)), MAX_RETRY_AFTER_SECONDS)
+
+    def snapshot(self) -> dict[str, object]:
+        return {
+            "in_flight": dict(self.in_flight),
+            "rejected": dict(self.rejected),
+            "delay_seconds": round(self.delay_seconds, 4),
+        }
+
+
+class AdmissionMiddleware:
+    """Rejects requests before routing while the coordinator is overloaded."""
+
+    def __init__(self, app: ASGIApp, controller: AdmissionController) -> None:
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        route = route_class(scope["method"], scope["path"]) if scope["type"] == "http" else None
+        if route is None:
+            await self.app(scope, receive, send)
+            return
+        started = time.monotonic()
+        code = self.controller.admit(route, started)
+        if code is not None:
+            response = JSONResponse(
+                {"detail": "coordinator overloaded, retry later"},
+                status_code=code,
+                headers={"Retry-After": str(self.controller.retry_after())},
+            )
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(route, time.monotonic() - started)
@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+from collections.abc import Callable, Collection
+from dataclasses import dataclass
+from datetime import datetime
+
+
+@dataclass(frozen=True)
+class AffinityPolicy:
+    """Delay scheduling for jobs with an `affinity_key`.
+
+    A node claims jobs whose key it reports warm before anything else. A job it
+    does not hold warm waits for up to `delay_seconds` after it was queued: a keyed
+    job is left alone while another recently seen node holds its key, and other
+    jobs are only taken once the node has nothing local. Past the delay every job
+    competes in plain FIFO order, which bounds how long locality can hold it back.
+    """
+
+    delay_seconds: float = 5.0
+
+    def rank(
+        self,
+        affinity_key: str | None,
+        warm_keys: Collection[str],
+        queued_at: datetime,
+        now: datetime,
+        warm_elsewhere: Callable[[str], bool],
+    ) -> int | None:
+        """0 to claim in FIFO order, 1 to claim only if nothing ranks 0, None to skip."""
+        if affinity_key is not None and affinity_key in warm_keys:
+            return 0
+        if (now - queued_at).total_seconds() >= self.delay_seconds:
+            return 0
+        if affinity_key is not None and warm_elsewhere(affinity_key):
+            return None
+        return 1
@@ -1,197 +1,595 @@
 from __future__ import annotations
 
+import functools
 import json
 import os
 import secrets
 import sqlite3
 import threading
+import time
 from argparse import ArgumentParser, Namespace
-from datetime import UTC, datetime, timedelta
-from typing import Any, Literal, cast
+from collections.abc import AsyncIterator, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import astuple
+from datetime import datetime, timedelta
+from typing import Annotated, Any, Literal, Protocol, cast
 
 import boto3
 from botocore.config import Config
 import uvicorn
-from fastapi import Depends, FastAPI, HTTPException, Query, Response, status
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response, status
+from fastapi.responses import PlainTextResponse
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from pydantic import BaseModel, Field
+from pydantic import BaseModel
+from starlette.middleware.base import RequestResponseEndpoint
+
+from deborgen.coordinator.admission import (
+    AdmissionController,
+    AdmissionMiddleware,
+    AdmissionPolicy,
+)
+from deborgen.coordinator.affinity import AffinityPolicy
+from deborgen.coordinator.archive import JobArchive
+from deborgen.coordinator.instrumentation import (
+    InstrumentedLock,
+    StoreInstrumentation,
+    TimedConnection,
+    format_collapsed,
+    sample_stacks,
+)
+from deborgen.coordinator.load import LoadPolicy
+from deborgen.coordinator.memory_store import MemoryJobStore
+from deborgen.coordinator.metrics import (
+    COMMAND_METRICS_LIMIT,
+    CommandMetricsResponse,
+    CommandTotals,
+    JobMetricsEntry,
+    MetricsRow,
+    command_fingerprint,
+    rank,
+)
+from deborgen.coordinator.models import (
+    Job,
+    JobArtifactPresignRequest,
+    JobArtifactPresignResponse,
+    JobArtifactRecordRequest,
+    JobAssignment,
+    JobBatchCreateRequest,
+    JobBatchItem,
+    JobCompleteRequest,
+    JobCreateRequest,
+    JobFinishRequest,
+    JobKind,
+    JobListResponse,
+    JobLogsRequest,
+    JobLogsResponse,
+    JobPreemptRequest,
+    JobResources,
+    JobStatusEntry,
+    JobStatusRequest,
+    JobStatusResponse,
+    JobStatus,
+    LogSearchHit,
+    LogSearchResponse,
+    Node,
+    NodeHeartbeatRequest,
+    NodeHeartbeatResponse,
+    NodeLoad,
+    NodeThresholds,
+    dependency_failure_reason,
+    fits_window,
+    initial_dependency_state,
+    order_statuses,
+    parse_job_pk,
+    requested_job_pks,
+    requirements_match,
+    status_response,
+    utcnow,
+    window_seconds,
+)
+from deborgen.coordinator.schema import (
+    BLOCKED,
+    FAILED,
+    QUEUED,
+    RUNNING,
+    SCHEMA_VERSION,
+    STATUS_CODES,
+    STATUS_NAMES,
+    SUCCEEDED,
+    TIMESTAMP_COLUMNS,
+    from_micros,
+    legacy_micros,
+    legacy_status_code,
+    to_micros,
+)
+from deborgen.coordinator.scheduling import ESTIMATE_WINDOW, SchedulingMode, SchedulingPolicy
+from deborgen.coordinator.speculation import SpeculationPolicy
+from deborgen.coordinator.stats import (
+    STAT_FIELDS,
+    StatsDelta,
+    StatsResponse,
+    build_stats,
+    claimed_deltas,
+    created_deltas,
+    dependency_failed_deltas,
+    expired_deltas,
+    finished_deltas,
+    preempted_deltas,
+    prune_cutoff,
+    released_deltas,
+)
+from deborgen.coordinator.tasks import PeriodicTask
+from deborgen.coordinator.wire import WireMiddleware
+
+StoreKind = Literal["sqlite", "memory"]
+# Ids per `IN (...)` query, under SQLite's default bound-parameter limit.
+STATUS_QUERY_CHUNK = 500
+LOG_SEARCH_LIMIT = 50
+# Tokens of context in each search snippet.
+LOG_SNIPPET_TOKENS = 16
+
+
+class JobStore(Protocol):
+    def create_job(self, request: JobCreateRequest) -> Job: ...
+
+    def create_jobs(self, items: list[JobBatchItem]) -> list[Job]: ...
+
+    def list_jobs(self, status_filter: JobStatus | None, limit: int | None) -> list[Job]: ...
+
+    def get_job(self, job_id: str) -> Job: ...
+
+    def job_statuses(self, request: JobStatusRequest) -> JobStatusResponse: ...
+
+    def job_version(self, job_id: str) -> int | None: ...
+
+    def change_sequence(self) -> int: ...
+
+    def claim_next_job(self, node_id: str) -> JobAssignment | None: ...
+
+    def finish_job(self, job_id: str, request: JobFinishRequest) -> Job: ...
+
+    def complete_job(self, job_id: str, request: JobCompleteRequest) -> Job: ...
+
+    def preempt_job(self, job_id: str, request: JobPreemptRequest) -> Job: ...
+
+    def append_logs(self, job_id: str, request: JobLogsRequest) -> None: ...
+
+    def read_logs(self, job_id: str) -> JobLogsResponse: ...
+
+    def search_logs(
+        self,
+        query: str,
+        status_filter: JobStatus | None,
+        since: datetime | None,
+        until: datetime | None,
+        limit: int,
+    ) -> LogSearchResponse: ...
+
+    def assert_job_lease(self, job_id: str, node_id: str, lease_token: str) -> None: ...
+
+    def record_artifact(self, job_id: str, url: str) -> None: ...
+
+    def heartbeat_node(self, node_id: str, request: NodeHeartbeatRequest) -> Node: ...
+
+    def archive_jobs(self, older_than: datetime, batch_size: int = 500) -> int: ...
 
-JobStatus = Literal["queued", "running", "succeeded", "failed"]
+    def expire_leases(self) -> int: ...
 
+    def stats(self) -> StatsResponse: ...
 
-def utcnow() -> datetime:
-    return datetime.now(UTC)
+    def job_metrics(self, job_id: str) -> JobMetricsEntry: ...
 
+    def command_metrics(self, fingerprint: str | None, limit: int) -> CommandMetricsResponse: ...
 
-def to_iso(dt: datetime | None) -> str | None:
-    if dt is None:
-        return None
-    return dt.isoformat()
-
-
-def parse_iso(value: str | None) -> datetime | None:
-    if value is None:
-        return None
-    return datetime.fromisoformat(value)
-
-
-def parse_job_pk(job_id: str) -> int:
-    if not job_id.startswith("job_"):
-        raise HTTPException(status_code=404, detail="job not found")
-    suffix = job_id.removeprefix("job_")
-    if not suffix.isdigit():
-        raise HTTPException(status_code=404, detail="job not found")
-    return int(suffix)
-
-
-class Job(BaseModel):
-    id: str
-    status: JobStatus
-    command: str
-    created_at: datetime
-    started_at: datetime | None = None
-    finished_at: datetime | None = None
-    assigned_node_id: str | None = None
-    timeout_seconds: int = 3600
-    attempts: int = 0
-    max_attempts: int = 1
-    exit_code: int | None = None
-    failure_reason: str | None = None
-    artifact_urls: list[str] = Field(default_factory=list)
-    requirements: dict[str, str | int | float | bool] = Field(default_factory=dict)
-
-
-class JobCreateRequest(BaseModel):
-    command: str
-    timeout_seconds: int = 3600
-    max_attempts: int = 1
-    requirements: dict[str, str | int | float | bool] = Field(default_factory=dict)
-
-
-class JobAssignment(BaseModel):
-    job: Job
-    lease_token: str
-
-
-class JobFinishRequest(BaseModel):
-    node_id: str
-    lease_token: str
-    exit_code: int
-    failure_reason: str | None = None
-
-
-class JobLogsRequest(BaseModel):
-    node_id: str
-    lease_token: str
-    text: str
-
-
-class JobListResponse(BaseModel):
-    jobs: list[Job]
+    def flush_heartbeats(self) -> int: ...
 
-
-class JobLogsResponse(BaseModel):
-    text: str
-
-
-class JobArtifactPresignRequest(BaseModel):
-    node_id: str
-    lease_token: str
-    filename: str
-
-
-class JobArtifactPresignResponse(BaseModel):
-    upload_url: str
-    download_url: str
-
-
-class JobArtifactRecordRequest(BaseModel):
-    node_id: str
-    lease_token: str
-    url: str
-
-
-class Node(BaseModel):
-    node_id: str
-    name: str | None = None
-    labels: dict[str, str | int | float | bool] = Field(default_factory=dict)
-    last_seen_at: datetime
-
-
-class NodeHeartbeatRequest(BaseModel):
-    name: str | None = None
-    labels: dict[str, str | int | float | bool] = Field(default_factory=dict)
+    def take_cancellations(self, node_id: str) -> list[str]: ...
 
 
 class SqliteJobStore:
-    def __init__(self, db_path: str, lease_duration_seconds: int = 30) -> None:
-        self._lock = threading.Lock()
+    def __init__(
+        self,
+        db_path: str,
+        lease_duration_seconds: int = 30,
+        instrumentation: StoreInstrumentation | None = None,
+        archive: JobArchive | None = None,
+        speculation: SpeculationPolicy | None = None,
+        affinity: AffinityPolicy | None = None,
+        scheduling: SchedulingPolicy | None = None,
+        load: LoadPolicy | None = None,
+        log_search: bool = False,
+    ) -> None:
         self._lease_duration = timedelta(seconds=lease_duration_seconds)
-        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._archive = archive
+        self._log_search = log_search
+        self._speculation = speculation
+        self._affinity = affinity
+        self._scheduling = scheduling
+        self._load = load if load is not None else LoadPolicy()
+        self._stats_pruned_before = ""
+        # Each coordinator process opens its own connection. `timeout` is SQLite's busy
+        # timeout: how long a write waits for another process to release the DB lock.
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30.0)
         self._conn.row_factory = sqlite3.Row
         # Required for ON DELETE CASCADE and other FK behavior in SQLite.
         self._conn.execute("PRAGMA foreign_keys = ON")
+        if db_path != ":memory:":
+            # WAL lets readers in other processes proceed while one process writes.
+            self._conn.execute("PRAGMA journal_mode = WAL")
+        self._lock: threading.Lock | InstrumentedLock = threading.Lock()
+        self.instrumentation = instrumentation
+        if instrumentation is not None:
+            self._lock = InstrumentedLock(instrumentation)
+            self._conn = cast(sqlite3.Connection, TimedConnection(self._conn, instrumentation))
+        # Liveness table: the last node state this process wrote or served, plus the
+        # (first, last) heartbeat times not yet flushed to SQLite. Guarded by its own
+        # lock so timestamp-only heartbeats never wait on the write lock. Lock order
+        # is always `_lock` before `_liveness_lock`.
+        self._liveness_lock = threading.Lock()
+        self._node_cache: dict[str, Node] = {}
+        self._pending_seen: dict[str, tuple[datetime, datetime]] = {}
+        # Job versions known to be current, so conditional GETs can be answered without
+        # reading the job. Trusted only while PRAGMA data_version is unchanged, i.e.
+        # until another coordinator process commits. Guarded by `_lock`.
+        self._versions: dict[int, int] = {}
+        self._change_seq = 0
+        self._data_version: int | None = None
+        # Versions assigned inside the open write transaction, published once it commits.
+        self._uncommitted_versions: dict[int, int] = {}
+        self._uncommitted_seq: int | None = None
         self._init_schema()
+        self._sync_versions()
+
+    @contextmanager
+    def _write_transaction(self) -> Iterator[None]:
+        """Run a read-modify-write under SQLite's write lock.
+
+        `self._lock` only serializes threads in this process. BEGIN IMMEDIATE takes the
+        database write lock before the first read, so coordinator processes sharing the
+        DB file cannot interleave between our SELECT and UPDATE (e.g. claim the same job).
+        """
+        self._uncommitted_versions = {}
+        self._uncommitted_seq = None
+        with self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            yield
+        if self._uncommitted_seq is not None:
+            self._change_seq = self._uncommitted_seq
+            self._versions.update(self._uncommitted_versions)
 
     def _init_schema(self) -> None:
-        with self._conn:
+        if self._schema_version() < SCHEMA_VERSION and self._table_exists("jobs"):
+            self._migrate_to_compact()
+        with self._write_transaction():
+            stats_exists = self._table_exists("stats")
+            self._create_tables()
+            for column in (
+                "version INTEGER NOT NULL DEFAULT 0",
+                "resources_json TEXT NOT NULL DEFAULT '{}'",
+            ):
+                try:
+                    self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column}")
+                except sqlite3.OperationalError:
+                    pass  # Column already exists
+            for column in ("load_json TEXT", "thresholds_json TEXT"):
+                try:
+                    self._conn.execute(f"ALTER TABLE nodes ADD COLUMN {column}")
+                except sqlite3.OperationalError:
+                    pass  # Column already exists
             self._conn.execute(
                 """
-                CREATE TABLE IF NOT EXISTS jobs (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    status TEXT NOT NULL,
-                    command TEXT NOT NULL,
-                    created_at TEXT NOT NULL,
-                    started_at TEXT,
-                    finished_at TEXT,
-                    assigned_node_id TEXT,
-                    timeout_seconds INTEGER NOT NULL,
-                    attempts INTEGER NOT NULL DEFAULT 0,
-                    max_attempts INTEGER NOT NULL DEFAULT 1,
-                    exit_code INTEGER,
-                    failure_reason TEXT,
-                    artifact_urls TEXT NOT NULL DEFAULT '[]',
-                    requirements_json TEXT NOT NULL DEFAULT '{}'
-                )
+                INSERT INTO change_sequence(seq)
+                SELECT COALESCE(MAX(version), 0) FROM jobs
+                WHERE NOT EXISTS (SELECT 1 FROM change_sequence)
                 """
             )
-            try:
-                self._conn.execute("ALTER TABLE jobs ADD COLUMN requirements_json TEXT NOT NULL DEFAULT '{}'")
-            except sqlite3.OperationalError:
-                pass  # Column already exists
-
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_logs_job_id ON logs(job_id)")
             self._conn.execute(
-                """
-                CREATE TABLE IF NOT EXISTS leases (
-                    job_id INTEGER PRIMARY KEY,
-                    node_id TEXT NOT NULL,
-                    lease_token TEXT NOT NULL,
-                    lease_expires_at TEXT NOT NULL,
-                    FOREIGN KEY(job_id) REFERENCES jobs(id) ON DELETE CASCADE
-                )
-                """
+                "CREATE INDEX IF NOT EXISTS idx_job_metrics_fingerprint ON job_metrics(fingerprint)"
             )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_leases_node_id ON leases(node_id)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_leases_job_id ON leases(job_id)")
             self._conn.execute(
-                """
-                CREATE TABLE IF NOT EXISTS logs (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    job_id INTEGER NOT NULL,
-                    text TEXT NOT NULL,
-                    created_at TEXT NOT NULL,
-                    FOREIGN KEY(job_id) REFERENCES jobs(id) ON DELETE CASCADE
-                )
-                """
+                "CREATE INDEX IF NOT EXISTS idx_leases_expires_at ON leases(lease_expires_at)"
             )
             self._conn.execute(
-                """
-                CREATE TABLE IF NOT EXISTS nodes (
-                    node_id TEXT PRIMARY KEY,
-                    name TEXT,
-                    labels_json TEXT NOT NULL DEFAULT '{}',
-                    last_seen_at TEXT NOT NULL
+                "CREATE INDEX IF NOT EXISTS idx_cancelled_leases_node_id ON cancelled_leases(node_id)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_jobs_group_status ON jobs(group_id, status)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_node_warm_keys_node_id ON node_warm_keys(node_id)"
+            )
+
+            # Incrementally maintained counters; see deborgen.coordinator.stats.
+            counter_columns = ",\n".join(f"{name} REAL NOT NULL DEFAULT 0" for name in STAT_FIELDS)
+            self._conn.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS stats (
+                    scope TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    bucket TEXT NOT NULL,
+                    {counter_columns},
+                    PRIMARY KEY(scope, key, bucket)
                 )
                 """
             )
+            if not stats_exists:
+                self._backfill_stats()
+            else:
+                stats_columns = self._table_columns("stats")
+                for name in STAT_FIELDS:
+                    if name not in stats_columns:
+                        self._conn.execute(
+                            f"ALTER TABLE stats ADD COLUMN {name} REAL NOT NULL DEFAULT 0"
+                        )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_jobs_status_finished_at ON jobs(status, finished_at)"
+            )
+            self._configure_log_search()
+            self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def _configure_log_search(self) -> None:
+        """Create or drop the full-text index of log chunks; call inside a write transaction.
+
+        `logs_fts` is an FTS5 index over `logs.text` that stores no copy of the text.
+        Triggers keep it in step with every insert and delete on `logs`, including
+        deletes cascaded from jobs and archiving, so it is maintained incrementally.
+        With search off the triggers and index are dropped, and appending a log chunk
+        costs what it did before. Turning search on indexes the existing logs once.
+        """
+        if not self._log_search:
+            self._conn.execute("DROP TRIGGER IF EXISTS logs_fts_insert")
+            self._conn.execute("DROP TRIGGER IF EXISTS logs_fts_delete")
+            self._conn.execute("DROP TABLE IF EXISTS logs_fts")
+            return
+        indexed = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'logs_fts_insert'"
+        ).fetchone()
+        if indexed is not None:
+            return
+        self._conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS logs_fts USING fts5("
+            "text, content = 'logs', content_rowid = 'id')"
+        )
+        self._conn.execute("INSERT INTO logs_fts(logs_fts) VALUES ('rebuild')")
+        self._conn.execute(
+            """
+            CREATE TRIGGER logs_fts_insert AFTER INSERT ON logs BEGIN
+                INSERT INTO logs_fts(rowid, text) VALUES (new.id, new.text);
+            END
+            """
+        )
+        self._conn.execute(
+            """
+            CREATE TRIGGER logs_fts_delete AFTER DELETE ON logs BEGIN
+                INSERT INTO logs_fts(logs_fts, rowid, text) VALUES ('delete', old.id, old.text);
+            END
+            """
+        )
+
+    def _create_tables(self) -> None:
+        """Create any missing table in the current encoding; see deborgen.coordinator.schema."""
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                status INTEGER NOT NULL,
+                command TEXT NOT NULL,
+                created_at INTEGER NOT NULL,
+                started_at INTEGER,
+                finished_at INTEGER,
+                assigned_node_id TEXT,
+                timeout_seconds INTEGER NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL DEFAULT 1,
+                exit_code INTEGER,
+                failure_reason TEXT,
+                artifact_urls TEXT NOT NULL DEFAULT '[]',
+                requirements_json TEXT NOT NULL DEFAULT '{}',
+                submitter TEXT,
+                depends_on_json TEXT NOT NULL DEFAULT '[]',
+                remaining_dependencies INTEGER NOT NULL DEFAULT 0,
+                group_id TEXT,
+                affinity_key TEXT,
+                kind TEXT NOT NULL DEFAULT 'command',
+                args_json TEXT NOT NULL DEFAULT '{}',
+                checkpoint_url TEXT,
+                version INTEGER NOT NULL DEFAULT 0,
+                resources_json TEXT NOT NULL DEFAULT '{}'
+            )
+            """
+        )
+        # Single row: the last change sequence number handed out; see _record_change.
+        self._conn.execute("CREATE TABLE IF NOT EXISTS change_sequence (seq INTEGER NOT NULL)")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS leases (
+                lease_token TEXT PRIMARY KEY,
+                job_id INTEGER NOT NULL,
+                node_id TEXT NOT NULL,
+                lease_expires_at INTEGER NOT NULL,
+                FOREIGN KEY(job_id) REFERENCES jobs(id) ON DELETE CASCADE
+            )
+            """
+        )
+        # Leases dropped because another lease on the same job finished first, kept
+        # until the losing node picks up the cancel signal on its next heartbeat.
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cancelled_leases (
+                lease_token TEXT PRIMARY KEY,
+                job_id INTEGER NOT NULL,
+                node_id TEXT NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS logs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_id INTEGER NOT NULL,
+                text TEXT NOT NULL,
+                created_at INTEGER NOT NULL,
+                FOREIGN KEY(job_id) REFERENCES jobs(id) ON DELETE CASCADE
+            )
+            """
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS nodes (
+                node_id TEXT PRIMARY KEY,
+                name TEXT,
+                labels_json TEXT NOT NULL DEFAULT '{}',
+                last_seen_at INTEGER NOT NULL,
+                warm_keys_json TEXT NOT NULL DEFAULT '[]',
+                available_until INTEGER,
+                load_json TEXT,
+                thresholds_json TEXT
+            )
+            """
+        )
+        # Inverse of nodes.warm_keys_json, so a claim can ask whether any node holds a key.
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS node_warm_keys (
+                affinity_key TEXT NOT NULL,
+                node_id TEXT NOT NULL,
+                PRIMARY KEY(affinity_key, node_id)
+            )
+            """
+        )
+        # Unresolved dependency edges only: an edge is deleted once its parent finishes.
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS job_dependencies (
+                parent_id INTEGER NOT NULL REFERENCES jobs(id) ON DELETE CASCADE,
+                child_id INTEGER NOT NULL REFERENCES jobs(id) ON DELETE CASCADE,
+                PRIMARY KEY(parent_id, child_id)
+            )
+            """
+        )
+        # What each finished run used, as reported by its worker; see coordinator.metrics.
+        # Not tied to jobs by a foreign key, so the history outlives archiving.
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS job_metrics (
+                job_id INTEGER PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                finished_at INTEGER NOT NULL,
+                wall_ms INTEGER NOT NULL,
+                user_ms INTEGER,
+                system_ms INTEGER,
+                max_rss_kb INTEGER,
+                read_blocks INTEGER,
+                write_blocks INTEGER
+            )
+            """
+        )
+        # Expected runtime per command fingerprint, learned from succeeded runs.
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS runtime_estimates (
+                fingerprint TEXT PRIMARY KEY,
+                samples INTEGER NOT NULL,
+                mean_seconds REAL NOT NULL
+            )
+            """
+        )
+        # Jobs moved out of the hot tables by archive_jobs, and the segment holding each.
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS archived_jobs (
+                job_id INTEGER PRIMARY KEY,
+                segment TEXT NOT NULL
+            )
+            """
+        )
+
+    def _schema_version(self) -> int:
+        return cast(int, self._conn.execute("PRAGMA user_version").fetchone()[0])
+
+    def _table_exists(self, name: str) -> bool:
+        row = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+        ).fetchone()
+        return row is not None
+
+    def _table_columns(self, table: str) -> list[str]:
+        return [
+            cast(str, row["name"])
+            for row in self._conn.execute(f"PRAGMA table_info({table})").fetchall()
+        ]
+
+    def _migrate_to_compact(self) -> None:
+        """Rebuild a version 0 database, whose timestamps and statuses are text.
+
+        The tables holding either are renamed aside, recreated in the current encoding
+        and refilled, all in one transaction: a crash leaves the old schema intact, and
+        a second coordinator process opening the file waits and then finds it done.
+        Columns added after a legacy table was created take their defaults.
+        """
+        # Swapping tables underneath the rows that reference them needs foreign keys
+        # off, and legacy_alter_table stops RENAME from repointing those references.
+        self._conn.execute("PRAGMA foreign_keys = OFF")
+        self._conn.execute("PRAGMA legacy_alter_table = ON")
+        try:
+            with self._write_transaction():
+                if self._schema_version() >= SCHEMA_VERSION:
+                    return
+                tables = [table for table in TIMESTAMP_COLUMNS if self._table_exists(table)]
+                for table in tables:
+                    self._conn.execute(f"ALTER TABLE {table} RENAME TO {table}_legacy")
+                self._create_tables()
+                for table in tables:
+                    self._copy_legacy_rows(table)
+                    # Keep AUTOINCREMENT past ids that were archived or deleted.
+                    self._conn.execute(
+                        """
+                        UPDATE sqlite_sequence
+                        SET seq = MAX(seq, (SELECT seq FROM sqlite_sequence WHERE name = ?))
+                        WHERE name = ?
+                        """,
+                        (f"{table}_legacy", table),
+                    )
+                    self._conn.execute(
+                        """
+                        INSERT INTO sqlite_sequence(name, seq)
+                        SELECT ?, seq FROM sqlite_sequence WHERE name = ?
+                        AND NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = ?)
+                        """,
+                        (table, f"{table}_legacy", table),
+                    )
+                    self._conn.execute(f"DROP TABLE {table}_legacy")
+                self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        finally:
+            self._conn.execute("PRAGMA legacy_alter_table = OFF")
+            self._conn.execute("PRAGMA foreign_keys = ON")
+
+    def _copy_legacy_rows(self, table: str) -> None:
+        current = self._table_columns(table)
+        columns = [name for name in self._table_columns(f"{table}_legacy") if name in current]
+        query = f"SELECT {', '.join(columns)} FROM {table}_legacy"
+        if table in ("leases", "logs"):
+            # Rows orphaned while foreign keys were off would fail the new constraint.
+            query += " WHERE job_id IN (SELECT id FROM jobs)"
+        timestamps = {columns.index(name) for name in TIMESTAMP_COLUMNS[table] if name in columns}
+        status = columns.index("status") if "status" in columns else None
+
+        def convert(row: sqlite3.Row) -> list[Any]:
+            values = list(row)
+            for index in timestamps:
+                values[index] = legacy_micros(values[index])
+            if status is not None:
+                values[status] = legacy_status_code(values[status])
+            return values
+
+        self._conn.executemany(
+            f"INSERT INTO {table}({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' for _ in columns)})",
+            [convert(row) for row in self._conn.execute(query)],
+        )
 
     def _row_to_job(self, row: sqlite3.Row) -> Job:
         artifact_urls_raw = cast(str, row["artifact_urls"])
@@ -200,11 +598,11 @@ class SqliteJobStore:
         requirements = cast(dict[str, str | int | float | bool], json.loads(requirements_raw))
         return Job(
             id=f"job_{cast(int, row['id'])}",
-            status=cast(JobStatus, row["status"]),
+            status=STATUS_NAMES[cast(int, row["status"])],
             command=cast(str, row["command"]),
-            created_at=parse_iso(cast(str, row["created_at"])) or utcnow(),
-            started_at=parse_iso(cast(str | None, row["started_at"])),
-            finished_at=parse_iso(cast(str | None, row["finished_at"])),
+            created_at=from_micros(cast(int, row["created_at"])) or utcnow(),
+            started_at=from_micros(cast(int | None, row["started_at"])),
+            finished_at=from_micros(cast(int | None, row["finished_at"])),
             assigned_node_id=cast(str | None, row["assigned_node_id"]),
             timeout_seconds=cast(int, row["timeout_seconds"]),
             attempts=cast(int, row["attempts"]),
@@ -213,45 +611,258 @@ class SqliteJobStore:
             failure_reason=cast(str | None, row["failure_reason"]),
             artifact_urls=artifact_urls,
             requirements=requirements,
+            resources=JobResources.model_validate_json(cast(str, row["resources_json"])),
+            submitter=cast(str | None, row["submitter"]),
+            depends_on=cast(list[str], json.loads(cast(str, row["depends_on_json"]))),
+            group_id=cast(str | None, row["group_id"]),
+            affinity_key=cast(str | None, row["affinity_key"]),
+            kind=cast(JobKind, row["kind"]),
+            args=cast(list[Any] | dict[str, Any], json.loads(cast(str, row["args_json"]))),
+            checkpoint_url=cast(str | None, row["checkpoint_url"]),
+            version=cast(int, row["version"]),
         )
 
     def _row_to_node(self, row: sqlite3.Row) -> Node:
         labels_raw = cast(str, row["labels_json"])
         labels_any = cast(dict[str, Any], json.loads(labels_raw))
         labels = cast(dict[str, str | int | float | bool], labels_any)
+        load_raw = cast(str | None, row["load_json"])
+        thresholds_raw = cast(str | None, row["thresholds_json"])
         return Node(
             node_id=cast(str, row["node_id"]),
             name=cast(str | None, row["name"]),
             labels=labels,
-            last_seen_at=parse_iso(cast(str, row["last_seen_at"])) or utcnow(),
+            warm_keys=cast(list[str], json.loads(cast(str, row["warm_keys_json"]))),
+            available_until=from_micros(cast(int | None, row["available_until"])),
+            load=NodeLoad.model_validate_json(load_raw) if load_raw else None,
+            thresholds=(
+                NodeThresholds.model_validate_json(thresholds_raw) if thresholds_raw else None
+            ),
+            last_seen_at=from_micros(cast(int, row["last_seen_at"])) or utcnow(),
+        )
+
+    def _record_change(self, job_pks: list[int]) -> None:
+        """Stamp `job_pks` with the next change sequence number; call inside a write transaction."""
+        seq = cast(
+            int,
+            self._conn.execute(
+                "UPDATE change_sequence SET seq = seq + 1 RETURNING seq"
+            ).fetchall()[0]["seq"],
+        )
+        self._conn.executemany(
+            "UPDATE jobs SET version = ? WHERE id = ?", [(seq, job_pk) for job_pk in job_pks]
         )
+        self._uncommitted_seq = seq
+        self._uncommitted_versions.update(dict.fromkeys(job_pks, seq))
+
+    def _sync_versions(self) -> None:
+        """Forget cached versions once another process has committed; call under `_lock`."""
+        data_version = cast(int, self._conn.execute("PRAGMA data_version").fetchone()[0])
+        if data_version != self._data_version:
+            self._data_version = data_version
+            self._versions.clear()
+            row = self._conn.execute("SELECT seq FROM change_sequence").fetchone()
+            self._change_seq = cast(int, row["seq"])
+
+    def job_version(self, job_id: str) -> int | None:
+        job_pk = parse_job_pk(job_id)
+        with self._lock:
+            self._sync_versions()
+            return self._versions.get(job_pk)
+
+    def change_sequence(self) -> int:
+        with self._lock:
+            self._sync_versions()
+            return self._change_seq
 
     def _get_job_row(self, job_pk: int) -> sqlite3.Row | None:
         row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_pk,)).fetchone()
         return cast(sqlite3.Row | None, row)
 
-    def create_job(self, request: JobCreateRequest) -> Job:
-        now = to_iso(utcnow())
+    def _apply_stats(self, deltas: list[StatsDelta]) -> None:
+        """Add counter deltas inside the caller's write transaction."""
+        columns = ", ".join(STAT_FIELDS)
+        placeholders = ", ".join("?" for _ in STAT_FIELDS)
+        updates = ", ".join(f"{name} = {name} + excluded.{name}" for name in STAT_FIELDS)
+        self._conn.executemany(
+            f"""
+            INSERT INTO stats(scope, key, bucket, {columns})
+            VALUES (?, ?, ?, {placeholders})
+            ON CONFLICT(scope, key, bucket) DO UPDATE SET {updates}
+            """,
+            [
+                (delta.scope, delta.key, delta.bucket, *(delta.values.get(name, 0) for name in STAT_FIELDS))
+                for delta in deltas
+            ],
+        )
+        cutoff = prune_cutoff(utcnow())
+        if cutoff != self._stats_pruned_before:
+            self._conn.execute("DELETE FROM stats WHERE bucket != '' AND bucket < ?", (cutoff,))
+            self._stats_pruned_before = cutoff
+
+    def _backfill_stats(self) -> None:
+        """Seed the counters from existing jobs when upgrading a DB created before `stats`."""
+        for row in self._conn.execute("SELECT * FROM jobs").fetchall():
+            job = self._row_to_job(row)
+            initial_status = (
+                job.status
+                if job.status == "blocked" or (job.status == "failed" and job.started_at is None)
+                else "queued"
+            )
+            deltas = created_deltas(job.submitter, job.created_at, initial_status)
+            if job.started_at is not None and job.assigned_node_id is not None:
+                deltas += claimed_deltas(
+                    job.submitter, job.assigned_node_id, job.created_at, job.started_at
+                )
+            if job.finished_at is not None:
+                deltas += finished_deltas(
+                    job.submitter,
+                    job.assigned_node_id,
+                    job.started_at,
+                    job.finished_at,
+                    succeeded=job.status == "succeeded",
+                )
+            self._apply_stats(deltas)
+
+    def _dependency_statuses(self, parent_pks: list[int]) -> dict[int, JobStatus]:
+        statuses: dict[int, JobStatus] = {}
+        for parent_pk in parent_pks:
+            row = self._conn.execute("SELECT status FROM jobs WHERE id = ?", (parent_pk,)).fetchone()
+            if row is not None:
+                statuses[parent_pk] = STATUS_NAMES[cast(int, row["status"])]
+                continue
+            segment = self._archived_segment(parent_pk)
+            archived = (
+                self._archive.read_job(segment, f"job_{parent_pk}")
+                if segment and self._archive
+                else None
+            )
+            if archived is None:
+                raise HTTPException(status_code=404, detail=f"dependency job_{parent_pk} not found")
+            statuses[parent_pk] = archived.status
+        return statuses
+
+    def _insert_job(self, request: JobCreateRequest, parent_pks: list[int], created_at: datetime) -> Job:
+        now = to_micros(created_at)
         assert now is not None
-        with self._lock, self._conn:
-            cursor = self._conn.execute(
-                """
-                INSERT INTO jobs(status, command, created_at, timeout_seconds, max_attempts, artifact_urls, requirements_json)
-                VALUES ('queued', ?, ?, ?, ?, '[]', ?)
+        status, remaining, failure_reason = initial_dependency_state(
+            self._dependency_statuses(parent_pks)
+        )
+        cursor = self._conn.execute(
+            """
+            INSERT INTO jobs(status, command, created_at, finished_at, timeout_seconds, max_attempts, artifact_urls, requirements_json, submitter, depends_on_json, remaining_dependencies, failure_reason, group_id, affinity_key, kind, args_json, resources_json)
+            VALUES (?, ?, ?, ?, ?, ?, '[]', ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                STATUS_CODES[status],
+                request.command,
+                now,
+                now if status == "failed" else None,
+                request.timeout_seconds,
+                request.max_attempts,
+                json.dumps(request.requirements),
+                request.submitter,
+                json.dumps([f"job_{parent_pk}" for parent_pk in parent_pks]),
+                remaining,
+                failure_reason,
+                request.group_id,
+                request.affinity_key,
+                request.kind,
+                json.dumps(request.args),
+                request.resources.model_dump_json(exclude_none=True),
+            ),
+        )
+        job_pk = cast(int, cursor.lastrowid)
+        self._record_change([job_pk])
+        if status == "blocked":
+            self._conn.executemany(
+                f"""
+                INSERT OR IGNORE INTO job_dependencies(parent_id, child_id)
+                SELECT id, ? FROM jobs WHERE id = ? AND status != {SUCCEEDED}
                 """,
-                (request.command, now, request.timeout_seconds, request.max_attempts, json.dumps(request.requirements)),
+                [(job_pk, parent_pk) for parent_pk in parent_pks],
             )
-            row = self._get_job_row(cast(int, cursor.lastrowid))
-            if row is None:
-                raise HTTPException(status_code=500, detail="failed to create job")
-            return self._row_to_job(row)
+        row = self._get_job_row(job_pk)
+        if row is None:
+            raise HTTPException(status_code=500, detail="failed to create job")
+        self._apply_stats(created_deltas(request.submitter, created_at, status))
+        return self._row_to_job(row)
+
+    def create_job(self, request: JobCreateRequest) -> Job:
+        parent_pks = [parse_job_pk(ref) for ref in request.depends_on]
+        with self._lock, self._write_transaction():
+            return self._insert_job(request, parent_pks, utcnow())
+
+    def create_jobs(self, items: list[JobBatchItem]) -> list[Job]:
+        """Create a batch, possibly a whole DAG, in one transaction."""
+        created_at = utcnow()
+        keyed: dict[str, int] = {}
+        jobs: list[Job] = []
+        with self._lock, self._write_transaction():
+            for item in items:
+                parent_pks = [
+                    keyed[ref] if ref in keyed else parse_job_pk(ref) for ref in item.depends_on
+                ]
+                job = self._insert_job(item, parent_pks, created_at)
+                if item.key is not None:
+                    keyed[item.key] = parse_job_pk(job.id)
+                jobs.append(job)
+        return jobs
+
+    def _resolve_dependents(self, job_pk: int, succeeded: bool, at: datetime) -> None:
+        """Release or cascade-fail the jobs waiting on `job_pk`; call inside a write transaction."""
+        now = to_micros(at)
+        if succeeded:
+            self._conn.execute(
+                f"""
+                UPDATE jobs SET remaining_dependencies = remaining_dependencies - 1
+                WHERE status = {BLOCKED}
+                AND id IN (SELECT child_id FROM job_dependencies WHERE parent_id = ?)
+                """,
+                (job_pk,),
+            )
+            released = self._conn.execute(
+                f"""
+                UPDATE jobs SET status = {QUEUED}
+                WHERE status = {BLOCKED} AND remaining_dependencies <= 0
+                AND id IN (SELECT child_id FROM job_dependencies WHERE parent_id = ?)
+                RETURNING id, submitter
+                """,
+                (job_pk,),
+            ).fetchall()
+            if released:
+                self._record_change([cast(int, row["id"]) for row in released])
+            self._conn.execute("DELETE FROM job_dependencies WHERE parent_id = ?", (job_pk,))
+            for row in released:
+                self._apply_stats(released_deltas(cast(str | None, row["submitter"]), at))
+            return
+
+        failure_reason = dependency_failure_reason(f"job_{job_pk}")
+        frontier = [job_pk]
+        while frontier:
+            parent_pk = frontier.pop()
+            failed = self._conn.execute(
+                f"""
+                UPDATE jobs SET status = {FAILED}, failure_reason = ?, finished_at = ?
+                WHERE status = {BLOCKED}
+                AND id IN (SELECT child_id FROM job_dependencies WHERE parent_id = ?)
+                RETURNING id, submitter
+                """,
+                (failure_reason, now, parent_pk),
+            ).fetchall()
+            self._conn.execute("DELETE FROM job_dependencies WHERE parent_id = ?", (parent_pk,))
+            if failed:
+                self._record_change([cast(int, row["id"]) for row in failed])
+            for row in failed:
+                frontier.append(cast(int, row["id"]))
+                self._apply_stats(dependency_failed_deltas(cast(str | None, row["submitter"]), at))
 
     def list_jobs(self, status_filter: JobStatus | None, limit: int | None) -> list[Job]:
         query = "SELECT * FROM jobs"
         params: list[Any] = []
         if status_filter is not None:
             query += " WHERE status = ?"
-            params.append(status_filter)
+            params.append(STATUS_CODES[status_filter])
         query += " ORDER BY id DESC"
         if limit is not None:
             query += " LIMIT ?"
@@ -261,118 +872,562 @@ class SqliteJobStore:
             rows = self._conn.execute(query, params).fetchall()
             return [self._row_to_job(row) for row in rows]
 
+    def _archived_segment(self, job_pk: int) -> str | None:
+        row = self._conn.execute(
+            "SELECT segment FROM archived_jobs WHERE job_id = ?", (job_pk,)
+        ).fetchone()
+        return cast(str, row["segment"]) if row is not None else None
+
     def get_job(self, job_id: str) -> Job:
         job_pk = parse_job_pk(job_id)
         with self._lock:
             row = self._get_job_row(job_pk)
-            if row is None:
-                raise HTTPException(status_code=404, detail="job not found")
-            return self._row_to_job(row)
+            if row is not None:
+                self._versions[job_pk] = cast(int, row["version"])
+                return self._row_to_job(row)
+            segment = self._archived_segment(job_pk)
+        job = self._archive.read_job(segment, job_id) if segment and self._archive else None
+        if job is None:
+            raise HTTPException(status_code=404, detail="job not found")
+        return job
+
+    def job_statuses(self, request: JobStatusRequest) -> JobStatusResponse:
+        if request.group_id is not None:
+            return self._group_statuses(request.group_id, request.statuses)
+        job_pks = requested_job_pks(request.ids)
+        found: dict[int, JobStatusEntry] = {}
+        archived: dict[int, str] = {}
+        with self._lock:
+            for start in range(0, len(job_pks), STATUS_QUERY_CHUNK):
+                chunk = job_pks[start : start + STATUS_QUERY_CHUNK]
+                rows = self._conn.execute(
+                    f"""
+                    SELECT id, status, exit_code, failure_reason, finished_at
+                    FROM jobs WHERE id IN ({", ".join("?" for _ in chunk)})
+                    """,
+                    chunk,
+                ).fetchall()
+                for row in rows:
+                    found[cast(int, row["id"])] = self._row_to_status(row)
+            if self._archive is not None:
+                unresolved = [job_pk for job_pk in job_pks if job_pk not in found]
+                for start in range(0, len(unresolved), STATUS_QUERY_CHUNK):
+                    chunk = unresolved[start : start + STATUS_QUERY_CHUNK]
+                    rows = self._conn.execute(
+                        "SELECT job_id, segment FROM archived_jobs "
+                        f"WHERE job_id IN ({', '.join('?' for _ in chunk)})",
+                        chunk,
+                    ).fetchall()
+                    archived.update((cast(int, row["job_id"]), cast(str, row["segment"])) for row in rows)
+        if self._archive is not None:
+            found.update(self._archive.read_statuses(archived))
+        entries, missing = order_statuses(request.ids, found)
+        return status_response(entries, missing, request.statuses)
+
+    def _group_statuses(self, group_id: str, statuses: list[JobStatus] | None) -> JobStatusResponse:
+        # Counts come straight from idx_jobs_group_status; rows are read only for the
+        # requested states, so a caller asking for failures alone stays cheap.
+        query = """
+            SELECT id, status, exit_code, failure_reason, finished_at
+            FROM jobs WHERE group_id = ?
+        """
+        params: list[Any] = [group_id]
+        if statuses is not None:
+            query += f" AND status IN ({', '.join('?' for _ in statuses)})"
+            params.extend(STATUS_CODES[name] for name in statuses)
+        with self._lock:
+            counts = {
+                STATUS_NAMES[cast(int, row["status"])]: cast(int, row["count"])
+                for row in self._conn.execute(
+                    "SELECT status, COUNT(*) AS count FROM jobs WHERE group_id = ? GROUP BY status",
+                    (group_id,),
+                )
+            }
+            rows = self._conn.execute(query + " ORDER BY id", params).fetchall() if statuses != [] else []
+        return JobStatusResponse(jobs=[self._row_to_status(row) for row in rows], counts=counts)
+
+    @staticmethod
+    def _row_to_status(row: sqlite3.Row) -> JobStatusEntry:
+        return JobStatusEntry(
+            id=f"job_{cast(int, row['id'])}",
+            status=STATUS_NAMES[cast(int, row["status"])],
+            exit_code=cast(int | None, row["exit_code"]),
+            failure_reason=cast(str | None, row["failure_reason"]),
+            finished_at=from_micros(cast(int | None, row["finished_at"])),
+        )
 
     def claim_next_job(self, node_id: str) -> JobAssignment | None:
         claimed_at = utcnow()
-        now = to_iso(claimed_at)
-        lease_expires_at = to_iso(claimed_at + self._lease_duration)
+        now = to_micros(claimed_at)
+        lease_expires_at = to_micros(claimed_at + self._lease_duration)
         assert now is not None and lease_expires_at is not None
-        with self._lock, self._conn:
-            # 1. Fetch node labels
-            node_row = self._conn.execute("SELECT labels_json FROM nodes WHERE node_id = ?", (node_id,)).fetchone()
+        with self._lock, self._write_transaction():
+            # 1. Fetch node labels, warm affinity keys, availability window and load
+            node = self._claiming_node(node_id)
             node_labels: dict[str, Any] = {}
-            if node_row is not None:
-                node_labels = json.loads(node_row["labels_json"])
+            warm_keys: set[str] = set()
+            window: float | None = None
+            min_wait: float | None = 0.0
+            if node is not None:
+                node_labels = dict(node.labels)
+                warm_keys = set(node.warm_keys)
+                window = window_seconds(node.available_until, claimed_at)
+                min_wait = self._load.min_wait(node.load, node.thresholds)
+            if min_wait is None:
+                return None
 
             # 2. Find matching job
             queued_jobs = self._conn.execute(
-                """
-                SELECT id, requirements_json FROM jobs
-                WHERE status = 'queued' AND attempts < max_attempts
+                f"""
+                SELECT id, requirements_json, affinity_key, created_at, timeout_seconds, command, kind
+                FROM jobs
+                WHERE status = {QUEUED} AND attempts < max_attempts
                 ORDER BY id ASC
                 """
             ).fetchall()
 
             matched_job_pk = None
+            matched_key: tuple[int, tuple[int, float]] = (0, (0, 0.0))
+            warm_elsewhere = functools.cache(
+                lambda key: self._warm_elsewhere(key, node_id, claimed_at)
+            )
+            estimate = functools.cache(
+                lambda command, kind: self._runtime_estimate(command_fingerprint(command, kind))
+            )
+            # FIFO and backfill take the first job that ranks 0; SJF compares them all.
+            ordered = self._scheduling is not None and self._scheduling.ordered
             for row in queued_jobs:
                 # Handle old rows without requirements_json gracefully if they exist
                 reqs_raw = row["requirements_json"] if "requirements_json" in row.keys() else "{}"
                 reqs: dict[str, Any] = json.loads(reqs_raw)
-                
-                match = True
-                for k, v in reqs.items():
-                    if node_labels.get(k) != v:
-                        match = False
-                        break
-                
-                if match:
-                    matched_job_pk = cast(int, row["id"])
+                if not requirements_match(reqs, node_labels):
+                    continue
+                timeout_seconds = cast(int, row["timeout_seconds"])
+                queued_at = from_micros(cast(int, row["created_at"])) or claimed_at
+                if min_wait and (claimed_at - queued_at).total_seconds() < min_wait:
+                    continue
+                score = (0, 0.0)
+                if self._scheduling is None:
+                    if not fits_window(timeout_seconds, window):
+                        continue
+                else:
+                    expected = estimate(cast(str, row["command"]), cast(JobKind, row["kind"]))
+                    if not self._scheduling.fits(timeout_seconds, expected, window):
+                        continue
+                    score = self._scheduling.score(expected, queued_at, claimed_at)
+                rank: int | None = 0
+                if self._affinity is not None:
+                    rank = self._affinity.rank(
+                        cast(str | None, row["affinity_key"]),
+                        warm_keys,
+                        queued_at,
+                        claimed_at,
+                        warm_elsewhere,
+                    )
+                if rank is None or (matched_job_pk is not None and (rank, score) >= matched_key):
+                    continue
+                matched_job_pk, matched_key = cast(int, row["id"]), (rank, score)
+                if rank == 0 and not ordered:
                     break
-                    
+
             if matched_job_pk is None:
-                return None
+                # A busy node is not worth a duplicate lease on someone else's straggler.
+                if self._speculation is None or min_wait:
+                    return None
+                return self._claim_speculative(node_id, node_labels, window, claimed_at)
 
             job_pk = matched_job_pk
             updated = self._conn.execute(
-                """
+                f"""
                 UPDATE jobs
-                SET status = 'running', assigned_node_id = ?, started_at = ?, attempts = attempts + 1
-                WHERE id = ? AND status = 'queued' AND attempts < max_attempts
+                SET status = {RUNNING}, assigned_node_id = ?, started_at = ?, attempts = attempts + 1
+                WHERE id = ? AND status = {QUEUED} AND attempts < max_attempts
                 """,
                 (node_id, now, job_pk),
             )
             if updated.rowcount != 1:
                 return None
+            self._record_change([job_pk])
 
             lease_token = secrets.token_urlsafe(24)
-            lease_expires_at = to_iso(claimed_at + self._lease_duration)
+            lease_expires_at = to_micros(claimed_at + self._lease_duration)
             assert lease_expires_at is not None
+            self._conn.execute("DELETE FROM leases WHERE job_id = ?", (job_pk,))
             self._conn.execute(
                 """
-                INSERT INTO leases(job_id, node_id, lease_token, lease_expires_at)
+                INSERT INTO leases(lease_token, job_id, node_id, lease_expires_at)
                 VALUES (?, ?, ?, ?)
-                ON CONFLICT(job_id) DO UPDATE SET
-                    node_id = excluded.node_id,
-                    lease_token = excluded.lease_token,
-                    lease_expires_at = excluded.lease_expires_at
                 """,
-                (job_pk, node_id, lease_token, lease_expires_at),
+                (lease_token, job_pk, node_id, lease_expires_at),
             )
 
             row = self._get_job_row(job_pk)
             if row is None:
                 raise HTTPException(status_code=500, detail="claimed job missing")
-            return JobAssignment(job=self._row_to_job(row), lease_token=lease_token)
+            job = self._row_to_job(row)
+            self._apply_stats(claimed_deltas(job.submitter, node_id, job.created_at, claimed_at))
+            return JobAssignment(job=job, lease_token=lease_token)
+
+    def _claiming_node(self, node_id: str) -> Node | None:
+        """The node as last stored, or as last heard by this process if that is newer.
+
+        Load travels on timestamp-only heartbeats, which reach the table only when
+        they are flushed, so this process's cached copy is usually the fresher one.
+        """
+        row = self._conn.execute("SELECT * FROM nodes WHERE node_id = ?", (node_id,)).fetchone()
+        stored = self._row_to_node(row) if row is not None else None
+        with self._liveness_lock:
+            cached = self._node_cache.get(node_id)
+        if cached is None or (stored is not None and stored.last_seen_at > cached.last_seen_at):
+            return stored
+        return cached
+
+    def _warm_elsewhere(self, affinity_key: str, node_id: str, now: datetime) -> bool:
+        """Whether another recently seen node reports `affinity_key` warm."""
+        row = self._conn.execute(
+            """
+            SELECT 1 FROM node_warm_keys
+            JOIN nodes ON nodes.node_id = node_warm_keys.node_id
+            WHERE node_warm_keys.affinity_key = ? AND node_warm_keys.node_id != ?
+            AND nodes.last_seen_at >= ?
+            LIMIT 1
+            """,
+            (affinity_key, node_id, to_micros(now - 2 * self._lease_duration)),
+        ).fetchone()
+        return row is not None
+
+    def _runtime_estimate(self, fingerprint: str) -> float | None:
+        row = self._conn.execute(
+            "SELECT mean_seconds FROM runtime_estimates WHERE fingerprint = ?", (fingerprint,)
+        ).fetchone()
+        return cast(float, row["mean_seconds"]) if row is not None else None
+
+    def _group_runtimes(self, group_id: str) -> list[float]:
+        rows = self._conn.execute(
+            f"""
+            SELECT (finished_at - started_at) / 1e6 AS runtime
+            FROM jobs
+            WHERE group_id = ? AND status = {SUCCEEDED} AND started_at IS NOT NULL
+            """,
+            (group_id,),
+        ).fetchall()
+        return [cast(float, row["runtime"]) for row in rows]
+
+    def _claim_speculative(
+        self,
+        node_id: str,
+        node_labels: dict[str, Any],
+        window: float | None,
+        claimed_at: datetime,
+    ) -> JobAssignment | None:
+        """Give an idle node a duplicate lease on the longest-running straggler, if any."""
+        assert self._speculation is not None
+        candidates = self._conn.execute(
+            f"""
+            SELECT * FROM jobs
+            WHERE status = {RUNNING} AND group_id IS NOT NULL
+            AND (SELECT COUNT(*) FROM leases WHERE leases.job_id = jobs.id) = 1
+            AND NOT EXISTS (
+                SELECT 1 FROM leases WHERE leases.job_id = jobs.id AND leases.node_id = ?
+            )
+            ORDER BY started_at ASC
+            """,
+            (node_id,),
+        ).fetchall()
+        runtimes: dict[str, list[float]] = {}
+        for row in candidates:
+            job = self._row_to_job(row)
+            assert job.group_id is not None
+            if not requirements_match(job.requirements, node_labels):
+                continue
+            if not fits_window(job.timeout_seconds, window):
+                continue
+            if job.group_id not in runtimes:
+                runtimes[job.group_id] = self._group_runtimes(job.group_id)
+            if not self._speculation.is_straggler(job.started_at, claimed_at, runtimes[job.group_id]):
+                continue
+            lease_token = secrets.token_urlsafe(24)
+            self._conn.execute(
+                """
+                INSERT INTO leases(lease_token, job_id, node_id, lease_expires_at)
+                VALUES (?, ?, ?, ?)
+                """,
+                (lease_token, cast(int, row["id"]), node_id, to_micros(claimed_at + self._lease_duration)),
+            )
+            return JobAssignment(job=job, lease_token=lease_token)
+        return None
 
     def finish_job(self, job_id: str, request: JobFinishRequest) -> Job:
         job_pk = parse_job_pk(job_id)
-        now = to_iso(utcnow())
+        with self._lock, self._write_transaction():
+            return self._finish(job_pk, request)
+
+    def complete_job(self, job_id: str, request: JobCompleteRequest) -> Job:
+        """Append the final logs, record artifacts and finish, under one lease check."""
+        job_pk = parse_job_pk(job_id)
+        now = to_micros(utcnow())
         assert now is not None
-        with self._lock, self._conn:
-            row = self._get_job_row(job_pk)
-            if row is None:
-                raise HTTPException(status_code=404, detail="job not found")
-            if cast(str, row["status"]) != "running":
+        with self._lock, self._write_transaction():
+            row = self._check_lease(job_pk, request.node_id, request.lease_token)
+            if cast(int, row["status"]) != RUNNING:
                 raise HTTPException(status_code=409, detail="job is not running")
+            if request.logs:
+                self._conn.execute(
+                    "INSERT INTO logs(job_id, text, created_at) VALUES (?, ?, ?)",
+                    (job_pk, request.logs, now),
+                )
+            if request.artifact_urls:
+                artifact_urls = cast(list[str], json.loads(cast(str, row["artifact_urls"])))
+                artifact_urls += [url for url in request.artifact_urls if url not in artifact_urls]
+                self._conn.execute(
+                    "UPDATE jobs SET artifact_urls = ? WHERE id = ?",
+                    (json.dumps(artifact_urls), job_pk),
+                )
+            return self._finish(job_pk, request)
 
-            next_status: JobStatus = "succeeded" if request.exit_code == 0 else "failed"
+    def _finish(self, job_pk: int, request: JobFinishRequest) -> Job:
+        """Record a job's exit status; call inside a write transaction."""
+        finished_at = utcnow()
+        now = to_micros(finished_at)
+        assert now is not None
+        row = self._get_job_row(job_pk)
+        if row is None:
+            raise HTTPException(status_code=404, detail="job not found")
+        if cast(int, row["status"]) != RUNNING:
+            raise HTTPException(status_code=409, detail="job is not running")
+
+        next_status: JobStatus = "succeeded" if request.exit_code == 0 else "failed"
+        # With speculative duplicates the first finish wins; the job is credited to
+        # the node that reported it, and the other leases are cancelled.
+        self._conn.execute(
+            """
+            UPDATE jobs
+            SET status = ?, exit_code = ?, failure_reason = ?, finished_at = ?, assigned_node_id = ?
+            WHERE id = ?
+            """,
+            (
+                STATUS_CODES[next_status],
+                request.exit_code,
+                request.failure_reason,
+                now,
+                request.node_id,
+                job_pk,
+            ),
+        )
+        self._conn.execute(
+            """
+            INSERT OR IGNORE INTO cancelled_leases(lease_token, job_id, node_id)
+            SELECT lease_token, job_id, node_id FROM leases
+            WHERE job_id = ? AND lease_token != ?
+            """,
+            (job_pk, request.lease_token),
+        )
+        self._conn.execute("DELETE FROM leases WHERE job_id = ?", (job_pk,))
+        self._record_change([job_pk])
+        fingerprint = command_fingerprint(cast(str, row["command"]), cast(JobKind, row["kind"]))
+        started_at = cast(int | None, row["started_at"])
+        if next_status == "succeeded" and started_at is not None:
             self._conn.execute(
                 """
-                UPDATE jobs
-                SET status = ?, exit_code = ?, failure_reason = ?, finished_at = ?
-                WHERE id = ?
+                INSERT INTO runtime_estimates(fingerprint, samples, mean_seconds) VALUES (?, 1, ?)
+                ON CONFLICT(fingerprint) DO UPDATE SET
+                    samples = samples + 1,
+                    mean_seconds = mean_seconds
+                        + (excluded.mean_seconds - mean_seconds) / MIN(samples + 1, ?)
                 """,
-                (next_status, request.exit_code, request.failure_reason, now, job_pk),
+                (fingerprint, (now - started_at) / 1e6, ESTIMATE_WINDOW),
+            )
+        if request.metrics is not None:
+            metrics = MetricsRow.from_request(job_pk, fingerprint, now, request.metrics)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO job_metrics VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                astuple(metrics),
             )
-            self._conn.execute("DELETE FROM leases WHERE job_id = ?", (job_pk,))
 
+        updated_row = self._get_job_row(job_pk)
+        if updated_row is None:
+            raise HTTPException(status_code=500, detail="updated job missing")
+        job = self._row_to_job(updated_row)
+        self._resolve_dependents(job_pk, next_status == "succeeded", finished_at)
+        self._apply_stats(
+            finished_deltas(
+                job.submitter,
+                job.assigned_node_id,
+                job.started_at,
+                finished_at,
+                succeeded=next_status == "succeeded",
+            )
+        )
+        return job
+
+    def preempt_job(self, job_id: str, request: JobPreemptRequest) -> Job:
+        """Give a run back to the queue, with its checkpoint, without using up an attempt."""
+        job_pk = parse_job_pk(job_id)
+        preempted_at = utcnow()
+        now = to_micros(preempted_at)
+        assert now is not None
+        with self._lock, self._write_transaction():
+            row = self._check_lease(job_pk, request.node_id, request.lease_token)
+            if cast(int, row["status"]) != RUNNING:
+                raise HTTPException(status_code=409, detail="job is not running")
+            if request.logs:
+                self._conn.execute(
+                    "INSERT INTO logs(job_id, text, created_at) VALUES (?, ?, ?)",
+                    (job_pk, request.logs, now),
+                )
+            if request.checkpoint_url is not None:
+                self._conn.execute(
+                    "UPDATE jobs SET checkpoint_url = ? WHERE id = ?",
+                    (request.checkpoint_url, job_pk),
+                )
+            self._conn.execute("DELETE FROM leases WHERE lease_token = ?", (request.lease_token,))
+            survivor = self._conn.execute(
+                "SELECT node_id FROM leases WHERE job_id = ? LIMIT 1", (job_pk,)
+            ).fetchone()
+            if survivor is not None:
+                # A speculative duplicate is still alive; it now carries the job.
+                self._conn.execute(
+                    "UPDATE jobs SET assigned_node_id = ? WHERE id = ?",
+                    (cast(str, survivor["node_id"]), job_pk),
+                )
+            else:
+                job = self._row_to_job(row)
+                self._conn.execute(
+                    f"""
+                    UPDATE jobs
+                    SET status = {QUEUED}, assigned_node_id = NULL, started_at = NULL,
+                        attempts = MAX(attempts - 1, 0)
+                    WHERE id = ?
+                    """,
+                    (job_pk,),
+                )
+                self._apply_stats(
+                    preempted_deltas(job.submitter, request.node_id, job.started_at, preempted_at)
+                )
+            self._record_change([job_pk])
             updated_row = self._get_job_row(job_pk)
-            if updated_row is None:
-                raise HTTPException(status_code=500, detail="updated job missing")
+            assert updated_row is not None
             return self._row_to_job(updated_row)
 
+    def expire_leases(self) -> int:
+        """Resolve running jobs whose lease ran out: requeue if attempts remain, else fail."""
+        expired_at = utcnow()
+        now = to_micros(expired_at)
+        assert now is not None
+        with self._lock, self._write_transaction():
+            # Unflushed heartbeats may still be keeping some of these leases alive.
+            self._write_liveness(self._take_pending_seen())
+            expired_pks = [
+                cast(int, row["job_id"])
+                for row in self._conn.execute(
+                    f"""
+                    DELETE FROM leases
+                    WHERE lease_expires_at < ?
+                    AND job_id IN (SELECT id FROM jobs WHERE status = {RUNNING})
+                    RETURNING job_id
+                    """,
+                    (now,),
+                ).fetchall()
+            ]
+            resolved = 0
+            if expired_pks:
+                self._record_change(sorted(set(expired_pks)))
+            for job_pk in sorted(set(expired_pks)):
+                survivor = self._conn.execute(
+                    "SELECT node_id FROM leases WHERE job_id = ? LIMIT 1", (job_pk,)
+                ).fetchone()
+                if survivor is not None:
+                    # A speculative duplicate is still alive; it now carries the job.
+                    self._conn.execute(
+                        "UPDATE jobs SET assigned_node_id = ? WHERE id = ?",
+                        (cast(str, survivor["node_id"]), job_pk),
+                    )
+                    continue
+                row = self._get_job_row(job_pk)
+                assert row is not None
+                job = self._row_to_job(row)
+                requeued = job.attempts < job.max_attempts
+                if requeued:
+                    self._conn.execute(
+                        f"""
+                        UPDATE jobs
+                        SET status = {QUEUED}, assigned_node_id = NULL, started_at = NULL
+                        WHERE id = ?
+                        """,
+                        (job_pk,),
+                    )
+                else:
+                    self._conn.execute(
+                        f"""
+                        UPDATE jobs
+                        SET status = {FAILED}, failure_reason = 'lease expired', finished_at = ?
+                        WHERE id = ?
+                        """,
+                        (now, job_pk),
+                    )
+                    self._resolve_dependents(job_pk, succeeded=False, at=expired_at)
+                self._apply_stats(
+                    expired_deltas(job.submitter, job.assigned_node_id, expired_at, requeued)
+                )
+                resolved += 1
+            return resolved
+
+    def stats(self) -> StatsResponse:
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM stats").fetchall()
+        return build_stats(
+            (
+                (
+                    cast(str, row["scope"]),
+                    cast(str, row["key"]),
+                    cast(str, row["bucket"]),
+                    {name: cast(float, row[name]) for name in STAT_FIELDS},
+                )
+                for row in rows
+            ),
+            utcnow(),
+        )
+
+    def job_metrics(self, job_id: str) -> JobMetricsEntry:
+        job_pk = parse_job_pk(job_id)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM job_metrics WHERE job_id = ?", (job_pk,)
+            ).fetchone()
+        if row is None:
+            raise HTTPException(status_code=404, detail="job metrics not found")
+        metrics = MetricsRow(*row)
+        return metrics.to_entry(from_micros(metrics.finished_at) or utcnow())
+
+    def command_metrics(self, fingerprint: str | None, limit: int) -> CommandMetricsResponse:
+        where, params = ("WHERE fingerprint = ?", [fingerprint]) if fingerprint is not None else ("", [])
+        with self._lock:
+            rows = self._conn.execute(
+                f"""
+                SELECT
+                    fingerprint,
+                    COUNT(*),
+                    SUM(wall_ms),
+                    MAX(wall_ms),
+                    SUM(user_ms IS NOT NULL OR system_ms IS NOT NULL),
+                    COALESCE(SUM(COALESCE(user_ms, 0) + COALESCE(system_ms, 0)), 0) AS cpu_ms,
+                    MAX(max_rss_kb),
+                    COALESCE(SUM(read_blocks), 0),
+                    COALESCE(SUM(write_blocks), 0)
+                FROM job_metrics {where}
+                GROUP BY fingerprint
+                ORDER BY cpu_ms DESC
+                LIMIT ?
+                """,
+                [*params, limit],
+            ).fetchall()
+        return rank([CommandTotals(*row[1:]).to_metrics(row[0]) for row in rows], limit)
+
     def append_logs(self, job_id: str, request: JobLogsRequest) -> None:
         job_pk = parse_job_pk(job_id)
-        now = to_iso(utcnow())
+        now = to_micros(utcnow())
         assert now is not None
-        with self._lock, self._conn:
+        with self._lock, self._write_transaction():
             self._conn.execute(
                 "INSERT INTO logs(job_id, text, created_at) VALUES (?, ?, ?)",
                 (job_pk, request.text, now),
@@ -382,40 +1437,164 @@ class SqliteJobStore:
         job_pk = parse_job_pk(job_id)
         with self._lock:
             row = self._get_job_row(job_pk)
-            if row is None:
-                raise HTTPException(status_code=404, detail="job not found")
-            logs = self._conn.execute(
-                "SELECT text FROM logs WHERE job_id = ? ORDER BY id ASC",
-                (job_pk,),
-            ).fetchall()
-            text = "".join(cast(str, record["text"]) for record in logs)
-            return JobLogsResponse(text=text)
+            if row is not None:
+                return JobLogsResponse(text=self._read_log_text(job_pk))
+            segment = self._archived_segment(job_pk)
+        logs = self._archive.read_logs(segment, job_id) if segment and self._archive else None
+        if logs is None:
+            raise HTTPException(status_code=404, detail="job not found")
+        return logs
+
+    def search_logs(
+        self,
+        query: str,
+        status_filter: JobStatus | None,
+        since: datetime | None,
+        until: datetime | None,
+        limit: int,
+    ) -> LogSearchResponse:
+        """Jobs with a log chunk matching an FTS5 `query`, newest job first.
+
+        Each job is listed once, with a snippet of its newest matching chunk. Only
+        chunks logged in [`since`, `until`) count. Archived jobs are not searched.
+        """
+        if not self._log_search:
+            raise HTTPException(status_code=404, detail="log search is disabled")
+        sql = f"""
+            SELECT logs.job_id, jobs.status, logs.created_at,
+                snippet(logs_fts, 0, '**', '**', '...', {LOG_SNIPPET_TOKENS}) AS snippet
+            FROM logs_fts
+            JOIN logs ON logs.id = logs_fts.rowid
+            JOIN jobs ON jobs.id = logs.job_id
+            WHERE logs_fts MATCH ?
+        """
+        params: list[Any] = [query]
+        if status_filter is not None:
+            sql += " AND jobs.status = ?"
+            params.append(STATUS_CODES[status_filter])
+        if since is not None:
+            sql += " AND logs.created_at >= ?"
+            params.append(to_micros(since))
+        if until is not None:
+            sql += " AND logs.created_at < ?"
+            params.append(to_micros(until))
+        sql += " ORDER BY logs.job_id DESC, logs.id DESC"
+        hits: dict[int, LogSearchHit] = {}
+        with self._lock:
+            try:
+                cursor = self._conn.execute(sql, params)
+                # Rows come newest job first, so the scan can stop after `limit` jobs.
+                for row in cursor:
+                    job_pk = cast(int, row["job_id"])
+                    if job_pk in hits:
+                        continue
+                    if len(hits) == limit:
+                        break
+                    hits[job_pk] = LogSearchHit(
+                        job_id=f"job_{job_pk}",
+                        status=STATUS_NAMES[cast(int, row["status"])],
+                        snippet=cast(str, row["snippet"]),
+                        logged_at=from_micros(cast(int, row["created_at"])) or utcnow(),
+                    )
+            except sqlite3.OperationalError as exc:
+                # FTS5 reports a malformed query when it is first stepped.
+                raise HTTPException(status_code=400, detail=f"invalid search query: {exc}") from exc
+        return LogSearchResponse(hits=list(hits.values()))
+
+    def _read_log_text(self, job_pk: int) -> str:
+        logs = self._conn.execute(
+            "SELECT text FROM logs WHERE job_id = ? ORDER BY id ASC",
+            (job_pk,),
+        ).fetchall()
+        return "".join(cast(str, record["text"]) for record in logs)
+
+    def archive_jobs(self, older_than: datetime, batch_size: int = 500) -> int:
+        """Move terminal jobs finished before `older_than`, with their logs, into the archive."""
+        if self._archive is None:
+            return 0
+        cutoff = to_micros(older_than)
+        archived = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    f"""
+                    SELECT * FROM jobs
+                    WHERE status IN ({SUCCEEDED}, {FAILED}) AND finished_at < ?
+                    ORDER BY id ASC
+                    LIMIT ?
+                    """,
+                    (cutoff, batch_size),
+                ).fetchall()
+                entries = [
+                    (self._row_to_job(row), self._read_log_text(cast(int, row["id"])))
+                    for row in rows
+                ]
+            if not entries:
+                return archived
+
+            # Write the segment before touching the hot tables: a crash in between only
+            # leaves an unreferenced segment, and the jobs are archived again next run.
+            segment = self._archive.write_segment(entries)
+            candidates = [cast(int, row["id"]) for row in rows]
+            with self._lock, self._write_transaction():
+                # Another coordinator process may have archived some of these jobs since
+                # they were read; only those still in the hot table are indexed here.
+                placeholders = ", ".join("?" for _ in candidates)
+                job_pks = [
+                    (cast(int, row["id"]),)
+                    for row in self._conn.execute(
+                        f"SELECT id FROM jobs WHERE id IN ({placeholders})", candidates
+                    ).fetchall()
+                ]
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO archived_jobs(job_id, segment) VALUES (?, ?)",
+                    [(job_pk, segment) for (job_pk,) in job_pks],
+                )
+                # Logs and leases go with the job through ON DELETE CASCADE.
+                self._conn.executemany("DELETE FROM jobs WHERE id = ?", job_pks)
+                self._record_change([])
+                for (job_pk,) in job_pks:
+                    self._versions.pop(job_pk, None)
+            if not job_pks:
+                self._archive.discard_segment(segment)
+            archived += len(job_pks)
 
     def assert_job_lease(self, job_id: str, node_id: str, lease_token: str) -> None:
         job_pk = parse_job_pk(job_id)
         with self._lock:
-            row = self._get_job_row(job_pk)
-            if row is None:
-                raise HTTPException(status_code=404, detail="job not found")
-            lease = self._conn.execute(
-                "SELECT node_id, lease_token, lease_expires_at FROM leases WHERE job_id = ?",
-                (job_pk,),
-            ).fetchone()
-            if lease is None:
-                raise HTTPException(status_code=409, detail="job has no active lease")
-            lease_node_id = cast(str, lease["node_id"])
-            lease_token_db = cast(str, lease["lease_token"])
-            lease_expires_at = parse_iso(cast(str, lease["lease_expires_at"]))
-            if lease_node_id != node_id or lease_token_db != lease_token:
-                raise HTTPException(status_code=409, detail="job is owned by a different worker")
-            if lease_expires_at is None:
-                raise HTTPException(status_code=409, detail="job has no active lease")
-            if utcnow() > lease_expires_at:
-                raise HTTPException(status_code=409, detail="lease has expired")
+            self._check_lease(job_pk, node_id, lease_token)
+
+    def _check_lease(self, job_pk: int, node_id: str, lease_token: str) -> sqlite3.Row:
+        row = self._get_job_row(job_pk)
+        if row is None:
+            raise HTTPException(status_code=404, detail="job not found")
+        leases = self._conn.execute(
+            "SELECT node_id, lease_token, lease_expires_at FROM leases WHERE job_id = ?",
+            (job_pk,),
+        ).fetchall()
+        if not leases:
+            raise HTTPException(status_code=409, detail="job has no active lease")
+        lease = next(
+            (
+                candidate
+                for candidate in leases
+                if cast(str, candidate["node_id"]) == node_id
+                and cast(str, candidate["lease_token"]) == lease_token
+            ),
+            None,
+        )
+        if lease is None:
+            raise HTTPException(status_code=409, detail="job is owned by a different worker")
+        lease_expires_at = from_micros(cast(int, lease["lease_expires_at"]))
+        if lease_expires_at is None:
+            raise HTTPException(status_code=409, detail="job has no active lease")
+        if utcnow() > self._pending_lease_expiry(node_id, lease_expires_at):
+            raise HTTPException(status_code=409, detail="lease has expired")
+        return row
 
     def record_artifact(self, job_id: str, url: str) -> None:
         job_pk = parse_job_pk(job_id)
-        with self._lock, self._conn:
+        with self._lock, self._write_transaction():
             row = self._get_job_row(job_pk)
             if row is None:
                 raise HTTPException(status_code=404, detail="job not found")
@@ -430,46 +1609,180 @@ class SqliteJobStore:
                 "UPDATE jobs SET artifact_urls = ? WHERE id = ?",
                 (json.dumps(artifact_urls), job_pk)
             )
+            self._record_change([job_pk])
+
+    def _take_pending_seen(self) -> dict[str, tuple[datetime, datetime]]:
+        with self._liveness_lock:
+            pending, self._pending_seen = self._pending_seen, {}
+        return pending
+
+    def _write_liveness(self, pending: dict[str, tuple[datetime, datetime]]) -> None:
+        """Persist coalesced heartbeats; call inside a write transaction."""
+        if not pending:
+            return
+        # Pending heartbeats only come from nodes in the cache, which holds their latest load.
+        with self._liveness_lock:
+            loads = {node_id: self._node_cache[node_id].load for node_id in pending}
+        self._conn.executemany(
+            "UPDATE nodes SET last_seen_at = ?, load_json = ? WHERE node_id = ?",
+            [
+                (to_micros(last), model_json(loads[node_id]), node_id)
+                for node_id, (_, last) in pending.items()
+            ],
+        )
+        # Heartbeats extend every lease that was still live when they arrived. Pending
+        # heartbeats are never more than one lease duration apart, so a lease alive at
+        # the first one stayed alive through the last.
+        self._conn.executemany(
+            """
+            UPDATE leases SET lease_expires_at = MAX(lease_expires_at, ?)
+            WHERE node_id = ? AND lease_expires_at >= ?
+            """,
+            [
+                (to_micros(last + self._lease_duration), node_id, to_micros(first))
+                for node_id, (first, last) in pending.items()
+            ],
+        )
+
+    def _pending_lease_expiry(self, node_id: str, lease_expires_at: datetime) -> datetime:
+        """A lease's deadline including heartbeats from its node that are not flushed yet."""
+        with self._liveness_lock:
+            pending = self._pending_seen.get(node_id)
+        if pending is None or pending[0] > lease_expires_at:
+            return lease_expires_at
+        return max(lease_expires_at, pending[1] + self._lease_duration)
+
+    def flush_heartbeats(self) -> int:
+        pending = self._take_pending_seen()
+        if pending:
+            with self._lock, self._write_transaction():
+                self._write_liveness(pending)
+        return len(pending)
+
+    def take_cancellations(self, node_id: str) -> list[str]:
+        """Pop the jobs `node_id` should stop because a duplicate lease finished first."""
+        if self._speculation is None:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT lease_token, job_id FROM cancelled_leases WHERE node_id = ?", (node_id,)
+            ).fetchall()
+            if not rows:
+                return []
+            with self._write_transaction():
+                self._conn.executemany(
+                    "DELETE FROM cancelled_leases WHERE lease_token = ?",
+                    [(cast(str, row["lease_token"]),) for row in rows],
+                )
+        return [f"job_{cast(int, row['job_id'])}" for row in rows]
 
     def heartbeat_node(self, node_id: str, request: NodeHeartbeatRequest) -> Node:
-        now = to_iso(utcnow())
-        assert now is not None
-        with self._lock, self._conn:
+        seen_at = utcnow()
+        warm_keys = sorted(set(request.warm_keys)) if request.warm_keys is not None else None
+        with self._liveness_lock:
+            cached = self._node_cache.get(node_id)
+            pending = self._pending_seen.get(node_id)
+            if (
+                cached is not None
+                and (request.name is None or request.name == cached.name)
+                and (not request.labels or request.labels == cached.labels)
+                and (warm_keys is None or warm_keys == cached.warm_keys)
+                and request.available_until == cached.available_until
+                and request.thresholds == cached.thresholds
+                and (pending is None or seen_at - pending[1] <= self._lease_duration)
+            ):
+                # Only the timestamp and load changed: record them and let
+                # flush_heartbeats batch them.
+                self._pending_seen[node_id] = (pending[0] if pending else seen_at, seen_at)
+                node = cached.model_copy(update={"last_seen_at": seen_at, "load": request.load})
+                self._node_cache[node_id] = node
+                return node
+            self._pending_seen.pop(node_id, None)
+
+        now = to_micros(seen_at)
+        lease_expires_at = to_micros(seen_at + self._lease_duration)
+        assert now is not None and lease_expires_at is not None
+        with self._lock, self._write_transaction():
+            if pending is not None:
+                self._write_liveness({node_id: pending})
+            # A heartbeat proves the node is alive, so it extends every live lease it holds.
+            self._conn.execute(
+                "UPDATE leases SET lease_expires_at = ? WHERE node_id = ? AND lease_expires_at >= ?",
+                (lease_expires_at, node_id, now),
+            )
             existing = self._conn.execute(
                 "SELECT * FROM nodes WHERE node_id = ?",
                 (node_id,),
             ).fetchone()
             if existing is None:
-                labels_json = json.dumps(request.labels)
+                node = Node(
+                    node_id=node_id,
+                    name=request.name,
+                    labels=request.labels,
+                    warm_keys=warm_keys or [],
+                    available_until=request.available_until,
+                    load=request.load,
+                    thresholds=request.thresholds,
+                    last_seen_at=seen_at,
+                )
                 self._conn.execute(
                     """
-                    INSERT INTO nodes(node_id, name, labels_json, last_seen_at)
-                    VALUES (?, ?, ?, ?)
+                    INSERT INTO nodes(
+                        node_id, name, labels_json, warm_keys_json, available_until,
+                        load_json, thresholds_json, last_seen_at
+                    )
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
                     """,
-                    (node_id, request.name, labels_json, now),
+                    (
+                        node_id,
+                        node.name,
+                        json.dumps(node.labels),
+                        json.dumps(node.warm_keys),
+                        to_micros(node.available_until),
+                        model_json(node.load),
+                        model_json(node.thresholds),
+                        now,
+                    ),
                 )
             else:
-                existing_labels_any = cast(dict[str, Any], json.loads(cast(str, existing["labels_json"])))
-                existing_labels = cast(dict[str, str | int | float | bool], existing_labels_any)
-                labels = request.labels if request.labels else existing_labels
-                name = request.name if request.name is not None else cast(str | None, existing["name"])
+                previous = self._row_to_node(existing)
+                node = Node(
+                    node_id=node_id,
+                    name=request.name if request.name is not None else previous.name,
+                    labels=request.labels if request.labels else previous.labels,
+                    warm_keys=warm_keys if warm_keys is not None else previous.warm_keys,
+                    available_until=request.available_until,
+                    load=request.load,
+                    thresholds=request.thresholds,
+                    last_seen_at=seen_at,
+                )
                 self._conn.execute(
                     """
                     UPDATE nodes
-                    SET name = ?, labels_json = ?, last_seen_at = ?
+                    SET name = ?, labels_json = ?, warm_keys_json = ?, available_until = ?,
+                        load_json = ?, thresholds_json = ?, last_seen_at = ?
                     WHERE node_id = ?
                     """,
-                    (name, json.dumps(labels), now, node_id),
+                    (
+                        node.name,
+                        json.dumps(node.labels),
+                        json.dumps(node.warm_keys),
+                        to_micros(node.available_until),
+                        model_json(node.load),
+                        model_json(node.thresholds),
+                        now,
+                        node_id,
+                    ),
                 )
-
-            row = self._conn.execute(
-                "SELECT * FROM nodes WHERE node_id = ?",
-                (node_id,),
-            ).fetchone()
-            if row is None:
-                raise HTTPException(status_code=500, detail="failed to persist node heartbeat")
-            return self._row_to_node(row)
-
+            if warm_keys is not None:
+                self._conn.execute("DELETE FROM node_warm_keys WHERE node_id = ?", (node_id,))
+                self._conn.executemany(
+                    "INSERT INTO node_warm_keys(affinity_key, node_id) VALUES (?, ?)",
+                    [(key, node_id) for key in warm_keys],
+                )
+        with self._liveness_lock:
+            self._node_cache[node_id] = node
+        return node
 
 auth_scheme = HTTPBearer(auto_error=False)
 
@@ -487,29 +1800,324 @@ def require_auth(
         )
 
 
-def create_app(db_path: str | None = None, lease_duration_seconds: int = 30) -> FastAPI:
-    app = FastAPI(title="deborgen")
-    resolved_db_path: str = (
-        db_path if db_path is not None else os.getenv("DEBORGEN_DB_PATH") or "deborgen.db"
+def version_etag(version: int) -> str:
+    # Weak: the body may be re-encoded (MessagePack, compression) on the way out.
+    return f'W/"{version}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Weak comparison of `etag` against the request's If-None-Match header."""
+    header = request.headers.get("if-none-match")
+    if header is None:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
+
+
+def model_json(model: BaseModel | None) -> str | None:
+    return model.model_dump_json(exclude_none=True) if model is not None else None
+
+
+def env_flag(name: str) -> bool:
+    return os.getenv(name, "").strip().lower() in {"1", "true", "yes", "on"}
+
+
+def env_float(name: str) -> float | None:
+    value = os.getenv(name)
+    return float(value) if value else None
+
+
+def create_app(
+    db_path: str | None = None,
+    lease_duration_seconds: int = 30,
+    instrument: bool | None = None,
+    slow_operation_ms: float | None = None,
+    store_kind: StoreKind | None = None,
+    journal_dir: str | None = None,
+    retention_days: float | None = None,
+    archive_dir: str | None = None,
+    archive_interval_seconds: float | None = None,
+    heartbeat_flush_seconds: float | None = None,
+    speculation_percentile: float | None = None,
+    affinity_delay_seconds: float | None = None,
+    scheduling: SchedulingMode | None = None,
+    busy_node_delay_seconds: float | None = None,
+    max_in_flight: int | None = None,
+    target_delay_ms: float | None = None,
+    log_search: bool | None = None,
+) -> FastAPI:
+    periodic_tasks: list[PeriodicTask] = []
+
+    @asynccontextmanager
+    async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+        for task in periodic_tasks:
+            task.start()
+        try:
+            yield
+        finally:
+            for task in periodic_tasks:
+                task.stop()
+
+    app = FastAPI(title="deborgen", lifespan=lifespan)
+    app.add_middleware(WireMiddleware)
+    resolved_max_in_flight = (
+        max_in_flight
+        if max_in_flight is not None
+        else int(os.getenv("DEBORGEN_MAX_IN_FLIGHT") or "0")
+    )
+    admission: AdmissionController | None = None
+    if resolved_max_in_flight > 0:
+        target_seconds = (
+            target_delay_ms
+            if target_delay_ms is not None
+            else float(os.getenv("DEBORGEN_TARGET_DELAY_MS") or "500")
+        ) / 1000
+        admission = AdmissionController(
+            AdmissionPolicy(
+                worker_in_flight=resolved_max_in_flight,
+                user_in_flight=max(resolved_max_in_flight // 4, 1),
+                worker_target_seconds=4 * target_seconds,
+                user_target_seconds=target_seconds,
+            )
+        )
+        # Added last, so it runs first and sheds requests before their bodies are decoded.
+        app.add_middleware(AdmissionMiddleware, controller=admission)
+    resolved_store_kind = store_kind or os.getenv("DEBORGEN_STORE") or "sqlite"
+    if resolved_store_kind not in ("sqlite", "memory"):
+        raise ValueError(f"unknown store kind: {resolved_store_kind}")
+    resolved_instrument = instrument if instrument is not None else env_flag("DEBORGEN_INSTRUMENT")
+    instrumentation: StoreInstrumentation | None = None
+    if resolved_instrument:
+        resolved_slow_ms = (
+            slow_operation_ms
+            if slow_operation_ms is not None
+            else float(os.getenv("DEBORGEN_SLOW_OPERATION_MS") or "100")
+        )
+        instrumentation = StoreInstrumentation(slow_threshold_seconds=resolved_slow_ms / 1000)
+    resolved_retention_days = (
+        retention_days if retention_days is not None else env_float("DEBORGEN_RETENTION_DAYS")
+    )
+    archive: JobArchive | None = None
+    if resolved_retention_days is not None:
+        archive = JobArchive(
+            archive_dir
+            if archive_dir is not None
+            else os.getenv("DEBORGEN_ARCHIVE_DIR") or "deborgen-archive"
+        )
+    resolved_speculation_percentile = (
+        speculation_percentile
+        if speculation_percentile is not None
+        else env_float("DEBORGEN_SPECULATION_PERCENTILE")
+    )
+    speculation: SpeculationPolicy | None = None
+    if resolved_speculation_percentile is not None:
+        speculation = SpeculationPolicy(
+            percentile=resolved_speculation_percentile,
+            min_peers=int(os.getenv("DEBORGEN_SPECULATION_MIN_PEERS") or "5"),
+        )
+    resolved_affinity_delay = (
+        affinity_delay_seconds
+        if affinity_delay_seconds is not None
+        else float(os.getenv("DEBORGEN_AFFINITY_DELAY_SECONDS") or "5")
+    )
+    # A zero delay never holds a job back, which is plain FIFO.
+    affinity = AffinityPolicy(delay_seconds=resolved_affinity_delay) if resolved_affinity_delay > 0 else None
+    resolved_scheduling = scheduling or os.getenv("DEBORGEN_SCHEDULING") or "fifo"
+    if resolved_scheduling not in ("fifo", "sjf", "backfill"):
+        raise ValueError(f"unknown scheduling mode: {resolved_scheduling}")
+    scheduling_policy: SchedulingPolicy | None = None
+    if resolved_scheduling != "fifo":
+        aging = env_float("DEBORGEN_SCHEDULING_AGING")
+        scheduling_policy = SchedulingPolicy(
+            mode=cast(SchedulingMode, resolved_scheduling),
+            aging=1.0 if aging is None else aging,
+            max_wait_seconds=env_float("DEBORGEN_SCHEDULING_MAX_WAIT_SECONDS") or 3600.0,
+        )
+    resolved_busy_delay = (
+        busy_node_delay_seconds
+        if busy_node_delay_seconds is not None
+        else env_float("DEBORGEN_BUSY_NODE_DELAY_SECONDS")
+    )
+    load_policy = LoadPolicy(
+        busy_delay_seconds=30.0 if resolved_busy_delay is None else resolved_busy_delay
+    )
+    store: JobStore
+    if resolved_store_kind == "memory":
+        store = MemoryJobStore(
+            journal_dir=(
+                journal_dir
+                if journal_dir is not None
+                else os.getenv("DEBORGEN_JOURNAL_DIR") or "deborgen-journal"
+            ),
+            lease_duration_seconds=lease_duration_seconds,
+            instrumentation=instrumentation,
+            archive=archive,
+            speculation=speculation,
+            affinity=affinity,
+            scheduling=scheduling_policy,
+            load=load_policy,
+        )
+    else:
+        store = SqliteJobStore(
+            db_path=(
+                db_path if db_path is not None else os.getenv("DEBORGEN_DB_PATH") or "deborgen.db"
+            ),
+            lease_duration_seconds=lease_duration_seconds,
+            instrumentation=instrumentation,
+            archive=archive,
+            speculation=speculation,
+            affinity=affinity,
+            scheduling=scheduling_policy,
+            load=load_policy,
+            log_search=(
+                log_search if log_search is not None else env_flag("DEBORGEN_LOG_SEARCH")
+            ),
+        )
+
+    def archive_expired_jobs() -> int:
+        if resolved_retention_days is None:
+            raise HTTPException(status_code=404, detail="retention is not configured")
+        return store.archive_jobs(older_than=utcnow() - timedelta(days=resolved_retention_days))
+
+    periodic_tasks.append(
+        PeriodicTask(
+            name="expire-leases",
+            interval_seconds=max(lease_duration_seconds / 2, 1.0),
+            fn=store.expire_leases,
+        )
     )
-    store = SqliteJobStore(db_path=resolved_db_path, lease_duration_seconds=lease_duration_seconds)
+    periodic_tasks.append(
+        PeriodicTask(
+            name="flush-heartbeats",
+            # Heartbeat interval plus flush delay must stay under the lease duration,
+            # or leases in other coordinator processes expire before the flush lands.
+            interval_seconds=(
+                heartbeat_flush_seconds
+                if heartbeat_flush_seconds is not None
+                else env_float("DEBORGEN_HEARTBEAT_FLUSH_SECONDS")
+                or max(lease_duration_seconds / 6, 1.0)
+            ),
+            fn=store.flush_heartbeats,
+            run_on_stop=True,
+        )
+    )
+    if resolved_retention_days is not None:
+        periodic_tasks.append(
+            PeriodicTask(
+                name="archive",
+                interval_seconds=(
+                    archive_interval_seconds
+                    if archive_interval_seconds is not None
+                    else env_float("DEBORGEN_ARCHIVE_INTERVAL_SECONDS") or 3600.0
+                ),
+                fn=archive_expired_jobs,
+            )
+        )
+
+    if instrumentation is not None:
+        active_instrumentation = instrumentation
+
+        @app.middleware("http")
+        async def time_requests(request: Request, call_next: RequestResponseEndpoint) -> Response:
+            started = time.perf_counter()
+            response = await call_next(request)
+            route = request.scope.get("route")
+            route_path = getattr(route, "path", request.url.path)
+            active_instrumentation.record_request(
+                f"{request.method} {route_path}", time.perf_counter() - started
+            )
+            return response
+
+    def require_instrumentation() -> StoreInstrumentation:
+        if instrumentation is None:
+            raise HTTPException(status_code=404, detail="instrumentation is disabled")
+        return instrumentation
 
     @app.get("/health")
     def health() -> dict[str, str]:
         return {"status": "ok"}
 
+    @app.get("/admin/timings")
+    def admin_timings(
+        reset: bool = False,
+        _: None = Depends(require_auth),
+    ) -> dict[str, Any]:
+        active = require_instrumentation()
+        summary = active.summary()
+        if reset:
+            active.reset()
+        return summary
+
+    @app.get("/admin/admission")
+    def admin_admission(_: None = Depends(require_auth)) -> dict[str, object]:
+        if admission is None:
+            raise HTTPException(status_code=404, detail="admission control is disabled")
+        return admission.snapshot()
+
+    @app.post("/admin/archive")
+    def admin_archive(_: None = Depends(require_auth)) -> dict[str, int]:
+        return {"archived": archive_expired_jobs()}
+
+    @app.get("/admin/profile", response_class=PlainTextResponse)
+    def admin_profile(
+        seconds: float = Query(default=5.0, gt=0, le=60),
+        interval_ms: float = Query(default=5.0, ge=1, le=1000),
+        _: None = Depends(require_auth),
+    ) -> PlainTextResponse:
+        require_instrumentation()
+        counts = sample_stacks(seconds=seconds, interval_seconds=interval_ms / 1000)
+        return PlainTextResponse(format_collapsed(counts))
+
+    @app.get("/stats", response_model=StatsResponse)
+    def stats(_: None = Depends(require_auth)) -> StatsResponse:
+        return store.stats()
+
+    @app.get("/stats/commands", response_model=CommandMetricsResponse)
+    def command_metrics(
+        fingerprint: str | None = None,
+        limit: int = Query(default=COMMAND_METRICS_LIMIT, ge=1, le=1000),
+        _: None = Depends(require_auth),
+    ) -> CommandMetricsResponse:
+        return store.command_metrics(fingerprint, limit)
+
     @app.post("/jobs", response_model=Job, status_code=201)
     def create_job(request: JobCreateRequest, _: None = Depends(require_auth)) -> Job:
         return store.create_job(request)
 
+    @app.post("/jobs/batch", response_model=JobListResponse, status_code=201)
+    def create_jobs(request: JobBatchCreateRequest, _: None = Depends(require_auth)) -> JobListResponse:
+        # A batch is one submission group unless its entries name their own.
+        group_id = request.group_id or f"grp_{secrets.token_hex(6)}"
+        items = [
+            item if item.group_id is not None else item.model_copy(update={"group_id": group_id})
+            for item in request.jobs
+        ]
+        return JobListResponse(jobs=store.create_jobs(items))
+
     @app.get("/jobs", response_model=JobListResponse)
     def list_jobs(
+        request: Request,
+        response: Response,
         status_filter: JobStatus | None = Query(default=None, alias="status"),
         limit: int | None = Query(default=None, ge=1, le=1000),
         _: None = Depends(require_auth),
-    ) -> JobListResponse:
+    ) -> JobListResponse | Response:
+        # Any job change moves the change sequence, so it versions every listing. It is
+        # read before the jobs, so a change in between only costs the client a refetch.
+        etag = version_etag(store.change_sequence())
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        response.headers["ETag"] = etag
         return JobListResponse(jobs=store.list_jobs(status_filter=status_filter, limit=limit))
 
+    @app.post("/jobs/status", response_model=JobStatusResponse)
+    def job_statuses(request: JobStatusRequest, _: None = Depends(require_auth)) -> JobStatusResponse:
+        return store.job_statuses(request)
+
     @app.get("/jobs/next", response_model=JobAssignment)
     def next_job(node_id: str, _: None = Depends(require_auth)) -> JobAssignment | Response:
         assignment = store.claim_next_job(node_id=node_id)
@@ -518,21 +2126,48 @@ def create_app(db_path: str | None = None, lease_duration_seconds: int = 30) ->
         return assignment
 
     @app.get("/jobs/{job_id}", response_model=Job)
-    def get_job(job_id: str, _: None = Depends(require_auth)) -> Job:
-        return store.get_job(job_id)
+    def get_job(
+        job_id: str, request: Request, response: Response, _: None = Depends(require_auth)
+    ) -> Job | Response:
+        # Pollers revalidate against the store's in-memory version, without a job read.
+        version = store.job_version(job_id)
+        if version is not None and etag_matches(request, version_etag(version)):
+            return not_modified(version_etag(version))
+        job = store.get_job(job_id)
+        etag = version_etag(job.version)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        response.headers["ETag"] = etag
+        return job
 
     @app.post("/jobs/{job_id}/finish", response_model=Job)
     def finish_job(job_id: str, request: JobFinishRequest, _: None = Depends(require_auth)) -> Job:
         store.assert_job_lease(job_id, request.node_id, request.lease_token)
         return store.finish_job(job_id=job_id, request=request)
 
-    @app.post("/nodes/{node_id}/heartbeat", response_model=Node)
+    @app.post("/jobs/{job_id}/complete", response_model=Job)
+    def complete_job(
+        job_id: str, request: JobCompleteRequest, _: None = Depends(require_auth)
+    ) -> Job:
+        # Logs, artifact records and the finish in one call; the store checks the lease.
+        return store.complete_job(job_id=job_id, request=request)
+
+    @app.post("/jobs/{job_id}/preempt", response_model=Job)
+    def preempt_job(
+        job_id: str, request: JobPreemptRequest, _: None = Depends(require_auth)
+    ) -> Job:
+        return store.preempt_job(job_id=job_id, request=request)
+
+    @app.post("/nodes/{node_id}/heartbeat", response_model=NodeHeartbeatResponse)
     def node_heartbeat(
         node_id: str,
         request: NodeHeartbeatRequest,
         _: None = Depends(require_auth),
-    ) -> Node:
-        return store.heartbeat_node(node_id=node_id, request=request)
+    ) -> NodeHeartbeatResponse:
+        node = store.heartbeat_node(node_id=node_id, request=request)
+        return NodeHeartbeatResponse(
+            **node.model_dump(), cancelled_jobs=store.take_cancellations(node_id)
+        )
 
     @app.post("/jobs/{job_id}/logs")
     def append_logs(
@@ -548,6 +2183,21 @@ def create_app(db_path: str | None = None, lease_duration_seconds: int = 30) ->
     def read_logs(job_id: str, _: None = Depends(require_auth)) -> JobLogsResponse:
         return store.read_logs(job_id=job_id)
 
+    @app.get("/logs/search", response_model=LogSearchResponse)
+    def search_logs(
+        q: Annotated[str, Query(min_length=1)],
+        status_filter: Annotated[JobStatus | None, Query(alias="status")] = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        limit: Annotated[int, Query(ge=1, le=1000)] = LOG_SEARCH_LIMIT,
+        _: None = Depends(require_auth),
+    ) -> LogSearchResponse:
+        return store.search_logs(q, status_filter, since, until, limit)
+
+    @app.get("/jobs/{job_id}/metrics", response_model=JobMetricsEntry)
+    def job_metrics(job_id: str, _: None = Depends(require_auth)) -> JobMetricsEntry:
+        return store.job_metrics(job_id)
+
     @app.post("/jobs/{job_id}/artifacts/presign", response_model=JobArtifactPresignResponse)
     def presign_artifact(
         job_id: str,
@@ -612,9 +2262,32 @@ def parse_args() -> Namespace:
     parser = ArgumentParser(description="deborgen v0 coordinator")
     parser.add_argument("--host", default="0.0.0.0", help="Host interface to bind")
     parser.add_argument("--port", type=int, default=8000, help="Port to listen on")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("DEBORGEN_WORKERS") or "1"),
+        help="Number of coordinator processes sharing the SQLite DB (defaults to DEBORGEN_WORKERS or 1)",
+    )
     return parser.parse_args()
 
 
+def validate_workers(workers: int) -> None:
+    if workers < 1:
+        raise SystemExit("--workers must be at least 1")
+    if workers == 1:
+        return
+    if (os.getenv("DEBORGEN_STORE") or "sqlite") != "sqlite":
+        raise SystemExit("--workers > 1 requires DEBORGEN_STORE=sqlite")
+    if os.getenv("DEBORGEN_DB_PATH") == ":memory:":
+        raise SystemExit("--workers > 1 requires a file-backed DEBORGEN_DB_PATH")
+
+
 def main() -> None:
     args = parse_args()
-    uvicorn.run("deborgen.coordinator.app:app", host=args.host, port=args.port)
+    validate_workers(args.workers)
+    uvicorn.run(
+        "deborgen.coordinator.app:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+    )
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import gzip
+import json
+import os
+import secrets
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, cast
+
+from deborgen.coordinator.models import Job, JobLogsResponse, JobStatusEntry, parse_job_pk, utcnow
+
+
+class JobArchive:
+    """Immutable, gzip-compressed segments of terminal jobs and their logs.
+
+    Each archival run writes one segment: a gzip'd JSON-lines file with one
+    `{"job": ..., "logs": ...}` entry per job. Stores keep a small job id ->
+    segment index so archived jobs stay readable by id.
+    """
+
+    def __init__(self, archive_dir: str) -> None:
+        self._dir = Path(archive_dir)
+        self._dir.mkdir(parents=True, exist_ok=True)
+
+    def write_segment(self, entries: list[tuple[Job, str]]) -> str:
+        name = f"segment-{utcnow().strftime('%Y%m%dT%H%M%S')}-{secrets.token_hex(4)}.jsonl.gz"
+        tmp_path = self._dir / f"{name}.tmp"
+        with open(tmp_path, "wb") as raw:
+            with gzip.GzipFile(fileobj=raw, mode="wb") as compressed:
+                for job, logs in entries:
+                    line = json.dumps({"job": job.model_dump(mode="json"), "logs": logs})
+                    compressed.write(line.encode() + b"\n")
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(tmp_path, self._dir / name)
+        return name
+
+    def discard_segment(self, segment: str) -> None:
+        """Delete a segment no index entry refers to."""
+        (self._dir / segment).unlink(missing_ok=True)
+
+    def _entry(self, segment: str, job_id: str) -> dict[str, Any] | None:
+        return load_segment(str(self._dir / segment)).get(parse_job_pk(job_id))
+
+    def read_job(self, segment: str, job_id: str) -> Job | None:
+        entry = self._entry(segment, job_id)
+        if entry is None:
+            return None
+        return Job.model_validate(entry["job"])
+
+    def read_statuses(self, segments: dict[int, str]) -> dict[int, JobStatusEntry]:
+        """Status entries for archived jobs, given their job pk -> segment index entries."""
+        statuses: dict[int, JobStatusEntry] = {}
+        for job_pk, segment in segments.items():
+            job = self.read_job(segment, f"job_{job_pk}")
+            if job is not None:
+                statuses[job_pk] = JobStatusEntry.model_validate(job, from_attributes=True)
+        return statuses
+
+    def read_logs(self, segment: str, job_id: str) -> JobLogsResponse | None:
+        entry = self._entry(segment, job_id)
+        if entry is None:
+            return None
+        return JobLogsResponse(text=cast(str, entry["logs"]))
+
+
+@lru_cache(maxsize=8)
+def load_segment(path: str) -> dict[int, dict[str, Any]]:
+    # Segments are never modified after being written, so caching by path is safe.
+    entries: dict[int, dict[str, Any]] = {}
+    with gzip.open(path, "rt") as handle:
+        for line in handle:
+            entry = cast(dict[str, Any], json.loads(line))
+            job = cast(dict[str, Any], entry["job"])
+            entries[parse_job_pk(cast(str, job["id"]))] = entry
+    return entries
@@ -0,0 +1,274 @@
+from __future__ import annotations
+
+import logging
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from types import FrameType, TracebackType
+from typing import Any, Self
+
+logger = logging.getLogger("deborgen.coordinator")
+
+
+def normalize_sql(sql: str, max_length: int = 80) -> str:
+    collapsed = " ".join(sql.split())
+    if len(collapsed) > max_length:
+        return collapsed[: max_length - 3] + "..."
+    return collapsed
+
+
+@dataclass
+class Timing:
+    count: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+
+    def summary(self) -> dict[str, float | int]:
+        mean = self.total_seconds / self.count if self.count else 0.0
+        return {
+            "count": self.count,
+            "total_ms": round(self.total_seconds * 1000, 3),
+            "mean_ms": round(mean * 1000, 3),
+            "max_ms": round(self.max_seconds * 1000, 3),
+        }
+
+
+@dataclass
+class OperationTimings:
+    wait: Timing = field(default_factory=Timing)
+    hold: Timing = field(default_factory=Timing)
+    sql: Timing = field(default_factory=Timing)
+    statements: dict[str, Timing] = field(default_factory=dict)
+
+
+@dataclass
+class _ActiveOperation:
+    name: str
+    acquired_at: float
+    wait_seconds: float
+    sql_seconds: float = 0.0
+
+
+class StoreInstrumentation:
+    """Collects lock wait, lock hold and per-statement SQL timings per store method.
+
+    Store methods are identified by the name of the function that enters the
+    instrumented lock, so the store code itself does not need to change.
+    """
+
+    def __init__(self, slow_threshold_seconds: float = 0.1) -> None:
+        self.slow_threshold_seconds = slow_threshold_seconds
+        self._stats_lock = threading.Lock()
+        self._operations: dict[str, OperationTimings] = {}
+        self._requests: dict[str, Timing] = {}
+        self._local = threading.local()
+
+    def _operation_timings(self, name: str) -> OperationTimings:
+        timings = self._operations.get(name)
+        if timings is None:
+            timings = OperationTimings()
+            self._operations[name] = timings
+        return timings
+
+    def _active(self) -> list[_ActiveOperation]:
+        active: list[_ActiveOperation] | None = getattr(self._local, "active", None)
+        if active is None:
+            active = []
+            self._local.active = active
+        return active
+
+    def begin(self, name: str, wait_seconds: float) -> None:
+        self._active().append(
+            _ActiveOperation(name=name, acquired_at=time.perf_counter(), wait_seconds=wait_seconds)
+        )
+
+    def end(self) -> None:
+        active = self._active()
+        if not active:
+            return
+        operation = active.pop()
+        hold_seconds = time.perf_counter() - operation.acquired_at
+        with self._stats_lock:
+            timings = self._operation_timings(operation.name)
+            timings.wait.add(operation.wait_seconds)
+            timings.hold.add(hold_seconds)
+            timings.sql.add(operation.sql_seconds)
+        if operation.wait_seconds + hold_seconds >= self.slow_threshold_seconds:
+            logger.warning(
+                "slow store operation %s: wait=%.1fms hold=%.1fms sql=%.1fms",
+                operation.name,
+                operation.wait_seconds * 1000,
+                hold_seconds * 1000,
+                operation.sql_seconds * 1000,
+            )
+
+    def record_statement(self, sql: str, seconds: float) -> None:
+        active = self._active()
+        name = active[-1].name if active else "<unlocked>"
+        if active:
+            active[-1].sql_seconds += seconds
+        key = normalize_sql(sql)
+        with self._stats_lock:
+            statements = self._operation_timings(name).statements
+            timing = statements.get(key)
+            if timing is None:
+                timing = Timing()
+                statements[key] = timing
+            timing.add(seconds)
+
+    def record_request(self, route: str, seconds: float) -> None:
+        with self._stats_lock:
+            timing = self._requests.get(route)
+            if timing is None:
+                timing = Timing()
+                self._requests[route] = timing
+            timing.add(seconds)
+        if seconds >= self.slow_threshold_seconds:
+            logger.warning("slow request %s: %.1fms", route, seconds * 1000)
+
+    def summary(self) -> dict[str, Any]:
+        with self._stats_lock:
+            operations: dict[str, Any] = {}
+            for name, timings in sorted(self._operations.items()):
+                # Time held under the lock but not spent in SQL is Python work:
+                # row decoding, JSON parsing and pydantic model construction.
+                python_seconds = max(timings.hold.total_seconds - timings.sql.total_seconds, 0.0)
+                operations[name] = {
+                    "lock_wait": timings.wait.summary(),
+                    "lock_hold": timings.hold.summary(),
+                    "sql": timings.sql.summary(),
+                    "python_total_ms": round(python_seconds * 1000, 3),
+                    "statements": {
+                        sql: timing.summary() for sql, timing in sorted(timings.statements.items())
+                    },
+                }
+            requests = {route: timing.summary() for route, timing in sorted(self._requests.items())}
+        return {
+            "slow_threshold_ms": round(self.slow_threshold_seconds * 1000, 3),
+            "operations": operations,
+            "requests": requests,
+        }
+
+    def reset(self) -> None:
+        with self._stats_lock:
+            self._operations.clear()
+            self._requests.clear()
+
+
+class InstrumentedLock:
+    """Drop-in replacement for threading.Lock used as a context manager."""
+
+    def __init__(self, instrumentation: StoreInstrumentation) -> None:
+        self._lock = threading.Lock()
+        self._instrumentation = instrumentation
+
+    def __enter__(self) -> bool:
+        name = sys._getframe(1).f_code.co_name
+        started = time.perf_counter()
+        self._lock.acquire()
+        self._instrumentation.begin(name, time.perf_counter() - started)
+        return True
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        try:
+            self._instrumentation.end()
+        finally:
+            self._lock.release()
+
+
+class TimedConnection:
+    """Wraps a sqlite3.Connection and times every statement it executes."""
+
+    def __init__(self, conn: sqlite3.Connection, instrumentation: StoreInstrumentation) -> None:
+        self._conn = conn
+        self._instrumentation = instrumentation
+
+    def execute(self, sql: str, parameters: Any = ()) -> sqlite3.Cursor:
+        started = time.perf_counter()
+        try:
+            return self._conn.execute(sql, parameters)
+        finally:
+            self._instrumentation.record_statement(sql, time.perf_counter() - started)
+
+    def executemany(self, sql: str, parameters: Any) -> sqlite3.Cursor:
+        started = time.perf_counter()
+        try:
+            return self._conn.executemany(sql, parameters)
+        finally:
+            self._instrumentation.record_statement(sql, time.perf_counter() - started)
+
+    def commit(self) -> None:
+        started = time.perf_counter()
+        try:
+            self._conn.commit()
+        finally:
+            self._instrumentation.record_statement("COMMIT", time.perf_counter() - started)
+
+    def __enter__(self) -> Self:
+        self._conn.__enter__()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> bool | None:
+        started = time.perf_counter()
+        try:
+            return self._conn.__exit__(exc_type, exc, traceback)
+        finally:
+            statement = "COMMIT" if exc_type is None else "ROLLBACK"
+            self._instrumentation.record_statement(statement, time.perf_counter() - started)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._conn, name)
+
+
+def _describe_frame(frame: FrameType) -> str:
+    code = frame.f_code
+    filename = code.co_filename.rsplit("/", 1)[-1]
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+def sample_stacks(seconds: float, interval_seconds: float = 0.005) -> Counter[str]:
+    """Sample every thread's Python stack for `seconds` and count identical stacks.
+
+    The profiler thread itself is excluded. Stacks are root-first and joined with
+    `;` so the result can be fed straight into flamegraph tooling.
+    """
+    counts: Counter[str] = Counter()
+    own_thread_id = threading.get_ident()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_thread_id:
+                continue
+            stack: list[str] = []
+            current: FrameType | None = frame
+            while current is not None:
+                stack.append(_describe_frame(current))
+                current = current.f_back
+            stack.append(thread_names.get(thread_id, f"thread-{thread_id}"))
+            counts[";".join(reversed(stack))] += 1
+        time.sleep(interval_seconds)
+    return counts
+
+
+def format_collapsed(counts: Counter[str]) -> str:
+    """Render sampled stacks in Brendan Gregg's collapsed-stack format."""
+    return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
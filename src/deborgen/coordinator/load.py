@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from deborgen.coordinator.models import NodeLoad, NodeThresholds
+
+
+@dataclass(frozen=True)
+class LoadPolicy:
+    """What a node may claim given the load it reports and its own thresholds.
+
+    A node with less free memory or disk than its `min_*_free_mb` claims nothing
+    until that recovers. A node whose load average is over its `max_load`, say
+    because its owner is using it, is deprioritized rather than skipped: it only
+    claims jobs that have been queued for `busy_delay_seconds`. Idle nodes get the
+    first pick of new work, and a backlog nobody else takes still drains. A node
+    that reports no load, or sets no thresholds, claims as before.
+    """
+
+    busy_delay_seconds: float = 30.0
+
+    def min_wait(self, load: NodeLoad | None, thresholds: NodeThresholds | None) -> float | None:
+        """Seconds a job must have been queued for this node to claim it; None to skip."""
+        if load is None or thresholds is None:
+            return 0.0
+        if _below(load.memory_free_mb, thresholds.min_memory_free_mb) or _below(
+            load.disk_free_mb, thresholds.min_disk_free_mb
+        ):
+            return None
+        if (
+            thresholds.max_load is not None
+            and load.load_avg is not None
+            and load.load_avg > thresholds.max_load
+        ):
+            return self.busy_delay_seconds
+        return 0.0
+
+
+def _below(value: int | None, minimum: int | None) -> bool:
+    return value is not None and minimum is not None and value < minimum
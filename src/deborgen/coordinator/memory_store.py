@@ -0,0 +1,1332 @@
+from __future__ import annotations
+
+import copy
+import functools
+import heapq
+import json
+import os
+import secrets
+import threading
+from dataclasses import astuple, dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, cast
+
+from fastapi import HTTPException
+
+from deborgen.coordinator.affinity import AffinityPolicy
+from deborgen.coordinator.archive import JobArchive
+from deborgen.coordinator.instrumentation import InstrumentedLock, StoreInstrumentation
+from deborgen.coordinator.load import LoadPolicy
+from deborgen.coordinator.metrics import (
+    CommandMetricsResponse,
+    JobMetricsEntry,
+    MetricsRow,
+    command_fingerprint,
+    summarize,
+)
+from deborgen.coordinator.models import (
+    Job,
+    JobAssignment,
+    JobBatchItem,
+    JobCompleteRequest,
+    JobCreateRequest,
+    JobFinishRequest,
+    JobKind,
+    JobLogsRequest,
+    JobLogsResponse,
+    JobPreemptRequest,
+    JobResources,
+    JobStatus,
+    JobStatusEntry,
+    JobStatusRequest,
+    JobStatusResponse,
+    LabelValue,
+    LogSearchResponse,
+    Node,
+    NodeHeartbeatRequest,
+    NodeLoad,
+    NodeThresholds,
+    dependency_failure_reason,
+    fits_window,
+    initial_dependency_state,
+    order_statuses,
+    parse_iso,
+    parse_job_pk,
+    requested_job_pks,
+    requirements_match,
+    status_response,
+    to_iso,
+    utcnow,
+    window_seconds,
+)
+from deborgen.coordinator.scheduling import RuntimeEstimates, SchedulingPolicy
+from deborgen.coordinator.schema import from_micros, to_micros
+from deborgen.coordinator.speculation import SpeculationPolicy
+from deborgen.coordinator.stats import (
+    MemoryStatsTable,
+    StatsDelta,
+    StatsResponse,
+    build_stats,
+    claimed_deltas,
+    created_deltas,
+    dependency_failed_deltas,
+    expired_deltas,
+    finished_deltas,
+    preempted_deltas,
+    released_deltas,
+)
+
+JOURNAL_FILENAME = "journal.log"
+SNAPSHOT_FILENAME = "snapshot.json"
+
+# Queued jobs are grouped by (sorted requirements, affinity key, timeout), so a node
+# whose availability window is too short for one group's head can still take another's.
+# Under a scheduling policy the command fingerprint is part of the key too, so every job
+# in a group has the same runtime estimate and the head is still the one to compare.
+_QueueKey = tuple[tuple[tuple[str, LabelValue], ...], str | None, int, str | None]
+
+
+@dataclass(slots=True)
+class _JobRecord:
+    pk: int
+    status: JobStatus
+    command: str
+    created_at: datetime
+    timeout_seconds: int
+    max_attempts: int
+    requirements: dict[str, LabelValue]
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    assigned_node_id: str | None = None
+    attempts: int = 0
+    exit_code: int | None = None
+    failure_reason: str | None = None
+    artifact_urls: list[str] = field(default_factory=list)
+    submitter: str | None = None
+    depends_on: list[str] = field(default_factory=list)
+    remaining_dependencies: int = 0
+    group_id: str | None = None
+    affinity_key: str | None = None
+    kind: JobKind = "command"
+    args: list[Any] | dict[str, Any] = field(default_factory=dict)
+    checkpoint_url: str | None = None
+    version: int = 0
+    resources: dict[str, int] = field(default_factory=dict)
+
+    def to_status(self) -> JobStatusEntry:
+        return JobStatusEntry(
+            id=f"job_{self.pk}",
+            status=self.status,
+            exit_code=self.exit_code,
+            failure_reason=self.failure_reason,
+            finished_at=self.finished_at,
+        )
+
+    def to_job(self) -> Job:
+        return Job(
+            id=f"job_{self.pk}",
+            status=self.status,
+            command=self.command,
+            created_at=self.created_at,
+            started_at=self.started_at,
+            finished_at=self.finished_at,
+            assigned_node_id=self.assigned_node_id,
+            timeout_seconds=self.timeout_seconds,
+            attempts=self.attempts,
+            max_attempts=self.max_attempts,
+            exit_code=self.exit_code,
+            failure_reason=self.failure_reason,
+            artifact_urls=list(self.artifact_urls),
+            requirements=dict(self.requirements),
+            resources=JobResources.model_validate(self.resources),
+            submitter=self.submitter,
+            depends_on=list(self.depends_on),
+            group_id=self.group_id,
+            affinity_key=self.affinity_key,
+            kind=self.kind,
+            args=copy.deepcopy(self.args),
+            checkpoint_url=self.checkpoint_url,
+            version=self.version,
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "pk": self.pk,
+            "status": self.status,
+            "command": self.command,
+            "created_at": to_iso(self.created_at),
+            "timeout_seconds": self.timeout_seconds,
+            "max_attempts": self.max_attempts,
+            "requirements": self.requirements,
+            "started_at": to_iso(self.started_at),
+            "finished_at": to_iso(self.finished_at),
+            "assigned_node_id": self.assigned_node_id,
+            "attempts": self.attempts,
+            "exit_code": self.exit_code,
+            "failure_reason": self.failure_reason,
+            "artifact_urls": self.artifact_urls,
+            "submitter": self.submitter,
+            "depends_on": self.depends_on,
+            "remaining_dependencies": self.remaining_dependencies,
+            "group_id": self.group_id,
+            "affinity_key": self.affinity_key,
+            "kind": self.kind,
+            "args": self.args,
+            "checkpoint_url": self.checkpoint_url,
+            "version": self.version,
+            "resources": self.resources,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> _JobRecord:
+        return cls(
+            pk=cast(int, data["pk"]),
+            status=cast(JobStatus, data["status"]),
+            command=cast(str, data["command"]),
+            created_at=parse_iso(cast(str, data["created_at"])) or utcnow(),
+            timeout_seconds=cast(int, data["timeout_seconds"]),
+            max_attempts=cast(int, data["max_attempts"]),
+            requirements=cast(dict[str, LabelValue], data["requirements"]),
+            started_at=parse_iso(cast(str | None, data["started_at"])),
+            finished_at=parse_iso(cast(str | None, data["finished_at"])),
+            assigned_node_id=cast(str | None, data["assigned_node_id"]),
+            attempts=cast(int, data["attempts"]),
+            exit_code=cast(int | None, data["exit_code"]),
+            failure_reason=cast(str | None, data["failure_reason"]),
+            artifact_urls=cast(list[str], data["artifact_urls"]),
+            submitter=cast(str | None, data.get("submitter")),
+            depends_on=cast(list[str], data.get("depends_on", [])),
+            remaining_dependencies=cast(int, data.get("remaining_dependencies", 0)),
+            group_id=cast(str | None, data.get("group_id")),
+            affinity_key=cast(str | None, data.get("affinity_key")),
+            kind=cast(JobKind, data.get("kind", "command")),
+            args=cast(list[Any] | dict[str, Any], data.get("args", {})),
+            checkpoint_url=cast(str | None, data.get("checkpoint_url")),
+            version=cast(int, data.get("version", 0)),
+            resources=cast(dict[str, int], data.get("resources", {})),
+        )
+
+
+@dataclass(slots=True)
+class _Lease:
+    node_id: str
+    lease_token: str
+    lease_expires_at: datetime
+
+
+@dataclass(slots=True)
+class _NodeRecord:
+    node_id: str
+    name: str | None
+    labels: dict[str, LabelValue]
+    last_seen_at: datetime
+    warm_keys: list[str] = field(default_factory=list)
+    available_until: datetime | None = None
+    load: NodeLoad | None = None
+    thresholds: NodeThresholds | None = None
+
+    def to_node(self) -> Node:
+        return Node(
+            node_id=self.node_id,
+            name=self.name,
+            labels=dict(self.labels),
+            warm_keys=list(self.warm_keys),
+            available_until=self.available_until,
+            load=self.load,
+            thresholds=self.thresholds,
+            last_seen_at=self.last_seen_at,
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "node_id": self.node_id,
+            "name": self.name,
+            "labels": self.labels,
+            "warm_keys": self.warm_keys,
+            "available_until": to_iso(self.available_until),
+            "load": self.load.model_dump(exclude_none=True) if self.load else None,
+            "thresholds": (
+                self.thresholds.model_dump(exclude_none=True) if self.thresholds else None
+            ),
+            "last_seen_at": to_iso(self.last_seen_at),
+        }
+
+
+class JobJournal:
+    """Append-only, group-committed journal of store mutations.
+
+    Entries are buffered and written by a single flusher thread. Every write is
+    followed by an fsync, and entries that arrive while an fsync is in flight are
+    batched into the next write, so concurrent writers share the fsync cost.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self._path = path
+        # Held open for the journal's lifetime and closed by close().
+        self._file = open(path, "ab")  # noqa: SIM115
+        self._condition = threading.Condition()
+        self._buffer: list[bytes] = []
+        self._appended_seq = 0
+        self._durable_seq = 0
+        self._closed = False
+        self._error: OSError | None = None
+        self._flusher = threading.Thread(target=self._run, name="deborgen-journal", daemon=True)
+        self._flusher.start()
+
+    @property
+    def appended_seq(self) -> int:
+        return self._appended_seq
+
+    def reset_seq(self, seq: int) -> None:
+        with self._condition:
+            self._appended_seq = seq
+            self._durable_seq = seq
+
+    def append(self, entry: dict[str, Any]) -> int:
+        with self._condition:
+            self._appended_seq += 1
+            entry["seq"] = self._appended_seq
+            self._buffer.append(json.dumps(entry, separators=(",", ":")).encode() + b"\n")
+            self._condition.notify_all()
+            return self._appended_seq
+
+    def wait_durable(self, seq: int) -> None:
+        with self._condition:
+            while self._durable_seq < seq and self._error is None:
+                self._condition.wait()
+            if self._error is not None:
+                raise HTTPException(status_code=500, detail=f"journal write failed: {self._error}")
+
+    def flush(self) -> None:
+        self.wait_durable(self._appended_seq)
+
+    def truncate(self) -> None:
+        """Drop all journal entries. Callers must flush first and block new appends."""
+        with self._condition:
+            self._file.truncate(0)
+            self._file.seek(0)
+            os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        self.flush()
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._flusher.join()
+        self._file.close()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._buffer and not self._closed:
+                    self._condition.wait()
+                if not self._buffer and self._closed:
+                    return
+                batch = self._buffer
+                self._buffer = []
+                batch_seq = self._appended_seq
+            try:
+                self._file.write(b"".join(batch))
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            except OSError as exc:
+                with self._condition:
+                    self._error = exc
+                    self._condition.notify_all()
+                return
+            with self._condition:
+                self._durable_seq = batch_seq
+                self._condition.notify_all()
+
+
+def encode_deltas(deltas: list[StatsDelta]) -> list[list[Any]]:
+    return [[delta.scope, delta.key, delta.bucket, delta.values] for delta in deltas]
+
+
+def decode_deltas(data: list[list[Any]]) -> list[StatsDelta]:
+    return [
+        StatsDelta(cast(str, scope), cast(str, key), cast(str, bucket), cast(dict[str, float], values))
+        for scope, key, bucket, values in data
+    ]
+
+
+def read_journal(path: Path) -> list[dict[str, Any]]:
+    if not path.exists():
+        return []
+    entries: list[dict[str, Any]] = []
+    with open(path, "rb") as handle:
+        for line in handle:
+            try:
+                entries.append(cast(dict[str, Any], json.loads(line)))
+            except json.JSONDecodeError:
+                # A torn final line from a crash mid-write; everything before it is intact.
+                break
+    return entries
+
+
+class MemoryJobStore:
+    """Job store that keeps all state in memory and persists through a journal.
+
+    Jobs, leases, nodes and logs live in plain dicts; queued jobs are indexed by
+    their requirement set and affinity key so a claim only inspects the head of
+    each group whose requirements the node satisfies. When `journal_dir` is `":memory:"` nothing is
+    persisted. Otherwise every mutation is journaled, a snapshot is written every
+    `snapshot_every` entries, and the snapshot plus journal are replayed on startup.
+    """
+
+    def __init__(
+        self,
+        journal_dir: str,
+        lease_duration_seconds: int = 30,
+        snapshot_every: int = 10_000,
+        instrumentation: StoreInstrumentation | None = None,
+        archive: JobArchive | None = None,
+        speculation: SpeculationPolicy | None = None,
+        affinity: AffinityPolicy | None = None,
+        scheduling: SchedulingPolicy | None = None,
+        load: LoadPolicy | None = None,
+    ) -> None:
+        self._lease_duration = timedelta(seconds=lease_duration_seconds)
+        self._snapshot_every = snapshot_every
+        self._archive = archive
+        self._speculation = speculation
+        self._affinity = affinity
+        self._scheduling = scheduling
+        self._load = load if load is not None else LoadPolicy()
+        self._lock: threading.Lock | InstrumentedLock = threading.Lock()
+        self.instrumentation = instrumentation
+        if instrumentation is not None:
+            self._lock = InstrumentedLock(instrumentation)
+
+        self._jobs: dict[int, _JobRecord] = {}
+        self._queued: dict[_QueueKey, list[int]] = {}
+        # job pk -> lease token -> lease; a job has a second lease while speculated.
+        self._leases: dict[int, dict[str, _Lease]] = {}
+        # (job_pk, lease_token) of every lease by holder, so a heartbeat touches only its own.
+        self._node_leases: dict[str, set[tuple[int, str]]] = {}
+        self._nodes: dict[str, _NodeRecord] = {}
+        # Affinity key -> nodes reporting it warm.
+        self._warm_nodes: dict[str, set[str]] = {}
+        self._logs: dict[int, list[str]] = {}
+        self._archived: dict[int, str] = {}
+        # Blocked jobs waiting on each job, rebuilt from the records on recovery.
+        self._dependents: dict[int, set[int]] = {}
+        # Nodes whose last_seen_at (and lease extensions) changed without being journaled.
+        self._unflushed_nodes: set[str] = set()
+        # Live job pks per submission group, for group status lookups.
+        self._group_members: dict[str, set[int]] = {}
+        # Runtimes of succeeded jobs per group, for straggler detection.
+        self._group_runtimes: dict[str, list[float]] = {}
+        # Expected runtime per command fingerprint, for the scheduling policy.
+        self._estimates = RuntimeEstimates()
+        # Jobs each node should stop; transient, so not journaled.
+        self._cancelled: dict[str, set[str]] = {}
+        self._stats = MemoryStatsTable()
+        # Reported resource use per job; kept when the job is archived.
+        self._metrics: dict[int, MetricsRow] = {}
+        self._next_pk = 1
+        # Last change sequence number handed out; every job change takes the next one.
+        self._change_seq = 0
+        self._entries_since_snapshot = 0
+
+        self._dir: Path | None = None
+        self._journal: JobJournal | None = None
+        if journal_dir != ":memory:":
+            self._dir = Path(journal_dir)
+            self._dir.mkdir(parents=True, exist_ok=True)
+            last_seq = self._recover()
+            self._journal = JobJournal(self._dir / JOURNAL_FILENAME)
+            self._journal.reset_seq(last_seq)
+            for record in self._jobs.values():
+                self._record_runtime(record)
+
+    # -- persistence -------------------------------------------------------
+
+    def _recover(self) -> int:
+        assert self._dir is not None
+        last_seq = 0
+        snapshot_path = self._dir / SNAPSHOT_FILENAME
+        if snapshot_path.exists():
+            snapshot = cast(dict[str, Any], json.loads(snapshot_path.read_text()))
+            last_seq = cast(int, snapshot["seq"])
+            self._load_snapshot(snapshot)
+        for entry in read_journal(self._dir / JOURNAL_FILENAME):
+            seq = cast(int, entry["seq"])
+            if seq <= last_seq:
+                continue
+            self._apply(entry)
+            last_seq = seq
+            self._entries_since_snapshot += 1
+        return last_seq
+
+    def _load_snapshot(self, snapshot: dict[str, Any]) -> None:
+        self._next_pk = cast(int, snapshot["next_pk"])
+        self._change_seq = cast(int, snapshot.get("change_seq", 0))
+        for job_data in cast(list[dict[str, Any]], snapshot["jobs"]):
+            self._put_job(_JobRecord.from_dict(job_data))
+        for lease_data in cast(list[dict[str, Any]], snapshot["leases"]):
+            self._apply_lease(lease_data)
+        for node_data in cast(list[dict[str, Any]], snapshot["nodes"]):
+            self._apply_node(node_data)
+        for pk_text, chunks in cast(dict[str, list[str]], snapshot["logs"]).items():
+            self._logs[int(pk_text)] = chunks
+        for pk_text, segment in cast(dict[str, str], snapshot.get("archived", {})).items():
+            self._archived[int(pk_text)] = segment
+        self._stats.apply(decode_deltas(cast(list[list[Any]], snapshot.get("stats", []))))
+        for values in cast(list[list[Any]], snapshot.get("metrics", [])):
+            self._put_metrics(MetricsRow(*values))
+
+    def _apply(self, entry: dict[str, Any]) -> None:
+        op = cast(str, entry["op"])
+        if "stats" in entry:
+            self._stats.apply(decode_deltas(cast(list[list[Any]], entry["stats"])))
+        if op == "job":
+            record = _JobRecord.from_dict(cast(dict[str, Any], entry["job"]))
+            self._put_job(record)
+            self._next_pk = max(self._next_pk, record.pk + 1)
+            self._change_seq = max(self._change_seq, record.version)
+        elif op == "lease":
+            self._apply_lease(cast(dict[str, Any], entry))
+        elif op == "unlease":
+            self._unlease(cast(int, entry["job_pk"]), cast(str | None, entry.get("lease_token")))
+        elif op == "log":
+            self._logs.setdefault(cast(int, entry["job_pk"]), []).append(cast(str, entry["text"]))
+        elif op == "node":
+            self._apply_node(cast(dict[str, Any], entry))
+        elif op == "metrics":
+            self._put_metrics(MetricsRow(*cast(list[Any], entry["row"])))
+        elif op == "archive":
+            self._apply_archive(cast(str, entry["segment"]), cast(list[int], entry["job_pks"]))
+            self._change_seq = max(self._change_seq, cast(int, entry.get("change_seq", 0)))
+
+    def _apply_archive(self, segment: str, job_pks: list[int]) -> None:
+        for job_pk in job_pks:
+            record = self._jobs.pop(job_pk, None)
+            if record is not None and record.group_id is not None:
+                members = self._group_members[record.group_id]
+                members.discard(job_pk)
+                if not members:
+                    del self._group_members[record.group_id]
+            self._logs.pop(job_pk, None)
+            self._unlease(job_pk)
+            self._archived[job_pk] = segment
+
+    def _apply_lease(self, data: dict[str, Any]) -> None:
+        lease = _Lease(
+            node_id=cast(str, data["node_id"]),
+            lease_token=cast(str, data["lease_token"]),
+            lease_expires_at=parse_iso(cast(str, data["lease_expires_at"])) or utcnow(),
+        )
+        self._add_lease(cast(int, data["job_pk"]), lease)
+
+    def _add_lease(self, job_pk: int, lease: _Lease) -> None:
+        self._leases.setdefault(job_pk, {})[lease.lease_token] = lease
+        self._node_leases.setdefault(lease.node_id, set()).add((job_pk, lease.lease_token))
+
+    def _unlease(self, job_pk: int, lease_token: str | None = None) -> dict[str, _Lease]:
+        """Drop one lease of a job, or all of them when `lease_token` is None.
+
+        Returns the leases dropped, by token.
+        """
+        leases = self._leases.get(job_pk)
+        if leases is None:
+            return {}
+        tokens = list(leases) if lease_token is None else [lease_token]
+        dropped: dict[str, _Lease] = {}
+        for token in tokens:
+            lease = leases.pop(token, None)
+            if lease is None:
+                continue
+            dropped[token] = lease
+            held = self._node_leases[lease.node_id]
+            held.discard((job_pk, token))
+            if not held:
+                del self._node_leases[lease.node_id]
+        if not leases:
+            del self._leases[job_pk]
+        return dropped
+
+    def _node_lease_items(self, node_id: str) -> list[tuple[int, _Lease]]:
+        return [
+            (job_pk, self._leases[job_pk][token])
+            for job_pk, token in self._node_leases.get(node_id, ())
+        ]
+
+    def _apply_node(self, data: dict[str, Any]) -> None:
+        node_id = cast(str, data["node_id"])
+        node = _NodeRecord(
+            node_id=node_id,
+            name=cast(str | None, data["name"]),
+            labels=cast(dict[str, LabelValue], data["labels"]),
+            last_seen_at=parse_iso(cast(str, data["last_seen_at"])) or utcnow(),
+            available_until=parse_iso(cast(str | None, data.get("available_until"))),
+            load=NodeLoad.model_validate(data["load"]) if data.get("load") else None,
+            thresholds=(
+                NodeThresholds.model_validate(data["thresholds"])
+                if data.get("thresholds")
+                else None
+            ),
+        )
+        self._nodes[node_id] = node
+        self._set_warm_keys(node, cast(list[str], data.get("warm_keys", [])))
+
+    def _put_metrics(self, row: MetricsRow) -> None:
+        self._metrics[row.job_pk] = row
+
+    def _job_entry(self, record: _JobRecord, deltas: list[StatsDelta] | None = None) -> int:
+        """Apply stats deltas for a job transition and journal the job with them."""
+        self._change_seq += 1
+        record.version = self._change_seq
+        entry: dict[str, Any] = {"op": "job", "job": record.to_dict()}
+        if deltas:
+            self._stats.apply(deltas)
+            entry["stats"] = encode_deltas(deltas)
+        return self._journal_entry(entry)
+
+    def _lease_entry(self, job_pk: int, lease: _Lease) -> int:
+        return self._journal_entry(
+            {
+                "op": "lease",
+                "job_pk": job_pk,
+                "node_id": lease.node_id,
+                "lease_token": lease.lease_token,
+                "lease_expires_at": to_iso(lease.lease_expires_at),
+            }
+        )
+
+    def _journal_entry(self, entry: dict[str, Any]) -> int:
+        """Append an entry while holding the store lock; returns its sequence number."""
+        if self._journal is None:
+            return 0
+        seq = self._journal.append(entry)
+        self._entries_since_snapshot += 1
+        if self._entries_since_snapshot >= self._snapshot_every:
+            self._write_snapshot()
+        return seq
+
+    def _wait_durable(self, seq: int) -> None:
+        """Block until `seq` is fsync'd. Called after releasing the store lock."""
+        if self._journal is not None and seq:
+            self._journal.wait_durable(seq)
+
+    def _write_snapshot(self) -> None:
+        assert self._dir is not None and self._journal is not None
+        self._journal.flush()
+        snapshot = {
+            "seq": self._journal.appended_seq,
+            "next_pk": self._next_pk,
+            "change_seq": self._change_seq,
+            "jobs": [record.to_dict() for record in self._jobs.values()],
+            "leases": [
+                {
+                    "job_pk": job_pk,
+                    "node_id": lease.node_id,
+                    "lease_token": lease.lease_token,
+                    "lease_expires_at": to_iso(lease.lease_expires_at),
+                }
+                for job_pk, leases in self._leases.items()
+                for lease in leases.values()
+            ],
+            "nodes": [node.to_dict() for node in self._nodes.values()],
+            "logs": {str(job_pk): chunks for job_pk, chunks in self._logs.items()},
+            "archived": {str(job_pk): segment for job_pk, segment in self._archived.items()},
+            "stats": [
+                [scope, key, bucket, values] for scope, key, bucket, values in self._stats.rows()
+            ],
+            "metrics": [list(astuple(row)) for row in self._metrics.values()],
+        }
+        tmp_path = self._dir / f"{SNAPSHOT_FILENAME}.tmp"
+        with open(tmp_path, "w") as handle:
+            json.dump(snapshot, handle, separators=(",", ":"))
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(tmp_path, self._dir / SNAPSHOT_FILENAME)
+        # Entries up to the snapshot's seq are now redundant; replay skips them even
+        # if we crash before the truncate below.
+        self._journal.truncate()
+        self._entries_since_snapshot = 0
+
+    def snapshot(self) -> None:
+        with self._lock:
+            if self._journal is not None:
+                self._write_snapshot()
+
+    def close(self) -> None:
+        self.flush_heartbeats()
+        if self._journal is not None:
+            self._journal.close()
+
+    # -- indexes -----------------------------------------------------------
+
+    def _queue_key(self, record: _JobRecord) -> _QueueKey:
+        requirements = tuple(sorted(record.requirements.items()))
+        fingerprint = None
+        if self._scheduling is not None:
+            fingerprint = command_fingerprint(record.command, record.kind)
+        return requirements, record.affinity_key, record.timeout_seconds, fingerprint
+
+    def _put_job(self, record: _JobRecord) -> None:
+        self._jobs[record.pk] = record
+        if record.group_id is not None:
+            self._group_members.setdefault(record.group_id, set()).add(record.pk)
+        if record.status == "succeeded":
+            # Its dependents were released when it finished; replayed, their entries follow.
+            self._dependents.pop(record.pk, None)
+        if record.status == "blocked":
+            # Index only parents still to finish: an entry for one that already succeeded
+            # (or was archived) would never be popped.
+            for parent_id in record.depends_on:
+                parent_pk = parse_job_pk(parent_id)
+                parent = self._jobs.get(parent_pk)
+                if parent is not None and parent.status != "succeeded":
+                    self._dependents.setdefault(parent_pk, set()).add(record.pk)
+        if record.status == "queued" and record.attempts < record.max_attempts:
+            key = self._queue_key(record)
+            heapq.heappush(self._queued.setdefault(key, []), record.pk)
+
+    def _is_claimable(self, job_pk: int) -> bool:
+        record = self._jobs.get(job_pk)
+        return (
+            record is not None
+            and record.status == "queued"
+            and record.attempts < record.max_attempts
+        )
+
+    def _get_record(self, job_id: str) -> _JobRecord:
+        record = self._jobs.get(parse_job_pk(job_id))
+        if record is None:
+            raise HTTPException(status_code=404, detail="job not found")
+        return record
+
+    # -- store interface ---------------------------------------------------
+
+    def _dependency_statuses(self, parent_pks: list[int]) -> dict[int, JobStatus]:
+        statuses: dict[int, JobStatus] = {}
+        for parent_pk in parent_pks:
+            record = self._jobs.get(parent_pk)
+            if record is not None:
+                statuses[parent_pk] = record.status
+                continue
+            segment = self._archived.get(parent_pk)
+            archived = (
+                self._archive.read_job(segment, f"job_{parent_pk}")
+                if segment and self._archive
+                else None
+            )
+            if archived is None:
+                raise HTTPException(status_code=404, detail=f"dependency job_{parent_pk} not found")
+            statuses[parent_pk] = archived.status
+        return statuses
+
+    def _insert_job(self, request: JobCreateRequest, parent_pks: list[int], created_at: datetime) -> int:
+        status, remaining, failure_reason = initial_dependency_state(
+            self._dependency_statuses(parent_pks)
+        )
+        record = _JobRecord(
+            pk=self._next_pk,
+            status=status,
+            command=request.command,
+            created_at=created_at,
+            timeout_seconds=request.timeout_seconds,
+            max_attempts=request.max_attempts,
+            requirements=dict(request.requirements),
+            submitter=request.submitter,
+            failure_reason=failure_reason,
+            finished_at=created_at if status == "failed" else None,
+            depends_on=[f"job_{parent_pk}" for parent_pk in parent_pks],
+            remaining_dependencies=remaining,
+            group_id=request.group_id,
+            affinity_key=request.affinity_key,
+            kind=request.kind,
+            args=copy.deepcopy(request.args),
+            resources=request.resources.model_dump(exclude_none=True),
+        )
+        self._next_pk += 1
+        self._put_job(record)
+        return self._job_entry(record, created_deltas(record.submitter, created_at, status))
+
+    def create_job(self, request: JobCreateRequest) -> Job:
+        parent_pks = [parse_job_pk(ref) for ref in request.depends_on]
+        with self._lock:
+            seq = self._insert_job(request, parent_pks, utcnow())
+            job = self._jobs[self._next_pk - 1].to_job()
+        self._wait_durable(seq)
+        return job
+
+    def create_jobs(self, items: list[JobBatchItem]) -> list[Job]:
+        """Create a batch, possibly a whole DAG, atomically."""
+        created_at = utcnow()
+        batch_keys = {item.key for item in items if item.key is not None}
+        external = sorted(
+            {parse_job_pk(ref) for item in items for ref in item.depends_on if ref not in batch_keys}
+        )
+        keyed: dict[str, int] = {}
+        jobs: list[Job] = []
+        seq = 0
+        with self._lock:
+            # Validate every external parent up front so a bad reference creates nothing.
+            self._dependency_statuses(external)
+            for item in items:
+                parent_pks = [
+                    keyed[ref] if ref in keyed else parse_job_pk(ref) for ref in item.depends_on
+                ]
+                seq = self._insert_job(item, parent_pks, created_at)
+                job_pk = self._next_pk - 1
+                if item.key is not None:
+                    keyed[item.key] = job_pk
+                jobs.append(self._jobs[job_pk].to_job())
+        self._wait_durable(seq)
+        return jobs
+
+    def _resolve_dependents(self, job_pk: int, succeeded: bool, at: datetime) -> None:
+        """Release or cascade-fail the jobs waiting on `job_pk`; call under the lock."""
+        if succeeded:
+            for child_pk in sorted(self._dependents.pop(job_pk, ())):
+                child = self._jobs.get(child_pk)
+                if child is None or child.status != "blocked":
+                    continue
+                child.remaining_dependencies -= 1
+                deltas: list[StatsDelta] = []
+                if child.remaining_dependencies <= 0:
+                    child.status = "queued"
+                    deltas = released_deltas(child.submitter, at)
+                    self._put_job(child)
+                self._job_entry(child, deltas)
+            return
+
+        failure_reason = dependency_failure_reason(f"job_{job_pk}")
+        frontier = [job_pk]
+        while frontier:
+            for child_pk in sorted(self._dependents.pop(frontier.pop(), ())):
+                child = self._jobs.get(child_pk)
+                if child is None or child.status != "blocked":
+                    continue
+                child.status = "failed"
+                child.failure_reason = failure_reason
+                child.finished_at = at
+                self._job_entry(child, dependency_failed_deltas(child.submitter, at))
+                frontier.append(child_pk)
+
+    def list_jobs(self, status_filter: JobStatus | None, limit: int | None) -> list[Job]:
+        with self._lock:
+            jobs: list[Job] = []
+            for job_pk in reversed(self._jobs):
+                record = self._jobs[job_pk]
+                if status_filter is not None and record.status != status_filter:
+                    continue
+                jobs.append(record.to_job())
+                if limit is not None and len(jobs) >= limit:
+                    break
+            return jobs
+
+    def job_version(self, job_id: str) -> int | None:
+        with self._lock:
+            record = self._jobs.get(parse_job_pk(job_id))
+            return record.version if record is not None else None
+
+    def change_sequence(self) -> int:
+        with self._lock:
+            return self._change_seq
+
+    def get_job(self, job_id: str) -> Job:
+        job_pk = parse_job_pk(job_id)
+        with self._lock:
+            record = self._jobs.get(job_pk)
+            if record is not None:
+                return record.to_job()
+            segment = self._archived.get(job_pk)
+        job = self._archive.read_job(segment, job_id) if segment and self._archive else None
+        if job is None:
+            raise HTTPException(status_code=404, detail="job not found")
+        return job
+
+    def job_statuses(self, request: JobStatusRequest) -> JobStatusResponse:
+        found: dict[int, JobStatusEntry] = {}
+        archived: dict[int, str] = {}
+        with self._lock:
+            if request.group_id is not None:
+                members = sorted(self._group_members.get(request.group_id, ()))
+                entries = [self._jobs[job_pk].to_status() for job_pk in members]
+                return status_response(entries, [], request.statuses)
+            for job_pk in requested_job_pks(request.ids):
+                record = self._jobs.get(job_pk)
+                if record is not None:
+                    found[job_pk] = record.to_status()
+                elif job_pk in self._archived:
+                    archived[job_pk] = self._archived[job_pk]
+        if self._archive is not None:
+            found.update(self._archive.read_statuses(archived))
+        entries, missing = order_statuses(request.ids, found)
+        return status_response(entries, missing, request.statuses)
+
+    def claim_next_job(self, node_id: str) -> JobAssignment | None:
+        claimed_at = utcnow()
+        with self._lock:
+            node = self._nodes.get(node_id)
+            node_labels: dict[str, LabelValue] = node.labels if node is not None else {}
+            warm_keys = set(node.warm_keys) if node is not None else set()
+            window = window_seconds(node.available_until if node else None, claimed_at)
+            min_wait = self._load.min_wait(node.load, node.thresholds) if node else 0.0
+            if min_wait is None:
+                return None
+
+            best_key: _QueueKey | None = None
+            best: tuple[int, tuple[int, float], int] | None = None
+            drained: list[_QueueKey] = []
+            warm_elsewhere = functools.cache(
+                lambda key: self._warm_elsewhere(key, node_id, claimed_at)
+            )
+            for key, heap in self._queued.items():
+                # Lazily discard entries that were claimed or changed since they were queued.
+                while heap and not self._is_claimable(heap[0]):
+                    heapq.heappop(heap)
+                if not heap:
+                    drained.append(key)
+                    continue
+                requirements, affinity_key, timeout_seconds, fingerprint = key
+                if not requirements_match(dict(requirements), node_labels):
+                    continue
+                # The head is the oldest job in its group, so it ranks and scores best.
+                queued_at = self._jobs[heap[0]].created_at
+                if min_wait and (claimed_at - queued_at).total_seconds() < min_wait:
+                    continue
+                score = (0, 0.0)
+                if self._scheduling is None or fingerprint is None:
+                    if not fits_window(timeout_seconds, window):
+                        continue
+                else:
+                    expected = self._estimates.get(fingerprint)
+                    if not self._scheduling.fits(timeout_seconds, expected, window):
+                        continue
+                    score = self._scheduling.score(expected, queued_at, claimed_at)
+                rank: int | None = 0
+                if self._affinity is not None:
+                    rank = self._affinity.rank(
+                        affinity_key,
+                        warm_keys,
+                        queued_at,
+                        claimed_at,
+                        warm_elsewhere,
+                    )
+                if rank is not None and (best is None or (rank, score, heap[0]) < best):
+                    best_key, best = key, (rank, score, heap[0])
+            for key in drained:
+                del self._queued[key]
+            if best_key is None or best is None:
+                # A busy node is not worth a duplicate lease on someone else's straggler.
+                if self._speculation is None or min_wait:
+                    return None
+                speculative = self._claim_speculative(node_id, node_labels, window, claimed_at)
+                if speculative is None:
+                    return None
+                assignment, seq = speculative
+            else:
+                best_pk = heapq.heappop(self._queued[best_key])
+                record = self._jobs[best_pk]
+                record.status = "running"
+                record.assigned_node_id = node_id
+                record.started_at = claimed_at
+                record.attempts += 1
+                lease = _Lease(
+                    node_id=node_id,
+                    lease_token=secrets.token_urlsafe(24),
+                    lease_expires_at=claimed_at + self._lease_duration,
+                )
+                self._unlease(best_pk)
+                self._add_lease(best_pk, lease)
+                self._job_entry(
+                    record, claimed_deltas(record.submitter, node_id, record.created_at, claimed_at)
+                )
+                seq = self._lease_entry(best_pk, lease)
+                assignment = JobAssignment(job=record.to_job(), lease_token=lease.lease_token)
+        self._wait_durable(seq)
+        return assignment
+
+    def _warm_elsewhere(self, affinity_key: str, node_id: str, now: datetime) -> bool:
+        """Whether another recently seen node reports `affinity_key` warm."""
+        seen_after = now - 2 * self._lease_duration
+        return any(
+            other != node_id and self._nodes[other].last_seen_at >= seen_after
+            for other in self._warm_nodes.get(affinity_key, ())
+        )
+
+    def _set_warm_keys(self, node: _NodeRecord, warm_keys: list[str]) -> None:
+        for key in node.warm_keys:
+            holders = self._warm_nodes.get(key)
+            if holders is not None:
+                holders.discard(node.node_id)
+                if not holders:
+                    del self._warm_nodes[key]
+        node.warm_keys = warm_keys
+        for key in warm_keys:
+            self._warm_nodes.setdefault(key, set()).add(node.node_id)
+
+    def _record_runtime(self, record: _JobRecord) -> None:
+        if (
+            record.status != "succeeded"
+            or record.started_at is None
+            or record.finished_at is None
+        ):
+            return
+        runtime = (record.finished_at - record.started_at).total_seconds()
+        self._estimates.observe(command_fingerprint(record.command, record.kind), runtime)
+        if record.group_id is not None:
+            self._group_runtimes.setdefault(record.group_id, []).append(runtime)
+
+    def _claim_speculative(
+        self,
+        node_id: str,
+        node_labels: dict[str, LabelValue],
+        window: float | None,
+        claimed_at: datetime,
+    ) -> tuple[JobAssignment, int] | None:
+        """Give an idle node a duplicate lease on the longest-running straggler, if any."""
+        assert self._speculation is not None
+        candidates = sorted(
+            (
+                self._jobs[job_pk]
+                for job_pk, leases in self._leases.items()
+                if len(leases) == 1
+                and all(lease.node_id != node_id for lease in leases.values())
+            ),
+            key=lambda record: record.started_at or claimed_at,
+        )
+        for record in candidates:
+            if (
+                record.status != "running"
+                or record.group_id is None
+                or not requirements_match(record.requirements, node_labels)
+                or not fits_window(record.timeout_seconds, window)
+                or not self._speculation.is_straggler(
+                    record.started_at, claimed_at, self._group_runtimes.get(record.group_id, [])
+                )
+            ):
+                continue
+            lease = _Lease(
+                node_id=node_id,
+                lease_token=secrets.token_urlsafe(24),
+                lease_expires_at=claimed_at + self._lease_duration,
+            )
+            self._add_lease(record.pk, lease)
+            seq = self._lease_entry(record.pk, lease)
+            return JobAssignment(job=record.to_job(), lease_token=lease.lease_token), seq
+        return None
+
+    def finish_job(self, job_id: str, request: JobFinishRequest) -> Job:
+        with self._lock:
+            record = self._get_record(job_id)
+            seq = self._finish(record, request)
+            job = record.to_job()
+        self._wait_durable(seq)
+        return job
+
+    def complete_job(self, job_id: str, request: JobCompleteRequest) -> Job:
+        """Append the final logs, record artifacts and finish, under one lease check."""
+        with self._lock:
+            record = self._get_record(job_id)
+            self._check_lease(record, request.node_id, request.lease_token)
+            if record.status != "running":
+                raise HTTPException(status_code=409, detail="job is not running")
+            if request.logs:
+                self._logs.setdefault(record.pk, []).append(request.logs)
+                self._journal_entry({"op": "log", "job_pk": record.pk, "text": request.logs})
+            for url in request.artifact_urls:
+                if url not in record.artifact_urls:
+                    record.artifact_urls.append(url)
+            seq = self._finish(record, request)
+            job = record.to_job()
+        self._wait_durable(seq)
+        return job
+
+    def _finish(self, record: _JobRecord, request: JobFinishRequest) -> int:
+        if record.status != "running":
+            raise HTTPException(status_code=409, detail="job is not running")
+        record.status = "succeeded" if request.exit_code == 0 else "failed"
+        record.exit_code = request.exit_code
+        record.failure_reason = request.failure_reason
+        record.finished_at = utcnow()
+        # With speculative duplicates the first finish wins; the job is credited to
+        # the node that reported it, and the other leases are cancelled.
+        record.assigned_node_id = request.node_id
+        for lease in self._unlease(record.pk).values():
+            if lease.lease_token != request.lease_token:
+                self._cancelled.setdefault(lease.node_id, set()).add(record.to_job().id)
+        self._record_runtime(record)
+        if request.metrics is not None:
+            finished_at = to_micros(record.finished_at)
+            assert finished_at is not None
+            row = MetricsRow.from_request(
+                record.pk, command_fingerprint(record.command, record.kind), finished_at, request.metrics
+            )
+            self._put_metrics(row)
+            self._journal_entry({"op": "metrics", "row": list(astuple(row))})
+        self._job_entry(
+            record,
+            finished_deltas(
+                record.submitter,
+                record.assigned_node_id,
+                record.started_at,
+                record.finished_at,
+                succeeded=record.status == "succeeded",
+            ),
+        )
+        self._resolve_dependents(record.pk, record.status == "succeeded", record.finished_at)
+        return self._journal_entry({"op": "unlease", "job_pk": record.pk})
+
+    def preempt_job(self, job_id: str, request: JobPreemptRequest) -> Job:
+        """Give a run back to the queue, with its checkpoint, without using up an attempt."""
+        now = utcnow()
+        with self._lock:
+            record = self._get_record(job_id)
+            self._check_lease(record, request.node_id, request.lease_token)
+            if record.status != "running":
+                raise HTTPException(status_code=409, detail="job is not running")
+            if request.logs:
+                self._logs.setdefault(record.pk, []).append(request.logs)
+                self._journal_entry({"op": "log", "job_pk": record.pk, "text": request.logs})
+            if request.checkpoint_url is not None:
+                record.checkpoint_url = request.checkpoint_url
+            self._unlease(record.pk, request.lease_token)
+            self._journal_entry(
+                {"op": "unlease", "job_pk": record.pk, "lease_token": request.lease_token}
+            )
+            survivors = self._leases.get(record.pk)
+            if survivors:
+                # A speculative duplicate is still alive; it now carries the job.
+                record.assigned_node_id = next(iter(survivors.values())).node_id
+                seq = self._job_entry(record)
+            else:
+                started_at = record.started_at
+                record.status = "queued"
+                record.assigned_node_id = None
+                record.started_at = None
+                record.attempts = max(record.attempts - 1, 0)
+                self._put_job(record)
+                seq = self._job_entry(
+                    record, preempted_deltas(record.submitter, request.node_id, started_at, now)
+                )
+            job = record.to_job()
+        self._wait_durable(seq)
+        return job
+
+    def expire_leases(self) -> int:
+        """Resolve running jobs whose lease ran out: requeue if attempts remain, else fail."""
+        now = utcnow()
+        seq = 0
+        with self._lock:
+            expired = [
+                (job_pk, lease.lease_token)
+                for job_pk, leases in self._leases.items()
+                if self._jobs[job_pk].status == "running"
+                for lease in leases.values()
+                if lease.lease_expires_at < now
+            ]
+            resolved = 0
+            for job_pk, lease_token in expired:
+                self._unlease(job_pk, lease_token)
+                seq = self._journal_entry(
+                    {"op": "unlease", "job_pk": job_pk, "lease_token": lease_token}
+                )
+                record = self._jobs[job_pk]
+                survivors = self._leases.get(job_pk)
+                if survivors:
+                    # A speculative duplicate is still alive; it now carries the job.
+                    record.assigned_node_id = next(iter(survivors.values())).node_id
+                    seq = self._job_entry(record)
+                    continue
+                node_id = record.assigned_node_id
+                requeued = record.attempts < record.max_attempts
+                if requeued:
+                    record.status = "queued"
+                    record.assigned_node_id = None
+                    record.started_at = None
+                else:
+                    record.status = "failed"
+                    record.failure_reason = "lease expired"
+                    record.finished_at = now
+                self._put_job(record)
+                seq = self._job_entry(record, expired_deltas(record.submitter, node_id, now, requeued))
+                if not requeued:
+                    self._resolve_dependents(job_pk, succeeded=False, at=now)
+                resolved += 1
+        self._wait_durable(seq)
+        return resolved
+
+    def stats(self) -> StatsResponse:
+        now = utcnow()
+        with self._lock:
+            self._stats.prune(now)
+            rows = self._stats.rows()
+        return build_stats(rows, now)
+
+    def job_metrics(self, job_id: str) -> JobMetricsEntry:
+        job_pk = parse_job_pk(job_id)
+        with self._lock:
+            row = self._metrics.get(job_pk)
+        if row is None:
+            raise HTTPException(status_code=404, detail="job metrics not found")
+        return row.to_entry(from_micros(row.finished_at) or utcnow())
+
+    def command_metrics(self, fingerprint: str | None, limit: int) -> CommandMetricsResponse:
+        with self._lock:
+            rows = list(self._metrics.values())
+        return summarize(rows, fingerprint, limit)
+
+    def append_logs(self, job_id: str, request: JobLogsRequest) -> None:
+        job_pk = parse_job_pk(job_id)
+        with self._lock:
+            self._logs.setdefault(job_pk, []).append(request.text)
+            seq = self._journal_entry({"op": "log", "job_pk": job_pk, "text": request.text})
+        self._wait_durable(seq)
+
+    def read_logs(self, job_id: str) -> JobLogsResponse:
+        job_pk = parse_job_pk(job_id)
+        with self._lock:
+            if job_pk in self._jobs:
+                return JobLogsResponse(text="".join(self._logs.get(job_pk, [])))
+            segment = self._archived.get(job_pk)
+        logs = self._archive.read_logs(segment, job_id) if segment and self._archive else None
+        if logs is None:
+            raise HTTPException(status_code=404, detail="job not found")
+        return logs
+
+    def search_logs(
+        self,
+        query: str,
+        status_filter: JobStatus | None,
+        since: datetime | None,
+        until: datetime | None,
+        limit: int,
+    ) -> LogSearchResponse:
+        raise HTTPException(status_code=404, detail="log search needs the sqlite store")
+
+    def archive_jobs(self, older_than: datetime, batch_size: int = 500) -> int:
+        """Move terminal jobs finished before `older_than`, with their logs, into the archive."""
+        if self._archive is None:
+            return 0
+        archived = 0
+        while True:
+            with self._lock:
+                expired = [
+                    record
+                    for record in self._jobs.values()
+                    if record.status in ("succeeded", "failed")
+                    and record.finished_at is not None
+                    and record.finished_at < older_than
+                ][:batch_size]
+                entries = [
+                    (record.to_job(), "".join(self._logs.get(record.pk, []))) for record in expired
+                ]
+            if not entries:
+                return archived
+
+            segment = self._archive.write_segment(entries)
+            job_pks = [record.pk for record in expired]
+            with self._lock:
+                self._apply_archive(segment, job_pks)
+                self._change_seq += 1
+                seq = self._journal_entry(
+                    {
+                        "op": "archive",
+                        "segment": segment,
+                        "job_pks": job_pks,
+                        "change_seq": self._change_seq,
+                    }
+                )
+            self._wait_durable(seq)
+            archived += len(entries)
+
+    def assert_job_lease(self, job_id: str, node_id: str, lease_token: str) -> None:
+        with self._lock:
+            self._check_lease(self._get_record(job_id), node_id, lease_token)
+
+    def _check_lease(self, record: _JobRecord, node_id: str, lease_token: str) -> None:
+        leases = self._leases.get(record.pk)
+        if not leases:
+            raise HTTPException(status_code=409, detail="job has no active lease")
+        lease = leases.get(lease_token)
+        if lease is None or lease.node_id != node_id:
+            raise HTTPException(status_code=409, detail="job is owned by a different worker")
+        if utcnow() > lease.lease_expires_at:
+            raise HTTPException(status_code=409, detail="lease has expired")
+
+    def record_artifact(self, job_id: str, url: str) -> None:
+        with self._lock:
+            record = self._get_record(job_id)
+            if url in record.artifact_urls:
+                return
+            record.artifact_urls.append(url)
+            seq = self._job_entry(record)
+        self._wait_durable(seq)
+
+    def _journal_liveness(self, node_ids: set[str]) -> int:
+        """Journal the current last_seen_at and lease deadlines of `node_ids`."""
+        seq = 0
+        for node_id in node_ids:
+            for job_pk, lease in self._node_lease_items(node_id):
+                seq = self._lease_entry(job_pk, lease)
+            seq = self._journal_entry({"op": "node", **self._nodes[node_id].to_dict()})
+        return seq
+
+    def flush_heartbeats(self) -> int:
+        with self._lock:
+            node_ids, self._unflushed_nodes = self._unflushed_nodes, set()
+            seq = self._journal_liveness(node_ids)
+        self._wait_durable(seq)
+        return len(node_ids)
+
+    def take_cancellations(self, node_id: str) -> list[str]:
+        """Pop the jobs `node_id` should stop because a duplicate lease finished first."""
+        with self._lock:
+            return sorted(self._cancelled.pop(node_id, set()))
+
+    def heartbeat_node(self, node_id: str, request: NodeHeartbeatRequest) -> Node:
+        now = utcnow()
+        warm_keys = sorted(set(request.warm_keys)) if request.warm_keys is not None else None
+        with self._lock:
+            # A heartbeat proves the node is alive, so it extends every live lease it holds.
+            for _, lease in self._node_lease_items(node_id):
+                if lease.lease_expires_at >= now:
+                    lease.lease_expires_at = now + self._lease_duration
+            node = self._nodes.get(node_id)
+            if (
+                node is not None
+                and (request.name is None or request.name == node.name)
+                and (not request.labels or request.labels == node.labels)
+                and (warm_keys is None or warm_keys == node.warm_keys)
+                and request.available_until == node.available_until
+                and request.thresholds == node.thresholds
+            ):
+                # Only liveness and load changed; flush_heartbeats journals them in a batch.
+                node.last_seen_at = now
+                node.load = request.load
+                self._unflushed_nodes.add(node_id)
+                return node.to_node()
+            if node is None:
+                node = _NodeRecord(
+                    node_id=node_id,
+                    name=request.name,
+                    labels=dict(request.labels),
+                    last_seen_at=now,
+                    available_until=request.available_until,
+                    load=request.load,
+                    thresholds=request.thresholds,
+                )
+                self._nodes[node_id] = node
+            else:
+                if request.labels:
+                    node.labels = dict(request.labels)
+                if request.name is not None:
+                    node.name = request.name
+                node.available_until = request.available_until
+                node.load = request.load
+                node.thresholds = request.thresholds
+                node.last_seen_at = now
+            if warm_keys is not None:
+                self._set_warm_keys(node, warm_keys)
+            self._unflushed_nodes.discard(node_id)
+            seq = self._journal_liveness({node_id})
+            result = node.to_node()
+        self._wait_durable(seq)
+        return result
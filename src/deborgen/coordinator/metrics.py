@@ -0,0 +1,173 @@
+"""Per-job resource use reported by workers, and its rollup by command fingerprint.
+
+A job's metrics are kept in their own small table keyed by job id, as integers
+(milliseconds, KiB, 512-byte blocks), so they outlive the job row when it is
+archived and a fingerprint's history stays cheap to aggregate.
+"""
+
+from __future__ import annotations
+
+import functools
+import re
+import shlex
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import datetime
+
+from pydantic import BaseModel, Field
+
+from deborgen.coordinator.models import JobKind, JobMetrics
+
+# Digit runs and long hex strings (seeds, dates, hashes, ids) vary between runs of the
+# same command; they are masked so those runs share a fingerprint.
+VOLATILE_TOKEN = re.compile(r"[0-9a-f]{8,}|\d+", re.IGNORECASE)
+FINGERPRINT_MAX_LENGTH = 200
+COMMAND_METRICS_LIMIT = 100
+
+
+@functools.lru_cache(maxsize=4096)
+def command_fingerprint(command: str, kind: JobKind = "command") -> str:
+    """A readable key shared by runs of the same command with different arguments.
+
+    `python train.py --seed 7 --out runs/2026-03-01` becomes
+    `python train.py --seed # --out runs/#-#-#`. Python jobs are keyed by entrypoint.
+    """
+    if kind == "python":
+        return command[:FINGERPRINT_MAX_LENGTH]
+    try:
+        tokens = shlex.split(command)
+    except ValueError:
+        tokens = command.split()
+    return " ".join(VOLATILE_TOKEN.sub("#", token) for token in tokens)[:FINGERPRINT_MAX_LENGTH]
+
+
+def _millis(seconds: float | None) -> int | None:
+    return None if seconds is None else round(seconds * 1000)
+
+
+def _seconds(millis: int | None) -> float | None:
+    return None if millis is None else millis / 1000
+
+
+@dataclass(frozen=True, slots=True)
+class MetricsRow:
+    """One job's metrics in stored form."""
+
+    job_pk: int
+    fingerprint: str
+    finished_at: int  # epoch microseconds
+    wall_ms: int
+    user_ms: int | None = None
+    system_ms: int | None = None
+    max_rss_kb: int | None = None
+    read_blocks: int | None = None
+    write_blocks: int | None = None
+
+    @classmethod
+    def from_request(
+        cls, job_pk: int, fingerprint: str, finished_at: int, metrics: JobMetrics
+    ) -> MetricsRow:
+        return cls(
+            job_pk=job_pk,
+            fingerprint=fingerprint,
+            finished_at=finished_at,
+            wall_ms=round(metrics.wall_seconds * 1000),
+            user_ms=_millis(metrics.user_cpu_seconds),
+            system_ms=_millis(metrics.system_cpu_seconds),
+            max_rss_kb=metrics.max_rss_kb,
+            read_blocks=metrics.read_blocks,
+            write_blocks=metrics.write_blocks,
+        )
+
+    def to_entry(self, finished_at: datetime) -> JobMetricsEntry:
+        return JobMetricsEntry(
+            job_id=f"job_{self.job_pk}",
+            fingerprint=self.fingerprint,
+            finished_at=finished_at,
+            wall_seconds=self.wall_ms / 1000,
+            user_cpu_seconds=_seconds(self.user_ms),
+            system_cpu_seconds=_seconds(self.system_ms),
+            max_rss_kb=self.max_rss_kb,
+            read_blocks=self.read_blocks,
+            write_blocks=self.write_blocks,
+        )
+
+
+class JobMetricsEntry(JobMetrics):
+    job_id: str
+    fingerprint: str
+    finished_at: datetime
+
+
+class CommandMetrics(BaseModel):
+    fingerprint: str
+    jobs: int
+    mean_wall_seconds: float
+    max_wall_seconds: float
+    # CPU figures cover the jobs that reported them (python jobs report wall time only).
+    total_cpu_seconds: float = 0.0
+    mean_cpu_seconds: float | None = None
+    max_rss_kb: int | None = None
+    read_blocks: int = 0
+    write_blocks: int = 0
+
+
+class CommandMetricsResponse(BaseModel):
+    commands: list[CommandMetrics] = Field(default_factory=list)
+
+
+@dataclass(slots=True)
+class CommandTotals:
+    """Running sums for one fingerprint; SQLite computes the same with GROUP BY."""
+
+    jobs: int = 0
+    wall_ms: int = 0
+    max_wall_ms: int = 0
+    cpu_jobs: int = 0
+    cpu_ms: int = 0
+    max_rss_kb: int | None = None
+    read_blocks: int = 0
+    write_blocks: int = 0
+
+    def add(self, row: MetricsRow) -> None:
+        self.jobs += 1
+        self.wall_ms += row.wall_ms
+        self.max_wall_ms = max(self.max_wall_ms, row.wall_ms)
+        if row.user_ms is not None or row.system_ms is not None:
+            self.cpu_jobs += 1
+            self.cpu_ms += (row.user_ms or 0) + (row.system_ms or 0)
+        if row.max_rss_kb is not None:
+            self.max_rss_kb = max(self.max_rss_kb or 0, row.max_rss_kb)
+        self.read_blocks += row.read_blocks or 0
+        self.write_blocks += row.write_blocks or 0
+
+    def to_metrics(self, fingerprint: str) -> CommandMetrics:
+        return CommandMetrics(
+            fingerprint=fingerprint,
+            jobs=self.jobs,
+            mean_wall_seconds=self.wall_ms / self.jobs / 1000,
+            max_wall_seconds=self.max_wall_ms / 1000,
+            total_cpu_seconds=self.cpu_ms / 1000,
+            mean_cpu_seconds=self.cpu_ms / self.cpu_jobs / 1000 if self.cpu_jobs else None,
+            max_rss_kb=self.max_rss_kb,
+            read_blocks=self.read_blocks,
+            write_blocks=self.write_blocks,
+        )
+
+
+def summarize(
+    rows: Iterable[MetricsRow], fingerprint: str | None, limit: int
+) -> CommandMetricsResponse:
+    """Roll rows up by fingerprint, most total CPU time first."""
+    totals: dict[str, CommandTotals] = {}
+    for row in rows:
+        if fingerprint is None or row.fingerprint == fingerprint:
+            totals.setdefault(row.fingerprint, CommandTotals()).add(row)
+    return rank([summary.to_metrics(name) for name, summary in totals.items()], limit)
+
+
+def rank(commands: list[CommandMetrics], limit: int) -> CommandMetricsResponse:
+    commands.sort(
+        key=lambda item: (-item.total_cpu_seconds, -item.mean_wall_seconds, item.fingerprint)
+    )
+    return CommandMetricsResponse(commands=commands[:limit])
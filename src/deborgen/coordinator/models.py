@@ -0,0 +1,362 @@
+from __future__ import annotations
+
+import re
+from collections import Counter
+from datetime import UTC, datetime
+from typing import Any, Literal
+
+from fastapi import HTTPException
+from pydantic import BaseModel, Field, model_validator
+
+# `blocked` jobs wait for the jobs in their `depends_on` to succeed before they are queued.
+JobStatus = Literal["blocked", "queued", "running", "succeeded", "failed"]
+# `command` jobs run `command` as a process; `python` jobs call the `module:function`
+# named by `command` with `args` in a long-lived interpreter on the worker.
+JobKind = Literal["command", "python"]
+ENTRYPOINT_PATTERN = re.compile(r"^[\w.]+:[\w.]+$")
+LabelValue = str | int | float | bool
+# Most job ids one bulk status lookup may name.
+STATUS_LOOKUP_MAX = 10_000
+
+
+def utcnow() -> datetime:
+    return datetime.now(UTC)
+
+
+def to_iso(dt: datetime | None) -> str | None:
+    if dt is None:
+        return None
+    return dt.isoformat()
+
+
+def parse_iso(value: str | None) -> datetime | None:
+    if value is None:
+        return None
+    return datetime.fromisoformat(value)
+
+
+def parse_job_pk(job_id: str) -> int:
+    if not job_id.startswith("job_"):
+        raise HTTPException(status_code=404, detail="job not found")
+    suffix = job_id.removeprefix("job_")
+    if not suffix.isdigit():
+        raise HTTPException(status_code=404, detail="job not found")
+    return int(suffix)
+
+
+class JobResources(BaseModel):
+    """Caps a worker enforces on a job's processes; unset leaves the worker's own cap."""
+
+    memory_mb: int | None = Field(default=None, gt=0)
+    cpu_seconds: int | None = Field(default=None, gt=0)
+
+
+class Job(BaseModel):
+    id: str
+    status: JobStatus
+    command: str
+    created_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    assigned_node_id: str | None = None
+    timeout_seconds: int = 3600
+    attempts: int = 0
+    max_attempts: int = 1
+    exit_code: int | None = None
+    failure_reason: str | None = None
+    artifact_urls: list[str] = Field(default_factory=list)
+    requirements: dict[str, str | int | float | bool] = Field(default_factory=dict)
+    resources: JobResources = Field(default_factory=JobResources)
+    submitter: str | None = None
+    depends_on: list[str] = Field(default_factory=list)
+    group_id: str | None = None
+    affinity_key: str | None = None
+    kind: JobKind = "command"
+    args: list[Any] | dict[str, Any] = Field(default_factory=dict)
+    # Download URL of the checkpoint left by the last preempted run, if any.
+    checkpoint_url: str | None = None
+    # Store-wide change sequence number of the job's last change; grows on every change.
+    version: int = 0
+
+
+class JobCreateRequest(BaseModel):
+    command: str
+    timeout_seconds: int = 3600
+    max_attempts: int = 1
+    requirements: dict[str, str | int | float | bool] = Field(default_factory=dict)
+    resources: JobResources = Field(default_factory=JobResources)
+    submitter: str | None = None
+    depends_on: list[str] = Field(default_factory=list)
+    group_id: str | None = None
+    # Opaque cache identity, e.g. repo plus lockfile hash; nodes holding it warm are preferred.
+    affinity_key: str | None = None
+    kind: JobKind = "command"
+    # Positional (list) or keyword (object) arguments for `python` jobs.
+    args: list[Any] | dict[str, Any] = Field(default_factory=dict)
+
+    @model_validator(mode="after")
+    def check_entrypoint(self) -> JobCreateRequest:
+        if self.kind == "python" and not ENTRYPOINT_PATTERN.match(self.command):
+            raise ValueError("python jobs need command in 'module:function' form")
+        if self.kind == "command" and self.args:
+            raise ValueError("args are only supported for python jobs")
+        return self
+
+
+class JobBatchItem(JobCreateRequest):
+    # Batch-local name; later jobs in the same batch may list it in `depends_on`.
+    key: str | None = None
+
+
+class JobBatchCreateRequest(BaseModel):
+    jobs: list[JobBatchItem]
+    # Applied to entries without their own group_id; generated when omitted.
+    group_id: str | None = None
+
+    @model_validator(mode="after")
+    def check_dependency_order(self) -> JobBatchCreateRequest:
+        keys: set[str] = set()
+        for item in self.jobs:
+            for ref in item.depends_on:
+                if ref not in keys and not ref.startswith("job_"):
+                    raise ValueError(
+                        f"depends_on '{ref}' must be an existing job id or the key of an earlier job in the batch"
+                    )
+            if item.key is not None:
+                if item.key in keys:
+                    raise ValueError(f"duplicate key '{item.key}'")
+                keys.add(item.key)
+        return self
+
+
+class JobAssignment(BaseModel):
+    job: Job
+    lease_token: str
+
+
+class JobMetrics(BaseModel):
+    """What a run used, measured by the worker over the job's whole process tree."""
+
+    wall_seconds: float = Field(ge=0)
+    user_cpu_seconds: float | None = Field(default=None, ge=0)
+    system_cpu_seconds: float | None = Field(default=None, ge=0)
+    max_rss_kb: int | None = Field(default=None, ge=0)
+    # 512-byte blocks read from and written to disk (not page cache hits).
+    read_blocks: int | None = Field(default=None, ge=0)
+    write_blocks: int | None = Field(default=None, ge=0)
+
+
+class JobFinishRequest(BaseModel):
+    node_id: str
+    lease_token: str
+    exit_code: int
+    failure_reason: str | None = None
+    metrics: JobMetrics | None = None
+
+
+class JobCompleteRequest(JobFinishRequest):
+    # Final log text and artifact URLs, committed together with the finish.
+    logs: str = ""
+    artifact_urls: list[str] = Field(default_factory=list)
+
+
+class JobPreemptRequest(BaseModel):
+    node_id: str
+    lease_token: str
+    # Where the run's checkpoint was uploaded; omitted keeps the previous checkpoint.
+    checkpoint_url: str | None = None
+    logs: str = ""
+
+
+class JobLogsRequest(BaseModel):
+    node_id: str
+    lease_token: str
+    text: str
+
+
+class JobListResponse(BaseModel):
+    jobs: list[Job]
+
+
+class JobStatusRequest(BaseModel):
+    ids: list[str] = Field(default_factory=list, max_length=STATUS_LOOKUP_MAX)
+    # Every unarchived job in this submission group, instead of `ids`.
+    group_id: str | None = None
+    # Only return entries in these states; `counts` still covers every matched job.
+    statuses: list[JobStatus] | None = None
+
+    @model_validator(mode="after")
+    def check_selector(self) -> JobStatusRequest:
+        if self.ids and self.group_id is not None:
+            raise ValueError("give either ids or group_id, not both")
+        return self
+
+
+class JobStatusEntry(BaseModel):
+    id: str
+    status: JobStatus
+    exit_code: int | None = None
+    failure_reason: str | None = None
+    finished_at: datetime | None = None
+
+
+class JobStatusResponse(BaseModel):
+    # In request order; ids that match no live or archived job are listed in `missing`.
+    jobs: list[JobStatusEntry]
+    missing: list[str] = Field(default_factory=list)
+    counts: dict[JobStatus, int] = Field(default_factory=dict)
+
+
+class JobLogsResponse(BaseModel):
+    text: str
+
+
+class LogSearchHit(BaseModel):
+    job_id: str
+    status: JobStatus
+    # Where the query matched, with the matching terms wrapped in ** and the cut ends
+    # marked with ...; from the newest matching chunk of the job's logs.
+    snippet: str
+    logged_at: datetime
+
+
+class LogSearchResponse(BaseModel):
+    hits: list[LogSearchHit] = Field(default_factory=list)
+
+
+class JobArtifactPresignRequest(BaseModel):
+    node_id: str
+    lease_token: str
+    filename: str
+
+
+class JobArtifactPresignResponse(BaseModel):
+    upload_url: str
+    download_url: str
+
+
+class JobArtifactRecordRequest(BaseModel):
+    node_id: str
+    lease_token: str
+    url: str
+
+
+class NodeLoad(BaseModel):
+    """Live figures a worker reports with each heartbeat; None where it cannot tell."""
+
+    load_avg: float | None = Field(default=None, ge=0)  # 1-minute load average
+    memory_free_mb: int | None = Field(default=None, ge=0)
+    disk_free_mb: int | None = Field(default=None, ge=0)  # in the worker's work dir
+    running_slots: int | None = Field(default=None, ge=0)
+
+
+class NodeThresholds(BaseModel):
+    """Per-node limits on `NodeLoad`, set by the node's owner; see coordinator.load."""
+
+    max_load: float | None = Field(default=None, gt=0)
+    min_memory_free_mb: int | None = Field(default=None, ge=0)
+    min_disk_free_mb: int | None = Field(default=None, ge=0)
+
+
+class Node(BaseModel):
+    node_id: str
+    name: str | None = None
+    labels: dict[str, str | int | float | bool] = Field(default_factory=dict)
+    warm_keys: list[str] = Field(default_factory=list)
+    # End of the node's current availability window; None means no limit.
+    available_until: datetime | None = None
+    load: NodeLoad | None = None
+    thresholds: NodeThresholds | None = None
+    last_seen_at: datetime
+
+
+class NodeHeartbeatResponse(Node):
+    # Jobs this node should stop running: a duplicate lease on another node finished first.
+    cancelled_jobs: list[str] = Field(default_factory=list)
+
+
+class NodeHeartbeatRequest(BaseModel):
+    name: str | None = None
+    labels: dict[str, str | int | float | bool] = Field(default_factory=dict)
+    # Affinity keys the node has cached; omitted means unchanged, [] clears them.
+    warm_keys: list[str] | None = None
+    # When the node's work-hours window closes. Sent with every heartbeat, so
+    # omitting it (as workers without --work-hours do) clears any previous window.
+    available_until: datetime | None = None
+    # Also sent with every heartbeat: omitting either clears it. A change in `load`
+    # alone keeps the heartbeat on the batched path; see coordinator.load.
+    load: NodeLoad | None = None
+    thresholds: NodeThresholds | None = None
+
+
+def requested_job_pks(job_ids: list[str]) -> list[int]:
+    """Distinct primary keys of the well-formed ids in `job_ids`, in request order."""
+    job_pks: dict[int, None] = {}
+    for job_id in job_ids:
+        try:
+            job_pks[parse_job_pk(job_id)] = None
+        except HTTPException:
+            continue
+    return list(job_pks)
+
+
+def order_statuses(
+    job_ids: list[str], found: dict[int, JobStatusEntry]
+) -> tuple[list[JobStatusEntry], list[str]]:
+    """Entries for `job_ids` in request order without duplicates, and the ids not found."""
+    entries: list[JobStatusEntry] = []
+    missing: list[str] = []
+    seen: set[str] = set()
+    for job_id in job_ids:
+        if job_id in seen:
+            continue
+        seen.add(job_id)
+        try:
+            entry = found.get(parse_job_pk(job_id))
+        except HTTPException:
+            entry = None
+        if entry is None:
+            missing.append(job_id)
+        else:
+            entries.append(entry)
+    return entries, missing
+
+
+def status_response(
+    entries: list[JobStatusEntry], missing: list[str], statuses: list[JobStatus] | None
+) -> JobStatusResponse:
+    counts = Counter(entry.status for entry in entries)
+    if statuses is not None:
+        entries = [entry for entry in entries if entry.status in statuses]
+    return JobStatusResponse(jobs=entries, missing=missing, counts=dict(counts))
+
+
+def dependency_failure_reason(failed_job_id: str) -> str:
+    return f"dependency {failed_job_id} failed"
+
+
+def initial_dependency_state(
+    parents: dict[int, JobStatus],
+) -> tuple[JobStatus, int, str | None]:
+    """Status, unfinished-parent count and failure reason for a job with `parents`."""
+    for parent_pk, parent_status in parents.items():
+        if parent_status == "failed":
+            return "failed", 0, dependency_failure_reason(f"job_{parent_pk}")
+    remaining = sum(1 for parent_status in parents.values() if parent_status != "succeeded")
+    return ("blocked" if remaining else "queued"), remaining, None
+
+
+def requirements_match(requirements: dict[str, Any], labels: dict[str, Any]) -> bool:
+    return all(labels.get(key) == value for key, value in requirements.items())
+
+
+def window_seconds(available_until: datetime | None, now: datetime) -> float | None:
+    """Seconds left in a node's availability window, or None if it has no window."""
+    if available_until is None:
+        return None
+    return (available_until - now).total_seconds()
+
+
+def fits_window(timeout_seconds: int, window: float | None) -> bool:
+    """Whether a job can run to its timeout before the node's window closes."""
+    return window is None or timeout_seconds <= window
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Literal
+
+from deborgen.coordinator.models import fits_window
+
+# `fifo` claims the oldest queued job; the other modes use learned runtimes.
+SchedulingMode = Literal["fifo", "sjf", "backfill"]
+# An estimate is the mean runtime of a fingerprint's succeeded runs, moving to an
+# exponential average over about this many runs so it follows slow drift.
+ESTIMATE_WINDOW = 20
+
+
+@dataclass(slots=True)
+class RuntimeEstimate:
+    samples: int = 0
+    mean_seconds: float = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.samples += 1
+        self.mean_seconds += (seconds - self.mean_seconds) / min(self.samples, ESTIMATE_WINDOW)
+
+
+class RuntimeEstimates:
+    """Expected runtime per command fingerprint; SQLite keeps the same in a table."""
+
+    def __init__(self) -> None:
+        self._estimates: dict[str, RuntimeEstimate] = {}
+
+    def observe(self, fingerprint: str, seconds: float) -> None:
+        self._estimates.setdefault(fingerprint, RuntimeEstimate()).observe(seconds)
+
+    def get(self, fingerprint: str) -> float | None:
+        estimate = self._estimates.get(fingerprint)
+        return estimate.mean_seconds if estimate is not None else None
+
+
+@dataclass(frozen=True)
+class SchedulingPolicy:
+    """Claim order from runtime estimates learned per command fingerprint.
+
+    `sjf` claims the job with the least expected runtime first. Waiting ages a job:
+    each second queued takes `aging` seconds off its expected runtime, so a long job
+    overtakes newer short ones once it has waited about as long as it will run. A job
+    queued for `max_wait_seconds` goes ahead of every job that has not, oldest first,
+    which bounds how long a stream of short jobs can hold it back.
+
+    `backfill` keeps FIFO order but decides whether a job fits before the node's
+    work-hours window closes by its expected runtime, times `backfill_margin`,
+    instead of its timeout. Short jobs then fill the tail of a window that FIFO
+    leaves idle; one that overruns is preempted with a checkpoint when it closes.
+
+    Fingerprints with no succeeded run yet are expected to take
+    `default_runtime_seconds`.
+    """
+
+    mode: SchedulingMode = "sjf"
+    aging: float = 1.0
+    max_wait_seconds: float = 3600.0
+    default_runtime_seconds: float = 300.0
+    backfill_margin: float = 1.5
+
+    @property
+    def ordered(self) -> bool:
+        """Whether the claim has to compare every candidate rather than take the oldest."""
+        return self.mode == "sjf"
+
+    def score(
+        self, estimate: float | None, queued_at: datetime, now: datetime
+    ) -> tuple[int, float]:
+        """Sort key among claimable jobs; lower claims first, ties go to the oldest."""
+        if self.mode != "sjf":
+            return 0, 0.0
+        waited = (now - queued_at).total_seconds()
+        if waited >= self.max_wait_seconds:
+            return 0, -waited
+        expected = estimate if estimate is not None else self.default_runtime_seconds
+        return 1, expected - self.aging * waited
+
+    def fits(self, timeout_seconds: int, estimate: float | None, window: float | None) -> bool:
+        if self.mode == "backfill" and estimate is not None:
+            expected = estimate * self.backfill_margin
+            return window is None or min(expected, timeout_seconds) <= window
+        return fits_window(timeout_seconds, window)
@@ -0,0 +1,61 @@
+"""On-disk encoding used by the SQLite store.
+
+Schema version 2 stores timestamps as integer microseconds since the Unix epoch and
+job statuses as small integer codes. Lease expiry, retention cutoffs and liveness
+checks are then integer range scans over an index instead of ISO-8601 string
+comparisons, and no row read has to parse a date. Version 0 is every earlier
+database, which kept both as text; `SqliteJobStore` rebuilds those on open.
+"""
+
+from __future__ import annotations
+
+from datetime import UTC, datetime, timedelta
+from typing import cast
+
+from deborgen.coordinator.models import JobStatus, parse_iso
+
+SCHEMA_VERSION = 2
+
+# Codes are positions in STATUS_NAMES and are stored on disk: append, never reorder.
+STATUS_NAMES: tuple[JobStatus, ...] = ("blocked", "queued", "running", "succeeded", "failed")
+STATUS_CODES: dict[JobStatus, int] = {name: code for code, name in enumerate(STATUS_NAMES)}
+BLOCKED, QUEUED, RUNNING, SUCCEEDED, FAILED = range(len(STATUS_NAMES))
+
+# Tables rebuilt by the version 2 migration, with their timestamp columns.
+TIMESTAMP_COLUMNS: dict[str, tuple[str, ...]] = {
+    "jobs": ("created_at", "started_at", "finished_at"),
+    "leases": ("lease_expires_at",),
+    "logs": ("created_at",),
+    "nodes": ("last_seen_at", "available_until"),
+}
+
+EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+MICROSECOND = timedelta(microseconds=1)
+
+
+def to_micros(dt: datetime | None) -> int | None:
+    if dt is None:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=UTC)
+    return (dt - EPOCH) // MICROSECOND
+
+
+def from_micros(value: int | None) -> datetime | None:
+    if value is None:
+        return None
+    return EPOCH + timedelta(microseconds=value)
+
+
+def legacy_micros(value: str | int | None) -> int | None:
+    """A version 0 timestamp, ISO-8601 text, as epoch microseconds."""
+    if value is None or isinstance(value, int):
+        return value
+    return to_micros(parse_iso(value))
+
+
+def legacy_status_code(value: str | int) -> int:
+    """A version 0 status name as its integer code."""
+    if isinstance(value, int):
+        return value
+    return STATUS_CODES[cast(JobStatus, value)]
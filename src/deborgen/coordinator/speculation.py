@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+
+
+@dataclass(frozen=True)
+class SpeculationPolicy:
+    """When an idle node may get a duplicate lease on a straggling job.
+
+    A running job is a straggler once it has run longer than `percentile` of the
+    runtimes of its succeeded peers (jobs in the same group), provided at least
+    `min_peers` of them have finished. Duplicates are only handed out when the
+    idle node has nothing queued it could claim instead.
+    """
+
+    percentile: float = 0.9
+    min_peers: int = 5
+
+    def threshold_seconds(self, peer_runtimes: list[float]) -> float | None:
+        if len(peer_runtimes) < max(self.min_peers, 1):
+            return None
+        ordered = sorted(peer_runtimes)
+        return ordered[min(int(self.percentile * len(ordered)), len(ordered) - 1)]
+
+    def is_straggler(
+        self, started_at: datetime | None, now: datetime, peer_runtimes: list[float]
+    ) -> bool:
+        threshold = self.threshold_seconds(peer_runtimes)
+        if threshold is None or started_at is None:
+            return False
+        return (now - started_at).total_seconds() > threshold
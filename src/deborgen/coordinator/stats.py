@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+from pydantic import BaseModel, Field
+
+STAT_FIELDS = (
+    "queued",
+    "running",
+    "submitted",
+    "started",
+    "succeeded",
+    "failed",
+    "expired",
+    "preempted",
+    "wait_seconds",
+    "run_seconds",
+)
+GAUGE_FIELDS = frozenset({"queued", "running"})
+ANONYMOUS_SUBMITTER = "anonymous"
+WINDOW_HOURS = 24
+BUCKET_RETENTION = timedelta(days=7)
+
+
+@dataclass(frozen=True)
+class StatsDelta:
+    """Amounts to add to one counter row.
+
+    Rows are keyed by (scope, key, bucket): scope is `all`, `submitter`, `node` or
+    `hour`; bucket is `""` for running totals or an hour start for windowed rows.
+    """
+
+    scope: str
+    key: str
+    bucket: str
+    values: dict[str, float] = field(default_factory=dict)
+
+
+def hour_bucket(at: datetime) -> str:
+    return at.replace(minute=0, second=0, microsecond=0).isoformat()
+
+
+def _fan_out(
+    values: Mapping[str, float], at: datetime, submitter: str | None, node_id: str | None = None
+) -> list[StatsDelta]:
+    row = dict(values)
+    deltas = [
+        StatsDelta("all", "", "", row),
+        StatsDelta("submitter", submitter or ANONYMOUS_SUBMITTER, "", row),
+    ]
+    # Gauges only add up over a job's whole life: a node never holds a queued job, and
+    # an hour would go negative for every job claimed in a later hour than it was
+    # submitted. Node and hour rows count events and durations only.
+    events = {name: amount for name, amount in row.items() if name not in GAUGE_FIELDS}
+    if events:
+        deltas.append(StatsDelta("hour", "", hour_bucket(at), events))
+        if node_id is not None:
+            deltas.append(StatsDelta("node", node_id, "", events))
+    return deltas
+
+
+def created_deltas(
+    submitter: str | None, at: datetime, status: str = "queued"
+) -> list[StatsDelta]:
+    # Blocked jobs only count as queued once their dependencies release them.
+    values = {"submitted": 1}
+    if status in ("queued", "failed"):
+        values[status] = 1
+    return _fan_out(values, at, submitter)
+
+
+def released_deltas(submitter: str | None, at: datetime) -> list[StatsDelta]:
+    return _fan_out({"queued": 1}, at, submitter)
+
+
+def dependency_failed_deltas(submitter: str | None, at: datetime) -> list[StatsDelta]:
+    return _fan_out({"failed": 1}, at, submitter)
+
+
+def claimed_deltas(
+    submitter: str | None, node_id: str, created_at: datetime, at: datetime
+) -> list[StatsDelta]:
+    values = {
+        "queued": -1,
+        "running": 1,
+        "started": 1,
+        "wait_seconds": (at - created_at).total_seconds(),
+    }
+    return _fan_out(values, at, submitter, node_id)
+
+
+def finished_deltas(
+    submitter: str | None,
+    node_id: str | None,
+    started_at: datetime | None,
+    at: datetime,
+    succeeded: bool,
+) -> list[StatsDelta]:
+    run_seconds = (at - started_at).total_seconds() if started_at is not None else 0.0
+    values = {
+        "running": -1,
+        "succeeded" if succeeded else "failed": 1,
+        "run_seconds": run_seconds,
+    }
+    deltas = _fan_out(values, at, submitter, node_id)
+    if node_id is not None:
+        # Per-node hourly busy time, used for the utilization window.
+        deltas.append(StatsDelta("node", node_id, hour_bucket(at), {"run_seconds": run_seconds}))
+    return deltas
+
+
+def expired_deltas(
+    submitter: str | None, node_id: str | None, at: datetime, requeued: bool
+) -> list[StatsDelta]:
+    values = {"running": -1, "expired": 1, "queued" if requeued else "failed": 1}
+    return _fan_out(values, at, submitter, node_id)
+
+
+def preempted_deltas(
+    submitter: str | None, node_id: str | None, started_at: datetime | None, at: datetime
+) -> list[StatsDelta]:
+    deltas = _fan_out({"running": -1, "queued": 1, "preempted": 1}, at, submitter, node_id)
+    if node_id is not None and started_at is not None:
+        # The partial run still kept the node busy.
+        run_seconds = (at - started_at).total_seconds()
+        deltas.append(StatsDelta("node", node_id, hour_bucket(at), {"run_seconds": run_seconds}))
+    return deltas
+
+
+def prune_cutoff(now: datetime) -> str:
+    return hour_bucket(now - BUCKET_RETENTION)
+
+
+class StatsCounters(BaseModel):
+    queued: int = 0
+    running: int = 0
+    submitted: int = 0
+    started: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    expired: int = 0
+    preempted: int = 0
+    wait_seconds: float = 0.0
+    run_seconds: float = 0.0
+    mean_wait_seconds: float | None = None
+    mean_run_seconds: float | None = None
+
+
+class StatsWindow(StatsCounters):
+    start: str
+
+
+class NodeStats(StatsCounters):
+    utilization: float = 0.0
+
+
+class StatsResponse(BaseModel):
+    totals: StatsCounters
+    windows: list[StatsWindow] = Field(default_factory=list)
+    submitters: dict[str, StatsCounters] = Field(default_factory=dict)
+    nodes: dict[str, NodeStats] = Field(default_factory=dict)
+
+
+def _counters(values: dict[str, float]) -> dict[str, float | int | None]:
+    result: dict[str, float | int | None] = {
+        name: values.get(name, 0) for name in STAT_FIELDS
+    }
+    started = values.get("started", 0)
+    finished = values.get("succeeded", 0) + values.get("failed", 0)
+    result["mean_wait_seconds"] = values.get("wait_seconds", 0) / started if started else None
+    result["mean_run_seconds"] = values.get("run_seconds", 0) / finished if finished else None
+    return result
+
+
+def build_stats(
+    rows: Iterable[tuple[str, str, str, dict[str, float]]], now: datetime
+) -> StatsResponse:
+    window_start = hour_bucket(now - timedelta(hours=WINDOW_HOURS - 1))
+    totals: dict[str, float] = {}
+    windows: dict[str, dict[str, float]] = {}
+    submitters: dict[str, dict[str, float]] = {}
+    nodes: dict[str, dict[str, float]] = {}
+    node_busy: dict[str, float] = {}
+    for scope, key, bucket, values in rows:
+        if bucket and bucket < window_start:
+            continue
+        if scope == "all":
+            totals = values
+        elif scope == "hour":
+            windows[bucket] = values
+        elif scope == "submitter":
+            submitters[key] = values
+        elif scope == "node" and bucket:
+            node_busy[key] = node_busy.get(key, 0.0) + values.get("run_seconds", 0.0)
+        elif scope == "node":
+            nodes[key] = values
+
+    window_seconds = WINDOW_HOURS * 3600
+    return StatsResponse(
+        totals=StatsCounters.model_validate(_counters(totals)),
+        windows=[
+            StatsWindow.model_validate({"start": start, **_counters(values)})
+            for start, values in sorted(windows.items())
+        ],
+        submitters={
+            name: StatsCounters.model_validate(_counters(values))
+            for name, values in sorted(submitters.items())
+        },
+        nodes={
+            node_id: NodeStats.model_validate(
+                {
+                    **_counters(values),
+                    # Busy time is booked in the hour a job finishes, so long jobs can
+                    # overfill a bucket; clamp the window ratio to 1.
+                    "utilization": min(node_busy.get(node_id, 0.0) / window_seconds, 1.0),
+                }
+            )
+            for node_id, values in sorted(nodes.items())
+        },
+    )
+
+
+class MemoryStatsTable:
+    """In-process equivalent of the SQLite `stats` table."""
+
+    def __init__(self) -> None:
+        self._rows: dict[tuple[str, str, str], dict[str, float]] = {}
+        self._pruned_before = ""
+
+    def apply(self, deltas: Iterable[StatsDelta]) -> None:
+        for delta in deltas:
+            row = self._rows.setdefault((delta.scope, delta.key, delta.bucket), {})
+            for name, amount in delta.values.items():
+                row[name] = row.get(name, 0) + amount
+
+    def prune(self, now: datetime) -> None:
+        cutoff = prune_cutoff(now)
+        if cutoff == self._pruned_before:
+            return
+        self._pruned_before = cutoff
+        for row_key in [row_key for row_key in self._rows if row_key[2] and row_key[2] < cutoff]:
+            del self._rows[row_key]
+
+    def rows(self) -> list[tuple[str, str, str, dict[str, float]]]:
+        return [(scope, key, bucket, dict(values)) for (scope, key, bucket), values in self._rows.items()]
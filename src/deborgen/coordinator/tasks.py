@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import logging
+import threading
+from collections.abc import Callable
+
+logger = logging.getLogger("deborgen.coordinator")
+
+
+class PeriodicTask:
+    """Runs `fn` every `interval_seconds` on a daemon thread until stopped.
+
+    With `run_on_stop`, `fn` runs once more after the thread exits, for tasks that
+    flush buffered state.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        interval_seconds: float,
+        fn: Callable[[], object],
+        run_on_stop: bool = False,
+    ) -> None:
+        self.name = name
+        self._interval_seconds = interval_seconds
+        self._fn = fn
+        self._run_on_stop = run_on_stop
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f"deborgen-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+            if self._run_on_stop:
+                self._run_once()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval_seconds):
+            self._run_once()
+
+    def _run_once(self) -> None:
+        try:
+            self._fn()
+        except Exception:
+            logger.exception("periodic task %s failed", self.name)
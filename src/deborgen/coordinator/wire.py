@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import json
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from deborgen.core.wire import (
+    JSON_TYPE,
+    MIN_COMPRESS_BYTES,
+    MSGPACK_TYPE,
+    WIRE_HEADER,
+    UnsupportedEncodingError,
+    WireDecodeError,
+    advertised,
+    choose_encoding,
+    compress,
+    decompress,
+    has_msgpack,
+    msgpack_to_json,
+    pack,
+    parse_tokens,
+)
+
+
+class WireMiddleware:
+    """Decode compressed or MessagePack request bodies and encode responses to match.
+
+    Requests are turned back into plain JSON before routing, so endpoints and their
+    pydantic models never see the wire format. JSON responses are re-encoded as
+    MessagePack when the client accepts it (successful responses only, so errors
+    stay readable) and compressed when they are large enough to be worth it.
+    Anything else, including streaming responses, passes through untouched.
+    """
+
+    def __init__(self, app: ASGIApp, min_compress_bytes: int = MIN_COMPRESS_BYTES) -> None:
+        self.app = app
+        self.min_compress_bytes = min_compress_bytes
+        self.advertised = advertised()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        content_encoding = headers.get("content-encoding", "identity").strip().lower()
+        is_msgpack = headers.get("content-type", "").startswith(MSGPACK_TYPE)
+        if content_encoding != "identity" or is_msgpack:
+            body = await read_body(receive)
+            try:
+                if content_encoding != "identity":
+                    body = decompress(body, content_encoding)
+                if is_msgpack:
+                    body = msgpack_to_json(body)
+            except WireDecodeError as exc:
+                status_code = 415 if isinstance(exc, UnsupportedEncodingError) else 400
+                response = JSONResponse({"detail": str(exc)}, status_code=status_code)
+                response.headers[WIRE_HEADER] = self.advertised
+                await response(scope, receive, send)
+                return
+            scope = dict(scope)
+            request_headers = MutableHeaders(scope=scope)
+            del request_headers["content-encoding"]
+            request_headers["content-type"] = JSON_TYPE
+            request_headers["content-length"] = str(len(body))
+            receive = replay(body)
+
+        encoding = choose_encoding(headers.get("accept-encoding", ""))
+        wants_msgpack = has_msgpack() and MSGPACK_TYPE in parse_tokens(headers.get("accept", ""))
+        await self.app(scope, receive, ResponseEncoder(send, self, encoding, wants_msgpack))
+
+
+async def read_body(receive: Receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            return b"".join(chunks)
+
+
+def replay(body: bytes) -> Receive:
+    sent = False
+
+    async def receive() -> Message:
+        nonlocal sent
+        if sent:
+            return {"type": "http.disconnect"}
+        sent = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    return receive
+
+
+class ResponseEncoder:
+    """ASGI `send` wrapper that buffers a JSON response and re-encodes it."""
+
+    def __init__(
+        self, send: Send, middleware: WireMiddleware, encoding: str | None, wants_msgpack: bool
+    ) -> None:
+        self.send = send
+        self.middleware = middleware
+        self.encoding = encoding
+        self.wants_msgpack = wants_msgpack
+        self.start: Message | None = None
+        self.chunks: list[bytes] = []
+        self.passthrough = False
+
+    async def __call__(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            headers = MutableHeaders(raw=message["headers"])
+            headers[WIRE_HEADER] = self.middleware.advertised
+            buffer = (self.encoding is not None or self.wants_msgpack) and (
+                headers.get("content-type", "").startswith(JSON_TYPE)
+                and "content-encoding" not in headers
+            )
+            if not buffer:
+                self.passthrough = True
+                await self.send(message)
+                return
+            self.start = message
+            return
+        if self.passthrough or message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        self.chunks.append(message.get("body", b""))
+        if message.get("more_body", False):
+            return
+        assert self.start is not None
+        body = b"".join(self.chunks)
+        headers = MutableHeaders(raw=self.start["headers"])
+        if self.wants_msgpack and self.start["status"] < 400 and body:
+            body = pack(json.loads(body))
+            headers["content-type"] = MSGPACK_TYPE
+        if self.encoding is not None and len(body) >= self.middleware.min_compress_bytes:
+            body = compress(body, self.encoding)
+            headers["content-encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        headers.add_vary_header("Accept")
+        headers["content-length"] = str(len(body))
+        await self.send(self.start)
+        await self.send({"type": "http.response.body", "body": body, "more_body": False})
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import random
+
+import httpx
+
+# Responses a coordinator sends when it sheds load; see coordinator.admission.
+OVERLOADED_STATUSES = frozenset({429, 503})
+
+
+class PollBackoff:
+    """How long to wait before the next try after a claim that found no job or failed,
+    or after a request an overloaded coordinator shed.
+
+    The wait doubles from `base` up to `maximum` with each such poll in a row, and is
+    drawn at random from its upper half, so workers that started polling together
+    (after a coordinator restart, say) drift apart instead of arriving in waves. A
+    claim that gets a job resets it. A `Retry-After` from an overloaded coordinator is
+    a floor, stretched by up to half again.
+    """
+
+    def __init__(self, base: float, maximum: float, factor: float = 2.0) -> None:
+        self.base = base
+        self.maximum = max(maximum, base)
+        self.factor = factor
+        self._misses = 0
+
+    def reset(self) -> None:
+        self._misses = 0
+
+    def next(self, retry_after: float | None = None) -> float:
+        ceiling = min(self.base * self.factor**self._misses, self.maximum)
+        if ceiling < self.maximum:
+            self._misses += 1
+        delay = random.uniform(ceiling / 2, ceiling)
+        if retry_after is not None:
+            delay = max(delay, retry_after * random.uniform(1.0, 1.5))
+        return delay
+
+
+def retry_after(response: httpx.Response) -> float | None:
+    """The `Retry-After` of an overloaded response, in seconds, if it gave one."""
+    if response.status_code not in OVERLOADED_STATUSES:
+        return None
+    try:
+        return max(float(response.headers["Retry-After"]), 0.0)
+    except (KeyError, ValueError):
+        return None  # Absent, or an HTTP date, which the coordinator does not send.
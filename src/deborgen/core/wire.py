@@ -0,0 +1,203 @@
+"""Body encodings shared by the coordinator and its HTTP clients.
+
+JSON stays the default. MessagePack (`application/msgpack`) and zstd need the
+optional `msgpack` / `zstandard` packages (`pip install 'deborgen[wire]'`);
+gzip is always available. Peers advertise what they can decode in the
+`X-Deborgen-Wire` response header, so clients only send an encoding the
+coordinator has said it understands.
+"""
+
+from __future__ import annotations
+
+import gzip
+import io
+import json
+import zlib
+from typing import Any
+
+import httpx
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - depends on the environment
+    msgpack = None  # type: ignore[assignment, unused-ignore]
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - depends on the environment
+    zstandard = None  # type: ignore[assignment, unused-ignore]
+
+JSON_TYPE = "application/json"
+MSGPACK_TYPE = "application/msgpack"
+WIRE_HEADER = "X-Deborgen-Wire"
+# Below this, compression costs more CPU than the bytes it saves are worth.
+MIN_COMPRESS_BYTES = 1024
+# Refuse request bodies that inflate past this, so a small upload cannot exhaust memory.
+MAX_DECODED_BYTES = 64 * 1024 * 1024
+
+
+class WireDecodeError(ValueError):
+    pass
+
+
+class UnsupportedEncodingError(WireDecodeError):
+    pass
+
+
+def has_msgpack() -> bool:
+    return msgpack is not None
+
+
+def content_encodings() -> list[str]:
+    """Encodings this process can compress and decompress, best first."""
+    return ["zstd", "gzip"] if zstandard is not None else ["gzip"]
+
+
+def advertised() -> str:
+    """Value for `X-Deborgen-Wire`: body formats and encodings we accept."""
+    return ", ".join(([MSGPACK_TYPE] if has_msgpack() else []) + content_encodings())
+
+
+def parse_tokens(header: str) -> list[str]:
+    """Lowercased tokens of a comma-separated header, dropping `q=0` entries."""
+    tokens = []
+    for part in header.split(","):
+        token, _, params = part.partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        if params.replace(" ", "").lower() in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        tokens.append(token)
+    return tokens
+
+
+def choose_encoding(accept_encoding: str) -> str | None:
+    """Best encoding we support from an `Accept-Encoding` header."""
+    accepted = parse_tokens(accept_encoding)
+    return next((encoding for encoding in content_encodings() if encoding in accepted), None)
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "gzip":
+        # Level 6 is gzip's default trade-off; log text compresses well below it.
+        return gzip.compress(body, compresslevel=6, mtime=0)
+    if encoding == "zstd" and zstandard is not None:
+        return bytes(zstandard.ZstdCompressor(level=3).compress(body))
+    raise ValueError(f"unsupported content encoding: {encoding}")
+
+
+def decompress(body: bytes, encoding: str, limit: int = MAX_DECODED_BYTES) -> bytes:
+    try:
+        if encoding == "gzip":
+            decompressor = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+            decoded = decompressor.decompress(body, limit + 1)
+        elif encoding == "zstd" and zstandard is not None:
+            with zstandard.ZstdDecompressor().stream_reader(io.BytesIO(body)) as reader:
+                decoded = reader.read(limit + 1)
+        else:
+            raise UnsupportedEncodingError(f"unsupported content encoding: {encoding}")
+    except (zlib.error, OSError) as exc:
+        raise WireDecodeError(f"invalid {encoding} body: {exc}") from exc
+    except Exception as exc:
+        if zstandard is not None and isinstance(exc, zstandard.ZstdError):
+            raise WireDecodeError(f"invalid {encoding} body: {exc}") from exc
+        raise
+    if len(decoded) > limit:
+        raise WireDecodeError("decoded body is too large")
+    return decoded
+
+
+def pack(value: Any) -> bytes:
+    if msgpack is None:
+        raise RuntimeError("MessagePack support needs the msgpack package")
+    return bytes(msgpack.packb(value, use_bin_type=True))
+
+
+def unpack(body: bytes) -> Any:
+    if msgpack is None:
+        raise UnsupportedEncodingError("MessagePack support needs the msgpack package")
+    try:
+        return msgpack.unpackb(body, raw=False)
+    except (ValueError, msgpack.UnpackException) as exc:
+        raise WireDecodeError(f"invalid MessagePack body: {exc}") from exc
+
+
+def msgpack_to_json(body: bytes) -> bytes:
+    return json.dumps(unpack(body), separators=(",", ":")).encode()
+
+
+class PackedResponse(httpx.Response):
+    """A response whose body is MessagePack; `json()` decodes it."""
+
+    def json(self, **kwargs: Any) -> Any:
+        return unpack(self.content)
+
+
+class WireClient(httpx.Client):
+    """`httpx.Client` that negotiates compact encodings with the coordinator.
+
+    It asks for MessagePack responses (httpx already decompresses gzip and, with
+    `zstandard` installed, zstd). JSON request bodies are sent as MessagePack and
+    compressed only after a response's `X-Deborgen-Wire` header shows the
+    coordinator accepts them, so older coordinators keep getting plain JSON.
+    Callers keep using `response.json()` either way.
+    """
+
+    def __init__(
+        self, *args: Any, compact: bool = True, min_compress_bytes: int = MIN_COMPRESS_BYTES, **kwargs: Any
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.compact = compact
+        self.min_compress_bytes = min_compress_bytes
+        self.peer_accepts: frozenset[str] = frozenset()
+        if compact and has_msgpack():
+            self.headers["Accept"] = f"{MSGPACK_TYPE}, {JSON_TYPE}"
+
+    def send(self, request: httpx.Request, **kwargs: Any) -> httpx.Response:
+        if not self.compact:
+            return super().send(request, **kwargs)
+        response = super().send(self.encode_request(request), **kwargs)
+        wire = response.headers.get(WIRE_HEADER)
+        if wire is not None:
+            self.peer_accepts = frozenset(parse_tokens(wire))
+        if kwargs.get("stream") or not response.headers.get("content-type", "").startswith(MSGPACK_TYPE):
+            return response
+        # The body is already decompressed, so drop the headers that describe the wire form.
+        headers = [
+            (key, value)
+            for key, value in response.headers.multi_items()
+            if key.lower() not in ("content-encoding", "content-length")
+        ]
+        return PackedResponse(
+            response.status_code,
+            headers=headers,
+            content=response.content,
+            request=response.request,
+            extensions=response.extensions,
+        )
+
+    def encode_request(self, request: httpx.Request) -> httpx.Request:
+        if "content-encoding" in request.headers or not request.headers.get(
+            "content-type", ""
+        ).startswith(JSON_TYPE):
+            return request
+        try:
+            body = request.content
+        except httpx.RequestNotRead:
+            return request
+        headers = httpx.Headers(request.headers)
+        encoded = body
+        if MSGPACK_TYPE in self.peer_accepts and has_msgpack():
+            encoded = pack(json.loads(body))
+            headers["Content-Type"] = MSGPACK_TYPE
+        encoding = next((name for name in content_encodings() if name in self.peer_accepts), None)
+        if encoding is not None and len(encoded) >= self.min_compress_bytes:
+            encoded = compress(encoded, encoding)
+            headers["Content-Encoding"] = encoding
+        if encoded is body:
+            return request
+        del headers["Content-Length"]
+        return httpx.Request(
+            request.method, request.url, headers=headers, content=encoded, extensions=request.extensions
+        )
@@ -6,17 +6,42 @@ import os
 import platform
 import shlex
 import shutil
+import signal
 import subprocess
 import tempfile
+import threading
 import time
-from datetime import datetime
+import zipfile
+from collections import OrderedDict
+from datetime import UTC, datetime, timedelta
+from datetime import time as clock_time
 from pathlib import Path
+from types import FrameType
 from typing import Any
 
 import httpx
 
+from deborgen.core.backoff import PollBackoff, retry_after
+from deborgen.core.wire import WireClient
+from deborgen.worker.envpool import EnvPool
+from deborgen.worker.limits import (
+    ResourceLimits,
+    job_limits,
+    over_memory_limit,
+    parse_cpu_list,
+    session_rss_bytes,
+)
+from deborgen.worker.pyexec import CHECKPOINT_ENV, PREEMPTED_REASON, InterpreterPool
+from deborgen.worker.usage import JobUsage, node_load
+
 LabelValue = str | int | float | bool
 
+# How often a running job checks for timeout and cancellation.
+JOB_POLL_SECONDS = 0.5
+# Without a memory limit, a job's session RSS is walked for its usage metrics at
+# doubling intervals up to this, rather than on every poll.
+USAGE_SAMPLE_MAX_SECONDS = 10.0
+
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="deborgen v0 worker agent")
@@ -30,6 +55,12 @@ def parse_args() -> argparse.Namespace:
     )
     parser.add_argument("--token", default=None, help="Bearer token")
     parser.add_argument("--poll-seconds", type=float, default=2.0, help="Poll interval when queue is empty")
+    parser.add_argument(
+        "--poll-max-seconds",
+        type=float,
+        default=15.0,
+        help="Longest wait between polls while the queue stays empty or the coordinator is failing",
+    )
     parser.add_argument(
         "--work-dir",
         default=None,
@@ -46,6 +77,93 @@ def parse_args() -> argparse.Namespace:
         default=None,
         help="Optional time window to accept jobs (e.g. '22:00-08:00' or '09:00-17:00')",
     )
+    parser.add_argument(
+        "--preempt-grace-seconds",
+        type=float,
+        default=30.0,
+        help="How long a preempted job gets after SIGTERM to write its checkpoint",
+    )
+    parser.add_argument(
+        "--warm-keys-max",
+        type=int,
+        default=32,
+        help="How many recently run affinity keys to report as warm (0 disables)",
+    )
+    parser.add_argument(
+        "--env-pool-dir",
+        default=None,
+        help="Keep reusable environments for `uv run` jobs here, keyed by uv.lock hash",
+    )
+    parser.add_argument(
+        "--env-pool-max-gb",
+        type=float,
+        default=20.0,
+        help="Disk budget for --env-pool-dir; least recently used environments are evicted",
+    )
+    parser.add_argument(
+        "--python-workers",
+        type=int,
+        default=1,
+        help="Long-lived interpreters kept for `python` (module:function) jobs; 0 disables them",
+    )
+    parser.add_argument(
+        "--python-preload",
+        default="",
+        help="Comma-separated modules imported once before interpreters fork, e.g. 'numpy,pandas'",
+    )
+    parser.add_argument(
+        "--python-max-tasks",
+        type=int,
+        default=100,
+        help="Replace an interpreter after this many tasks",
+    )
+    parser.add_argument(
+        "--python-max-growth-mb",
+        type=float,
+        default=512.0,
+        help="Replace an interpreter once its memory grows this much past its startup size",
+    )
+    parser.add_argument(
+        "--cpus",
+        default=None,
+        help="Pin this worker and its jobs to these CPUs, e.g. '0-3' (Linux only)",
+    )
+    parser.add_argument(
+        "--max-memory-mb",
+        type=int,
+        default=None,
+        help="Kill a job whose processes together use more resident memory than this",
+    )
+    parser.add_argument(
+        "--max-cpu-seconds",
+        type=int,
+        default=None,
+        help="CPU-time limit for each process a job starts",
+    )
+    parser.add_argument(
+        "--max-load",
+        type=float,
+        default=None,
+        help="Only take long-queued jobs while the 1-minute load average is above this",
+    )
+    parser.add_argument(
+        "--min-free-memory-mb",
+        type=int,
+        default=None,
+        help="Take no jobs while less memory than this is available",
+    )
+    parser.add_argument(
+        "--min-free-disk-mb",
+        type=int,
+        default=None,
+        help="Take no jobs while the work dir's disk has less free space than this",
+    )
+    parser.add_argument(
+        "--wire",
+        choices=["auto", "json"],
+        default="auto",
+        help="auto negotiates MessagePack and compression with the coordinator; json sends plain JSON",
+    )
     return parser.parse_args()
 
 
@@ -53,6 +171,12 @@ def run_job(
     command: str,
     timeout_seconds: int,
     work_dir: str | None = None,
+    cancel: threading.Event | None = None,
+    env: dict[str, str] | None = None,
+    preempt: threading.Event | None = None,
+    grace_seconds: float = 30.0,
+    limits: ResourceLimits | None = None,
+    usage: JobUsage | None = None,
 ) -> tuple[int, str, str | None]:
     try:
         argv = shlex.split(command)
@@ -63,23 +187,177 @@ def run_job(
         return 2, "", "invalid command: empty command"
 
     try:
-        completed = subprocess.run(
+        process = subprocess.Popen(
             argv,
-            check=False,
-            capture_output=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
             text=True,
-            timeout=timeout_seconds,
             cwd=work_dir,
+            env=env,
+            # Its own session, so a Ctrl-C meant for the worker does not kill the job
+            # before it can be preempted.
+            start_new_session=True,
         )
-        text = (completed.stdout or "") + (completed.stderr or "")
-        return completed.returncode, text, None
     except FileNotFoundError:
         return 127, "", f"command not found: {argv[0]}"
-    except subprocess.TimeoutExpired as exc:
-        stdout = exc.stdout.decode() if isinstance(exc.stdout, bytes) else (exc.stdout or "")
-        stderr = exc.stderr.decode() if isinstance(exc.stderr, bytes) else (exc.stderr or "")
-        output = stdout + stderr
-        return 124, output, f"timeout exceeded ({timeout_seconds}s)"
+    if limits is not None:
+        limits.apply(process.pid)
+
+    enforce_memory = limits is not None and limits.memory_mb is not None
+    deadline = time.monotonic() + timeout_seconds
+    sample_interval = JOB_POLL_SECONDS
+    next_sample = time.monotonic()
+    while True:
+        try:
+            stdout, stderr = process.communicate(
+                timeout=max(min(JOB_POLL_SECONDS, deadline - time.monotonic()), 0)
+            )
+            failure_reason = limits.cpu_failure(process.returncode) if limits is not None else None
+            return process.returncode, (stdout or "") + (stderr or ""), failure_reason
+        except subprocess.TimeoutExpired:
+            rss = None
+            if enforce_memory or (usage is not None and time.monotonic() >= next_sample):
+                rss = session_rss_bytes(process.pid)
+                next_sample = time.monotonic() + sample_interval
+                sample_interval = min(sample_interval * 2, USAGE_SAMPLE_MAX_SECONDS)
+            if usage is not None:
+                usage.sample(rss)
+            if cancel is not None and cancel.is_set():
+                failure_reason = "cancelled: another node finished this job first"
+                exit_code = 130
+            elif preempt is not None and preempt.is_set():
+                # SIGTERM asks the job to write its checkpoint; SIGKILL after the grace period.
+                # Both go to the whole session, since a wrapper script's children are the
+                # ones doing the work.
+                signal_session(process, signal.SIGTERM)
+                try:
+                    stdout, stderr = process.communicate(timeout=grace_seconds)
+                except subprocess.TimeoutExpired:
+                    signal_session(process, signal.SIGKILL)
+                    stdout, stderr = process.communicate()
+                return process.returncode, (stdout or "") + (stderr or ""), PREEMPTED_REASON
+            elif time.monotonic() >= deadline:
+                failure_reason = f"timeout exceeded ({timeout_seconds}s)"
+                exit_code = 124
+            elif limits is not None and over_memory_limit(rss, limits):
+                failure_reason = f"memory limit exceeded ({limits.memory_mb} MB)"
+                exit_code = 137
+            else:
+                continue
+            # Kill the whole session: a background child that outlives the job still holds
+            # the pipes, and communicate() would wait for it.
+            signal_session(process, signal.SIGKILL)
+            stdout, stderr = process.communicate()
+            return exit_code, (stdout or "") + (stderr or ""), failure_reason
+
+
+def signal_session(process: subprocess.Popen[str], signum: int) -> None:
+    """Signal every process in a job's session, which may have exited already."""
+    try:
+        os.killpg(process.pid, signum)
+    except ProcessLookupError:
+        pass
+
+
+class JobCancellation:
+    """Hands cancel signals from the heartbeat thread to the job being run."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._job_id: str | None = None
+        self._event = threading.Event()
+
+    def start(self, job_id: str) -> threading.Event:
+        with self._lock:
+            self._job_id = job_id
+            self._event = threading.Event()
+            return self._event
+
+    def finish(self) -> None:
+        with self._lock:
+            self._job_id = None
+
+    @property
+    def running(self) -> bool:
+        with self._lock:
+            return self._job_id is not None
+
+    def cancel(self, job_ids: list[str]) -> None:
+        with self._lock:
+            if self._job_id is not None and self._job_id in job_ids:
+                print(f"[worker] cancelling {self._job_id}: another node finished it first")
+                self._event.set()
+
+
+class JobPreemption:
+    """Asks the running job to checkpoint and stop, so it can resume on another node.
+
+    The heartbeat thread preempts the job when the node's work hours end. SIGTERM or
+    SIGINT (the owner taking the machine back) preempts it and then stops the worker;
+    a second signal exits at once.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._job_id: str | None = None
+        self._event = threading.Event()
+        self.stopping = threading.Event()
+
+    def start(self, job_id: str) -> threading.Event:
+        with self._lock:
+            self._job_id = job_id
+            self._event = threading.Event()
+            if self.stopping.is_set():
+                self._event.set()
+            return self._event
+
+    def finish(self) -> None:
+        with self._lock:
+            self._job_id = None
+
+    def preempt(self, reason: str) -> None:
+        with self._lock:
+            if self._job_id is not None and not self._event.is_set():
+                print(f"[worker] preempting {self._job_id}: {reason}")
+                self._event.set()
+
+    def handle_signal(self, signum: int, frame: FrameType | None) -> None:
+        if self.stopping.is_set():
+            raise KeyboardInterrupt
+        print("[worker] stopping; signal again to exit without handing back the running job")
+        self.stopping.set()
+        self.preempt("worker is stopping")
+
+
+class WarmKeys:
+    """Affinity keys this node reports warm in its heartbeats.
+
+    Caches a job fills (package downloads, clones, build outputs) outlive the job on
+    this machine, so the keys of recently run jobs are the node's best guess at what
+    is warm, alongside the lockfile keys held in its environment pool.
+    """
+
+    def __init__(self, limit: int, env_pool: EnvPool | None = None) -> None:
+        self._limit = limit
+        self._env_pool = env_pool
+        self._lock = threading.Lock()
+        self._keys: OrderedDict[str, None] = OrderedDict()
+
+    def add(self, key: str) -> None:
+        if self._limit <= 0:
+            return
+        with self._lock:
+            self._keys[key] = None
+            self._keys.move_to_end(key)
+            while len(self._keys) > self._limit:
+                self._keys.popitem(last=False)
+
+    def snapshot(self) -> list[str]:
+        with self._lock:
+            keys = set(self._keys)
+        if self._env_pool is not None:
+            keys.update(self._env_pool.keys())
+        return sorted(keys)
 
 
 def parse_labels(labels_json: str) -> dict[str, LabelValue]:
@@ -93,7 +371,8 @@ def parse_labels(labels_json: str) -> dict[str, LabelValue]:
     labels["os"] = platform.system().lower()
     labels["arch"] = platform.machine().lower()
     
-    cpu_cores = os.cpu_count()
+    # The CPUs this process may run on, which --cpus narrows.
+    cpu_cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
     if cpu_cores is not None:
         labels["cpu_cores"] = cpu_cores
 
@@ -108,27 +387,93 @@ def parse_labels(labels_json: str) -> dict[str, LabelValue]:
     return labels
 
 
-def send_heartbeat(client: httpx.Client, node_id: str, name: str | None, labels: dict[str, LabelValue]) -> None:
-    client.post(
-        f"/nodes/{node_id}/heartbeat",
-        json={
-            "name": name,
-            "labels": labels,
-        },
-    ).raise_for_status()
+def send_heartbeat(
+    client: httpx.Client,
+    node_id: str,
+    name: str | None,
+    labels: dict[str, LabelValue],
+    warm_keys: list[str] | None = None,
+    available_until: datetime | None = None,
+    load: dict[str, float | int] | None = None,
+    thresholds: dict[str, float | int] | None = None,
+) -> list[str]:
+    body: dict[str, Any] = {
+        "name": name,
+        "labels": labels,
+    }
+    if warm_keys is not None:
+        body["warm_keys"] = warm_keys
+    if available_until is not None:
+        body["available_until"] = available_until.isoformat()
+    if load is not None:
+        body["load"] = load
+    if thresholds:
+        body["thresholds"] = thresholds
+    response = client.post(f"/nodes/{node_id}/heartbeat", json=body)
+    response.raise_for_status()
+    payload: dict[str, Any] = response.json()
+    return [str(job_id) for job_id in payload.get("cancelled_jobs", [])]
+
+
+def heartbeat_loop(
+    client: httpx.Client,
+    node_id: str,
+    name: str | None,
+    labels: dict[str, LabelValue],
+    heartbeat_seconds: float,
+    stop: threading.Event,
+    cancellation: JobCancellation,
+    warm_keys: WarmKeys,
+    work_hours: str | None = None,
+    preemption: JobPreemption | None = None,
+    work_dir: str | None = None,
+    thresholds: dict[str, float | int] | None = None,
+) -> None:
+    # Runs on its own thread so heartbeats keep renewing the node's leases while a
+    # job is executing, and so a job still running when work hours end is preempted.
+    while True:
+        if preemption is not None and not is_within_work_hours(datetime.now(), work_hours):
+            preemption.preempt("work hours ended")
+        try:
+            cancelled = send_heartbeat(
+                client=client,
+                node_id=node_id,
+                name=name,
+                labels=labels,
+                warm_keys=warm_keys.snapshot(),
+                available_until=work_hours_end(datetime.now(), work_hours),
+                load=node_load(work_dir, int(cancellation.running)),
+                thresholds=thresholds,
+            )
+            cancellation.cancel(cancelled)
+        except httpx.HTTPError as exc:
+            print(f"[worker] heartbeat failed: {exc}")
+        if stop.wait(heartbeat_seconds):
+            return
 
 
-def is_within_work_hours(now: datetime, work_hours_str: str | None) -> bool:
+def parse_work_hours(work_hours_str: str | None) -> tuple[clock_time, clock_time] | None:
+    """Start and end of an 'HH:MM-HH:MM' window, or None if unset or malformed."""
     if not work_hours_str:
-        return True
-        
+        return None
     try:
         start_str, end_str = work_hours_str.split("-")
         start_time = datetime.strptime(start_str.strip(), "%H:%M").time()
         end_time = datetime.strptime(end_str.strip(), "%H:%M").time()
     except ValueError:
+        return None
+    return start_time, end_time
+
+
+def is_within_work_hours(now: datetime, work_hours_str: str | None) -> bool:
+    if not work_hours_str:
+        return True
+        
+    window = parse_work_hours(work_hours_str)
+    if window is None:
         print(f"[worker] warning: invalid --work-hours format '{work_hours_str}'. Expected 'HH:MM-HH:MM'. Ignoring.")
         return True
+    start_time, end_time = window
         
     current_time = now.time()
     
@@ -140,6 +485,21 @@ def is_within_work_hours(now: datetime, work_hours_str: str | None) -> bool:
         return current_time >= start_time or current_time <= end_time
 
 
+def work_hours_end(now: datetime, work_hours_str: str | None) -> datetime | None:
+    """When the current (or, between windows, the next) work-hours window closes.
+
+    `now` is local time, as for `is_within_work_hours`; the result is in UTC so the
+    coordinator can compare it with its own clock. None means there is no window.
+    """
+    window = parse_work_hours(work_hours_str)
+    if window is None or window[0] == window[1]:
+        return None
+    end_at = datetime.combine(now.date(), window[1])
+    if now.time() > window[1]:
+        end_at += timedelta(days=1)
+    return end_at.astimezone(UTC)
+
+
 def worker_loop(
     coordinator: str,
     node_id: str,
@@ -150,150 +510,370 @@ def worker_loop(
     work_dir: str | None,
     heartbeat_seconds: float,
     work_hours: str | None,
+    warm_keys_max: int = 32,
+    env_pool_dir: str | None = None,
+    env_pool_max_gb: float = 20.0,
+    python_pool: InterpreterPool | None = None,
+    compact_wire: bool = True,
+    preemption: JobPreemption | None = None,
+    preempt_grace_seconds: float = 30.0,
+    job_caps: ResourceLimits | None = None,
+    thresholds: dict[str, float | int] | None = None,
+    poll_max_seconds: float | None = None,
 ) -> None:
     headers: dict[str, str] = {}
+    preemption = preemption or JobPreemption()
     if token:
         headers["Authorization"] = f"Bearer {token}"
 
-    with httpx.Client(base_url=coordinator.rstrip("/"), headers=headers, timeout=30.0) as client:
-        next_heartbeat = 0.0
-        while True:
-            now = time.monotonic()
-            if now >= next_heartbeat:
-                try:
-                    send_heartbeat(client=client, node_id=node_id, name=name, labels=labels)
-                except httpx.HTTPError as exc:
-                    print(f"[worker] heartbeat failed: {exc}")
-                next_heartbeat = now + heartbeat_seconds
-
-            if not is_within_work_hours(datetime.now(), work_hours):
-                time.sleep(poll_seconds)
-                continue
+    with WireClient(
+        base_url=coordinator.rstrip("/"), headers=headers, timeout=30.0, compact=compact_wire
+    ) as client:
+        stop_heartbeat = threading.Event()
+        cancellation = JobCancellation()
+        env_pool = EnvPool(env_pool_dir, int(env_pool_max_gb * 1e9)) if env_pool_dir else None
+        warm_keys = WarmKeys(warm_keys_max, env_pool)
+        heartbeat_thread = threading.Thread(
+            target=heartbeat_loop,
+            args=(
+                client,
+                node_id,
+                name,
+                labels,
+                heartbeat_seconds,
+                stop_heartbeat,
+                cancellation,
+                warm_keys,
+                work_hours,
+                preemption,
+                work_dir,
+                thresholds,
+            ),
+            name="deborgen-heartbeat",
+            daemon=True,
+        )
+        heartbeat_thread.start()
+        try:
+            poll_jobs(
+                client,
+                node_id,
+                poll_seconds,
+                work_dir,
+                work_hours,
+                cancellation,
+                warm_keys,
+                env_pool,
+                python_pool,
+                preemption,
+                preempt_grace_seconds,
+                job_caps,
+                poll_max_seconds,
+            )
+        finally:
+            stop_heartbeat.set()
+            heartbeat_thread.join()
 
-            try:
-                response = client.get("/jobs/next", params={"node_id": node_id})
-            except httpx.HTTPError as exc:
-                print(f"[worker] poll failed: {exc}")
-                time.sleep(poll_seconds)
-                continue
 
-            if response.status_code == 204:
-                time.sleep(poll_seconds)
-                continue
+def is_unknown_route(response: httpx.Response) -> bool:
+    """Whether the coordinator lacks the endpoint, as opposed to rejecting the call."""
+    if response.status_code == 405:
+        return True
+    if response.status_code != 404:
+        return False
+    try:
+        detail = response.json().get("detail")
+    except ValueError:
+        return True
+    # FastAPI answers unknown routes with "Not Found"; a missing job is "job not found".
+    return bool(detail == "Not Found")
 
-            if response.status_code != 200:
-                print(f"[worker] poll returned {response.status_code}: {response.text}")
-                time.sleep(poll_seconds)
-                continue
 
-            payload: dict[str, Any] = response.json()
-            job: dict[str, Any] = payload["job"]
-            lease_token = payload["lease_token"]
+def report_separately(
+    client: httpx.Client,
+    job_id: str,
+    finish: dict[str, Any],
+    log_text: str,
+    artifact_urls: list[str],
+) -> None:
+    """Report a finished job through the older logs, artifacts and finish endpoints."""
+    lease = {"node_id": finish["node_id"], "lease_token": finish["lease_token"]}
+    if log_text:
+        try:
+            client.post(f"/jobs/{job_id}/logs", json={**lease, "text": log_text}).raise_for_status()
+        except httpx.HTTPError as exc:
+            print(f"[worker] log upload failed for {job_id}: {exc}")
+    for url in artifact_urls:
+        try:
+            client.post(f"/jobs/{job_id}/artifacts", json={**lease, "url": url}).raise_for_status()
+        except httpx.HTTPError as exc:
+            print(f"[worker] artifact record failed for {job_id}: {exc}")
+    client.post(f"/jobs/{job_id}/finish", json=finish).raise_for_status()
+
+
+def upload_directory(
+    client: httpx.Client, job_id: str, lease: dict[str, str], root_dir: str, filename: str
+) -> str:
+    """Zip `root_dir`, upload it through a presigned URL and return its download URL."""
+    zip_path = shutil.make_archive(
+        base_name=os.path.join(tempfile.gettempdir(), f"{job_id}_{Path(filename).stem}"),
+        format="zip",
+        root_dir=root_dir,
+    )
+    try:
+        presign_resp = client.post(
+            f"/jobs/{job_id}/artifacts/presign", json={**lease, "filename": filename}
+        )
+        presign_resp.raise_for_status()
+        urls = presign_resp.json()
+        with open(zip_path, "rb") as f:
+            # Use a separate client for the S3 upload to avoid sending our Bearer token
+            upload_resp = httpx.put(urls["upload_url"], content=f, timeout=300.0)
+            upload_resp.raise_for_status()
+        return str(urls["download_url"])
+    finally:
+        os.remove(zip_path)
+
+
+def restore_checkpoint(checkpoint_url: str, checkpoint_dir: str) -> None:
+    with tempfile.TemporaryFile() as archive:
+        with httpx.stream("GET", checkpoint_url, timeout=300.0) as response:
+            response.raise_for_status()
+            for chunk in response.iter_bytes():
+                archive.write(chunk)
+        archive.seek(0)
+        with zipfile.ZipFile(archive) as checkpoint:
+            checkpoint.extractall(checkpoint_dir)
+
+
+def hand_back(
+    client: httpx.Client, job_id: str, lease: dict[str, str], checkpoint_dir: str, log_text: str
+) -> None:
+    """Upload a preempted job's checkpoint, if it wrote one, and requeue the job."""
+    checkpoint_url: str | None = None
+    if any(Path(checkpoint_dir).iterdir()):
+        try:
+            checkpoint_url = upload_directory(client, job_id, lease, checkpoint_dir, "checkpoint.zip")
+            print(f"[worker] uploaded checkpoint for {job_id}")
+        except Exception as exc:
+            print(f"[worker] checkpoint upload failed for {job_id}: {exc}")
+    try:
+        client.post(
+            f"/jobs/{job_id}/preempt",
+            json={**lease, "checkpoint_url": checkpoint_url, "logs": log_text},
+        ).raise_for_status()
+        print(f"[worker] handed back {job_id}")
+    except httpx.HTTPError as exc:
+        print(f"[worker] preempt failed for {job_id}: {exc}")
 
-            job_id = str(job["id"])
-            command = str(job["command"])
-            timeout_seconds = int(job.get("timeout_seconds", 3600))
-            print(f"[worker] running {job_id}: {command}")
 
-            with tempfile.TemporaryDirectory(dir=work_dir) as job_work_dir:
+def poll_jobs(
+    client: httpx.Client,
+    node_id: str,
+    poll_seconds: float,
+    work_dir: str | None,
+    work_hours: str | None,
+    cancellation: JobCancellation,
+    warm_keys: WarmKeys,
+    env_pool: EnvPool | None = None,
+    python_pool: InterpreterPool | None = None,
+    preemption: JobPreemption | None = None,
+    preempt_grace_seconds: float = 30.0,
+    job_caps: ResourceLimits | None = None,
+    poll_max_seconds: float | None = None,
+) -> None:
+    preemption = preemption or JobPreemption()
+    job_caps = job_caps or ResourceLimits()
+    backoff = PollBackoff(poll_seconds, poll_max_seconds or poll_seconds)
+    # Cleared the first time the coordinator turns out to predate /complete.
+    use_complete = True
+    while True:
+        if preemption.stopping.is_set():
+            return
+        if not is_within_work_hours(datetime.now(), work_hours):
+            time.sleep(poll_seconds)
+            continue
+
+        try:
+            response = client.get("/jobs/next", params={"node_id": node_id})
+        except httpx.HTTPError as exc:
+            print(f"[worker] poll failed: {exc}")
+            time.sleep(backoff.next())
+            continue
+
+        if response.status_code == 204:
+            time.sleep(backoff.next())
+            continue
+
+        if response.status_code != 200:
+            print(f"[worker] poll returned {response.status_code}: {response.text}")
+            time.sleep(backoff.next(retry_after(response)))
+            continue
+        backoff.reset()
+
+        payload: dict[str, Any] = response.json()
+        job: dict[str, Any] = payload["job"]
+        lease_token = payload["lease_token"]
+
+        job_id = str(job["id"])
+        command = str(job["command"])
+        timeout_seconds = int(job.get("timeout_seconds", 3600))
+        print(f"[worker] running {job_id}: {command}")
+
+        lease = {"node_id": node_id, "lease_token": lease_token}
+        cancelled = cancellation.start(job_id)
+        preempted = preemption.start(job_id)
+        failure_reason: str | None
+        metrics: dict[str, float | int | None] | None = None
+        with (
+            tempfile.TemporaryDirectory(dir=work_dir) as job_work_dir,
+            tempfile.TemporaryDirectory(dir=work_dir, prefix="deborgen-checkpoint-") as checkpoint_dir,
+        ):
+            if job.get("checkpoint_url"):
+                try:
+                    restore_checkpoint(str(job["checkpoint_url"]), checkpoint_dir)
+                    print(f"[worker] restored checkpoint for {job_id}")
+                except (httpx.HTTPError, zipfile.BadZipFile, OSError) as exc:
+                    print(f"[worker] checkpoint restore failed for {job_id}, starting over: {exc}")
+            if job.get("kind", "command") == "python":
+                if python_pool is None:
+                    exit_code, log_text, failure_reason = 2, "", "python jobs are disabled on this worker"
+                else:
+                    usage = JobUsage()
+                    exit_code, log_text, failure_reason = python_pool.run(
+                        entrypoint=command,
+                        args=job.get("args", {}),
+                        timeout_seconds=timeout_seconds,
+                        work_dir=job_work_dir,
+                        cancel=cancelled,
+                        checkpoint_dir=checkpoint_dir,
+                        preempt=preempted,
+                        grace_seconds=preempt_grace_seconds,
+                    )
+                    # The interpreter outlives the task, so only wall time is known.
+                    metrics = usage.finish(children=False)
+            else:
+                pooled = env_pool.acquire(command, job_work_dir) if env_pool is not None else None
+                env = {**os.environ, CHECKPOINT_ENV: checkpoint_dir}
+                if pooled is not None:
+                    env["UV_PROJECT_ENVIRONMENT"] = str(pooled.path)
+                usage = JobUsage()
                 exit_code, log_text, failure_reason = run_job(
                     command=command,
                     timeout_seconds=timeout_seconds,
                     work_dir=job_work_dir,
+                    cancel=cancelled,
+                    env=env,
+                    preempt=preempted,
+                    grace_seconds=preempt_grace_seconds,
+                    limits=job_limits(job.get("resources") or {}, job_caps),
+                    usage=usage,
                 )
+                metrics = usage.finish()
+                if env_pool is not None and pooled is not None:
+                    env_pool.release(pooled)
+            cancellation.finish()
+            preemption.finish()
+            if cancelled.is_set():
+                # The coordinator already dropped our lease; there is nothing to report.
+                continue
+            if failure_reason == PREEMPTED_REASON:
+                hand_back(client, job_id, lease, checkpoint_dir, log_text)
+                continue
+            if job.get("affinity_key"):
+                warm_keys.add(str(job["affinity_key"]))
 
-                # Check for artifacts
-                artifacts_found = any(Path(job_work_dir).iterdir())
-                
-                if log_text:
-                    try:
-                        client.post(
-                            f"/jobs/{job_id}/logs",
-                            json={
-                                "node_id": node_id,
-                                "lease_token": lease_token,
-                                "text": log_text,
-                            },
-                        ).raise_for_status()
-                    except httpx.HTTPError as exc:
-                        print(f"[worker] log upload failed for {job_id}: {exc}")
-
-                if artifacts_found:
-                    try:
-                        zip_path = shutil.make_archive(
-                            base_name=os.path.join(tempfile.gettempdir(), f"{job_id}_artifacts"),
-                            format="zip",
-                            root_dir=job_work_dir,
-                        )
-                        
-                        presign_resp = client.post(
-                            f"/jobs/{job_id}/artifacts/presign",
-                            json={
-                                "node_id": node_id,
-                                "lease_token": lease_token,
-                                "filename": "artifacts.zip",
-                            },
-                        )
-                        presign_resp.raise_for_status()
-                        urls = presign_resp.json()
-                        upload_url = urls["upload_url"]
-                        download_url = urls["download_url"]
-                        
-                        # Upload to S3
-                        with open(zip_path, "rb") as f:
-                            # Use a separate client for the S3 upload to avoid sending our Bearer token
-                            upload_resp = httpx.put(upload_url, content=f, timeout=300.0)
-                            upload_resp.raise_for_status()
-                            
-                        # Record with coordinator
-                        client.post(
-                            f"/jobs/{job_id}/artifacts",
-                            json={
-                                "node_id": node_id,
-                                "lease_token": lease_token,
-                                "url": download_url,
-                            },
-                        ).raise_for_status()
-                        
-                        print(f"[worker] uploaded artifacts for {job_id}")
-                    except Exception as exc:
-                        print(f"[worker] artifact upload failed for {job_id}: {exc}")
-                    finally:
-                        try:
-                            if 'zip_path' in locals() and os.path.exists(zip_path):
-                                os.remove(zip_path)
-                        except Exception:
-                            pass
-
-            try:
-                client.post(
-                    f"/jobs/{job_id}/finish",
-                    json={
-                        "node_id": node_id,
-                        "lease_token": lease_token,
-                        "exit_code": exit_code,
-                        "failure_reason": failure_reason,
-                    },
-                ).raise_for_status()
-                print(f"[worker] finished {job_id} exit_code={exit_code}")
-            except httpx.HTTPError as exc:
-                print(f"[worker] finish failed for {job_id}: {exc}")
+            # Check for artifacts
+            artifacts_found = any(Path(job_work_dir).iterdir())
+            artifact_urls: list[str] = []
+
+            if artifacts_found:
+                try:
+                    artifact_urls.append(
+                        upload_directory(client, job_id, lease, job_work_dir, "artifacts.zip")
+                    )
+                    print(f"[worker] uploaded artifacts for {job_id}")
+                except Exception as exc:
+                    print(f"[worker] artifact upload failed for {job_id}: {exc}")
+
+        finish = {
+            **lease,
+            "exit_code": exit_code,
+            "failure_reason": failure_reason,
+            "metrics": metrics,
+        }
+        try:
+            if use_complete:
+                response = client.post(
+                    f"/jobs/{job_id}/complete",
+                    json={**finish, "logs": log_text, "artifact_urls": artifact_urls},
+                )
+                if is_unknown_route(response):
+                    print("[worker] coordinator has no /complete endpoint; reporting in separate calls")
+                    use_complete = False
+                else:
+                    response.raise_for_status()
+            if not use_complete:
+                report_separately(client, job_id, finish, log_text, artifact_urls)
+            print(f"[worker] finished {job_id} exit_code={exit_code}")
+        except httpx.HTTPError as exc:
+            print(f"[worker] finish failed for {job_id}: {exc}")
 
 
 def main() -> None:
     args = parse_args()
+    if args.cpus is not None:
+        if not hasattr(os, "sched_setaffinity"):
+            raise SystemExit("--cpus needs Linux")
+        try:
+            # Inherited by every job and interpreter this worker starts.
+            os.sched_setaffinity(0, parse_cpu_list(args.cpus))
+        except (ValueError, OSError) as exc:
+            raise SystemExit(f"--cpus {args.cpus}: {exc}") from exc
     labels = parse_labels(args.labels_json)
-    worker_loop(
-        coordinator=args.coordinator,
-        node_id=args.node_id,
-        name=args.name,
-        labels=labels,
-        token=args.token,
-        poll_seconds=args.poll_seconds,
-        work_dir=args.work_dir,
-        heartbeat_seconds=args.heartbeat_seconds,
-        work_hours=args.work_hours,
-    )
+    python_pool: InterpreterPool | None = None
+    if args.python_workers > 0:
+        python_pool = InterpreterPool(
+            size=args.python_workers,
+            preload=tuple(name.strip() for name in args.python_preload.split(",") if name.strip()),
+            max_tasks=args.python_max_tasks,
+            max_growth_mb=args.python_max_growth_mb,
+        )
+    preemption = JobPreemption()
+    signal.signal(signal.SIGTERM, preemption.handle_signal)
+    signal.signal(signal.SIGINT, preemption.handle_signal)
+    try:
+        worker_loop(
+            coordinator=args.coordinator,
+            node_id=args.node_id,
+            name=args.name,
+            labels=labels,
+            token=args.token,
+            poll_seconds=args.poll_seconds,
+            poll_max_seconds=args.poll_max_seconds,
+            work_dir=args.work_dir,
+            heartbeat_seconds=args.heartbeat_seconds,
+            work_hours=args.work_hours,
+            warm_keys_max=args.warm_keys_max,
+            env_pool_dir=args.env_pool_dir,
+            env_pool_max_gb=args.env_pool_max_gb,
+            python_pool=python_pool,
+            compact_wire=args.wire == "auto",
+            preemption=preemption,
+            preempt_grace_seconds=args.preempt_grace_seconds,
+            job_caps=ResourceLimits(memory_mb=args.max_memory_mb, cpu_seconds=args.max_cpu_seconds),
+            thresholds={
+                key: value
+                for key, value in (
+                    ("max_load", args.max_load),
+                    ("min_memory_free_mb", args.min_free_memory_mb),
+                    ("min_disk_free_mb", args.min_free_disk_mb),
+                )
+                if value is not None
+            },
+        )
+    finally:
+        if python_pool is not None:
+            python_pool.close()
 
 
 if __name__ == "__main__":
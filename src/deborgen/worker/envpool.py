@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shlex
+import shutil
+import subprocess
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+INDEX_FILENAME = "index.json"
+# Long enough for a cold sync of a large scientific stack.
+SYNC_TIMEOUT_SECONDS = 1800
+
+
+@dataclass(frozen=True)
+class PooledEnv:
+    key: str
+    path: Path
+
+
+def find_uv_lockfile(argv: list[str], cwd: str) -> Path | None:
+    """The `uv.lock` a `uv run ...` command would use, or None for other commands.
+
+    Honors `--project` / `--directory` given before the command; otherwise searches
+    upward from `cwd` the way uv discovers a project. Jobs run in a fresh directory
+    under the worker's `--work-dir`, so a plain `uv run` only finds a project when
+    that work dir is inside one.
+    """
+    if len(argv) < 2 or Path(argv[0]).name != "uv" or argv[1] != "run":
+        return None
+    start = Path(cwd)
+    args = argv[2:]
+    index = 0
+    while index < len(args) and args[index].startswith("-") and args[index] != "--":
+        flag, _, value = args[index].partition("=")
+        if flag in ("--project", "--directory"):
+            if not value and index + 1 < len(args):
+                index += 1
+                value = args[index]
+            start = Path(cwd) / value
+        index += 1
+    start = start.resolve()
+    for directory in (start, *start.parents):
+        lockfile = directory / "uv.lock"
+        if lockfile.is_file():
+            return lockfile
+    return None
+
+
+def lockfile_key(lockfile: Path) -> str:
+    return f"uvlock-{hashlib.sha256(lockfile.read_bytes()).hexdigest()[:16]}"
+
+
+def _dir_size(path: Path) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+class EnvPool:
+    """Ready-to-use uv project environments, keyed by lockfile hash.
+
+    `uv run` jobs get `UV_PROJECT_ENVIRONMENT` pointed at the pooled environment
+    for their lockfile, so only the first job per lockfile pays for resolution and
+    installs. A new key is built with `uv sync --frozen` before its job starts, and
+    its size is measured then, once. Environments are evicted least recently used
+    first once the pool exceeds `max_bytes`. The pool directory belongs to one
+    worker process.
+    """
+
+    def __init__(self, root: str, max_bytes: int) -> None:
+        self._root = Path(root)
+        self._root.mkdir(parents=True, exist_ok=True)
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # key -> (last used, size in bytes), persisted so LRU order survives restarts.
+        self._entries: dict[str, tuple[float, int]] = {}
+        index_path = self._root / INDEX_FILENAME
+        if index_path.exists():
+            loaded: dict[str, list[float]] = json.loads(index_path.read_text())
+            self._entries = {
+                key: (value[0], int(value[1]))
+                for key, value in loaded.items()
+                if (self._root / key).is_dir()
+            }
+        for child in self._root.iterdir():
+            # Anything not in the index is a build that never finished.
+            if child.is_dir() and child.name not in self._entries:
+                shutil.rmtree(child, ignore_errors=True)
+
+    def keys(self) -> list[str]:
+        with self._lock:
+            return sorted(self._entries)
+
+    def acquire(self, command: str, cwd: str) -> PooledEnv | None:
+        """The pooled environment for a `uv run` command, building it if new."""
+        try:
+            argv = shlex.split(command)
+        except ValueError:
+            return None
+        lockfile = find_uv_lockfile(argv, cwd)
+        if lockfile is None:
+            return None
+        key = lockfile_key(lockfile)
+        pooled = PooledEnv(key=key, path=self._root / key)
+        with self._lock:
+            if key in self._entries:
+                return pooled
+        print(f"[worker] building environment {key} for {lockfile.parent}")
+        error = self._build(pooled, argv[0], lockfile.parent)
+        if error is not None:
+            print(f"[worker] environment build failed for {key}: {error}")
+            shutil.rmtree(pooled.path, ignore_errors=True)
+            return None
+        self._add(pooled, _dir_size(pooled.path))
+        return pooled
+
+    @staticmethod
+    def _build(pooled: PooledEnv, uv: str, project_dir: Path) -> str | None:
+        try:
+            result = subprocess.run(
+                [uv, "sync", "--frozen", "--project", str(project_dir)],
+                env={**os.environ, "UV_PROJECT_ENVIRONMENT": str(pooled.path)},
+                capture_output=True,
+                text=True,
+                check=False,
+                timeout=SYNC_TIMEOUT_SECONDS,
+            )
+        except (OSError, subprocess.TimeoutExpired) as exc:
+            return str(exc)
+        if result.returncode != 0:
+            return result.stderr.strip() or f"exit code {result.returncode}"
+        return None
+
+    def release(self, pooled: PooledEnv) -> None:
+        """Record a use of `pooled`, moving it to the back of the eviction order."""
+        with self._lock:
+            entry = self._entries.get(pooled.key)
+            if entry is None:
+                return
+            self._entries[pooled.key] = (time.time(), entry[1])
+            self._write_index()
+
+    def _add(self, pooled: PooledEnv, size: int) -> None:
+        """Index a newly built environment and evict others over the budget."""
+        with self._lock:
+            self._entries[pooled.key] = (time.time(), size)
+            total = sum(entry_size for _, entry_size in self._entries.values())
+            for key, (_, entry_size) in sorted(self._entries.items(), key=lambda item: item[1][0]):
+                if total <= self._max_bytes:
+                    break
+                if key == pooled.key:
+                    continue
+                shutil.rmtree(self._root / key, ignore_errors=True)
+                del self._entries[key]
+                total -= entry_size
+                print(f"[worker] evicted environment {key}")
+            self._write_index()
+
+    def _write_index(self) -> None:
+        index = {key: [last_used, entry_size] for key, (last_used, entry_size) in self._entries.items()}
+        tmp_path = self._root / f"{INDEX_FILENAME}.tmp"
+        tmp_path.write_text(json.dumps(index))
+        os.replace(tmp_path, self._root / INDEX_FILENAME)
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import os
+import signal
+from dataclasses import dataclass
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None  # type: ignore[assignment]
+
+# A job past its CPU-time cap gets SIGXCPU first, then SIGKILL this much later.
+CPU_KILL_GRACE_SECONDS = 5
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+@dataclass(frozen=True)
+class ResourceLimits:
+    """Caps on one job's processes, from its resource request and the worker's own caps.
+
+    `cpu_seconds` is an RLIMIT_CPU on each process the job starts. `memory_mb` bounds
+    the resident memory of the job's whole session, which the worker samples while it
+    waits; an address-space rlimit would also count memory merely reserved, which
+    breaks CUDA and JIT runtimes long before they use it.
+    """
+
+    memory_mb: int | None = None
+    cpu_seconds: int | None = None
+
+    def apply(self, pid: int) -> None:
+        """Sets the rlimits on a just-started process (Linux only; elsewhere a no-op).
+
+        Done from the worker with prlimit(2) rather than in a preexec_fn, which is not
+        safe to run in a forked child while the heartbeat thread holds locks. CPU time
+        the process used before this call still counts against the limit.
+        """
+        if self.cpu_seconds is None or not hasattr(resource, "prlimit"):
+            return
+        resource.prlimit(
+            pid, resource.RLIMIT_CPU, (self.cpu_seconds, self.cpu_seconds + CPU_KILL_GRACE_SECONDS)
+        )
+
+    def cpu_failure(self, returncode: int) -> str | None:
+        """The failure reason when `returncode` means the job hit its CPU-time cap."""
+        if self.cpu_seconds is None or not hasattr(resource, "prlimit"):
+            return None
+        if returncode == -signal.SIGXCPU:
+            return f"cpu time limit exceeded ({self.cpu_seconds}s)"
+        return None
+
+
+def job_limits(resources: dict[str, int | None], caps: ResourceLimits) -> ResourceLimits:
+    """The tighter of what a job asked for and what this worker allows."""
+
+    def tighter(requested: int | None, cap: int | None) -> int | None:
+        if requested is None or cap is None:
+            return requested if cap is None else cap
+        return min(requested, cap)
+
+    return ResourceLimits(
+        memory_mb=tighter(resources.get("memory_mb"), caps.memory_mb),
+        cpu_seconds=tighter(resources.get("cpu_seconds"), caps.cpu_seconds),
+    )
+
+
+def parse_cpu_list(text: str) -> set[int]:
+    """CPU ids from a list such as '0-3,8', the format `taskset -c` takes."""
+    cpus: set[int] = set()
+    for part in text.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        first, _, last = part.partition("-")
+        start, end = int(first), int(last or first)
+        if start < 0 or end < start:
+            raise ValueError(f"invalid CPU range: {part}")
+        cpus.update(range(start, end + 1))
+    if not cpus:
+        raise ValueError("empty CPU list")
+    return cpus
+
+
+def session_rss_bytes(session_id: int) -> int | None:
+    """Resident memory of every process in a session, or None without Linux's /proc."""
+    proc = Path("/proc")
+    if not proc.is_dir():
+        return None
+    total = 0
+    for entry in proc.iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            stat = (entry / "stat").read_text()
+        except OSError:
+            continue  # Exited since the listing.
+        # The command name is parenthesised and may contain spaces; fields follow it.
+        fields = stat[stat.rfind(")") + 2 :].split()
+        if int(fields[3]) == session_id:
+            total += int(fields[21]) * PAGE_SIZE
+    return total
+
+
+def over_memory_limit(rss_bytes: int | None, limits: ResourceLimits) -> bool:
+    if limits.memory_mb is None or rss_bytes is None:
+        return False
+    return rss_bytes > limits.memory_mb * 2**20
@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import importlib
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from collections.abc import Callable
+from dataclasses import dataclass
+from multiprocessing.connection import Connection
+from multiprocessing.context import ForkServerContext, SpawnContext
+from multiprocessing.process import BaseProcess
+from pathlib import Path
+from typing import Any, cast
+
+# Matches the run_job poll interval: how often a running task checks for timeout and cancel.
+TASK_POLL_SECONDS = 0.5
+# Environment variable naming the directory a job writes its checkpoint to.
+CHECKPOINT_ENV = "DEBORGEN_CHECKPOINT_DIR"
+# failure_reason of a run that was stopped so it can resume on another node.
+PREEMPTED_REASON = "preempted"
+
+
+def _rss_kb() -> int:
+    try:
+        with open("/proc/self/statm") as handle:
+            return int(handle.read().split()[1]) * (os.sysconf("SC_PAGE_SIZE") // 1024)
+    except (OSError, ValueError, AttributeError):
+        import resource
+
+        # Peak rather than current RSS, but still only grows with leaks.
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def resolve_entrypoint(entrypoint: str) -> Callable[..., Any]:
+    module_name, _, function_name = entrypoint.partition(":")
+    target: Any = importlib.import_module(module_name)
+    for attribute in function_name.split("."):
+        target = getattr(target, attribute)
+    if not callable(target):
+        raise TypeError(f"{entrypoint} is not callable")
+    return cast(Callable[..., Any], target)
+
+
+def _run_task(
+    entrypoint: str,
+    args: Any,
+    output_path: str,
+    cwd: str | None,
+    checkpoint_dir: str | None = None,
+) -> dict[str, Any]:
+    """Run one task with fds 1 and 2 redirected to `output_path`, like a subprocess."""
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved = os.dup(1), os.dup(2)
+    previous_cwd = os.getcwd()
+    exit_code, failure_reason = 0, None
+    with open(output_path, "wb") as output:
+        os.dup2(output.fileno(), 1)
+        os.dup2(output.fileno(), 2)
+        try:
+            if cwd is not None:
+                os.chdir(cwd)
+            if checkpoint_dir is not None:
+                os.environ[CHECKPOINT_ENV] = checkpoint_dir
+            function = resolve_entrypoint(entrypoint)
+            result = function(*args) if isinstance(args, list) else function(**args)
+            if result is not None:
+                print(json.dumps(result, default=repr))
+        except SystemExit as exc:
+            exit_code = exc.code if isinstance(exc.code, int) else (0 if exc.code is None else 1)
+        except Exception as exc:  # noqa: BLE001 - any error in user code fails the task
+            traceback.print_exc()
+            exit_code, failure_reason = 1, f"{type(exc).__name__}: {exc}"
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os.dup2(saved[0], 1)
+            os.dup2(saved[1], 2)
+            os.close(saved[0])
+            os.close(saved[1])
+            os.chdir(previous_cwd)
+            os.environ.pop(CHECKPOINT_ENV, None)
+    return {"exit_code": exit_code, "failure_reason": failure_reason, "rss_kb": _rss_kb()}
+
+
+def _serve(connection: Connection, preload: tuple[str, ...]) -> None:
+    for module_name in preload:
+        importlib.import_module(module_name)
+    connection.send({"rss_kb": _rss_kb()})
+    while True:
+        try:
+            task = connection.recv()
+        except EOFError:
+            return
+        connection.send(_run_task(*task))
+
+
+@dataclass
+class _Interpreter:
+    process: BaseProcess
+    connection: Connection
+    baseline_rss_kb: int
+    tasks: int = 0
+
+
+class InterpreterPool:
+    """Long-lived Python processes that run `module:function` jobs.
+
+    On POSIX, interpreters fork from a forkserver that has already imported
+    `preload`, so a new one is ready in milliseconds with heavy dependencies loaded.
+    Each task's stdout and stderr are captured at the file-descriptor level and
+    returned like `run_job` output. An interpreter is replaced after `max_tasks`
+    tasks, once its RSS has grown `max_growth_mb` past its post-import baseline, or
+    when a task times out, is cancelled or is preempted. A preempted task's
+    interpreter gets SIGTERM and `grace_seconds` to write its checkpoint.
+    """
+
+    def __init__(
+        self,
+        size: int = 1,
+        preload: tuple[str, ...] = (),
+        max_tasks: int = 100,
+        max_growth_mb: float = 512.0,
+    ) -> None:
+        self._context: ForkServerContext | SpawnContext
+        if "forkserver" in multiprocessing.get_all_start_methods():
+            self._context = multiprocessing.get_context("forkserver")
+            self._context.set_forkserver_preload(list(preload))
+        else:
+            self._context = multiprocessing.get_context("spawn")
+        self._preload = preload
+        self._max_tasks = max_tasks
+        self._max_growth_kb = max_growth_mb * 1024
+        self._lock = threading.Lock()
+        self._idle = [self._start() for _ in range(max(size, 1))]
+
+    def _start(self) -> _Interpreter:
+        parent, child = self._context.Pipe()
+        process = self._context.Process(
+            target=_serve, args=(child, self._preload), name="deborgen-python", daemon=True
+        )
+        process.start()
+        child.close()
+        ready = cast(dict[str, int], parent.recv())
+        return _Interpreter(process=process, connection=parent, baseline_rss_kb=ready["rss_kb"])
+
+    def _stop(self, interpreter: _Interpreter) -> None:
+        interpreter.connection.close()
+        interpreter.process.kill()
+        interpreter.process.join()
+
+    def run(
+        self,
+        entrypoint: str,
+        args: list[Any] | dict[str, Any],
+        timeout_seconds: int,
+        work_dir: str | None = None,
+        cancel: threading.Event | None = None,
+        checkpoint_dir: str | None = None,
+        preempt: threading.Event | None = None,
+        grace_seconds: float = 30.0,
+    ) -> tuple[int, str, str | None]:
+        with self._lock:
+            interpreter = self._idle.pop() if self._idle else None
+        if interpreter is None or not interpreter.process.is_alive():
+            interpreter = self._start()
+
+        fd, output_path = tempfile.mkstemp(prefix="deborgen-task-", suffix=".log")
+        os.close(fd)
+        try:
+            interpreter.connection.send((entrypoint, args, output_path, work_dir, checkpoint_dir))
+            deadline = time.monotonic() + timeout_seconds
+            reply: dict[str, Any] | None = None
+            failure: tuple[int, str] | None = None
+            while reply is None and failure is None:
+                if interpreter.connection.poll(max(min(TASK_POLL_SECONDS, deadline - time.monotonic()), 0)):
+                    try:
+                        reply = cast(dict[str, Any], interpreter.connection.recv())
+                    except EOFError:
+                        failure = 1, "python worker process exited"
+                elif cancel is not None and cancel.is_set():
+                    failure = 130, "cancelled: another node finished this job first"
+                elif preempt is not None and preempt.is_set():
+                    interpreter.process.terminate()
+                    interpreter.process.join(grace_seconds)
+                    failure = 143, PREEMPTED_REASON
+                elif time.monotonic() >= deadline:
+                    failure = 124, f"timeout exceeded ({timeout_seconds}s)"
+
+            interpreter.tasks += 1
+            if (
+                reply is None
+                or interpreter.tasks >= self._max_tasks
+                or reply["rss_kb"] - interpreter.baseline_rss_kb > self._max_growth_kb
+            ):
+                self._stop(interpreter)
+                interpreter = self._start()
+            with self._lock:
+                self._idle.append(interpreter)
+            output = Path(output_path).read_text(errors="replace")
+        finally:
+            os.remove(output_path)
+
+        if reply is None:
+            assert failure is not None
+            return failure[0], output, failure[1]
+        return cast(int, reply["exit_code"]), output, cast(str | None, reply["failure_reason"])
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for interpreter in idle:
+            self._stop(interpreter)
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import Any
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None  # type: ignore[assignment]
+
+
+class JobUsage:
+    """Measures what one job used, for the `metrics` sent with its finish.
+
+    CPU time and block I/O are the growth of the worker's RUSAGE_CHILDREN over the
+    run. The kernel folds each process into its parent's figures when it is reaped,
+    so this covers the job's whole tree, as long as the worker starts no other child
+    meanwhile (it runs one job at a time). Peak memory is the larger of the session's
+    resident memory, sampled at growing intervals while the job runs (every poll under a
+    memory limit), and any rise in the children's max RSS, which covers jobs that finish
+    between samples.
+    """
+
+    def __init__(self) -> None:
+        self._started = time.monotonic()
+        self._before = self._children()
+        self._peak_rss_kb = 0
+
+    @staticmethod
+    def _children() -> Any:
+        if resource is None:
+            return None
+        return resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    def sample(self, rss_bytes: int | None) -> None:
+        if rss_bytes is not None:
+            self._peak_rss_kb = max(self._peak_rss_kb, rss_bytes // 1024)
+
+    def finish(self, children: bool = True) -> dict[str, float | int | None]:
+        """The metrics so far; `children=False` reports wall time only, for jobs the
+        worker ran in a pooled interpreter rather than a child it reaped."""
+        metrics: dict[str, float | int | None] = {
+            "wall_seconds": round(time.monotonic() - self._started, 3)
+        }
+        after = self._children()
+        if not children or after is None or self._before is None:
+            return metrics
+        before = self._before
+        max_rss_kb = self._peak_rss_kb
+        if after.ru_maxrss > before.ru_maxrss:
+            # Bytes on macOS, KiB elsewhere.
+            scale = 1024 if sys.platform == "darwin" else 1
+            max_rss_kb = max(max_rss_kb, after.ru_maxrss // scale)
+        metrics.update(
+            user_cpu_seconds=round(after.ru_utime - before.ru_utime, 3),
+            system_cpu_seconds=round(after.ru_stime - before.ru_stime, 3),
+            max_rss_kb=max_rss_kb or None,
+            read_blocks=after.ru_inblock - before.ru_inblock,
+            write_blocks=after.ru_oublock - before.ru_oublock,
+        )
+        return metrics
+
+
+def node_load(work_dir: str | None, running_slots: int) -> dict[str, float | int]:
+    """The live load a heartbeat reports. Only cheap reads, as it runs every few seconds."""
+    load: dict[str, float | int] = {"running_slots": running_slots}
+    if hasattr(os, "getloadavg"):
+        try:
+            load["load_avg"] = round(os.getloadavg()[0], 2)
+        except OSError:
+            pass
+    memory_free_mb = available_memory_mb()
+    if memory_free_mb is not None:
+        load["memory_free_mb"] = memory_free_mb
+    try:
+        # Jobs run in temporary directories under the work dir, or the system default.
+        disk = shutil.disk_usage(work_dir or tempfile.gettempdir())
+    except OSError:
+        pass
+    else:
+        load["disk_free_mb"] = disk.free // 2**20
+    return load
+
+
+def available_memory_mb() -> int | None:
+    """MemAvailable from /proc/meminfo, or None without Linux's /proc."""
+    try:
+        with open("/proc/meminfo") as meminfo:
+            for line in meminfo:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) // 1024
+    except OSError:
+        return None
+    return None
@@ -1,15 +1,78 @@
 from __future__ import annotations
 
-from fastapi.testclient import TestClient
+from datetime import datetime, timedelta
+
+import httpx
 import pytest
+from fastapi.testclient import TestClient
+
+from deborgen.coordinator import app, memory_store
+from deborgen.coordinator.app import StoreKind, create_app
+from deborgen.coordinator.models import utcnow
+
+
+def make_client(store_kind: StoreKind = "sqlite") -> TestClient:
+    return TestClient(create_app(db_path=":memory:", store_kind=store_kind, journal_dir=":memory:"))
+
+
+@pytest.fixture(params=["sqlite", "memory"])
+def client(request: pytest.FixtureRequest) -> TestClient:
+    return make_client(request.param)
+
+
+def claim(client: httpx.Client, node_id: str = "node-1") -> tuple[str, str] | None:
+    """Play a worker: claim the next job for `node_id`, returning its id and lease token."""
+    response = client.get("/jobs/next", params={"node_id": node_id})
+    if response.status_code == 204:
+        return None
+    assignment = response.json()
+    return str(assignment["job"]["id"]), assignment["lease_token"]
+
+
+def submit_and_claim(client: httpx.Client, command: str = "echo hi") -> tuple[str, str]:
+    client.post("/jobs", json={"command": command}).raise_for_status()
+    claimed = claim(client)
+    assert claimed is not None
+    return claimed
+
+
+def finish(
+    client: httpx.Client,
+    job_id: str,
+    lease_token: str,
+    exit_code: int = 0,
+    node_id: str = "node-1",
+) -> httpx.Response:
+    return client.post(
+        f"/jobs/{job_id}/finish",
+        json={"node_id": node_id, "lease_token": lease_token, "exit_code": exit_code},
+    )
+
+
+def finish_next(client: httpx.Client, exit_code: int = 0) -> str:
+    """Play a worker: claim the next job and finish it with `exit_code`."""
+    claimed = claim(client)
+    assert claimed is not None
+    finish(client, *claimed, exit_code=exit_code).raise_for_status()
+    return claimed[0]
+
+
+class Clock:
+    """Stands in for the stores' `utcnow`; time only moves when a test advances it."""
 
-from deborgen.coordinator.app import create_app
+    def __init__(self) -> None:
+        self.now = utcnow()
 
+    def __call__(self) -> datetime:
+        return self.now
 
-def make_client() -> TestClient:
-    return TestClient(create_app(db_path=":memory:"))
+    def advance(self, seconds: float) -> None:
+        self.now += timedelta(seconds=seconds)
 
 
 @pytest.fixture
-def client() -> TestClient:
-    return make_client()
+def clock(monkeypatch: pytest.MonkeyPatch) -> Clock:
+    clock = Clock()
+    for module in (app, memory_store):
+        monkeypatch.setattr(module, "utcnow", clock)
+    return clock
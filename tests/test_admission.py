@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from deborgen.coordinator.admission import (
+    AdmissionController,
+    AdmissionMiddleware,
+    AdmissionPolicy,
+    route_class,
+)
+from deborgen.coordinator.app import create_app
+
+
+def test_routes_are_classed_by_who_calls_them() -> None:
+    assert route_class("GET", "/jobs/next") == "worker"
+    assert route_class("POST", "/nodes/node-1/heartbeat") == "worker"
+    assert route_class("POST", "/jobs/job_1/logs") == "worker"
+    assert route_class("GET", "/jobs/job_1/logs") == "user"
+    assert route_class("POST", "/jobs") == "user"
+    assert route_class("POST", "/jobs/job_1/complete") is None
+    assert route_class("GET", "/health") is None
+
+
+def test_controller_sheds_over_budget_and_under_standing_delay() -> None:
+    controller = AdmissionController(AdmissionPolicy(user_in_flight=1, min_samples=2))
+    now = controller._window_started
+    assert controller.admit("user", now) is None
+    assert controller.admit("user", now) == 429
+    controller.release("user", latency_seconds=1.2)
+
+    # One slow request on its own is not a queue.
+    assert controller.admit("user", now + 1.0) is None
+    controller.release("user", latency_seconds=1.2)
+    assert controller.admit("worker", now + 1.0) is None
+    controller.release("worker", latency_seconds=1.5)
+
+    # Every request in the window was slow; user routes give way first.
+    assert controller.admit("user", now + 2.0) == 503
+    assert controller.admit("worker", now + 2.0) is None
+    assert controller.retry_after() == 3
+    # A window with nothing finished clears the estimate again.
+    assert controller.admit("user", now + 3.0) is None
+    assert controller.snapshot()["rejected"] == {"worker": 0, "user": 2}
+
+
+def test_middleware_rejects_with_retry_after() -> None:
+    controller = AdmissionController(AdmissionPolicy(window_seconds=3600))
+    controller.delay_seconds = 1.0
+    app = FastAPI()
+    app.add_middleware(AdmissionMiddleware, controller=controller)
+
+    @app.get("/jobs")
+    def list_jobs() -> dict[str, str]:
+        return {}
+
+    @app.get("/jobs/next")
+    def claim() -> dict[str, str]:
+        return {}
+
+    client = TestClient(app)
+    response = client.get("/jobs")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "2"
+    assert client.get("/jobs/next").status_code == 200
+    assert controller.in_flight == {"worker": 0, "user": 0}
+
+
+def test_admission_is_off_unless_configured() -> None:
+    client = TestClient(create_app(db_path=":memory:"))
+    assert client.get("/admin/admission").status_code == 404
+    enabled = TestClient(create_app(db_path=":memory:", max_in_flight=64))
+    assert enabled.get("/admin/admission").json()["in_flight"] == {"worker": 0, "user": 0}
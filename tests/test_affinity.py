@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import time
+from unittest.mock import ANY
+
+import pytest
+from conftest import claim
+from fastapi.testclient import TestClient
+
+from deborgen.coordinator.app import StoreKind, create_app
+
+
+def make_affinity_client(store_kind: StoreKind, delay_seconds: float = 60.0) -> TestClient:
+    client = TestClient(
+        create_app(
+            db_path=":memory:",
+            store_kind=store_kind,
+            journal_dir=":memory:",
+            affinity_delay_seconds=delay_seconds,
+        )
+    )
+    client.post("/nodes/warm/heartbeat", json={"warm_keys": ["repo@abc"]}).raise_for_status()
+    client.post("/nodes/cold/heartbeat", json={}).raise_for_status()
+    return client
+
+
+@pytest.mark.parametrize("store_kind", ["sqlite", "memory"])
+def test_keyed_job_waits_for_a_warm_node(store_kind: StoreKind) -> None:
+    client = make_affinity_client(store_kind)
+    keyed = client.post("/jobs", json={"command": "make", "affinity_key": "repo@abc"}).json()["id"]
+    plain = client.post("/jobs", json={"command": "echo"}).json()["id"]
+
+    assert claim(client, "cold") == (plain, ANY)
+    assert claim(client, "cold") is None
+    assert claim(client, "warm") == (keyed, ANY)
+
+
+@pytest.mark.parametrize("store_kind", ["sqlite", "memory"])
+def test_warm_node_takes_local_jobs_before_older_young_jobs(store_kind: StoreKind) -> None:
+    client = make_affinity_client(store_kind)
+    plain = client.post("/jobs", json={"command": "echo"}).json()["id"]
+    keyed = client.post("/jobs", json={"command": "make", "affinity_key": "repo@abc"}).json()["id"]
+
+    assert claim(client, "warm") == (keyed, ANY)
+    assert claim(client, "warm") == (plain, ANY)
+
+
+@pytest.mark.parametrize("store_kind", ["sqlite", "memory"])
+def test_locality_is_given_up_after_the_delay(store_kind: StoreKind) -> None:
+    client = make_affinity_client(store_kind, delay_seconds=0.05)
+    keyed = client.post("/jobs", json={"command": "make", "affinity_key": "repo@abc"}).json()["id"]
+    time.sleep(0.1)
+
+    assert claim(client, "cold") == (keyed, ANY)
+
+
+@pytest.mark.parametrize("store_kind", ["sqlite", "memory"])
+def test_keys_nobody_holds_run_anywhere(store_kind: StoreKind) -> None:
+    client = make_affinity_client(store_kind)
+    keyed = client.post("/jobs", json={"command": "make", "affinity_key": "repo@new"}).json()["id"]
+
+    assert claim(client, "cold") == (keyed, ANY)
+
+
+@pytest.mark.parametrize("store_kind", ["sqlite", "memory"])
+def test_warm_keys_are_replaced_by_later_heartbeats(store_kind: StoreKind) -> None:
+    client = make_affinity_client(store_kind)
+    node = client.post("/nodes/warm/heartbeat", json={"warm_keys": ["repo@def", "repo@def"]}).json()
+    assert node["warm_keys"] == ["repo@def"]
+    # Omitting warm_keys keeps the reported set.
+    assert client.post("/nodes/warm/heartbeat", json={}).json()["warm_keys"] == ["repo@def"]
+
+    keyed = client.post("/jobs", json={"command": "make", "affinity_key": "repo@abc"}).json()["id"]
+    assert claim(client, "cold") == (keyed, ANY)
+
+
+def test_zero_delay_is_plain_fifo() -> None:
+    client = make_affinity_client("sqlite", delay_seconds=0)
+    keyed = client.post("/jobs", json={"command": "make", "affinity_key": "repo@abc"}).json()["id"]
+
+    assert claim(client, "cold") == (keyed, ANY)
@@ -48,7 +48,19 @@ def test_watch_job_cli_help() -> None:
     assert "Watch a deborgen job until it reaches a terminal state" in result.stdout
 
 
+def test_wait_cli_help() -> None:
+    result = run_help("deborgen-wait")
+    assert result.returncode == 0
+    assert "Wait for many deborgen jobs to reach a terminal state" in result.stdout
+
+
 def test_tutorial_cli_help() -> None:
     result = run_help("deborgen-tutorial")
     assert result.returncode == 0
     assert "Run the deborgen onboarding tutorial sequence" in result.stdout
+
+
+def test_migrate_db_cli_help() -> None:
+    result = run_help("deborgen-migrate-db")
+    assert result.returncode == 0
+    assert "Upgrade a coordinator's SQLite database to the current schema" in result.stdout
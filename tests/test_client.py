@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+from conftest import claim, finish_next
+from fastapi.testclient import TestClient
+
+from deborgen.client import AsyncDeborgenClient, DeborgenClient, DeborgenExecutor, JobFailedError
+from deborgen.client.executor import entrypoint_for
+from deborgen.coordinator.app import create_app
+from deborgen.coordinator.models import JobBatchItem, JobCreateRequest
+
+
+def sdk_client(client: TestClient) -> DeborgenClient:
+    return DeborgenClient(str(client.base_url), transport=client._transport)
+
+
+def test_bulk_status_lookup_keeps_request_order(client: TestClient) -> None:
+    first = client.post("/jobs", json={"command": "echo 1"}).json()["id"]
+    second = client.post("/jobs", json={"command": "echo 2"}).json()["id"]
+    finish_next(client, exit_code=3)
+
+    response = client.post("/jobs/status", json={"ids": [second, "job_999", first, "bogus", second]})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [(entry["id"], entry["status"]) for entry in body["jobs"]] == [
+        (second, "queued"),
+        (first, "failed"),
+    ]
+    assert body["jobs"][1]["exit_code"] == 3
+    assert body["missing"] == ["job_999", "bogus"]
+
+
+def test_sync_client_submits_and_reads_jobs(client: TestClient) -> None:
+    with sdk_client(client) as sdk:
+        job = sdk.submit(JobCreateRequest(command="echo hi"))
+        batch = sdk.submit_batch(
+            [JobBatchItem(command="echo a", key="a"), JobBatchItem(command="echo b", depends_on=["a"])],
+            group_id="grp_sweep",
+        )
+        claimed = claim(client)
+        assert claimed is not None
+        client.post(
+            f"/jobs/{job.id}/complete",
+            json={"node_id": "node-1", "lease_token": claimed[1], "exit_code": 0, "logs": "hi\n"},
+        ).raise_for_status()
+
+        assert sdk.get_job(job.id).status == "succeeded"
+        assert [entry.status for entry in sdk.statuses([job.id, *(b.id for b in batch)]).jobs] == [
+            "succeeded",
+            "queued",
+            "blocked",
+        ]
+        assert {b.group_id for b in batch} == {"grp_sweep"}
+        assert sdk.logs(job.id) == "hi\n"
+
+
+def test_async_client_submits_and_reads_statuses() -> None:
+    app = create_app(db_path=":memory:", store_kind="memory", journal_dir=":memory:")
+
+    async def scenario() -> list[str]:
+        transport = httpx.ASGITransport(app=app)
+        async with AsyncDeborgenClient("http://testserver", transport=transport) as sdk:
+            jobs = await sdk.submit_batch([JobBatchItem(command=f"echo {i}") for i in range(3)])
+            statuses = await sdk.statuses([job.id for job in jobs])
+            return [entry.status for entry in statuses.jobs]
+
+    assert asyncio.run(scenario()) == ["queued"] * 3
+
+
+class SheddingTransport(httpx.BaseTransport):
+    """Answers the first `shed` requests the way an overloaded coordinator would."""
+
+    def __init__(self, inner: httpx.BaseTransport, shed: int) -> None:
+        self.inner = inner
+        self.shed = shed
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        if self.shed > 0:
+            self.shed -= 1
+            return httpx.Response(429, headers={"Retry-After": "2"})
+        return self.inner.handle_request(request)
+
+
+def test_clients_retry_requests_shed_by_an_overloaded_coordinator(
+    client: TestClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    sleeps: list[float] = []
+    monkeypatch.setattr("deborgen.client.http.time.sleep", sleeps.append)
+    transport = SheddingTransport(client._transport, shed=2)
+    with DeborgenClient(str(client.base_url), transport=transport, overload_retries=2) as sdk:
+        jobs = sdk.submit_batch([JobBatchItem(command="echo 1")])
+        assert len(sleeps) == 2 and all(2 <= delay <= 3 for delay in sleeps)
+
+        transport.shed = 3
+        with pytest.raises(httpx.HTTPStatusError):
+            sdk.get_job(jobs[0].id)
+
+    requests: list[httpx.Request] = []
+
+    def shed_once(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if len(requests) == 1:
+            return httpx.Response(503, headers={"Retry-After": "0"})
+        return httpx.Response(200, json={"text": "ok"})
+
+    async def scenario() -> str:
+        async with AsyncDeborgenClient(
+            "http://testserver", transport=httpx.MockTransport(shed_once)
+        ) as sdk:
+            return await sdk.logs("job_1")
+
+    assert asyncio.run(scenario()) == "ok"
+    assert len(requests) == 2
+
+
+def test_executor_batches_submissions_and_resolves_futures(client: TestClient) -> None:
+    with sdk_client(client) as sdk:
+        executor = DeborgenExecutor(sdk, poll_seconds=0.05, job_defaults={"timeout_seconds": 60})
+        futures = [executor.submit("math:sqrt", value) for value in (4, 9)]
+        failing = executor.submit(json.loads, s="{")
+
+        deadline = time.monotonic() + 5
+        while len(client.get("/jobs", params={"status": "queued"}).json()["jobs"]) < 3:
+            assert time.monotonic() < deadline, "executor never submitted its batch"
+            time.sleep(0.01)
+        ran = {finish_next(client), finish_next(client)}
+        finish_next(client, exit_code=1)
+
+        assert {future.result(timeout=5).id for future in futures} == ran
+        with pytest.raises(JobFailedError):
+            failing.result(timeout=5)
+        job = client.get(f"/jobs/{futures[0].result().id}").json()
+        assert (job["kind"], job["command"], job["timeout_seconds"]) == ("python", "math:sqrt", 60)
+        assert job["group_id"] == executor.group_id
+        executor.shutdown()
+
+
+def test_executor_rejects_unimportable_callables() -> None:
+    assert entrypoint_for(json.dumps) == "json:dumps"
+    with pytest.raises(ValueError):
+        entrypoint_for(lambda: None)
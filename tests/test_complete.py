@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import httpx
+from conftest import submit_and_claim
+from fastapi.testclient import TestClient
+
+from deborgen.worker.agent import is_unknown_route
+
+
+def test_complete_records_logs_artifacts_and_status(client: TestClient) -> None:
+    job_id, lease_token = submit_and_claim(client)
+
+    response = client.post(
+        f"/jobs/{job_id}/complete",
+        json={
+            "node_id": "node-1",
+            "lease_token": lease_token,
+            "exit_code": 0,
+            "logs": "hi\n",
+            "artifact_urls": ["https://example.com/artifacts.zip"],
+        },
+    )
+
+    assert response.status_code == 200
+    job = response.json()
+    assert (job["status"], job["exit_code"]) == ("succeeded", 0)
+    assert job["artifact_urls"] == ["https://example.com/artifacts.zip"]
+    assert client.get(f"/jobs/{job_id}/logs").json()["text"] == "hi\n"
+
+
+def test_complete_checks_the_lease_before_writing_anything(client: TestClient) -> None:
+    job_id, lease_token = submit_and_claim(client)
+    body = {"node_id": "node-2", "lease_token": lease_token, "exit_code": 0, "logs": "stray"}
+
+    response = client.post(f"/jobs/{job_id}/complete", json=body)
+
+    assert response.status_code == 409
+    assert "different worker" in response.json()["detail"]
+    assert client.get(f"/jobs/{job_id}").json()["status"] == "running"
+    assert client.get(f"/jobs/{job_id}/logs").json()["text"] == ""
+
+    body["node_id"] = "node-1"
+    client.post(f"/jobs/{job_id}/complete", json=body).raise_for_status()
+    assert client.post(f"/jobs/{job_id}/complete", json=body).status_code == 409
+
+
+def test_is_unknown_route_tells_missing_endpoints_from_missing_jobs() -> None:
+    assert is_unknown_route(httpx.Response(404, json={"detail": "Not Found"}))
+    assert is_unknown_route(httpx.Response(405, json={"detail": "Method Not Allowed"}))
+    assert not is_unknown_route(httpx.Response(404, json={"detail": "job not found"}))
+    assert not is_unknown_route(httpx.Response(409, json={"detail": "job is not running"}))
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import httpx
+from fastapi.testclient import TestClient
+
+from deborgen.client import DeborgenClient
+from deborgen.coordinator.app import SqliteJobStore
+from deborgen.coordinator.models import JobCreateRequest, JobFinishRequest
+
+
+class RecordingTransport(httpx.BaseTransport):
+    def __init__(self, inner: httpx.BaseTransport) -> None:
+        self.inner = inner
+        self.statuses: list[int] = []
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        response = self.inner.handle_request(request)
+        self.statuses.append(response.status_code)
+        return response
+
+
+def test_job_etag_revalidates_until_the_job_changes(client: TestClient) -> None:
+    created = client.post("/jobs", json={"command": "echo hi"})
+    job_id = created.json()["id"]
+    first = client.get(f"/jobs/{job_id}")
+    etag = first.headers["ETag"]
+    assert etag == f'W/"{created.json()["version"]}"'
+
+    unchanged = client.get(f"/jobs/{job_id}", headers={"If-None-Match": etag})
+    assert (unchanged.status_code, unchanged.content, unchanged.headers["ETag"]) == (304, b"", etag)
+
+    client.get("/jobs/next", params={"node_id": "node-1"})
+    changed = client.get(f"/jobs/{job_id}", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.json()["status"] == "running"
+    assert changed.json()["version"] > first.json()["version"]
+
+
+def test_job_list_etag_follows_the_change_sequence(client: TestClient) -> None:
+    client.post("/jobs", json={"command": "echo 1"})
+    etag = client.get("/jobs").headers["ETag"]
+
+    assert client.get("/jobs", headers={"If-None-Match": etag}).status_code == 304
+    client.post("/jobs", json={"command": "echo 2"})
+    refreshed = client.get("/jobs", headers={"If-None-Match": etag})
+    assert refreshed.status_code == 200
+    assert len(refreshed.json()["jobs"]) == 2
+
+
+def test_versions_cached_in_one_process_see_commits_from_another(tmp_path: Path) -> None:
+    db_path = str(tmp_path / "deborgen.db")
+    reader = SqliteJobStore(db_path=db_path)
+    writer = SqliteJobStore(db_path=db_path)
+    reader.change_sequence()  # Take in the writer's schema setup.
+    job = reader.create_job(JobCreateRequest(command="echo"))
+    assert reader.job_version(job.id) == job.version
+
+    assignment = writer.claim_next_job("node-1")
+    assert assignment is not None
+
+    assert reader.job_version(job.id) is None
+    assert reader.get_job(job.id).version == assignment.job.version
+    assert reader.change_sequence() == assignment.job.version
+    writer.finish_job(
+        job.id,
+        JobFinishRequest(node_id="node-1", lease_token=assignment.lease_token, exit_code=0),
+    )
+    assert reader.change_sequence() > assignment.job.version
+
+
+def test_sdk_reuses_its_copy_when_the_job_is_unchanged(client: TestClient) -> None:
+    job_id = client.post("/jobs", json={"command": "echo hi"}).json()["id"]
+    transport = RecordingTransport(client._transport)
+
+    with DeborgenClient(str(client.base_url), transport=transport) as sdk:
+        first = sdk.get_job(job_id)
+        second = sdk.get_job(job_id)
+
+    assert second == first
+    assert transport.statuses == [200, 304]
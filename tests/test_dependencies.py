@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from conftest import finish_next
+from fastapi.testclient import TestClient
+
+from deborgen.coordinator.memory_store import MemoryJobStore
+from deborgen.coordinator.models import JobBatchItem, JobFinishRequest
+
+
+def statuses(client: TestClient, job_ids: list[str]) -> list[str]:
+    return [client.get(f"/jobs/{job_id}").json()["status"] for job_id in job_ids]
+
+
+def test_child_is_released_when_its_last_parent_succeeds(client: TestClient) -> None:
+    first = client.post("/jobs", json={"command": "echo a"}).json()["id"]
+    second = client.post("/jobs", json={"command": "echo b"}).json()["id"]
+    child = client.post("/jobs", json={"command": "echo c", "depends_on": [first, second]}).json()
+
+    assert child["status"] == "blocked"
+    assert child["depends_on"] == [first, second]
+    assert finish_next(client) == first
+    assert statuses(client, [child["id"]]) == ["blocked"]
+    assert finish_next(client) == second
+    assert statuses(client, [child["id"]]) == ["queued"]
+    assert finish_next(client) == child["id"]
+
+
+def test_parent_failure_cascades_to_descendants(client: TestClient) -> None:
+    response = client.post(
+        "/jobs/batch",
+        json={
+            "jobs": [
+                {"key": "prep", "command": "echo prep"},
+                {"key": "sweep", "command": "echo sweep", "depends_on": ["prep"]},
+                {"key": "reduce", "command": "echo reduce", "depends_on": ["sweep"]},
+            ]
+        },
+    )
+    assert response.status_code == 201
+    prep, sweep, reduce = (job["id"] for job in response.json()["jobs"])
+    assert statuses(client, [prep, sweep, reduce]) == ["queued", "blocked", "blocked"]
+
+    assert finish_next(client, exit_code=1) == prep
+    assert statuses(client, [sweep, reduce]) == ["failed", "failed"]
+    assert client.get(f"/jobs/{reduce}").json()["failure_reason"] == f"dependency {prep} failed"
+    assert client.get("/jobs/next", params={"node_id": "node-1"}).status_code == 204
+
+    totals = client.get("/stats").json()["totals"]
+    assert (totals["submitted"], totals["queued"], totals["failed"]) == (3, 0, 3)
+
+
+def test_dependencies_on_finished_jobs(client: TestClient) -> None:
+    done = client.post("/jobs", json={"command": "echo ok"}).json()["id"]
+    finish_next(client)
+    broken = client.post("/jobs", json={"command": "echo bad"}).json()["id"]
+    finish_next(client, exit_code=2)
+
+    assert client.post("/jobs", json={"command": "x", "depends_on": [done]}).json()["status"] == "queued"
+    failed = client.post("/jobs", json={"command": "x", "depends_on": [done, broken]}).json()
+    assert (failed["status"], failed["failure_reason"]) == ("failed", f"dependency {broken} failed")
+
+
+def test_batch_rejects_bad_references_without_creating_jobs(client: TestClient) -> None:
+    forward = client.post(
+        "/jobs/batch",
+        json={"jobs": [{"command": "a", "depends_on": ["later"]}, {"key": "later", "command": "b"}]},
+    )
+    assert forward.status_code == 422
+
+    missing = client.post(
+        "/jobs/batch",
+        json={"jobs": [{"key": "a", "command": "a"}, {"command": "b", "depends_on": ["a", "job_999"]}]},
+    )
+    assert missing.status_code == 404
+    assert missing.json()["detail"] == "dependency job_999 not found"
+    assert client.get("/jobs").json()["jobs"] == []
+
+
+def test_memory_store_recovers_dependency_graph(tmp_path: Path) -> None:
+    store = MemoryJobStore(journal_dir=str(tmp_path))
+    parent, child = store.create_jobs(
+        [
+            JobBatchItem(key="parent", command="echo a"),
+            JobBatchItem(command="echo b", depends_on=["parent"]),
+        ]
+    )
+    store.close()
+
+    recovered = MemoryJobStore(journal_dir=str(tmp_path))
+    assignment = recovered.claim_next_job("node-1")
+    assert assignment is not None and assignment.job.id == parent.id
+    recovered.finish_job(
+        parent.id,
+        JobFinishRequest(node_id="node-1", lease_token=assignment.lease_token, exit_code=0),
+    )
+    assert recovered.get_job(child.id).status == "queued"
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pytest
+
+from deborgen.worker import envpool
+from deborgen.worker.envpool import EnvPool, find_uv_lockfile, lockfile_key
+
+FAKE_UV = f"""#!{sys.executable}
+import os, pathlib, sys
+env = pathlib.Path(os.environ["UV_PROJECT_ENVIRONMENT"])
+env.mkdir(parents=True, exist_ok=True)
+(env / "payload").write_bytes(b"x" * 600)
+with open(pathlib.Path(__file__).parent / "calls.log", "a") as log:
+    log.write(" ".join(sys.argv[1:]) + "\\n")
+"""
+
+
+def make_project(root: Path, lock_text: str) -> Path:
+    root.mkdir(parents=True)
+    (root / "uv.lock").write_text(lock_text)
+    return root
+
+
+@pytest.fixture
+def fake_uv(tmp_path: Path) -> Path:
+    if sys.platform == "win32":
+        pytest.skip("fake uv is a shebang script")
+    path = tmp_path / "bin" / "uv"
+    path.parent.mkdir()
+    path.write_text(FAKE_UV)
+    path.chmod(0o755)
+    return path
+
+
+def test_find_uv_lockfile_searches_upward_and_honors_project(tmp_path: Path) -> None:
+    project = make_project(tmp_path / "proj", "a")
+    other = make_project(tmp_path / "other", "b")
+    job_dir = project / "runs" / "job_1"
+    job_dir.mkdir(parents=True)
+
+    assert find_uv_lockfile(["uv", "run", "python", "x.py"], str(job_dir)) == project / "uv.lock"
+    assert find_uv_lockfile(["uv", "run", "--project", str(other), "python"], str(job_dir)) == (
+        other / "uv.lock"
+    )
+    assert find_uv_lockfile(["uv", "run", f"--directory={other}", "python"], str(job_dir)) == (
+        other / "uv.lock"
+    )
+    assert find_uv_lockfile(["python", "x.py"], str(job_dir)) is None
+
+
+def test_pool_builds_once_per_lockfile_and_evicts_lru(tmp_path: Path, fake_uv: Path) -> None:
+    first = make_project(tmp_path / "first", "lock-1")
+    second = make_project(tmp_path / "second", "lock-2")
+    pool = EnvPool(str(tmp_path / "pool"), max_bytes=1000)
+
+    pooled = pool.acquire(f"{fake_uv} run python x.py", str(first))
+    assert pooled is not None and pooled.key == lockfile_key(first / "uv.lock")
+    assert pool.acquire(f"{fake_uv} run python y.py", str(first)) == pooled
+    assert len((fake_uv.parent / "calls.log").read_text().splitlines()) == 1
+
+    # Two 600-byte environments exceed the budget, so the older one goes.
+    newer = pool.acquire(f"{fake_uv} run python x.py", str(second))
+    assert newer is not None
+    assert pool.keys() == [newer.key]
+    assert not pooled.path.exists()
+
+    # The index survives a restart.
+    assert EnvPool(str(tmp_path / "pool"), max_bytes=1000).keys() == [newer.key]
+
+
+def test_pool_measures_an_environment_once(
+    tmp_path: Path, fake_uv: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    measured: list[Path] = []
+
+    def dir_size(path: Path) -> int:
+        measured.append(path)
+        return 600
+
+    monkeypatch.setattr(envpool, "_dir_size", dir_size)
+    project = make_project(tmp_path / "proj", "lock")
+    pool = EnvPool(str(tmp_path / "pool"), max_bytes=1000)
+    for _ in range(3):
+        pooled = pool.acquire(f"{fake_uv} run python x.py", str(project))
+        assert pooled is not None
+        pool.release(pooled)
+    assert measured == [pooled.path]
+
+
+def test_pool_ignores_other_commands_and_failed_builds(tmp_path: Path) -> None:
+    project = make_project(tmp_path / "proj", "lock")
+    pool = EnvPool(str(tmp_path / "pool"), max_bytes=1000)
+
+    assert pool.acquire("python x.py", str(project)) is None
+    assert pool.acquire(f"{tmp_path / 'missing' / 'uv'} run python x.py", str(project)) is None
+    assert pool.keys() == []
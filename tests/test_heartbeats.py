@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import sqlite3
+import time
+from pathlib import Path
+from unittest.mock import ANY
+
+import pytest
+from conftest import Clock, claim
+from fastapi.testclient import TestClient
+
+from deborgen.coordinator.app import SqliteJobStore, StoreKind, create_app
+from deborgen.coordinator.load import LoadPolicy
+from deborgen.coordinator.memory_store import JOURNAL_FILENAME, MemoryJobStore
+from deborgen.coordinator.models import (
+    JobCreateRequest,
+    NodeHeartbeatRequest,
+    NodeLoad,
+    NodeThresholds,
+)
+
+
+def stored_node(db_path: str) -> tuple[str, str]:
+    conn = sqlite3.connect(db_path)
+    row = conn.execute("SELECT labels_json, last_seen_at FROM nodes WHERE node_id = 'node-1'").fetchone()
+    conn.close()
+    return row[0], row[1]
+
+
+def test_timestamp_only_heartbeats_are_flushed_in_batches(tmp_path: Path) -> None:
+    db_path = str(tmp_path / "deborgen.db")
+    store = SqliteJobStore(db_path=db_path)
+    first = store.heartbeat_node("node-1", NodeHeartbeatRequest(labels={"gpu": "a"}))
+    _, first_seen = stored_node(db_path)
+
+    second = store.heartbeat_node("node-1", NodeHeartbeatRequest(labels={"gpu": "a"}))
+    assert second.last_seen_at > first.last_seen_at
+    assert stored_node(db_path)[1] == first_seen
+
+    assert store.flush_heartbeats() == 1
+    assert stored_node(db_path)[1] > first_seen
+    assert store.flush_heartbeats() == 0
+
+
+def test_label_changes_are_written_immediately(tmp_path: Path) -> None:
+    db_path = str(tmp_path / "deborgen.db")
+    store = SqliteJobStore(db_path=db_path)
+    store.heartbeat_node("node-1", NodeHeartbeatRequest(labels={"gpu": "a"}))
+    node = store.heartbeat_node("node-1", NodeHeartbeatRequest(name="pc", labels={"gpu": "b"}))
+
+    assert (node.name, node.labels) == ("pc", {"gpu": "b"})
+    assert stored_node(db_path)[0] == '{"gpu": "b"}'
+    # Empty labels and no name keep what the node last reported.
+    kept = store.heartbeat_node("node-1", NodeHeartbeatRequest())
+    assert (kept.name, kept.labels) == ("pc", {"gpu": "b"})
+
+
+def test_unflushed_heartbeats_keep_leases_alive(clock: Clock) -> None:
+    store = SqliteJobStore(db_path=":memory:", lease_duration_seconds=1)
+    store.heartbeat_node("node-1", NodeHeartbeatRequest(labels={}))
+    job = store.create_job(JobCreateRequest(command="echo hi"))
+    assignment = store.claim_next_job("node-1")
+    assert assignment is not None
+
+    clock.advance(0.6)
+    store.heartbeat_node("node-1", NodeHeartbeatRequest(labels={}))
+    clock.advance(0.6)
+    store.assert_job_lease(job.id, "node-1", assignment.lease_token)
+    assert store.expire_leases() == 0
+
+
+def test_memory_store_journals_heartbeats_on_flush(tmp_path: Path) -> None:
+    store = MemoryJobStore(journal_dir=str(tmp_path))
+    store.heartbeat_node("node-1", NodeHeartbeatRequest(labels={"gpu": "a"}))
+    journal_size = (tmp_path / JOURNAL_FILENAME).stat().st_size
+
+    latest = store.heartbeat_node("node-1", NodeHeartbeatRequest(labels={"gpu": "a"}))
+    assert (tmp_path / JOURNAL_FILENAME).stat().st_size == journal_size
+
+    assert store.flush_heartbeats() == 1
+    assert (tmp_path / JOURNAL_FILENAME).stat().st_size > journal_size
+    store.close()
+
+    recovered = MemoryJobStore(journal_dir=str(tmp_path))
+    assert recovered.heartbeat_node("node-1", NodeHeartbeatRequest()).labels == {"gpu": "a"}
+    assert recovered._nodes["node-1"].last_seen_at >= latest.last_seen_at
+
+
+def test_pending_heartbeats_flush_on_shutdown(tmp_path: Path) -> None:
+    db_path = str(tmp_path / "deborgen.db")
+    with TestClient(create_app(db_path=db_path, heartbeat_flush_seconds=3600)) as client:
+        client.post("/nodes/node-1/heartbeat", json={"labels": {}}).raise_for_status()
+        _, first_seen = stored_node(db_path)
+        client.post("/nodes/node-1/heartbeat", json={"labels": {}}).raise_for_status()
+        assert stored_node(db_path)[1] == first_seen
+    assert stored_node(db_path)[1] > first_seen
+
+
+@pytest.mark.parametrize("store_kind", ["sqlite", "memory"])
+def test_overloaded_nodes_are_skipped_or_deprioritized(store_kind: StoreKind) -> None:
+    client = TestClient(
+        create_app(
+            db_path=":memory:",
+            store_kind=store_kind,
+            journal_dir=":memory:",
+            busy_node_delay_seconds=0.3,
+        )
+    )
+    full = {"load": {"memory_free_mb": 100}, "thresholds": {"min_memory_free_mb": 512}}
+    client.post("/nodes/full/heartbeat", json=full).raise_for_status()
+    busy = {"load": {"load_avg": 12.0}, "thresholds": {"max_load": 4.0}}
+    client.post("/nodes/busy/heartbeat", json=busy).raise_for_status()
+    job_id = client.post("/jobs", json={"command": "echo"}).json()["id"]
+
+    assert claim(client, "full") is None
+    assert claim(client, "busy") is None
+    time.sleep(0.3)
+    assert claim(client, "full") is None
+    # Nobody idle took it, so the busy node does once it has waited long enough.
+    assert claim(client, "busy") == (job_id, ANY)
+
+
+def test_load_changes_stay_on_the_batched_path(tmp_path: Path) -> None:
+    db_path = str(tmp_path / "deborgen.db")
+    store = SqliteJobStore(db_path=db_path, load=LoadPolicy(busy_delay_seconds=60))
+    store.heartbeat_node("node-1", NodeHeartbeatRequest(thresholds=NodeThresholds(max_load=4)))
+    _, first_seen = stored_node(db_path)
+    store.create_job(JobCreateRequest(command="echo hi"))
+
+    busy = NodeHeartbeatRequest(load=NodeLoad(load_avg=12), thresholds=NodeThresholds(max_load=4))
+    assert store.heartbeat_node("node-1", busy).load == NodeLoad(load_avg=12)
+    assert stored_node(db_path)[1] == first_seen
+    # The unflushed load already counts for claims made by this process.
+    assert store.claim_next_job("node-1") is None
+
+    store.flush_heartbeats()
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT load_json FROM nodes").fetchone()[0] == '{"load_avg":12.0}'
+    conn.close()
+
+
+def test_memory_store_recovers_node_load(tmp_path: Path) -> None:
+    store = MemoryJobStore(journal_dir=str(tmp_path))
+    store.heartbeat_node("node-1", NodeHeartbeatRequest(thresholds=NodeThresholds(max_load=4)))
+    store.heartbeat_node("node-1", NodeHeartbeatRequest(load=NodeLoad(disk_free_mb=10)))
+    store.flush_heartbeats()
+    store.close()
+
+    node = MemoryJobStore(journal_dir=str(tmp_path))._nodes["node-1"]
+    assert node.load == NodeLoad(disk_free_mb=10)
+    assert node.thresholds is None
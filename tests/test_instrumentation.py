@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from deborgen.coordinator.app import create_app
+from deborgen.coordinator.instrumentation import format_collapsed, sample_stacks
+
+
+def test_admin_endpoints_are_disabled_by_default(client: TestClient) -> None:
+    assert client.get("/admin/timings").status_code == 404
+    assert client.get("/admin/profile", params={"seconds": 0.01}).status_code == 404
+
+
+def test_timings_record_lock_and_statement_timings_per_store_method() -> None:
+    client = TestClient(create_app(db_path=":memory:", instrument=True))
+    job_id = client.post("/jobs", json={"command": "echo hi"}).json()["id"]
+    client.get("/jobs/next", params={"node_id": "node-1"})
+    client.get(f"/jobs/{job_id}")
+
+    summary = client.get("/admin/timings").json()
+    operations = summary["operations"]
+    assert operations["create_job"]["lock_wait"]["count"] == 1
+    assert operations["claim_next_job"]["lock_hold"]["count"] == 1
+    assert any(sql.startswith("INSERT INTO jobs") for sql in operations["create_job"]["statements"])
+    assert "GET /jobs/{job_id}" in summary["requests"]
+
+
+def test_timings_reset_clears_collected_data() -> None:
+    client = TestClient(create_app(db_path=":memory:", instrument=True))
+    client.post("/jobs", json={"command": "echo hi"})
+
+    assert client.get("/admin/timings", params={"reset": True}).json()["operations"]
+    assert client.get("/admin/timings").json()["operations"] == {}
+
+
+def test_slow_operations_are_logged(caplog: pytest.LogCaptureFixture) -> None:
+    client = TestClient(create_app(db_path=":memory:", instrument=True, slow_operation_ms=0))
+    with caplog.at_level(logging.WARNING, logger="deborgen.coordinator"):
+        client.post("/jobs", json={"command": "echo hi"})
+    assert any("slow store operation create_job" in record.message for record in caplog.records)
+
+
+def test_sample_stacks_produces_collapsed_output() -> None:
+    stop = threading.Event()
+
+    def busy_wait_for_profiler() -> None:
+        while not stop.is_set():
+            time.sleep(0.001)
+
+    thread = threading.Thread(target=busy_wait_for_profiler, name="busy")
+    thread.start()
+    try:
+        counts = sample_stacks(seconds=0.05, interval_seconds=0.005)
+    finally:
+        stop.set()
+        thread.join()
+
+    output = format_collapsed(counts)
+    line = next(line for line in output.splitlines() if "busy_wait_for_profiler" in line)
+    stack, count = line.rsplit(" ", 1)
+    assert stack.startswith("busy;")
+    assert int(count) >= 1
+
+
+def test_profile_endpoint_returns_collapsed_stacks() -> None:
+    client = TestClient(create_app(db_path=":memory:", instrument=True))
+    response = client.get("/admin/profile", params={"seconds": 0.05})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
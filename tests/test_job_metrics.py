@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from deborgen.coordinator.memory_store import MemoryJobStore
+from deborgen.coordinator.metrics import command_fingerprint
+from deborgen.coordinator.models import JobCreateRequest, JobFinishRequest, JobMetrics
+
+
+def run(client: TestClient, command: str, metrics: dict[str, float | int] | None) -> str:
+    job_id = client.post("/jobs", json={"command": command}).json()["id"]
+    lease_token = client.get("/jobs/next", params={"node_id": "node-1"}).json()["lease_token"]
+    response = client.post(
+        f"/jobs/{job_id}/complete",
+        json={"node_id": "node-1", "lease_token": lease_token, "exit_code": 0, "metrics": metrics},
+    )
+    assert response.status_code == 200
+    return str(job_id)
+
+
+def test_command_fingerprint_masks_run_specific_arguments() -> None:
+    assert command_fingerprint("python train.py --seed 7 --out runs/2026-03-01") == (
+        "python train.py --seed # --out runs/#-#-#"
+    )
+    assert command_fingerprint("git checkout 3f9c2a8be1") == "git checkout #"
+    assert command_fingerprint("mypkg.tasks:estimate_pi", "python") == "mypkg.tasks:estimate_pi"
+
+
+def test_finish_metrics_are_stored_and_rolled_up_by_fingerprint(client: TestClient) -> None:
+    cpu = {"user_cpu_seconds": 8.0, "system_cpu_seconds": 1.0}
+    first = run(
+        client,
+        "python sim.py --seed 1",
+        {"wall_seconds": 10.0, **cpu, "max_rss_kb": 2048, "read_blocks": 4, "write_blocks": 100},
+    )
+    cpu = {"user_cpu_seconds": 17.5, "system_cpu_seconds": 0.5}
+    run(
+        client,
+        "python sim.py --seed 2",
+        {"wall_seconds": 20.0, **cpu, "max_rss_kb": 4096, "read_blocks": 0, "write_blocks": 50},
+    )
+    run(client, "sleep 5", {"wall_seconds": 5.0, "user_cpu_seconds": 0.0, "system_cpu_seconds": 0.0})
+    unmeasured = run(client, "echo hi", None)
+
+    entry = client.get(f"/jobs/{first}/metrics").json()
+    assert entry["fingerprint"] == "python sim.py --seed #"
+    assert (entry["wall_seconds"], entry["user_cpu_seconds"], entry["max_rss_kb"]) == (10.0, 8.0, 2048)
+    assert client.get(f"/jobs/{unmeasured}/metrics").status_code == 404
+
+    commands = client.get("/stats/commands").json()["commands"]
+    assert [item["fingerprint"] for item in commands] == ["python sim.py --seed #", "sleep #"]
+    sim = commands[0]
+    assert (sim["jobs"], sim["mean_wall_seconds"], sim["max_wall_seconds"]) == (2, 15.0, 20.0)
+    assert (sim["total_cpu_seconds"], sim["mean_cpu_seconds"], sim["max_rss_kb"]) == (27.0, 13.5, 4096)
+    assert (sim["read_blocks"], sim["write_blocks"]) == (4, 150)
+
+    only = client.get("/stats/commands", params={"fingerprint": "sleep #"}).json()["commands"]
+    assert [(item["jobs"], item["max_rss_kb"]) for item in only] == [(1, None)]
+
+
+def test_memory_store_replays_job_metrics(tmp_path: Path) -> None:
+    store = MemoryJobStore(journal_dir=str(tmp_path))
+    job = store.create_job(JobCreateRequest(command="python sim.py --seed 3"))
+    assignment = store.claim_next_job("node-1")
+    assert assignment is not None
+    metrics = JobMetrics(wall_seconds=3.5, user_cpu_seconds=3.0)
+    store.finish_job(
+        job.id,
+        JobFinishRequest(node_id="node-1", lease_token=assignment.lease_token, exit_code=0, metrics=metrics),
+    )
+    store.close()
+
+    recovered = MemoryJobStore(journal_dir=str(tmp_path))
+    assert recovered.job_metrics(job.id).wall_seconds == 3.5
+    assert recovered.command_metrics("python sim.py --seed #", 10).commands[0].jobs == 1
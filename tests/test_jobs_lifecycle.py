@@ -37,3 +37,15 @@ def test_job_lifecycle_success(client: TestClient) -> None:
 def test_next_job_empty_returns_204(client: TestClient) -> None:
     response = client.get("/jobs/next", params={"node_id": "node-1"})
     assert response.status_code == 204
+
+
+def test_job_resources_reach_the_claiming_worker(client: TestClient) -> None:
+    job_id = client.post(
+        "/jobs", json={"command": "train", "resources": {"memory_mb": 2048}}
+    ).json()["id"]
+
+    assignment = client.get("/jobs/next", params={"node_id": "node-1"}).json()
+
+    assert assignment["job"]["resources"] == {"memory_mb": 2048, "cpu_seconds": None}
+    assert client.get(f"/jobs/{job_id}").json()["resources"]["memory_mb"] == 2048
+    assert client.post("/jobs", json={"command": "train", "resources": {"memory_mb": 0}}).status_code == 422
@@ -1,8 +1,12 @@
 from __future__ import annotations
 
+import pytest
+from conftest import Clock
 from fastapi.testclient import TestClient
 
-from deborgen.coordinator.app import create_app
+from deborgen.coordinator.app import JobStore, SqliteJobStore, create_app
+from deborgen.coordinator.memory_store import MemoryJobStore
+from deborgen.coordinator.models import JobCreateRequest, NodeHeartbeatRequest
 
 
 def _expired_lease_client() -> TestClient:
@@ -44,3 +48,41 @@ def test_expired_lease_rejects_log_append() -> None:
 
     assert response.status_code == 409
     assert response.json()["detail"] == "lease has expired"
+
+
+def make_store(store_kind: str, lease_duration_seconds: int) -> JobStore:
+    if store_kind == "memory":
+        return MemoryJobStore(journal_dir=":memory:", lease_duration_seconds=lease_duration_seconds)
+    return SqliteJobStore(db_path=":memory:", lease_duration_seconds=lease_duration_seconds)
+
+
+@pytest.mark.parametrize("store_kind", ["sqlite", "memory"])
+def test_expired_lease_is_requeued_while_attempts_remain(store_kind: str) -> None:
+    store = make_store(store_kind, lease_duration_seconds=-1)
+    job = store.create_job(JobCreateRequest(command="echo hi", max_attempts=2))
+    assert store.claim_next_job("node-1") is not None
+
+    assert store.expire_leases() == 1
+    requeued = store.get_job(job.id)
+    assert (requeued.status, requeued.assigned_node_id, requeued.attempts) == ("queued", None, 1)
+
+    assert store.claim_next_job("node-2") is not None
+    assert store.expire_leases() == 1
+    failed = store.get_job(job.id)
+    assert (failed.status, failed.failure_reason) == ("failed", "lease expired")
+    assert store.expire_leases() == 0
+
+
+@pytest.mark.parametrize("store_kind", ["sqlite", "memory"])
+def test_heartbeat_extends_live_leases(store_kind: str, clock: Clock) -> None:
+    store = make_store(store_kind, lease_duration_seconds=1)
+    store.create_job(JobCreateRequest(command="echo hi"))
+    assert store.claim_next_job("node-1") is not None
+
+    clock.advance(0.6)
+    store.heartbeat_node("node-1", NodeHeartbeatRequest(labels={}))
+    clock.advance(0.6)
+    assert store.expire_leases() == 0
+
+    clock.advance(0.6)
+    assert store.expire_leases() == 1
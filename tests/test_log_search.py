@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+from datetime import timedelta
+from pathlib import Path
+from typing import Any
+
+from fastapi.testclient import TestClient
+
+from deborgen.coordinator.app import SqliteJobStore, create_app
+from deborgen.coordinator.models import JobCreateRequest, JobLogsRequest, utcnow
+
+
+def run_with_logs(client: TestClient, chunks: list[str], exit_code: int = 0) -> str:
+    job_id = str(client.post("/jobs", json={"command": "python train.py"}).json()["id"])
+    assignment = client.get("/jobs/next", params={"node_id": "node-1"}).json()
+    lease = {"node_id": "node-1", "lease_token": assignment["lease_token"]}
+    for chunk in chunks[:-1]:
+        client.post(f"/jobs/{job_id}/logs", json={**lease, "text": chunk}).raise_for_status()
+    client.post(
+        f"/jobs/{job_id}/complete", json={**lease, "exit_code": exit_code, "logs": chunks[-1]}
+    ).raise_for_status()
+    return job_id
+
+
+def search(client: TestClient, **params: Any) -> list[dict[str, Any]]:
+    response = client.get("/logs/search", params=params)
+    response.raise_for_status()
+    return list(response.json()["hits"])
+
+
+def test_search_lists_each_matching_job_once() -> None:
+    client = TestClient(create_app(db_path=":memory:", log_search=True))
+    first = run_with_logs(client, ["epoch 1 loss 0.4\n", "warning: NaN encountered in loss\n"], 1)
+    second = run_with_logs(client, ["NaN encountered\n", "epoch 2\n", "NaN encountered again\n"])
+    run_with_logs(client, ["epoch 1 loss 0.3\n"])
+
+    hits = search(client, q='"nan encountered"')
+    assert [hit["job_id"] for hit in hits] == [second, first]
+    assert hits[0]["snippet"] == "**NaN encountered** again\n"
+    assert hits[1]["status"] == "failed"
+
+    assert [hit["job_id"] for hit in search(client, q="nan", status="failed")] == [first]
+    assert len(search(client, q="nan", limit=1)) == 1
+    future = (utcnow() + timedelta(hours=1)).isoformat()
+    assert search(client, q="nan", since=future) == []
+    assert len(search(client, q="nan", until=future)) == 2
+    assert client.get("/logs/search", params={"q": '"unterminated'}).status_code == 400
+
+
+def test_search_is_off_unless_enabled() -> None:
+    assert TestClient(create_app(db_path=":memory:")).get(
+        "/logs/search", params={"q": "nan"}
+    ).status_code == 404
+    memory = TestClient(create_app(store_kind="memory", journal_dir=":memory:", log_search=True))
+    assert memory.get("/logs/search", params={"q": "nan"}).status_code == 404
+
+
+def test_enabling_search_indexes_existing_logs(tmp_path: Path) -> None:
+    db_path = str(tmp_path / "deborgen.db")
+    store = SqliteJobStore(db_path=db_path)
+    job = store.create_job(JobCreateRequest(command="echo"))
+    assignment = store.claim_next_job("node-1")
+    assert assignment is not None
+    logs = JobLogsRequest(node_id="node-1", lease_token=assignment.lease_token, text="NaN\n")
+    store.append_logs(job.id, logs)
+
+    searchable = SqliteJobStore(db_path=db_path, log_search=True)
+    assert [hit.job_id for hit in searchable.search_logs("nan", None, None, None, 10).hits] == [
+        job.id
+    ]
+    # Appends and deletes keep the index current.
+    searchable.append_logs(job.id, logs.model_copy(update={"text": "inf\n"}))
+    assert len(searchable.search_logs("inf", None, None, None, 10).hits) == 1
+    with searchable._conn:
+        searchable._conn.execute("DELETE FROM jobs")
+    assert searchable.search_logs("nan OR inf", None, None, None, 10).hits == []
+
+    SqliteJobStore(db_path=db_path)
+    assert not searchable._table_exists("logs_fts")
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from deborgen.coordinator.app import create_app
+from deborgen.coordinator.memory_store import JOURNAL_FILENAME, SNAPSHOT_FILENAME, MemoryJobStore
+from deborgen.coordinator.models import (
+    JobCreateRequest,
+    JobFinishRequest,
+    JobLogsRequest,
+    JobPreemptRequest,
+    NodeHeartbeatRequest,
+)
+
+
+def test_create_app_uses_memory_store(tmp_path: Path) -> None:
+    client = TestClient(create_app(store_kind="memory", journal_dir=str(tmp_path)))
+    job_id = client.post("/jobs", json={"command": "echo hi"}).json()["id"]
+    assert client.get(f"/jobs/{job_id}").json()["status"] == "queued"
+    assert (tmp_path / JOURNAL_FILENAME).stat().st_size > 0
+
+
+def test_journal_replay_restores_jobs_leases_logs_and_nodes(tmp_path: Path) -> None:
+    store = MemoryJobStore(journal_dir=str(tmp_path))
+    store.heartbeat_node("node-1", NodeHeartbeatRequest(name="pc", labels={"gpu": "rtx3060"}))
+    done = store.create_job(JobCreateRequest(command="echo done"))
+    running = store.create_job(JobCreateRequest(command="echo running"))
+    queued = store.create_job(JobCreateRequest(command="echo queued"))
+
+    first = store.claim_next_job("node-1")
+    assert first is not None and first.job.id == done.id
+    store.append_logs(done.id, JobLogsRequest(node_id="node-1", lease_token=first.lease_token, text="ok\n"))
+    store.finish_job(done.id, JobFinishRequest(node_id="node-1", lease_token=first.lease_token, exit_code=0))
+    second = store.claim_next_job("node-1")
+    assert second is not None and second.job.id == running.id
+    store.close()
+
+    recovered = MemoryJobStore(journal_dir=str(tmp_path))
+    assert recovered.get_job(done.id).status == "succeeded"
+    assert recovered.read_logs(done.id).text == "ok\n"
+    assert recovered.get_job(running.id).status == "running"
+    recovered.assert_job_lease(running.id, "node-1", second.lease_token)
+    assert recovered.get_job(queued.id).status == "queued"
+    assert recovered.heartbeat_node("node-1", NodeHeartbeatRequest()).labels == {"gpu": "rtx3060"}
+
+    third = recovered.claim_next_job("node-1")
+    assert third is not None and third.job.id == queued.id
+    assert recovered.create_job(JobCreateRequest(command="echo new")).id == "job_4"
+    recovered.close()
+
+
+def test_snapshot_truncates_journal_and_recovers(tmp_path: Path) -> None:
+    store = MemoryJobStore(journal_dir=str(tmp_path), snapshot_every=3)
+    for index in range(5):
+        store.create_job(JobCreateRequest(command=f"echo {index}"))
+    store.close()
+
+    assert (tmp_path / SNAPSHOT_FILENAME).exists()
+    journal_lines = (tmp_path / JOURNAL_FILENAME).read_text().splitlines()
+    assert len(journal_lines) == 2
+
+    recovered = MemoryJobStore(journal_dir=str(tmp_path))
+    assert [job.command for job in recovered.list_jobs(status_filter=None, limit=None)] == [
+        f"echo {index}" for index in reversed(range(5))
+    ]
+    recovered.close()
+
+
+def test_replay_ignores_torn_final_entry(tmp_path: Path) -> None:
+    store = MemoryJobStore(journal_dir=str(tmp_path))
+    store.create_job(JobCreateRequest(command="echo hi"))
+    store.close()
+    with open(tmp_path / JOURNAL_FILENAME, "ab") as handle:
+        handle.write(b'{"op":"job","job":{"pk":2')
+
+    recovered = MemoryJobStore(journal_dir=str(tmp_path))
+    assert len(recovered.list_jobs(status_filter=None, limit=None)) == 1
+    recovered.close()
+
+
+def test_claim_prefers_oldest_job_across_requirement_groups() -> None:
+    store = MemoryJobStore(journal_dir=":memory:")
+    store.heartbeat_node("node-gpu", NodeHeartbeatRequest(labels={"gpu": "rtx3060"}))
+    gpu_job = store.create_job(JobCreateRequest(command="echo gpu", requirements={"gpu": "rtx3060"}))
+    store.create_job(JobCreateRequest(command="echo any"))
+
+    assert store.claim_next_job("node-cpu") is not None
+    assignment = store.claim_next_job("node-gpu")
+    assert assignment is not None and assignment.job.id == gpu_job.id
+    assert store.claim_next_job("node-gpu") is None
+
+
+def test_dependents_index_drops_parents_once_they_succeed(tmp_path: Path) -> None:
+    store = MemoryJobStore(journal_dir=str(tmp_path))
+    first = store.create_job(JobCreateRequest(command="echo a"))
+    second = store.create_job(JobCreateRequest(command="echo b"))
+    child = store.create_job(JobCreateRequest(command="echo c", depends_on=[first.id, second.id]))
+
+    assignment = store.claim_next_job("node-1")
+    assert assignment is not None and assignment.job.id == first.id
+    store.finish_job(
+        first.id, JobFinishRequest(node_id="node-1", lease_token=assignment.lease_token, exit_code=0)
+    )
+    assert store.get_job(child.id).status == "blocked"
+    assert set(store._dependents) == {2}
+    store.close()
+
+    recovered = MemoryJobStore(journal_dir=str(tmp_path))
+    assert set(recovered._dependents) == {2}
+    assignment = recovered.claim_next_job("node-1")
+    assert assignment is not None and assignment.job.id == second.id
+    recovered.finish_job(
+        second.id, JobFinishRequest(node_id="node-1", lease_token=assignment.lease_token, exit_code=0)
+    )
+    assert recovered.get_job(child.id).status == "queued"
+    assert recovered._dependents == {}
+    recovered.close()
+
+
+def test_node_lease_index_follows_claims_finishes_and_preemptions() -> None:
+    store = MemoryJobStore(journal_dir=":memory:")
+    first = store.create_job(JobCreateRequest(command="echo a"))
+    second = store.create_job(JobCreateRequest(command="echo b"))
+    lease_a = store.claim_next_job("node-1")
+    lease_b = store.claim_next_job("node-2")
+    assert lease_a is not None and lease_b is not None
+    assert store._node_leases == {
+        "node-1": {(1, lease_a.lease_token)},
+        "node-2": {(2, lease_b.lease_token)},
+    }
+
+    expires_at = store._leases[2][lease_b.lease_token].lease_expires_at
+    store.heartbeat_node("node-2", NodeHeartbeatRequest())
+    assert store._leases[2][lease_b.lease_token].lease_expires_at > expires_at
+
+    store.finish_job(
+        first.id, JobFinishRequest(node_id="node-1", lease_token=lease_a.lease_token, exit_code=0)
+    )
+    store.preempt_job(
+        second.id, JobPreemptRequest(node_id="node-2", lease_token=lease_b.lease_token)
+    )
+    assert store._node_leases == {} and store._leases == {}
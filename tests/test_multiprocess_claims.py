@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import multiprocessing
+from collections import Counter
+from multiprocessing.queues import Queue
+from multiprocessing.synchronize import Barrier
+from pathlib import Path
+
+import pytest
+
+from deborgen.coordinator.app import SqliteJobStore, validate_workers
+from deborgen.coordinator.models import JobCreateRequest
+
+PROCESSES = 4
+JOBS = 200
+
+
+def claim_until_empty(
+    db_path: str, node_id: str, start: Barrier, results: Queue[list[str]]
+) -> None:
+    store = SqliteJobStore(db_path=db_path)
+    start.wait()
+    claimed: list[str] = []
+    misses = 0
+    # A miss only means the queue looked empty at that instant; keep going until
+    # several consecutive polls come back empty.
+    while misses < 3:
+        assignment = store.claim_next_job(node_id)
+        if assignment is None:
+            misses += 1
+            continue
+        misses = 0
+        claimed.append(assignment.job.id)
+    results.put(claimed)
+
+
+def test_concurrent_processes_claim_each_job_exactly_once(tmp_path: Path) -> None:
+    db_path = str(tmp_path / "deborgen.db")
+    store = SqliteJobStore(db_path=db_path)
+    job_ids = [store.create_job(JobCreateRequest(command=f"echo {i}")).id for i in range(JOBS)]
+
+    context = multiprocessing.get_context("spawn")
+    start = context.Barrier(PROCESSES)
+    results: Queue[list[str]] = context.Queue()
+    processes = [
+        context.Process(target=claim_until_empty, args=(db_path, f"node-{index}", start, results))
+        for index in range(PROCESSES)
+    ]
+    for process in processes:
+        process.start()
+    claimed_lists = [results.get(timeout=60) for _ in processes]
+    for process in processes:
+        process.join(timeout=10)
+        assert process.exitcode == 0
+
+    claims = Counter(job_id for claimed in claimed_lists for job_id in claimed)
+    assert set(claims) == set(job_ids)
+    assert max(claims.values()) == 1
+    assert all(job.status == "running" for job in store.list_jobs(status_filter=None, limit=None))
+
+
+def test_validate_workers_rejects_memory_backends(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv("DEBORGEN_STORE", raising=False)
+    monkeypatch.setenv("DEBORGEN_DB_PATH", ":memory:")
+    with pytest.raises(SystemExit):
+        validate_workers(2)
+
+    monkeypatch.setenv("DEBORGEN_DB_PATH", "deborgen.db")
+    validate_workers(2)
+
+    monkeypatch.setenv("DEBORGEN_STORE", "memory")
+    with pytest.raises(SystemExit):
+        validate_workers(2)
+    validate_workers(1)
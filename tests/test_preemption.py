@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from deborgen.worker.agent import hand_back
+
+
+def claim(client: TestClient, node_id: str) -> dict[str, str]:
+    assignment = client.get("/jobs/next", params={"node_id": node_id}).json()
+    return {"node_id": node_id, "lease_token": assignment["lease_token"]}
+
+
+def test_preempted_job_is_requeued_with_its_checkpoint(client: TestClient) -> None:
+    job_id = client.post("/jobs", json={"command": "simulate", "max_attempts": 1}).json()["id"]
+    lease = claim(client, "laptop")
+
+    response = client.post(
+        f"/jobs/{job_id}/preempt",
+        json={**lease, "checkpoint_url": "https://store.example/ckpt-1.zip", "logs": "step 40\n"},
+    )
+
+    assert response.status_code == 200
+    job = response.json()
+    assert (job["status"], job["attempts"], job["assigned_node_id"]) == ("queued", 0, None)
+    assert job["checkpoint_url"] == "https://store.example/ckpt-1.zip"
+    assert client.get(f"/jobs/{job_id}/logs").json()["text"] == "step 40\n"
+    stats = client.get("/stats").json()
+    assert (stats["totals"]["preempted"], stats["totals"]["queued"]) == (1, 1)
+
+    # The next claimant gets the checkpoint, and the old lease is gone.
+    assignment = client.get("/jobs/next", params={"node_id": "desktop"}).json()
+    assert assignment["job"]["checkpoint_url"] == "https://store.example/ckpt-1.zip"
+    assert client.post(f"/jobs/{job_id}/preempt", json=lease).status_code == 409
+
+
+def test_preempt_without_a_new_checkpoint_keeps_the_last_one(client: TestClient) -> None:
+    job_id = client.post("/jobs", json={"command": "simulate"}).json()["id"]
+    lease = claim(client, "laptop")
+    client.post(f"/jobs/{job_id}/preempt", json={**lease, "checkpoint_url": "ckpt-1"})
+    lease = claim(client, "laptop")
+
+    job = client.post(f"/jobs/{job_id}/preempt", json=lease).json()
+
+    assert (job["status"], job["checkpoint_url"]) == ("queued", "ckpt-1")
+
+
+def test_worker_hands_back_a_job_without_a_checkpoint(client: TestClient, tmp_path: Path) -> None:
+    job_id = client.post("/jobs", json={"command": "simulate"}).json()["id"]
+    lease = claim(client, "laptop")
+
+    hand_back(client, job_id, lease, str(tmp_path), "partial output\n")
+
+    job = client.get(f"/jobs/{job_id}").json()
+    assert (job["status"], job["checkpoint_url"]) == ("queued", None)
+    assert client.get(f"/jobs/{job_id}/logs").json()["text"] == "partial output\n"
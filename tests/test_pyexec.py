@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import threading
+from collections.abc import Iterator
+
+import pytest
+from fastapi.testclient import TestClient
+
+from deborgen.worker.pyexec import PREEMPTED_REASON, InterpreterPool
+
+
+@pytest.fixture
+def pool() -> Iterator[InterpreterPool]:
+    pool = InterpreterPool(size=1, preload=("json",), max_tasks=2)
+    yield pool
+    pool.close()
+
+
+def test_python_job_round_trips_kind_and_args(client: TestClient) -> None:
+    job = client.post(
+        "/jobs", json={"command": "builtins:print", "kind": "python", "args": ["hi"]}
+    ).json()
+    assert (job["kind"], job["args"]) == ("python", ["hi"])
+    claimed = client.get("/jobs/next", params={"node_id": "node-1"}).json()["job"]
+    assert (claimed["kind"], claimed["args"]) == ("python", ["hi"])
+
+
+def test_python_jobs_validate_the_entrypoint(client: TestClient) -> None:
+    response = client.post("/jobs", json={"command": "echo hi", "kind": "python"})
+    assert response.status_code == 422
+    response = client.post("/jobs", json={"command": "echo hi", "args": ["x"]})
+    assert response.status_code == 422
+
+
+def test_pool_captures_output_and_exit_codes(pool: InterpreterPool) -> None:
+    assert pool.run("builtins:print", ["hello", "world"], timeout_seconds=10) == (
+        0,
+        "hello world\n",
+        None,
+    )
+    assert pool.run("sys:exit", [3], timeout_seconds=10)[0] == 3
+
+    exit_code, output, failure_reason = pool.run("json:loads", {"s": "{"}, timeout_seconds=10)
+    assert exit_code == 1
+    assert "JSONDecodeError" in output
+    assert failure_reason is not None and failure_reason.startswith("JSONDecodeError")
+
+
+def test_pool_reuses_and_recycles_interpreters(pool: InterpreterPool) -> None:
+    pids = [pool.run("os:getpid", [], timeout_seconds=10)[1] for _ in range(3)]
+    # max_tasks=2: the first two tasks share an interpreter, the third gets a new one.
+    assert pids[0] == pids[1] != pids[2]
+
+
+def test_pool_times_out_and_cancels_tasks(pool: InterpreterPool) -> None:
+    exit_code, _, failure_reason = pool.run("time:sleep", [30], timeout_seconds=1)
+    assert (exit_code, failure_reason) == (124, "timeout exceeded (1s)")
+
+    cancel = threading.Event()
+    cancel.set()
+    assert pool.run("time:sleep", [30], timeout_seconds=10, cancel=cancel)[0] == 130
+    assert pool.run("builtins:print", ["still ok"], timeout_seconds=10)[1] == "still ok\n"
+
+    preempt = threading.Event()
+    preempt.set()
+    exit_code, _, failure_reason = pool.run(
+        "time:sleep", [30], timeout_seconds=10, preempt=preempt, grace_seconds=1
+    )
+    assert (exit_code, failure_reason) == (143, PREEMPTED_REASON)
+    assert pool.run("builtins:print", ["after"], timeout_seconds=10)[1] == "after\n"
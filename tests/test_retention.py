@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import time
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from deborgen.coordinator.app import SqliteJobStore, StoreKind, create_app
+from deborgen.coordinator.archive import JobArchive
+from deborgen.coordinator.models import Job, JobCreateRequest, JobFinishRequest, utcnow
+
+
+def make_retention_client(
+    tmp_path: Path, store_kind: StoreKind, archive_interval_seconds: float = 3600.0
+) -> TestClient:
+    return TestClient(
+        create_app(
+            db_path=":memory:",
+            store_kind=store_kind,
+            journal_dir=":memory:",
+            retention_days=0,
+            archive_dir=str(tmp_path / "archive"),
+            archive_interval_seconds=archive_interval_seconds,
+        )
+    )
+
+
+def run_job_to_completion(client: TestClient, command: str, exit_code: int = 0) -> str:
+    job_id = client.post("/jobs", json={"command": command}).json()["id"]
+    assignment = client.get("/jobs/next", params={"node_id": "node-1"}).json()
+    body = {"node_id": "node-1", "lease_token": assignment["lease_token"]}
+    client.post(f"/jobs/{job_id}/logs", json={**body, "text": f"{command}\n"}).raise_for_status()
+    client.post(f"/jobs/{job_id}/finish", json={**body, "exit_code": exit_code}).raise_for_status()
+    return str(job_id)
+
+
+@pytest.mark.parametrize("store_kind", ["sqlite", "memory"])
+def test_archived_jobs_leave_hot_tables_but_stay_readable(
+    tmp_path: Path, store_kind: StoreKind
+) -> None:
+    client = make_retention_client(tmp_path, store_kind)
+    succeeded = run_job_to_completion(client, "echo ok")
+    failed = run_job_to_completion(client, "echo bad", exit_code=3)
+    queued = client.post("/jobs", json={"command": "echo later"}).json()["id"]
+    before = client.get(f"/jobs/{succeeded}").json()
+
+    response = client.post("/admin/archive")
+    assert response.json() == {"archived": 2}
+
+    hot_ids = [job["id"] for job in client.get("/jobs").json()["jobs"]]
+    assert hot_ids == [queued]
+    assert client.get(f"/jobs/{succeeded}").json() == before
+    assert client.get(f"/jobs/{failed}").json()["exit_code"] == 3
+    assert client.get(f"/jobs/{succeeded}/logs").json()["text"] == "echo ok\n"
+    assert list((tmp_path / "archive").glob("segment-*.jsonl.gz"))
+
+
+def test_archive_endpoint_requires_retention(client: TestClient) -> None:
+    assert client.post("/admin/archive").status_code == 404
+
+
+def test_archive_index_survives_memory_store_restart(tmp_path: Path) -> None:
+    def make_app() -> TestClient:
+        return TestClient(
+            create_app(
+                store_kind="memory",
+                journal_dir=str(tmp_path / "journal"),
+                retention_days=0,
+                archive_dir=str(tmp_path / "archive"),
+            )
+        )
+
+    job_id = run_job_to_completion(make_app(), "echo ok")
+    client = make_app()
+    client.post("/admin/archive").raise_for_status()
+
+    restarted = make_app()
+    assert restarted.get(f"/jobs/{job_id}").json()["status"] == "succeeded"
+    assert restarted.get("/jobs").json()["jobs"] == []
+
+
+def test_archiver_runs_periodically_while_app_is_running(tmp_path: Path) -> None:
+    with make_retention_client(tmp_path, "sqlite", archive_interval_seconds=0.05) as client:
+        job_id = run_job_to_completion(client, "echo ok")
+        deadline = time.monotonic() + 5
+        while client.get("/jobs").json()["jobs"] and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert client.get("/jobs").json()["jobs"] == []
+        assert client.get(f"/jobs/{job_id}").json()["status"] == "succeeded"
+
+
+def test_concurrent_archivers_leave_no_orphaned_segment(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    db_path = str(tmp_path / "deborgen.db")
+    archive = JobArchive(str(tmp_path / "archive"))
+    first = SqliteJobStore(db_path=db_path, archive=archive)
+    second = SqliteJobStore(db_path=db_path, archive=JobArchive(str(tmp_path / "archive")))
+    job = first.create_job(JobCreateRequest(command="echo ok"))
+    assignment = first.claim_next_job("node-1")
+    assert assignment is not None
+    first.finish_job(
+        job.id, JobFinishRequest(node_id="node-1", lease_token=assignment.lease_token, exit_code=0)
+    )
+
+    # The other process archives the same jobs while this one is writing its segment.
+    write_segment = archive.write_segment
+
+    def racing_write(entries: list[tuple[Job, str]]) -> str:
+        segment = write_segment(entries)
+        assert second.archive_jobs(older_than=utcnow()) == 1
+        return segment
+
+    monkeypatch.setattr(archive, "write_segment", racing_write)
+    assert first.archive_jobs(older_than=utcnow()) == 0
+
+    segments = list((tmp_path / "archive").glob("segment-*.jsonl.gz"))
+    assert len(segments) == 1
+    assert first.get_job(job.id).status == "succeeded"
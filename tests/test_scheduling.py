@@ -1,7 +1,12 @@
+import time
+from datetime import timedelta
+
 import pytest
 from fastapi.testclient import TestClient
 
-from deborgen.coordinator.app import create_app
+from deborgen.coordinator.app import StoreKind, create_app
+from deborgen.coordinator.models import utcnow
+from deborgen.coordinator.scheduling import SchedulingMode, SchedulingPolicy
 
 @pytest.fixture
 def client() -> TestClient:
@@ -39,3 +44,86 @@ def test_job_routing_without_requirements_matches_any(client: TestClient) -> Non
     resp = client.get("/jobs/next?node_id=node_any")
     assert resp.status_code == 200
     assert resp.json()["job"]["command"] == "echo basic_work"
+
+@pytest.mark.parametrize("store_kind", ["sqlite", "memory"])
+def test_claims_only_jobs_that_fit_the_node_window(store_kind: StoreKind) -> None:
+    client = TestClient(
+        create_app(db_path=":memory:", store_kind=store_kind, journal_dir=":memory:")
+    )
+    long_job = client.post("/jobs", json={"command": "echo long", "timeout_seconds": 3 * 3600}).json()
+    short_job = client.post("/jobs", json={"command": "echo short", "timeout_seconds": 300}).json()
+
+    closing_soon = (utcnow() + timedelta(minutes=10)).isoformat()
+    client.post("/nodes/night_pc/heartbeat", json={"available_until": closing_soon})
+    resp = client.get("/jobs/next?node_id=night_pc")
+    assert resp.json()["job"]["id"] == short_job["id"]
+    assert client.get("/jobs/next?node_id=night_pc").status_code == 204
+
+    # A heartbeat without a window lifts the limit.
+    node = client.post("/nodes/night_pc/heartbeat", json={}).json()
+    assert node["available_until"] is None
+    assert client.get("/jobs/next?node_id=night_pc").json()["job"]["id"] == long_job["id"]
+
+
+def scheduled_client(store_kind: StoreKind, mode: SchedulingMode) -> TestClient:
+    app = create_app(
+        db_path=":memory:", store_kind=store_kind, journal_dir=":memory:", scheduling=mode
+    )
+    return TestClient(app)
+
+
+def run_once(
+    client: TestClient, command: str, seconds: float = 0.0, timeout_seconds: int = 3600
+) -> None:
+    """Submit, claim and finish a job, so its fingerprint gets a runtime estimate."""
+    job = {"command": command, "timeout_seconds": timeout_seconds}
+    job_id = client.post("/jobs", json=job).json()["id"]
+    lease_token = client.get("/jobs/next?node_id=trainer").json()["lease_token"]
+    time.sleep(seconds)
+    client.post(
+        f"/jobs/{job_id}/finish",
+        json={"node_id": "trainer", "lease_token": lease_token, "exit_code": 0},
+    )
+
+
+@pytest.mark.parametrize("store_kind", ["sqlite", "memory"])
+def test_sjf_claims_the_job_expected_to_finish_first(store_kind: StoreKind) -> None:
+    client = scheduled_client(store_kind, "sjf")
+    run_once(client, "python simulate.py --hours 2", seconds=0.2)
+    run_once(client, "python plot.py --run 1")
+
+    slow = client.post("/jobs", json={"command": "python simulate.py --hours 3"}).json()
+    fast = client.post("/jobs", json={"command": "python plot.py --run 2"}).json()
+
+    assert client.get("/jobs/next?node_id=n1").json()["job"]["id"] == fast["id"]
+    assert client.get("/jobs/next?node_id=n1").json()["job"]["id"] == slow["id"]
+
+
+def test_sjf_aging_and_max_wait_bound_how_long_a_job_is_passed_over() -> None:
+    policy = SchedulingPolicy(mode="sjf", aging=1.0, max_wait_seconds=3600)
+    now = utcnow()
+
+    def score(estimate: float, waited_seconds: float) -> tuple[int, float]:
+        return policy.score(estimate, now - timedelta(seconds=waited_seconds), now)
+
+    assert score(30, 0) < score(600, 0)
+    # Ten minutes of waiting makes up for ten minutes of extra expected runtime.
+    assert score(600, 601) < score(30, 0)
+    # Past the bound, even a 5-hour job goes ahead of fresh short ones.
+    assert score(5 * 3600, 3600) < score(1, 0)
+
+
+@pytest.mark.parametrize("store_kind", ["sqlite", "memory"])
+def test_backfill_fills_a_closing_window_with_jobs_expected_to_fit(store_kind: StoreKind) -> None:
+    client = scheduled_client(store_kind, "backfill")
+    run_once(client, "python sweep.py -p 1", timeout_seconds=10800)
+    unknown = client.post("/jobs", json={"command": "python train.py", "timeout_seconds": 10800})
+    known = client.post("/jobs", json={"command": "python sweep.py -p 7", "timeout_seconds": 10800})
+
+    closing_soon = (utcnow() + timedelta(minutes=10)).isoformat()
+    client.post("/nodes/night_pc/heartbeat", json={"available_until": closing_soon})
+
+    # Its timeout is too long for the window, but its past runs are not.
+    assert client.get("/jobs/next?node_id=night_pc").json()["job"]["id"] == known.json()["id"]
+    assert client.get("/jobs/next?node_id=night_pc").status_code == 204
+    assert client.get("/jobs/next?node_id=day_pc").json()["job"]["id"] == unknown.json()["id"]
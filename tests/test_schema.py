@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+from deborgen.cli import migrate_db
+from deborgen.coordinator.app import SqliteJobStore
+from deborgen.coordinator.models import JobCreateRequest
+from deborgen.coordinator.schema import SCHEMA_VERSION, from_micros, to_micros
+
+LEGACY_SCHEMA = """
+CREATE TABLE jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    status TEXT NOT NULL,
+    command TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    started_at TEXT,
+    finished_at TEXT,
+    assigned_node_id TEXT,
+    timeout_seconds INTEGER NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 1,
+    exit_code INTEGER,
+    failure_reason TEXT,
+    artifact_urls TEXT NOT NULL DEFAULT '[]',
+    requirements_json TEXT NOT NULL DEFAULT '{}'
+);
+CREATE TABLE leases (
+    lease_token TEXT PRIMARY KEY,
+    job_id INTEGER NOT NULL,
+    node_id TEXT NOT NULL,
+    lease_expires_at TEXT NOT NULL,
+    FOREIGN KEY(job_id) REFERENCES jobs(id) ON DELETE CASCADE
+);
+CREATE TABLE logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    FOREIGN KEY(job_id) REFERENCES jobs(id) ON DELETE CASCADE
+);
+CREATE TABLE nodes (
+    node_id TEXT PRIMARY KEY,
+    name TEXT,
+    labels_json TEXT NOT NULL DEFAULT '{}',
+    last_seen_at TEXT NOT NULL
+);
+CREATE INDEX idx_logs_job_id ON logs(job_id);
+INSERT INTO jobs(id, status, command, created_at, started_at, finished_at, timeout_seconds, attempts, exit_code)
+VALUES
+    (1, 'succeeded', 'echo done', '2026-01-01T00:00:00+00:00', '2026-01-01T00:00:01+00:00', '2026-01-01T00:00:03.500000+00:00', 60, 1, 0),
+    (3, 'running', 'sleep 600', '2026-01-02T00:00:00+00:00', '2026-01-02T00:00:01+00:00', NULL, 60, 1, NULL),
+    (4, 'queued', 'echo later', '2026-01-02T00:00:00+00:00', NULL, NULL, 60, 0, NULL);
+UPDATE sqlite_sequence SET seq = 7 WHERE name = 'jobs';
+INSERT INTO leases VALUES ('token', 3, 'node-1', '2999-01-01T00:00:00+00:00');
+INSERT INTO logs(job_id, text, created_at) VALUES (1, 'done', '2026-01-01T00:00:02+00:00');
+INSERT INTO nodes VALUES ('node-1', 'laptop', '{"gpu": true}', '2026-01-02T00:00:05+00:00');
+"""
+
+
+def make_legacy_db(tmp_path: Path) -> str:
+    db_path = str(tmp_path / "deborgen.db")
+    conn = sqlite3.connect(db_path)
+    conn.executescript(LEGACY_SCHEMA)
+    conn.close()
+    return db_path
+
+
+def test_micros_round_trip() -> None:
+    store = SqliteJobStore(db_path=":memory:")
+    job = store.create_job(JobCreateRequest(command="echo"))
+    assert from_micros(to_micros(job.created_at)) == job.created_at
+
+
+def test_legacy_database_is_migrated_on_open(tmp_path: Path) -> None:
+    db_path = make_legacy_db(tmp_path)
+
+    store = SqliteJobStore(db_path=db_path)
+
+    finished = store.get_job("job_1")
+    assert (finished.status, finished.exit_code, finished.kind) == ("succeeded", 0, "command")
+    assert finished.finished_at is not None and finished.started_at is not None
+    assert (finished.finished_at - finished.started_at).total_seconds() == 2.5
+    assert store.read_logs("job_1").text == "done"
+    store.assert_job_lease("job_3", "node-1", "token")
+    assert [job.id for job in store.list_jobs("queued", None)] == ["job_4"]
+    assert store.stats().totals.succeeded == 1
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+    assert conn.execute("SELECT typeof(created_at), typeof(status) FROM jobs").fetchall() == [
+        ("integer", "integer")
+    ] * 3
+    assert conn.execute("SELECT typeof(last_seen_at) FROM nodes").fetchone() == ("integer",)
+    assert not conn.execute(
+        "SELECT name FROM sqlite_master WHERE name LIKE '%legacy%'"
+    ).fetchall()
+    conn.close()
+    # Ids freed before the migration are still never reused.
+    assert store.create_job(JobCreateRequest(command="echo")).id == "job_8"
+
+
+def test_migrate_db_cli_backs_up_first(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    db_path = make_legacy_db(tmp_path)
+    monkeypatch.setattr(sys, "argv", ["deborgen-migrate-db", db_path, "--vacuum"])
+
+    migrate_db.main()
+
+    assert "from schema version 0 to 2" in capsys.readouterr().out
+    assert migrate_db.schema_version(f"{db_path}.bak") == 0
+    assert migrate_db.schema_version(db_path) == SCHEMA_VERSION
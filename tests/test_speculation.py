@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from conftest import finish
+from fastapi.testclient import TestClient
+
+from deborgen.coordinator.app import SqliteJobStore, StoreKind, create_app
+from deborgen.coordinator.speculation import SpeculationPolicy
+from deborgen.worker.agent import run_job
+
+
+def start_straggler(client: TestClient) -> tuple[str, str]:
+    """Submit a six-job group, finish five quickly and leave the last one running."""
+    batch = client.post("/jobs/batch", json={"jobs": [{"command": f"echo {i}"} for i in range(6)]})
+    job_ids = [job["id"] for job in batch.json()["jobs"]]
+    for _ in range(5):
+        assignment = client.get("/jobs/next", params={"node_id": "node-1"}).json()
+        assert finish(client, assignment["job"]["id"], assignment["lease_token"]).status_code == 200
+    straggler = client.get("/jobs/next", params={"node_id": "node-1"}).json()
+    assert straggler["job"]["id"] == job_ids[-1]
+    time.sleep(0.05)
+    return straggler["job"]["id"], straggler["lease_token"]
+
+
+def test_threshold_needs_enough_peers() -> None:
+    policy = SpeculationPolicy(percentile=0.5, min_peers=3)
+    assert policy.threshold_seconds([1.0, 2.0]) is None
+    assert policy.threshold_seconds([4.0, 1.0, 3.0, 2.0]) == 3.0
+
+
+@pytest.mark.parametrize("store_kind", ["sqlite", "memory"])
+def test_idle_node_gets_duplicate_lease_and_first_finish_wins(store_kind: StoreKind) -> None:
+    client = TestClient(
+        create_app(
+            db_path=":memory:",
+            store_kind=store_kind,
+            journal_dir=":memory:",
+            speculation_percentile=0.5,
+        )
+    )
+    job_id, original_token = start_straggler(client)
+
+    duplicate = client.get("/jobs/next", params={"node_id": "node-2"}).json()
+    assert duplicate["job"]["id"] == job_id
+    assert duplicate["lease_token"] != original_token
+    # One duplicate per job at most.
+    assert client.get("/jobs/next", params={"node_id": "node-3"}).status_code == 204
+
+    response = finish(client, job_id, duplicate["lease_token"], node_id="node-2")
+    assert response.status_code == 200
+    job = client.get(f"/jobs/{job_id}").json()
+    assert (job["status"], job["assigned_node_id"]) == ("succeeded", "node-2")
+
+    heartbeat = client.post("/nodes/node-1/heartbeat", json={"labels": {}}).json()
+    assert heartbeat["cancelled_jobs"] == [job_id]
+    assert client.post("/nodes/node-1/heartbeat", json={"labels": {}}).json()["cancelled_jobs"] == []
+    assert finish(client, job_id, original_token).status_code == 409
+
+
+def test_speculation_is_off_by_default(client: TestClient) -> None:
+    start_straggler(client)
+    assert client.get("/jobs/next", params={"node_id": "node-2"}).status_code == 204
+
+
+def test_single_lease_table_is_migrated(tmp_path: Path) -> None:
+    db_path = str(tmp_path / "deborgen.db")
+    SqliteJobStore(db_path=db_path)
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA user_version = 0")
+    conn.execute("DROP TABLE leases")
+    conn.execute(
+        """
+        CREATE TABLE leases (
+            job_id INTEGER PRIMARY KEY,
+            node_id TEXT NOT NULL,
+            lease_token TEXT NOT NULL,
+            lease_expires_at TEXT NOT NULL
+        )
+        """
+    )
+    conn.execute(
+        "INSERT INTO jobs(status, command, created_at, timeout_seconds) VALUES ('running', 'echo', '2026-01-01T00:00:00+00:00', 60)"
+    )
+    conn.execute("INSERT INTO leases VALUES (1, 'node-1', 'token', '2999-01-01T00:00:00+00:00')")
+    conn.commit()
+    conn.close()
+
+    store = SqliteJobStore(db_path=db_path)
+    store.assert_job_lease("job_1", "node-1", "token")
+
+
+def test_run_job_stops_when_cancelled() -> None:
+    cancel = threading.Event()
+    cancel.set()
+    started = time.monotonic()
+    exit_code, _, failure_reason = run_job("sleep 5", timeout_seconds=30, cancel=cancel)
+    assert time.monotonic() - started < 3
+    assert exit_code == 130
+    assert failure_reason is not None and failure_reason.startswith("cancelled")
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+import pytest
+from conftest import finish
+from fastapi.testclient import TestClient
+
+from deborgen.coordinator.app import SqliteJobStore
+from deborgen.coordinator.memory_store import MemoryJobStore
+from deborgen.coordinator.models import JobCreateRequest, JobFinishRequest
+from deborgen.coordinator.stats import (
+    MemoryStatsTable,
+    build_stats,
+    claimed_deltas,
+    created_deltas,
+)
+
+
+def test_stats_follow_job_transitions(client: TestClient) -> None:
+    assert client.get("/stats").json()["totals"]["submitted"] == 0
+
+    first = client.post("/jobs", json={"command": "echo a", "submitter": "alice"}).json()["id"]
+    second = client.post("/jobs", json={"command": "echo b", "submitter": "alice"}).json()["id"]
+    client.post("/jobs", json={"command": "echo c"})
+    lease_a = client.get("/jobs/next", params={"node_id": "node-1"}).json()["lease_token"]
+    lease_b = client.get("/jobs/next", params={"node_id": "node-1"}).json()["lease_token"]
+    finish(client, first, lease_a).raise_for_status()
+    finish(client, second, lease_b, exit_code=2).raise_for_status()
+
+    stats = client.get("/stats").json()
+    totals = stats["totals"]
+    assert (totals["submitted"], totals["queued"], totals["running"]) == (3, 1, 0)
+    assert (totals["started"], totals["succeeded"], totals["failed"]) == (2, 1, 1)
+    assert totals["mean_wait_seconds"] is not None and totals["mean_wait_seconds"] >= 0
+    assert stats["submitters"]["alice"]["submitted"] == 2
+    assert stats["submitters"]["anonymous"]["queued"] == 1
+    assert stats["nodes"]["node-1"]["succeeded"] == 1
+    assert 0 <= stats["nodes"]["node-1"]["utilization"] <= 1
+    assert len(stats["windows"]) == 1 and stats["windows"][0]["submitted"] == 3
+
+
+def test_gauges_stay_out_of_node_and_hour_rows(client: TestClient) -> None:
+    client.post("/jobs", json={"command": "echo a"})
+    client.get("/jobs/next", params={"node_id": "node-1"}).raise_for_status()
+
+    stats = client.get("/stats").json()
+    assert (stats["totals"]["queued"], stats["totals"]["running"]) == (0, 1)
+    node = stats["nodes"]["node-1"]
+    assert (node["queued"], node["running"], node["started"]) == (0, 0, 1)
+
+    # Claimed in the hour after it was submitted: each hour shows only its own event.
+    submitted_at = datetime(2026, 1, 1, 10, 59, tzinfo=UTC)
+    claimed_at = submitted_at + timedelta(minutes=2)
+    table = MemoryStatsTable()
+    table.apply(created_deltas(None, submitted_at))
+    table.apply(claimed_deltas(None, "node-1", submitted_at, claimed_at))
+    windows = build_stats(table.rows(), claimed_at).windows
+    assert [(w.submitted, w.started, w.queued, w.running) for w in windows] == [
+        (1, 0, 0, 0),
+        (0, 1, 0, 0),
+    ]
+
+
+def test_submitter_is_returned_on_job(client: TestClient) -> None:
+    job = client.post("/jobs", json={"command": "echo a", "submitter": "alice"}).json()
+    assert client.get(f"/jobs/{job['id']}").json()["submitter"] == "alice"
+
+
+def test_sqlite_stats_backfill_existing_jobs(tmp_path: Path) -> None:
+    db_path = str(tmp_path / "deborgen.db")
+    store = SqliteJobStore(db_path=db_path)
+    job = store.create_job(JobCreateRequest(command="echo a"))
+    assignment = store.claim_next_job("node-1")
+    assert assignment is not None
+    store.finish_job(
+        job.id, JobFinishRequest(node_id="node-1", lease_token=assignment.lease_token, exit_code=0)
+    )
+    store.create_job(JobCreateRequest(command="echo b"))
+    store._conn.execute("DROP TABLE stats")
+    store._conn.commit()
+
+    reopened = SqliteJobStore(db_path=db_path).stats()
+    assert (reopened.totals.submitted, reopened.totals.queued) == (2, 1)
+    assert reopened.totals.succeeded == 1
+    assert reopened.nodes["node-1"].succeeded == 1
+
+
+def test_memory_stats_survive_restart(tmp_path: Path) -> None:
+    store = MemoryJobStore(journal_dir=str(tmp_path), snapshot_every=2)
+    for index in range(3):
+        store.create_job(JobCreateRequest(command=f"echo {index}", submitter="bob"))
+    assert store.claim_next_job("node-1") is not None
+    store.close()
+
+    stats = MemoryJobStore(journal_dir=str(tmp_path)).stats()
+    assert (stats.totals.submitted, stats.totals.queued, stats.totals.running) == (3, 2, 1)
+    assert stats.submitters["bob"].started == 1
+
+
+@pytest.mark.parametrize("max_attempts", [1, 2])
+def test_expired_leases_are_counted(max_attempts: int) -> None:
+    for store in (
+        SqliteJobStore(db_path=":memory:", lease_duration_seconds=-1),
+        MemoryJobStore(journal_dir=":memory:", lease_duration_seconds=-1),
+    ):
+        store.create_job(JobCreateRequest(command="echo a", max_attempts=max_attempts))
+        assert store.claim_next_job("node-1") is not None
+        assert store.expire_leases() == 1
+
+        totals = store.stats().totals
+        assert (totals.running, totals.expired) == (0, 1)
+        if max_attempts > 1:
+            assert totals.queued == 1
+        else:
+            assert (totals.queued, totals.failed) == (0, 1)
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import pytest
+from conftest import finish_next
+from fastapi.testclient import TestClient
+
+from deborgen.cli.wait import (
+    PollInterval,
+    Progress,
+    format_progress,
+    group_poller,
+    id_poller,
+    wait_for_jobs,
+)
+from deborgen.client import DeborgenClient
+
+
+def submit_group(client: TestClient, size: int) -> list[str]:
+    jobs = [{"command": f"echo {index}"} for index in range(size)]
+    response = client.post("/jobs/batch", json={"jobs": jobs, "group_id": "grp_sweep"})
+    return [job["id"] for job in response.json()["jobs"]]
+
+
+def test_group_lookup_counts_every_job_and_filters_entries(client: TestClient) -> None:
+    job_ids = submit_group(client, 4)
+    client.post("/jobs", json={"command": "echo other"})
+    finish_next(client, exit_code=0)
+    finish_next(client, exit_code=2)
+
+    body = client.post(
+        "/jobs/status", json={"group_id": "grp_sweep", "statuses": ["failed"]}
+    ).json()
+
+    assert body["counts"] == {"succeeded": 1, "failed": 1, "queued": 2}
+    assert [(entry["id"], entry["exit_code"]) for entry in body["jobs"]] == [(job_ids[1], 2)]
+    everything = client.post("/jobs/status", json={"group_id": "grp_sweep"}).json()
+    assert [entry["id"] for entry in everything["jobs"]] == job_ids
+    assert client.post("/jobs/status", json={"group_id": "grp_none"}).json()["counts"] == {}
+
+
+def test_status_lookup_takes_ids_or_a_group(client: TestClient) -> None:
+    response = client.post("/jobs/status", json={"ids": ["job_1"], "group_id": "grp_sweep"})
+    assert response.status_code == 422
+
+
+def test_poll_interval_backs_off_until_something_changes() -> None:
+    interval = PollInterval(1.0, 3.0, factor=2.0)
+    assert [interval.next(changed) for changed in (False, False, False, True)] == [2.0, 3.0, 3.0, 1.0]
+
+
+def test_format_progress() -> None:
+    assert format_progress({"queued": 2, "succeeded": 7, "failed": 1}) == (
+        "8/10 done queued=2 succeeded=7 failed=1"
+    )
+
+
+@pytest.mark.parametrize("by_group", [False, True])
+def test_wait_for_jobs_polls_until_all_are_terminal(
+    client: TestClient, by_group: bool, capsys: pytest.CaptureFixture[str]
+) -> None:
+    job_ids = submit_group(client, 3)
+    sdk = DeborgenClient(str(client.base_url), transport=client._transport)
+    poll = group_poller(sdk, "grp_sweep") if by_group else id_poller(sdk, [*job_ids, "job_999"])
+    outcomes = iter([0, 1, 0])
+
+    def poll_and_run() -> Progress:
+        progress = poll()
+        exit_code = next(outcomes, None)
+        if exit_code is not None:
+            finish_next(client, exit_code)
+        return progress
+
+    counts, failed = wait_for_jobs(poll_and_run, PollInterval(0.0, 0.0), timeout_seconds=5)
+
+    assert counts["succeeded"] == 2 and counts["failed"] == 1
+    assert counts.get("missing", 0) == (0 if by_group else 1)
+    assert [entry.id for entry in failed] == [job_ids[1]]
+    assert capsys.readouterr().out.splitlines()[-1].startswith("3/3 done" if by_group else "4/4 done")
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import gzip
+
+import pytest
+from conftest import finish, submit_and_claim
+from fastapi.testclient import TestClient
+
+from deborgen.core.wire import (
+    MSGPACK_TYPE,
+    WireClient,
+    choose_encoding,
+    compress,
+    content_encodings,
+    decompress,
+)
+
+
+def wire_client(client: TestClient, compact: bool = True) -> WireClient:
+    return WireClient(transport=client._transport, base_url=str(client.base_url), compact=compact)
+
+
+def test_large_request_bodies_are_compressed_once_negotiated(client: TestClient) -> None:
+    worker = wire_client(client)
+    job_id, lease_token = submit_and_claim(worker)
+    logs = "epoch 1 loss 0.25\n" * 500
+
+    response = worker.post(
+        f"/jobs/{job_id}/complete",
+        json={"node_id": "node-1", "lease_token": lease_token, "exit_code": 0, "logs": logs},
+    )
+
+    assert response.status_code == 200
+    assert response.request.headers["content-encoding"] == content_encodings()[0]
+    assert len(response.request.content) < len(logs) // 10
+    assert worker.get(f"/jobs/{job_id}/logs").json()["text"] == logs
+    assert client.get(f"/jobs/{job_id}/logs").headers["content-encoding"] == content_encodings()[0]
+
+
+def test_plain_json_client_is_left_alone(client: TestClient) -> None:
+    worker = wire_client(client, compact=False)
+    job_id, lease_token = submit_and_claim(worker)
+
+    response = worker.post(
+        f"/jobs/{job_id}/logs",
+        json={"node_id": "node-1", "lease_token": lease_token, "text": "x" * 5000},
+    )
+
+    assert response.status_code == 200
+    assert "content-encoding" not in response.request.headers
+
+
+def test_undecodable_bodies_are_rejected(client: TestClient) -> None:
+    headers = {"Content-Type": "application/json"}
+    response = client.post(
+        "/jobs", content=b"not gzip", headers={**headers, "Content-Encoding": "gzip"}
+    )
+    assert response.status_code == 400
+    response = client.post("/jobs", content=b"{}", headers={**headers, "Content-Encoding": "br"})
+    assert response.status_code == 415
+
+
+def test_gzip_round_trip_and_negotiation() -> None:
+    body = b'{"text": "' + b"a" * 4000 + b'"}'
+    assert decompress(compress(body, "gzip"), "gzip") == body
+    assert gzip.decompress(compress(body, "gzip")) == body
+    assert choose_encoding("br, gzip;q=0.5") == "gzip"
+    assert choose_encoding("gzip;q=0, br") is None
+
+
+def test_msgpack_is_negotiated_both_ways(client: TestClient) -> None:
+    pytest.importorskip("msgpack")
+    worker = wire_client(client)
+    worker.get("/health")
+    job_id, lease_token = submit_and_claim(worker)
+
+    response = finish(worker, job_id, lease_token)
+
+    assert response.request.headers["content-type"] == MSGPACK_TYPE
+    assert response.headers["content-type"] == MSGPACK_TYPE
+    assert response.json()["status"] == "succeeded"
@@ -1,6 +1,6 @@
-from datetime import datetime
+from datetime import UTC, datetime
 
-from deborgen.worker.agent import is_within_work_hours
+from deborgen.worker.agent import is_within_work_hours, work_hours_end
 
 def test_no_work_hours() -> None:
     now = datetime(2026, 1, 1, 12, 0)
@@ -45,3 +45,18 @@ def test_spanning_midnight_window() -> None:
     
     # After window (daytime)
     assert is_within_work_hours(datetime(2026, 1, 2, 8, 1), window) is False
+
+def test_work_hours_end() -> None:
+    def end(now: datetime, window: str | None) -> datetime | None:
+        result = work_hours_end(now, window)
+        return None if result is None else result.astimezone().replace(tzinfo=None)
+
+    assert work_hours_end(datetime(2026, 1, 1, 12, 0), None) is None
+    assert work_hours_end(datetime(2026, 1, 1, 12, 0), "invalid") is None
+    assert end(datetime(2026, 1, 1, 12, 0), "09:00-17:00") == datetime(2026, 1, 1, 17, 0)
+    # Between windows the coordinator is told when the next one closes.
+    assert end(datetime(2026, 1, 1, 18, 0), "09:00-17:00") == datetime(2026, 1, 2, 17, 0)
+    assert end(datetime(2026, 1, 1, 23, 0), "22:00-08:00") == datetime(2026, 1, 2, 8, 0)
+    assert end(datetime(2026, 1, 2, 7, 50), "22:00-08:00") == datetime(2026, 1, 2, 8, 0)
+    result = work_hours_end(datetime(2026, 1, 1, 12, 0), "09:00-17:00")
+    assert result is not None and result.tzinfo is UTC
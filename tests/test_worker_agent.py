@@ -1,10 +1,20 @@
 from __future__ import annotations
 
+import os
 import sys
+import threading
+import time
+from pathlib import Path
 
+import httpx
 import pytest
 
-from deborgen.worker.agent import parse_labels, run_job
+from deborgen.core.backoff import PollBackoff, retry_after
+from deborgen.worker import agent
+from deborgen.worker.agent import WarmKeys, parse_labels, run_job
+from deborgen.worker.limits import ResourceLimits, job_limits, parse_cpu_list
+from deborgen.worker.pyexec import CHECKPOINT_ENV, PREEMPTED_REASON
+from deborgen.worker.usage import JobUsage, node_load
 
 
 def test_parse_labels_accepts_json_object() -> None:
@@ -46,3 +56,162 @@ def test_run_job_rejects_empty_command() -> None:
     assert exit_code == 2
     assert text == ""
     assert failure_reason == "invalid command: empty command"
+
+
+def test_warm_keys_keep_the_most_recent_keys() -> None:
+    warm_keys = WarmKeys(limit=2)
+    for key in ("a", "b", "a", "c"):
+        warm_keys.add(key)
+    assert warm_keys.snapshot() == ["a", "c"]
+
+
+def test_run_job_preempts_with_sigterm_and_a_grace_period(tmp_path: Path) -> None:
+    script = (
+        "import os, signal, sys, time\n"
+        "def save(*_):\n"
+        "    with open(os.path.join(os.environ['DEBORGEN_CHECKPOINT_DIR'], 'step'), 'w') as f:\n"
+        "        f.write('41')\n"
+        "    sys.exit(0)\n"
+        "signal.signal(signal.SIGTERM, save)\n"
+        "print('started', flush=True)\n"
+        "time.sleep(30)\n"
+    )
+    preempt = threading.Event()
+    threading.Timer(1.0, preempt.set).start()
+
+    exit_code, text, failure_reason = run_job(
+        f'"{sys.executable}" -c "{script}"',
+        timeout_seconds=30,
+        env={**os.environ, CHECKPOINT_ENV: str(tmp_path)},
+        preempt=preempt,
+        grace_seconds=5,
+    )
+
+    assert failure_reason == PREEMPTED_REASON
+    assert exit_code == 0
+    assert "started" in text
+    assert (tmp_path / "step").read_text() == "41"
+
+
+def test_parse_cpu_list_reads_ranges() -> None:
+    assert parse_cpu_list("0-3, 8") == {0, 1, 2, 3, 8}
+    with pytest.raises(ValueError):
+        parse_cpu_list("3-1")
+
+
+def test_job_limits_take_the_tighter_of_request_and_worker_cap() -> None:
+    caps = ResourceLimits(memory_mb=1024)
+    assert job_limits({"memory_mb": 4096, "cpu_seconds": 60}, caps) == ResourceLimits(1024, 60)
+    assert job_limits({"memory_mb": 256}, caps) == ResourceLimits(256, None)
+
+
+@pytest.mark.skipif(not Path("/proc/self/stat").exists(), reason="needs Linux /proc")
+def test_run_job_kills_a_job_over_its_memory_limit() -> None:
+    script = "import time; block = bytearray(300 * 2**20); print('allocated', flush=True); time.sleep(30)"
+
+    exit_code, text, failure_reason = run_job(
+        f'"{sys.executable}" -c "{script}"',
+        timeout_seconds=30,
+        limits=ResourceLimits(memory_mb=100),
+    )
+
+    assert (exit_code, failure_reason) == (137, "memory limit exceeded (100 MB)")
+    assert "allocated" in text
+
+
+@pytest.mark.skipif(os.name != "posix", reason="needs RLIMIT_CPU")
+def test_run_job_stops_a_job_past_its_cpu_time_limit() -> None:
+    exit_code, _, failure_reason = run_job(
+        f'"{sys.executable}" -c "while True: pass"',
+        timeout_seconds=30,
+        limits=ResourceLimits(cpu_seconds=1),
+    )
+
+    assert exit_code < 0
+    assert failure_reason == "cpu time limit exceeded (1s)"
+
+
+def test_run_job_measures_the_cpu_time_of_its_process_tree() -> None:
+    # The busy loop runs in a grandchild, which only the child waits for.
+    script = (
+        "import subprocess, sys\n"
+        "subprocess.run([sys.executable, '-c', 'sum(range(30_000_000))'])\n"
+    )
+    usage = JobUsage()
+
+    exit_code, _, _ = run_job(f'"{sys.executable}" -c "{script}"', timeout_seconds=30, usage=usage)
+    metrics = usage.finish()
+
+    assert exit_code == 0
+    assert metrics["wall_seconds"] is not None and metrics["wall_seconds"] > 0
+    assert metrics["user_cpu_seconds"] is not None and metrics["user_cpu_seconds"] > 0.1
+    assert metrics["max_rss_kb"] is not None and metrics["max_rss_kb"] > 0
+
+
+def test_run_job_samples_memory_less_often_without_a_memory_limit(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    sampled: list[int] = []
+
+    def session_rss_bytes(pid: int) -> int:
+        sampled.append(pid)
+        return 2**20
+
+    monkeypatch.setattr(agent, "session_rss_bytes", session_rss_bytes)
+    usage = JobUsage()
+
+    exit_code, _, _ = run_job(
+        f'"{sys.executable}" -c "import time; time.sleep(3)"', timeout_seconds=30, usage=usage
+    )
+
+    # Six polls; samples fall at 0.5, 1 and 2 seconds.
+    assert exit_code == 0
+    assert 1 <= len(sampled) <= 3
+    assert usage.finish()["max_rss_kb"] is not None
+
+
+@pytest.mark.skipif(not Path("/proc/meminfo").exists(), reason="needs Linux /proc")
+def test_node_load_reports_live_figures(tmp_path: Path) -> None:
+    load = node_load(str(tmp_path), running_slots=1)
+
+    assert load["running_slots"] == 1
+    assert load["load_avg"] >= 0
+    assert load["memory_free_mb"] > 0
+    assert load["disk_free_mb"] > 0
+
+
+def test_poll_backoff_grows_with_jitter_and_honours_retry_after() -> None:
+    backoff = PollBackoff(base=1.0, maximum=8.0)
+    delays = [backoff.next() for _ in range(6)]
+
+    for delay, ceiling in zip(delays, [1, 2, 4, 8, 8, 8], strict=True):
+        assert ceiling / 2 <= delay <= ceiling
+    assert 20.0 <= backoff.next(retry_after=20.0) <= 30.0
+    backoff.reset()
+    assert backoff.next() <= 1.0
+
+    overloaded = httpx.Response(503, headers={"Retry-After": "5"})
+    assert retry_after(overloaded) == 5.0
+    assert retry_after(httpx.Response(500, headers={"Retry-After": "5"})) is None
+
+
+def test_run_job_kills_children_that_hold_the_pipes_on_timeout() -> None:
+    started = time.monotonic()
+    exit_code, _, failure_reason = run_job('sh -c "sleep 30 & wait"', timeout_seconds=1)
+
+    assert exit_code == 124
+    assert failure_reason == "timeout exceeded (1s)"
+    assert time.monotonic() - started < 10
+
+
+def test_run_job_preempts_the_children_of_a_wrapper_script() -> None:
+    preempt = threading.Event()
+    preempt.set()
+    started = time.monotonic()
+
+    _, _, failure_reason = run_job(
+        'sh -c "sleep 30; true"', timeout_seconds=60, preempt=preempt, grace_seconds=1
+    )
+
+    assert failure_reason == PREEMPTED_REASON
+    assert time.monotonic() - started < 10